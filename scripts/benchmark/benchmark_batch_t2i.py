@@ -0,0 +1,93 @@
+# scripts/benchmark/benchmark_batch_t2i.py
+# ============================================================
+# 📚 T2I 여러 장 생성 처리량 측정
+# - serial    : /api/generate_t2i 를 N번 순차 호출 (기존 render_t2i_page 방식)
+# - batch     : num_images=N 한 번 호출 (EmptyLatentImage.batch_size)
+# - variations: prompt_variations N개 한 번 호출 (워크플로우 N개를 한 번에 큐 등록)
+# - 실행 중인 백엔드(FastAPI)와 ComfyUI가 필요합니다.
+#
+# 사용법:
+#   uv run python scripts/benchmark/benchmark_batch_t2i.py --num-images 4 --steps 28
+#   uv run python scripts/benchmark/benchmark_batch_t2i.py --num-images 4 --size 768 --runs 2
+# ============================================================
+
+import argparse
+import statistics
+import time
+
+import requests
+
+PROMPT = "헬스장에서 운동하는 사람, 밝은 조명"
+
+
+def post_t2i(base_url: str, payload: dict) -> dict:
+    """T2I 호출 (레거시 JSON 응답) 후 응답 본문 반환"""
+    resp = requests.post(f"{base_url}/api/generate_t2i", json=payload, timeout=3600)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def run_serial(base_url: str, base: dict, n: int) -> float:
+    start = time.time()
+    for i in range(n):
+        post_t2i(base_url, {**base, "seed": 1000 + i})
+    return time.time() - start
+
+
+def run_batch(base_url: str, base: dict, n: int) -> float:
+    start = time.time()
+    body = post_t2i(base_url, {**base, "seed": 1000, "num_images": n})
+    elapsed = time.time() - start
+    received = 1 + sum(1 for i in range(1, n) if f"image_{i}_base64" in body)
+    assert received == n, f"이미지 {received}/{n}장만 수신"
+    return elapsed
+
+
+def run_variations(base_url: str, base: dict, n: int) -> float:
+    variations = [f"{PROMPT} (variation {i + 1})" for i in range(n)]
+    start = time.time()
+    post_t2i(base_url, {**base, "seed": 1000, "prompt_variations": variations})
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="T2I 여러 장 생성 처리량 측정 (순차 vs 배치)")
+    parser.add_argument("--api", default="http://localhost:8000", help="백엔드 주소")
+    parser.add_argument("--model", default=None, help="사용할 모델 (없으면 현재 모델)")
+    parser.add_argument("--num-images", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=1, help="측정 반복 횟수")
+    parser.add_argument("--steps", type=int, default=28)
+    parser.add_argument("--size", type=int, default=1024)
+    args = parser.parse_args()
+
+    base = {
+        "prompt": PROMPT,
+        "width": args.size,
+        "height": args.size,
+        "steps": args.steps,
+        "model_name": args.model
+    }
+    n = args.num_images
+
+    # 워밍업 (모델 로딩이 첫 측정에 섞이지 않도록)
+    print("워밍업 중...")
+    post_t2i(args.api, {**base, "steps": 1, "width": 512, "height": 512})
+
+    modes = [("serial", run_serial), ("batch", run_batch), ("variations", run_variations)]
+    results = {name: [] for name, _ in modes}
+    for r in range(args.runs):
+        for name, func in modes:
+            t = func(args.api, base, n)
+            results[name].append(t)
+            print(f"[{r + 1}/{args.runs}] {name:<10}: {t:.1f}초 ({t / n:.1f}초/장)")
+
+    serial = statistics.mean(results["serial"])
+    print("=" * 60)
+    print(f"{'방식':<12}{'전체(초)':>10}{'장당(초)':>10}{'장/분':>10}{'serial 대비':>14}")
+    for name, _ in modes:
+        total = statistics.mean(results[name])
+        print(f"{name:<12}{total:>10.1f}{total / n:>10.1f}{n / total * 60:>10.2f}{serial / total:>13.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# scripts/benchmark/benchmark_cold_start.py
+# ============================================================
+# ⏱️ 콜드 스타트 → 첫 이미지 지연 시간 측정
+# - before: 모델 언로드 상태에서 첫 T2I 요청 (GGUF/T5/VAE 로딩 포함)
+# - after : 워밍업(최소 워크플로우) 완료 후 첫 T2I 요청
+# - 실행 중인 백엔드(FastAPI)와 ComfyUI가 필요합니다.
+#
+# 사용법:
+#   uv run python scripts/benchmark/benchmark_cold_start.py --model FLUX.1-dev-Q8 --runs 2
+# ============================================================
+
+import argparse
+import time
+import statistics
+
+import requests
+
+
+def wait_switch_done(base_url: str, timeout: int = 900) -> dict:
+    """모델 전환(워밍업) 완료까지 폴링"""
+    start = time.time()
+    while time.time() - start < timeout:
+        status = requests.get(f"{base_url}/api/switch_model_status", timeout=5).json()
+        if not status.get("in_progress", True):
+            return status
+        time.sleep(1)
+    raise TimeoutError("워밍업 타임아웃")
+
+
+def generate_once(base_url: str, model: str, steps: int, size: int) -> float:
+    """T2I 1회 생성 후 소요 시간(초) 반환"""
+    payload = {
+        "prompt": "헬스장에서 운동하는 사람, 밝은 조명",
+        "width": size,
+        "height": size,
+        "steps": steps,
+        "model_name": model
+    }
+    start = time.time()
+    resp = requests.post(f"{base_url}/api/generate_t2i", json=payload, timeout=3600)
+    resp.raise_for_status()
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="콜드 스타트 첫 이미지 지연 시간 측정")
+    parser.add_argument("--api", default="http://localhost:8000", help="백엔드 주소")
+    parser.add_argument("--model", default="FLUX.1-dev-Q8", help="측정할 모델")
+    parser.add_argument("--runs", type=int, default=2, help="측정 반복 횟수")
+    parser.add_argument("--steps", type=int, default=28)
+    parser.add_argument("--size", type=int, default=1024)
+    args = parser.parse_args()
+
+    cold, warm = [], []
+    for i in range(args.runs):
+        # before: 언로드 직후 첫 요청
+        requests.post(f"{args.api}/api/unload", timeout=30)
+        time.sleep(2)
+        t = generate_once(args.api, args.model, args.steps, args.size)
+        cold.append(t)
+        print(f"[{i+1}/{args.runs}] 콜드 스타트: {t:.1f}초")
+
+        # after: 워밍업 완료 후 첫 요청
+        requests.post(f"{args.api}/api/unload", timeout=30)
+        time.sleep(2)
+        requests.post(f"{args.api}/api/switch_model_async", json={"model_name": args.model}, timeout=10)
+        warm_status = wait_switch_done(args.api)
+        t = generate_once(args.api, args.model, args.steps, args.size)
+        warm.append(t)
+        print(f"[{i+1}/{args.runs}] 워밍업 후  : {t:.1f}초 (워밍업 {warm_status.get('elapsed', 0)}초)")
+
+    print("=" * 50)
+    print(f"콜드 스타트 평균: {statistics.mean(cold):.1f}초")
+    print(f"워밍업 후 평균  : {statistics.mean(warm):.1f}초")
+    print(f"개선            : {statistics.mean(cold) - statistics.mean(warm):.1f}초")
+
+    status = requests.get(f"{args.api}/status", timeout=5).json()
+    print(f"서버 측 집계    : {status.get('warmup', {}).get('latency')}")
+
+
+if __name__ == "__main__":
+    main()
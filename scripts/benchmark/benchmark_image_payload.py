@@ -0,0 +1,133 @@
+# scripts/benchmark/benchmark_image_payload.py
+# ============================================================
+# 📦 이미지 응답 직렬화 벤치마크
+# - legacy   : Base64-in-JSON (서버 b64encode + json.dumps / 클라이언트 json.loads + b64decode)
+# - binary   : image/png 바이트 그대로 + X-Image-* 헤더
+# - multipart: JSON 메타데이터 파트 + 이미지 파트 (product_mode처럼 출력이 2개인 경우)
+# - 페이로드 크기와 직렬화/역직렬화 CPU 시간을 비교 (백엔드/ComfyUI 불필요)
+#
+# 사용법:
+#   uv run python scripts/benchmark/benchmark_image_payload.py
+#   uv run python scripts/benchmark/benchmark_image_payload.py --image outputs/sample.png --repeat 50
+# ============================================================
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+src_path = os.path.join(project_root, "src")
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from backend.image_response import (
+    encode_multipart,
+    decode_multipart,
+    metadata_headers,
+    parse_metadata_headers
+)
+
+
+def make_sample_png(size: int) -> bytes:
+    """압축이 잘 안 되는(사진과 비슷한) 샘플 PNG 생성"""
+    rng = np.random.default_rng(0)
+    gradient = np.linspace(0, 255, size, dtype=np.float32)
+    base = np.stack([
+        np.add.outer(gradient, gradient) / 2,
+        np.tile(gradient, (size, 1)),
+        np.tile(gradient[:, None], (1, size))
+    ], axis=-1)
+    noisy = np.clip(base + rng.normal(0, 24, base.shape), 0, 255).astype(np.uint8)
+    buf = BytesIO()
+    Image.fromarray(noisy).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def timed(func, repeat: int) -> float:
+    """평균 소요 시간(ms)"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="이미지 응답 직렬화 벤치마크")
+    parser.add_argument("--image", help="측정할 PNG 경로 (없으면 샘플 생성)")
+    parser.add_argument("--size", type=int, default=1024, help="샘플 이미지 크기")
+    parser.add_argument("--repeat", type=int, default=30, help="반복 횟수")
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, "rb") as f:
+            image = f.read()
+    else:
+        image = make_sample_png(args.size)
+    # product_mode: 합성 결과 + 배경 제거 레이어
+    images = [("output_image", image), ("background_removed_image", image)]
+    meta = {
+        "experiment_id": "product_mode",
+        "experiment_name": "제품 모드",
+        "seed": 123456789,
+        "elapsed_time": 42.5
+    }
+
+    # legacy: Base64-in-JSON
+    def legacy_encode():
+        body = dict(meta)
+        for name, data in images:
+            body[f"{name}_base64"] = base64.b64encode(data).decode("utf-8")
+        return json.dumps(body, ensure_ascii=False).encode("utf-8")
+
+    legacy_body = legacy_encode()
+
+    def legacy_decode():
+        body = json.loads(legacy_body)
+        return [base64.b64decode(body[f"{name}_base64"]) for name, _ in images]
+
+    # binary: 대표 이미지만 본문, 메타데이터는 헤더
+    def binary_encode():
+        return image, metadata_headers(meta)
+
+    binary_headers = metadata_headers(meta)
+
+    def binary_decode():
+        return image, parse_metadata_headers(binary_headers)
+
+    # multipart: 메타데이터 + 이미지 2개
+    multipart_body, content_type = encode_multipart(meta, images)
+
+    def multipart_encode():
+        return encode_multipart(meta, images)
+
+    def multipart_decode():
+        return decode_multipart(multipart_body, content_type)
+
+    assert legacy_decode()[1] == image
+    assert multipart_decode()[1]["background_removed_image"] == image
+
+    binary_size = len(image) + sum(len(k) + len(v) + 4 for k, v in binary_headers.items())
+    rows = [
+        ("legacy (base64 JSON, 2장)", len(legacy_body), timed(legacy_encode, args.repeat), timed(legacy_decode, args.repeat)),
+        ("binary (image/png, 1장)", binary_size, timed(binary_encode, args.repeat), timed(binary_decode, args.repeat)),
+        ("multipart (2장)", len(multipart_body), timed(multipart_encode, args.repeat), timed(multipart_decode, args.repeat)),
+    ]
+
+    print(f"원본 PNG: {len(image) / 1024:.1f} KB (반복 {args.repeat}회 평균)")
+    print("=" * 72)
+    print(f"{'형식':<28}{'페이로드(KB)':>14}{'서버 직렬화(ms)':>16}{'클라이언트(ms)':>14}")
+    for name, size, enc_ms, dec_ms in rows:
+        print(f"{name:<28}{size / 1024:>14.1f}{enc_ms:>16.2f}{dec_ms:>14.2f}")
+    print("=" * 72)
+    print(f"multipart 대비 legacy 페이로드: +{(len(legacy_body) / len(multipart_body) - 1) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# scripts/benchmark/benchmark_multi_worker.py
+# ============================================================
+# 👥 API 워커 수에 따른 처리량 측정 (uvicorn --workers N)
+# - 가짜 ComfyUI(scripts/test/fake_comfyui.py)를 띄우고 COMFYUI_BASE_URL로 백엔드를 연결
+#   → GPU 실행 시간(--execution-seconds)을 짧게 두면 API 프로세스의 CPU 작업
+#     (프롬프트 처리, 결과 디코딩/인코딩, 아티팩트 저장)이 병목이 되어 워커 수 효과가 드러남
+# - 워커 수마다 백엔드를 새로 실행하고 동시 요청을 보내 처리량(req/s) / 지연 시간(p50, p95) 비교
+# - 워커 간 상태는 comfyui.shared_state(backend: sqlite)로 공유되어야 함
+# - 백엔드 실행 환경(torch 등)이 필요합니다. (ComfyUI / GPU 불필요)
+#
+# 사용법:
+#   uv run python scripts/benchmark/benchmark_multi_worker.py
+#   uv run python scripts/benchmark/benchmark_multi_worker.py --workers 1 2 4 --requests 64 --concurrency 16
+# ============================================================
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+test_path = os.path.join(project_root, "scripts", "test")
+if test_path not in sys.path:
+    sys.path.insert(0, test_path)
+
+from fake_comfyui import FakeComfyUI
+
+PROMPT = "헬스장에서 운동하는 사람, 밝은 조명"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_backend(workers: int, port: int, comfyui_url: str) -> subprocess.Popen:
+    """uvicorn --workers N 으로 백엔드 실행 후 /status 응답까지 대기"""
+    env = {**os.environ, "COMFYUI_BASE_URL": comfyui_url}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.backend.main:app",
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=project_root, env=env
+    )
+    deadline = time.time() + 300
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"백엔드 실행 실패 (exit {proc.returncode})")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/status", timeout=5).ok:
+                return proc
+        except requests.RequestException:
+            pass
+        time.sleep(1)
+    proc.terminate()
+    raise TimeoutError("백엔드가 시작되지 않았습니다")
+
+
+def post_t2i(base_url: str, payload: dict) -> float:
+    start = time.perf_counter()
+    resp = requests.post(f"{base_url}/api/generate_t2i", json=payload, timeout=600)
+    resp.raise_for_status()
+    return time.perf_counter() - start
+
+
+def measure(base_url: str, args) -> dict:
+    """요청 args.requests개를 args.concurrency개씩 동시에 보내 처리량 / 지연 시간 측정"""
+    base = {"prompt": PROMPT, "width": args.size, "height": args.size, "steps": args.steps}
+    for i in range(args.concurrency):  # 워커마다 커넥션 / 설정 준비
+        post_t2i(base_url, {**base, "seed": 10 + i})
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        # seed가 모두 달라야 합쳐지지(coalescing) 않음
+        latencies = sorted(pool.map(lambda i: post_t2i(base_url, {**base, "seed": 1000 + i}), range(args.requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        "rps": args.requests / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API 워커 수에 따른 처리량 측정 (가짜 ComfyUI)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--size", type=int, default=1024, help="결과 이미지 한 변 길이 (가짜 ComfyUI 출력)")
+    parser.add_argument("--steps", type=int, default=4)
+    parser.add_argument("--execution-seconds", type=float, default=0.02, help="가짜 ComfyUI 워크플로우 1개 실행 시간")
+    args = parser.parse_args()
+
+    fake = FakeComfyUI(image_size=args.size, execution_seconds=args.execution_seconds)
+    comfyui_url = fake.start()
+    print(f"🧪 가짜 ComfyUI: {comfyui_url} (실행 {args.execution_seconds}초, {args.size}x{args.size} PNG)")
+
+    results = {}
+    try:
+        for workers in args.workers:
+            port = free_port()
+            backend = start_backend(workers, port, comfyui_url)
+            try:
+                results[workers] = measure(f"http://127.0.0.1:{port}", args)
+                r = results[workers]
+                print(f"   workers={workers}: {r['rps']:.1f} req/s, p50 {r['p50']:.2f}초, p95 {r['p95']:.2f}초")
+            finally:
+                backend.terminate()
+                backend.wait(timeout=30)
+    finally:
+        fake.stop()
+
+    baseline = results[args.workers[0]]["rps"]
+    print("=" * 60)
+    print(f"{'workers':>8} {'req/s':>8} {'p50':>8} {'p95':>8} {'배율':>6}")
+    for workers, r in results.items():
+        print(f"{workers:>8} {r['rps']:>8.1f} {r['p50']:>7.2f}s {r['p95']:>7.2f}s {r['rps'] / baseline:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
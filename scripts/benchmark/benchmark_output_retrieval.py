@@ -0,0 +1,110 @@
+# scripts/benchmark/benchmark_output_retrieval.py
+# ============================================================
+# 📥 결과 이미지 가져오기 벤치마크 (ComfyUIClient.get_image)
+# - tcp : /view HTTP 다운로드 (TCP loopback, 기존 경로)
+# - uds : /view HTTP 다운로드 (Unix 도메인 소켓, co-located)
+# - read: output 폴더에서 파일 직접 읽기 (co-located, mmap_min_bytes=0)
+# - mmap: output 폴더에서 mmap으로 읽기 (co-located)
+# - 지연 시간(중앙값/p90)과 CPU 시간 비교
+#   - 클라이언트 CPU: get_image를 호출한 스레드의 CPU 시간
+#   - 전체 CPU: 같은 프로세스에서 실행되는 가짜 ComfyUI 서버의 응답 처리 포함
+# - scripts/test/fake_comfyui.py의 가짜 ComfyUI 사용 (GPU / ComfyUI 불필요)
+#
+# 사용법:
+#   uv run python scripts/benchmark/benchmark_output_retrieval.py
+#   uv run python scripts/benchmark/benchmark_output_retrieval.py --size 2048 --repeat 50
+# ============================================================
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+for path in (os.path.join(project_root, "src"), os.path.join(project_root, "scripts", "test")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from backend.colocated import SharedOutputReader
+from backend.comfyui_client import ComfyUIClient, get_shared_session
+from fake_comfyui import FakeComfyUI
+
+FILENAME = "benchmark_00001_.png"
+
+
+def measure(client: ComfyUIClient, expected: bytes, repeat: int) -> dict:
+    """get_image 반복 호출 → 지연 시간 / CPU 시간"""
+    for _ in range(2):  # 연결 / 페이지 캐시 준비
+        client.get_image(FILENAME)
+
+    latencies, thread_cpu = [], []
+    process_start = time.process_time()
+    for _ in range(repeat):
+        wall, cpu = time.perf_counter(), time.thread_time()
+        data = client.get_image(FILENAME)
+        thread_cpu.append(time.thread_time() - cpu)
+        latencies.append(time.perf_counter() - wall)
+        assert data == expected, "결과 바이트가 다릅니다"
+    process_cpu = (time.process_time() - process_start) / repeat
+
+    latencies.sort()
+    return {
+        "median_ms": statistics.median(latencies) * 1000,
+        "p90_ms": latencies[min(len(latencies) - 1, int(0.9 * len(latencies)))] * 1000,
+        "client_cpu_ms": statistics.fmean(thread_cpu) * 1000,
+        "process_cpu_ms": process_cpu * 1000,
+        "mb_per_s": len(expected) / (1024 * 1024) / statistics.median(latencies)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="결과 이미지 가져오기 벤치마크 (HTTP vs co-located)")
+    parser.add_argument("--size", type=int, default=2048, help="샘플 PNG 한 변 길이 (압축이 거의 안 되는 이미지)")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        output_dir = os.path.join(workdir, "output")
+        os.makedirs(output_dir)
+        fake = FakeComfyUI(image_size=args.size)
+        fake.files[("output", "", FILENAME)] = fake.image
+        with open(os.path.join(output_dir, FILENAME), "wb") as f:
+            f.write(fake.image)
+
+        base_url = fake.start()
+        socket_path = fake.start_unix(os.path.join(workdir, "comfyui.sock"))
+        print(f"🖼️ 샘플 이미지: {args.size}x{args.size} PNG, {len(fake.image) / (1024 * 1024):.1f}MB, {args.repeat}회")
+
+        modes = {
+            "tcp": (get_shared_session(base_url), None),
+            "uds": (get_shared_session(base_url, socket_path), None),
+            "read": (None, SharedOutputReader({"output": output_dir}, mmap_min_bytes=0)),
+            "mmap": (None, SharedOutputReader({"output": output_dir}, mmap_min_bytes=1)),
+        }
+        results = {}
+        try:
+            for name, (session, reader) in modes.items():
+                client = ComfyUIClient(base_url=base_url)
+                client.session = session or get_shared_session(base_url)
+                client.output_reader = reader
+                results[name] = measure(client, fake.image, args.repeat)
+        finally:
+            fake.stop()
+
+    print("=" * 78)
+    print(f"{'방식':<6} {'중앙값':>10} {'p90':>10} {'클라이언트 CPU':>14} {'전체 CPU':>10} {'처리량':>12}")
+    for name, r in results.items():
+        print(
+            f"{name:<6} {r['median_ms']:>8.2f}ms {r['p90_ms']:>8.2f}ms {r['client_cpu_ms']:>12.2f}ms "
+            f"{r['process_cpu_ms']:>8.2f}ms {r['mb_per_s']:>8.0f}MB/s"
+        )
+    baseline = results["tcp"]["median_ms"]
+    print("=" * 78)
+    for name in ("uds", "read", "mmap"):
+        print(f"   {name}: tcp 대비 지연 시간 {baseline / results[name]['median_ms']:.1f}배 빠름")
+
+
+if __name__ == "__main__":
+    main()
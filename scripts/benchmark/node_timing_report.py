@@ -0,0 +1,59 @@
+# scripts/benchmark/node_timing_report.py
+# ============================================================
+# 🐢 ComfyUI 느린 노드 리포트
+# - 백엔드가 수집한 노드별 실행 시간 통계(/api/comfyui/node_timings)를 모드별 표로 출력
+# - 편집 모드(portrait / product / hybrid)는 파이프라인 단계 이름을 함께 표시
+# - 실행 중인 백엔드(FastAPI)가 필요합니다. (통계는 서버 재시작 시 초기화)
+#
+# 사용법:
+#   uv run python scripts/benchmark/node_timing_report.py --top 5
+#   uv run python scripts/benchmark/node_timing_report.py --workflow portrait_mode
+# ============================================================
+
+import argparse
+
+import requests
+
+
+def print_report(report: dict):
+    """모드별 느린 노드 표 + 워크플로우/모델/해상도별 실행 시간 요약"""
+    slowest = report.get("slowest_nodes", {})
+    if not slowest:
+        print("수집된 노드 실행 시간이 없습니다. (websockets 설치 여부와 node_timing.enabled 설정을 확인하세요)")
+
+    for workflow, nodes in slowest.items():
+        print("=" * 90)
+        print(f"📋 {workflow}")
+        print(f"{'노드':>6} {'클래스':<28} {'평균':>7} {'p90':>7} {'최대':>7} {'횟수':>5}  단계")
+        for node in nodes:
+            print(
+                f"{node['node_id']:>6} {node['class_type'][:28]:<28} "
+                f"{node['mean']:>6.2f}s {node['p90']:>6.2f}s {node['max']:>6.2f}s {node['count']:>5}  "
+                f"{node.get('step') or ''}"
+            )
+
+    executions = report.get("executions", {})
+    if executions:
+        print("=" * 90)
+        print("⏱️ 전체 실행 시간 (워크플로우/모델/해상도)")
+        for key, summary in executions.items():
+            print(f"   {key:<50} 평균 {summary['mean']:>6.1f}s  p90 {summary['p90']:>6.1f}s  ({summary['count']}회)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ComfyUI 느린 노드 리포트")
+    parser.add_argument("--api", default="http://localhost:8000", help="백엔드 주소")
+    parser.add_argument("--top", type=int, default=10, help="모드별 상위 노드 수")
+    parser.add_argument("--workflow", default=None, help="특정 모드/워크플로우만 (예: portrait_mode, t2i)")
+    args = parser.parse_args()
+
+    params = {"top": args.top}
+    if args.workflow:
+        params["workflow"] = args.workflow
+    resp = requests.get(f"{args.api}/api/comfyui/node_timings", params=params, timeout=10)
+    resp.raise_for_status()
+    print_report(resp.json())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# scripts/test/admission_self_test.py
+# ============================================================
+# 🚦 요청 수락 제어 자가 점검 (GPU / ComfyUI 불필요)
+# 1. 거절: 예상 완료 시간이 SLO를 넘으면 AdmissionRejectedError + retry_after, 처리 중인 작업이 없으면 항상 수락
+# 2. 예상 시간: 성공한 작업만 EWMA에 반영 (앞 작업을 기다린 시간 제외), 여러 번 release해도 한 번만 처리
+# 3. 티켓 정리: 죽은 워커 / 오래된 티켓은 처리 중 작업에서 제외
+# 4. 본문 크기: 한도를 넘으면 본문을 읽기 전에 429 + Retry-After, 응답이 끝나면 예약 해제, chunked는 받은 만큼 합산
+#
+# 사용법:
+#   uv run python scripts/test/admission_self_test.py
+# ============================================================
+
+import asyncio
+import os
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+src_path = os.path.join(project_root, "src")
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from backend import admission, shared_state
+from backend.admission import (
+    ADMISSION_DURATIONS, ADMISSION_TICKETS, AdmissionController, PayloadBudget, PayloadLimitMiddleware
+)
+from backend.exceptions import AdmissionRejectedError
+from backend.shared_state import INSTANCE_ID, get_shared_state
+
+CONFIG = {"initial_durations": {"t2i": 100}, "slo_seconds": {"t2i": 150}, "ewma_alpha": 0.2, "max_ticket_age": 600}
+
+
+def fresh_controller() -> AdmissionController:
+    shared_state._shared_state = shared_state.LocalSharedState()
+    return AdmissionController(CONFIG)
+
+
+def check_reject():
+    controller = fresh_controller()
+    first = controller.admit("t2i")  # 처리 중인 작업 없음 → 수락
+    try:
+        controller.admit("t2i")  # 100 + 100 = 200초 > 150초
+        raise AssertionError("SLO 초과 요청이 수락됨")
+    except AdmissionRejectedError as e:
+        assert e.retry_after == 50, f"retry_after {e.retry_after}"
+        assert round(e.estimate) == 200, f"예상 {e.estimate}"
+
+    first.release(record=False)
+    assert controller.snapshot()["in_flight"] == 0
+    alone = AdmissionController({**CONFIG, "slo_seconds": {"t2i": 10}})
+    ticket = alone.admit("t2i")  # 예상 100초 > SLO 10초지만 처리 중인 작업이 없으므로 수락
+    ticket.release(record=False)
+    return "예상 200초 > SLO 150초 → 거절 (retry_after 50초), 작업이 없으면 SLO를 넘어도 수락"
+
+
+def check_ewma():
+    controller = fresh_controller()
+    shared = get_shared_state()
+
+    ticket = controller.admit("t2i")
+    ticket.admitted_at -= 10
+    ticket.release()
+    first = shared.get(ADMISSION_DURATIONS, "t2i")
+    assert 9.5 < first < 11, f"첫 기록 {first}"
+
+    failed = controller.admit("t2i")
+    failed.admitted_at -= 30
+    failed.release(record=False)
+    assert shared.get(ADMISSION_DURATIONS, "t2i") == first, "실패한 작업이 예상 시간에 반영됨"
+
+    # 20초 전에 수락됐지만 직전 작업(실패한 작업 포함)이 방금 끝남 → 대기 시간은 빼고 처리 시간(≈0초)만 반영
+    queued = controller.admit("t2i")
+    queued.admitted_at -= 20
+    queued.release()
+    queued.release()  # 두 번째 호출은 무시
+    second = shared.get(ADMISSION_DURATIONS, "t2i")
+    expected = 0.8 * first
+    assert abs(second - expected) < 0.5, f"EWMA {second} (기대 {expected:.1f})"
+    assert controller.snapshot()["in_flight"] == 0
+    assert abs(controller.expected_duration("t2i") - second) < 1e-9
+    return f"10초 작업 → {first:.1f}초, 실패는 미반영, 대기 20초 + 처리 0초 → {second:.1f}초"
+
+
+def check_stale_tickets():
+    controller = fresh_controller()
+    shared = get_shared_state()
+    now = time.time()
+    shared.set(ADMISSION_TICKETS, "dead", {"workflow": "t2i", "expected": 100, "admitted_at": now, "owner": "dead-worker"})
+    shared.set(ADMISSION_TICKETS, "old", {"workflow": "t2i", "expected": 100, "admitted_at": now - 3600, "owner": INSTANCE_ID})
+    assert controller.snapshot()["in_flight"] == 0, "정리되지 않은 티켓"
+    assert not shared.items(ADMISSION_TICKETS)
+
+    ticket = controller.admit("t2i")  # 남은 티켓이 있었다면 200초 > 150초로 거절됨
+    ticket.release(record=False)
+    return "죽은 워커 / 오래된 티켓 제외 후 수락"
+
+
+async def call(app, headers, chunks):
+    """ASGI 요청 1개 → (상태 코드, 응답 헤더)"""
+    pending = [{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+               for i, chunk in enumerate(chunks)]
+    sent = []
+
+    async def receive():
+        return pending.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/", "headers": headers}
+    await PayloadLimitMiddleware(app)(scope, receive, send)
+    start = sent[0]
+    return start["status"], dict(start["headers"])
+
+
+def check_payload_limit():
+    budget = PayloadBudget(100, retry_after=3)
+    admission._payload_budget = budget
+    observed = {}
+
+    async def run():
+        release = asyncio.Event()
+        entered = asyncio.Event()
+
+        async def app(scope, receive, send):
+            while True:
+                message = await receive()
+                if not message.get("more_body"):
+                    break
+            observed.setdefault(scope["path"], budget.in_flight)
+            entered.set()
+            await release.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        first = asyncio.create_task(call(app, [(b"content-length", b"80")], [b"x" * 80]))
+        await entered.wait()
+        status, headers = await call(app, [(b"content-length", b"50")], [b"x" * 50])
+        assert status == 429 and headers[b"retry-after"] == b"3", f"한도 초과 응답 {status}"
+        release.set()
+        assert (await first)[0] == 200
+        assert budget.in_flight == 0, f"예약이 해제되지 않음: {budget.in_flight}"
+
+        observed.clear()
+        status, _ = await call(app, [], [b"x" * 30, b"x" * 40])
+        assert status == 200 and observed["/"] == 70, f"chunked 합산 {observed}"
+        assert budget.in_flight == 0
+
+    try:
+        asyncio.run(run())
+    finally:
+        admission._payload_budget = None
+    return "80B 처리 중 50B 요청 → 429 (Retry-After 3), 응답 후 해제, chunked 30B + 40B → 70B 예약"
+
+
+def main():
+    checks = [
+        ("거절", check_reject),
+        ("예상 시간", check_ewma),
+        ("티켓 정리", check_stale_tickets),
+        ("본문 크기", check_payload_limit),
+    ]
+    failed = 0
+    for name, check in checks:
+        try:
+            print(f"✅ {name}: {check()}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {name}: {e!r}")
+    print("=" * 60)
+    print("✅ 모든 점검 통과" if not failed else f"❌ {failed}개 실패")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# scripts/test/artifact_download_self_test.py
+# ============================================================
+# 📥 아티팩트 다운로드 자가 점검 - 임시 아티팩트 저장소 + TestClient (GPU / ComfyUI 불필요)
+# 1. 전체 응답: 200 + ETag / Cache-Control immutable / Content-Length, 없는 ID는 404
+# 2. 조건부 요청: If-None-Match가 ETag와 같으면(* / W/ 포함) 본문 없이 304
+# 3. 범위 요청: bytes=start-end / start- / -N(마지막 N바이트) → 206 + Content-Range, 해석할 수 없는 범위는 200 전체
+# 4. 만족할 수 없는 범위: start >= 크기 / bytes=-0 → 416 + Content-Range: bytes */크기
+# 5. If-Range: ETag와 다르면 범위를 무시하고 200 전체, 같으면 206
+# 6. HEAD: 본문 없이 GET과 같은 헤더 (Content-Length 포함)
+#
+# 사용법:
+#   uv run python scripts/test/artifact_download_self_test.py
+# ============================================================
+
+import os
+import sys
+import tempfile
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+src_path = os.path.join(project_root, "src")
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from backend import artifacts
+from backend.image_response import build_artifact_response
+
+# PNG 시그니처 + 임의 바이트 (media_type 판별용)
+DATA = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+SIZE = len(DATA)
+
+
+def create_app() -> FastAPI:
+    """main.py의 GET / HEAD /api/artifacts/{id}와 같은 경로 (main.py는 GPU 의존성 때문에 직접 불러오지 않음)"""
+    app = FastAPI()
+
+    @app.api_route("/api/artifacts/{artifact_id}", methods=["GET", "HEAD"])
+    def get_artifact(artifact_id: str, request: Request):
+        artifact = artifacts.get_artifact_store().get(artifact_id)
+        if artifact is None:
+            raise HTTPException(status_code=404, detail="알 수 없거나 만료된 아티팩트입니다.")
+        return build_artifact_response(request, artifact)
+
+    return app
+
+
+def check_full(client: TestClient, artifact):
+    response = client.get(artifact.url)
+    assert response.status_code == 200, f"상태 코드 {response.status_code}"
+    assert response.content == DATA, "본문이 다릅니다"
+    assert response.headers["etag"] == artifact.etag
+    assert response.headers["content-length"] == str(SIZE)
+    assert response.headers["content-type"] == "image/png"
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["accept-ranges"] == "bytes"
+    missing = client.get("/api/artifacts/" + "0" * 64)
+    assert missing.status_code == 404, f"없는 ID {missing.status_code}"
+    return f"200 ({SIZE}B, ETag {artifact.etag[:10]}...\"), 없는 ID 404"
+
+
+def check_not_modified(client: TestClient, artifact):
+    for value in (artifact.etag, f'"other", W/{artifact.etag}', "*"):
+        response = client.get(artifact.url, headers={"If-None-Match": value})
+        assert response.status_code == 304, f"If-None-Match {value} → {response.status_code}"
+        assert response.content == b"" and response.headers["etag"] == artifact.etag
+    response = client.get(artifact.url, headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200, "다른 ETag인데 304"
+    return "같은 ETag / W/ / * → 304, 다른 ETag → 200"
+
+
+def check_ranges(client: TestClient, artifact):
+    cases = [
+        ("bytes=0-9", 0, 9),
+        ("bytes=100-", 100, SIZE - 1),
+        ("bytes=-16", SIZE - 16, SIZE - 1),
+        (f"bytes=-{SIZE * 2}", 0, SIZE - 1),      # 크기보다 긴 접미 범위 → 전체를 206으로
+        (f"bytes=10-{SIZE * 2}", 10, SIZE - 1),   # 끝이 크기를 넘으면 마지막 바이트까지
+    ]
+    for header, start, end in cases:
+        response = client.get(artifact.url, headers={"Range": header})
+        assert response.status_code == 206, f"{header} → {response.status_code}"
+        assert response.content == DATA[start:end + 1], f"{header} 본문이 다릅니다"
+        assert response.headers["content-range"] == f"bytes {start}-{end}/{SIZE}", response.headers["content-range"]
+        assert response.headers["content-length"] == str(end - start + 1)
+    for header in ("bytes=0-1,5-6", "bytes=9-3", "items=0-1", "bytes=abc"):
+        response = client.get(artifact.url, headers={"Range": header})
+        assert response.status_code == 200 and response.content == DATA, f"{header} → {response.status_code}"
+    return f"{len(cases)}개 범위 → 206, 여러 범위 / 잘못된 범위 → 200 전체"
+
+
+def check_unsatisfiable(client: TestClient, artifact):
+    for header in (f"bytes={SIZE}-", f"bytes={SIZE + 10}-{SIZE + 20}", "bytes=-0"):
+        response = client.get(artifact.url, headers={"Range": header})
+        assert response.status_code == 416, f"{header} → {response.status_code}"
+        assert response.headers["content-range"] == f"bytes */{SIZE}", response.headers["content-range"]
+    return f"start >= {SIZE} / bytes=-0 → 416 (bytes */{SIZE})"
+
+
+def check_if_range(client: TestClient, artifact):
+    response = client.get(artifact.url, headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert response.status_code == 200 and response.content == DATA, f"다른 If-Range → {response.status_code}"
+    assert "content-range" not in response.headers
+    response = client.get(artifact.url, headers={"Range": f"bytes={SIZE}-", "If-Range": '"stale"'})
+    assert response.status_code == 200, "If-Range가 다른데 범위를 해석함 (416)"
+    response = client.get(artifact.url, headers={"Range": "bytes=0-9", "If-Range": artifact.etag})
+    assert response.status_code == 206 and response.content == DATA[:10], f"같은 If-Range → {response.status_code}"
+    return "다른 ETag → 200 전체 (범위 무시), 같은 ETag → 206"
+
+
+def check_head(client: TestClient, artifact):
+    response = client.head(artifact.url)
+    assert response.status_code == 200 and response.content == b"", f"HEAD {response.status_code}"
+    assert response.headers["content-length"] == str(SIZE), f"Content-Length {response.headers['content-length']}"
+    assert response.headers["etag"] == artifact.etag
+    response = client.head(artifact.url, headers={"Range": "bytes=-16"})
+    assert response.status_code == 206 and response.content == b""
+    assert response.headers["content-length"] == "16"
+    assert response.headers["content-range"] == f"bytes {SIZE - 16}-{SIZE - 1}/{SIZE}"
+    return f"본문 없음, Content-Length {SIZE} / 범위 16"
+
+
+def main():
+    with tempfile.TemporaryDirectory() as workdir:
+        artifacts._artifact_store = artifacts.ArtifactStore(os.path.join(workdir, "artifacts"))
+        artifact = artifacts.get_artifact_store().put(DATA)
+        client = TestClient(create_app())
+        checks = [
+            ("전체 응답", check_full),
+            ("조건부 요청", check_not_modified),
+            ("범위 요청", check_ranges),
+            ("만족할 수 없는 범위", check_unsatisfiable),
+            ("If-Range", check_if_range),
+            ("HEAD", check_head),
+        ]
+        failed = 0
+        for name, check in checks:
+            try:
+                print(f"✅ {name}: {check(client, artifact)}")
+            except Exception as e:
+                failed += 1
+                print(f"❌ {name}: {e!r}")
+        artifacts._artifact_store = None
+    print("=" * 60)
+    print("✅ 모든 점검 통과" if not failed else f"❌ {failed}개 실패")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
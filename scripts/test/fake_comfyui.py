@@ -0,0 +1,329 @@
+# scripts/test/fake_comfyui.py
+# ============================================================
+# 🧪 가짜 ComfyUI 서버 (GPU / 모델 없이 ComfyUIClient 동작 확인용)
+# - /prompt, /queue, /history, /view, /upload/image, /object_info, /system_stats, /ws 흉내
+# - 워크플로우의 노드를 순서대로 "실행"하며 executing 이벤트 전송
+#   - SaveImage / PreviewImage: 샘플 PNG를 메모리에 "저장"하고 history outputs에 기록 (/view로 다운로드)
+#   - SaveImageWebsocket: 샘플 PNG를 WebSocket 바이너리 메시지(PREVIEW_IMAGE)로 전송
+#   - oom_when(workflow)이 True면 CUDA OOM execution_error로 실패 (OOM 사다리 / 실패 경로 확인용)
+# - POST /queue {"delete": [...]}: 대기 중인 작업 삭제 (실행하지 않음)
+# - POST /free: 모델 해제 요청 횟수만 기록 (free_delay초 뒤 응답)
+# - 다른 스크립트에서 import해서 사용 (websocket_output_self_test.py 등)
+#
+# 사용법 (단독 실행 - 수동 확인용):
+#   uv run python scripts/test/fake_comfyui.py --port 8188
+# ============================================================
+
+import argparse
+import asyncio
+import io
+import os
+import socket
+import struct
+import threading
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request, UploadFile, File, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response
+from PIL import Image
+
+WEBSOCKET_OUTPUT_NODE = "SaveImageWebsocket"
+PREVIEW_IMAGE = 1
+PNG_TYPE = 2
+
+
+def make_sample_png(size: int) -> bytes:
+    """압축이 거의 안 되는 샘플 PNG (실제 결과 이미지와 비슷한 크기)"""
+    image = Image.frombytes("RGB", (size, size), os.urandom(size * size * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", compress_level=1)
+    return buffer.getvalue()
+
+
+class FakeComfyUI:
+    """스레드에서 실행되는 가짜 ComfyUI (uvicorn)"""
+
+    def __init__(
+        self,
+        image_size: int = 512,
+        execution_seconds: float = 0.2,
+        websocket_node: bool = True,
+        drop_websocket_images: bool = False,
+        output_dir: str = None,
+        oom_when=None,
+        free_delay: float = 0.0
+    ):
+        """
+        Args:
+            image_size: 출력 샘플 PNG 한 변 길이
+            execution_seconds: 워크플로우 1개 "실행" 시간
+            websocket_node: SaveImageWebsocket 노드 설치 여부 (/object_info)
+            drop_websocket_images: 웹소켓 출력 이미지를 보내지 않음 (연결 끊김 흉내 → 클라이언트 재실행 확인)
+            output_dir: 지정하면 SaveImage 출력을 실제 파일로도 기록 (공유 디렉토리 읽기 확인용)
+            oom_when: workflow → bool, True면 실행 중 GPU 메모리 부족으로 실패 (None이면 항상 성공)
+            free_delay: POST /free 응답 지연 (초)
+        """
+        self.image = make_sample_png(image_size)
+        self.execution_seconds = execution_seconds
+        self.websocket_node = websocket_node
+        self.drop_websocket_images = drop_websocket_images
+        self.output_dir = output_dir
+        self.oom_when = oom_when
+        self.free_delay = free_delay
+        self.executed = []          # 실제로 실행한 워크플로우 (실행 순서)
+        self.files = {}             # (type, subfolder, filename) → 바이트
+        self.history = {}
+        self.queue_running = []
+        self.queue_pending = []
+        self.sockets = {}           # client_id → WebSocket
+        self.counters = {"prompts": 0, "view_requests": 0, "view_bytes": 0, "uploads": 0,
+                         "websocket_images": 0, "history_deleted": 0, "executed": 0, "oom": 0,
+                         "queue_deleted": 0, "free": 0}
+        self._number = 0
+        self._lock = asyncio.Lock()
+        self._servers = []
+        self.base_url = None
+        self.app = self._build_app()
+
+    # ---------- 실행 ----------
+    async def _send(self, client_id, message=None, data=None):
+        ws = self.sockets.get(client_id)
+        if ws is None:
+            return
+        try:
+            if data is not None:
+                await ws.send_bytes(data)
+            else:
+                await ws.send_json(message)
+        except Exception:
+            self.sockets.pop(client_id, None)
+
+    async def _execute(self, number, prompt_id, workflow, client_id):
+        async with self._lock:  # ComfyUI처럼 한 번에 하나씩 실행
+            item = next((i for i in self.queue_pending if i[1] == prompt_id), None)
+            if item is None:  # POST /queue로 삭제됨
+                return
+            self.queue_pending.remove(item)
+            self.queue_running.append(item)
+            self.executed.append(workflow)
+            self.counters["executed"] += 1
+            started = time.time()
+            await self._send(client_id, {"type": "execution_start", "data": {"prompt_id": prompt_id}})
+
+            if self.oom_when is not None and self.oom_when(workflow):
+                await asyncio.sleep(self.execution_seconds / 2)
+                self.counters["oom"] += 1
+                node_id, node = next(iter(workflow.items()))
+                error = {
+                    "prompt_id": prompt_id, "node_id": node_id, "node_type": node.get("class_type"),
+                    "exception_type": "torch.OutOfMemoryError",
+                    "exception_message": "CUDA out of memory. Tried to allocate 2.00 GiB",
+                    "timestamp": int(time.time() * 1000)
+                }
+                await self._send(client_id, {"type": "execution_error", "data": error})
+                self.history[prompt_id] = {
+                    "prompt": [number, prompt_id, workflow, {}, []],
+                    "outputs": {},
+                    "status": {
+                        "status_str": "error",
+                        "completed": False,
+                        "messages": [
+                            ["execution_start", {"prompt_id": prompt_id, "timestamp": int(started * 1000)}],
+                            ["execution_error", error]
+                        ]
+                    }
+                }
+                self.queue_running.remove(item)
+                return
+
+            outputs = {}
+            delay = self.execution_seconds / max(1, len(workflow))
+            for node_id, node in workflow.items():
+                await self._send(client_id, {"type": "executing", "data": {"node": node_id, "prompt_id": prompt_id}})
+                await asyncio.sleep(delay)
+                class_type = node.get("class_type")
+                if class_type == WEBSOCKET_OUTPUT_NODE:
+                    if not self.drop_websocket_images:
+                        await self._send(client_id, data=struct.pack(">II", PREVIEW_IMAGE, PNG_TYPE) + self.image)
+                        self.counters["websocket_images"] += 1
+                elif class_type in ("SaveImage", "PreviewImage"):
+                    folder_type = "output" if class_type == "SaveImage" else "temp"
+                    prefix = node.get("inputs", {}).get("filename_prefix", "ComfyUI")
+                    filename = f"{prefix}_{number:05d}_.png"
+                    self.files[(folder_type, "", filename)] = self.image
+                    if self.output_dir and folder_type == "output":
+                        with open(os.path.join(self.output_dir, filename), "wb") as f:
+                            f.write(self.image)
+                    outputs[node_id] = {"images": [{"filename": filename, "subfolder": "", "type": folder_type}]}
+
+            await self._send(client_id, {"type": "executing", "data": {"node": None, "prompt_id": prompt_id}})
+            finished = time.time()
+            self.history[prompt_id] = {
+                "prompt": [number, prompt_id, workflow, {}, list(outputs)],
+                "outputs": outputs,
+                "status": {
+                    "status_str": "success",
+                    "completed": True,
+                    "messages": [
+                        ["execution_start", {"prompt_id": prompt_id, "timestamp": int(started * 1000)}],
+                        ["execution_success", {"prompt_id": prompt_id, "timestamp": int(finished * 1000)}]
+                    ]
+                }
+            }
+            self.queue_running.remove(item)
+
+    # ---------- 라우트 ----------
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.get("/system_stats")
+        def system_stats():
+            return {"system": {"comfyui_version": "fake"}, "devices": []}
+
+        @app.get("/object_info/{node_class}")
+        def object_info(node_class: str):
+            if node_class == WEBSOCKET_OUTPUT_NODE and self.websocket_node:
+                return {node_class: {"input": {"required": {"images": ["IMAGE"]}}, "output_node": True}}
+            return {}
+
+        @app.post("/upload/image")
+        async def upload_image(image: UploadFile = File(...)):
+            data = await image.read()
+            self.files[("input", "", image.filename)] = data
+            self.counters["uploads"] += 1
+            return {"name": image.filename, "subfolder": "", "type": "input"}
+
+        @app.post("/prompt")
+        async def queue_prompt(request: Request):
+            body = await request.json()
+            prompt_id = uuid.uuid4().hex
+            self._number += 1
+            self.counters["prompts"] += 1
+            item = [self._number, prompt_id, body["prompt"], {"client_id": body.get("client_id")}, []]
+            self.queue_pending.append(item)
+            asyncio.get_running_loop().create_task(
+                self._execute(self._number, prompt_id, body["prompt"], body.get("client_id"))
+            )
+            return {"prompt_id": prompt_id, "number": self._number, "node_errors": {}}
+
+        @app.get("/queue")
+        def queue():
+            return {"queue_running": self.queue_running, "queue_pending": self.queue_pending}
+
+        @app.post("/queue")
+        async def delete_queue(request: Request):
+            body = await request.json()
+            delete = set(body.get("delete", []))
+            if body.get("clear"):
+                delete = {item[1] for item in self.queue_pending}
+            for item in [i for i in self.queue_pending if i[1] in delete]:
+                self.queue_pending.remove(item)
+                self.counters["queue_deleted"] += 1
+            return Response(status_code=200)
+
+        @app.get("/history")
+        def history_list(max_items: int = 200):
+            return dict(list(self.history.items())[-max_items:])
+
+        @app.get("/history/{prompt_id}")
+        def history(prompt_id: str):
+            return {prompt_id: self.history[prompt_id]} if prompt_id in self.history else {}
+
+        @app.post("/history")
+        async def delete_history(request: Request):
+            body = await request.json()
+            if body.get("clear"):
+                self.counters["history_deleted"] += len(self.history)
+                self.history.clear()
+            for prompt_id in body.get("delete", []):
+                if self.history.pop(prompt_id, None) is not None:
+                    self.counters["history_deleted"] += 1
+            return Response(status_code=200)
+
+        @app.post("/free")
+        async def free():
+            await asyncio.sleep(self.free_delay)
+            self.counters["free"] += 1
+            return Response(status_code=200)
+
+        @app.get("/view")
+        def view(filename: str, subfolder: str = "", type: str = "output"):
+            data = self.files.get((type, subfolder, filename))
+            if data is None:
+                return JSONResponse({"error": "not found"}, status_code=404)
+            self.counters["view_requests"] += 1
+            self.counters["view_bytes"] += len(data)
+            return Response(content=data, media_type="image/png")
+
+        @app.websocket("/ws")
+        async def websocket(ws: WebSocket, clientId: str = ""):
+            await ws.accept()
+            client_id = clientId or uuid.uuid4().hex
+            self.sockets[client_id] = ws
+            await ws.send_json({"type": "status", "data": {"sid": client_id}})
+            try:
+                while True:
+                    await ws.receive_text()
+            except WebSocketDisconnect:
+                self.sockets.pop(client_id, None)
+
+        return app
+
+    # ---------- 시작 / 종료 ----------
+    def _serve(self, config: "uvicorn.Config"):
+        server = uvicorn.Server(config)
+        thread = threading.Thread(target=server.run, name="fake-comfyui", daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.05)
+        self._servers.append((server, thread))
+
+    def start(self, port: int = 0) -> str:
+        """백그라운드 스레드에서 서버 시작 (port=0이면 빈 포트), base_url 반환"""
+        if not port:
+            with socket.socket() as s:
+                s.bind(("127.0.0.1", 0))
+                port = s.getsockname()[1]
+        self._serve(uvicorn.Config(self.app, host="127.0.0.1", port=port, log_level="warning"))
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self.base_url
+
+    def start_unix(self, path: str) -> str:
+        """같은 서버를 Unix 도메인 소켓으로도 열기 (co-located 모드 확인용), 소켓 경로 반환"""
+        if os.path.exists(path):
+            os.remove(path)
+        self._serve(uvicorn.Config(self.app, uds=path, log_level="warning"))
+        return path
+
+    def stop(self):
+        for server, thread in self._servers:
+            server.should_exit = True
+            thread.join(timeout=5)
+        self._servers.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="가짜 ComfyUI 서버")
+    parser.add_argument("--port", type=int, default=8188)
+    parser.add_argument("--image-size", type=int, default=1024)
+    parser.add_argument("--execution-seconds", type=float, default=1.0)
+    parser.add_argument("--no-websocket-node", action="store_true", help="SaveImageWebsocket 미설치 흉내")
+    args = parser.parse_args()
+
+    fake = FakeComfyUI(
+        image_size=args.image_size,
+        execution_seconds=args.execution_seconds,
+        websocket_node=not args.no_websocket_node
+    )
+    print(f"🧪 가짜 ComfyUI 실행 중: {fake.start(args.port)} (Ctrl+C로 종료)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
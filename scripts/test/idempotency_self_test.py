@@ -0,0 +1,178 @@
+# scripts/test/idempotency_self_test.py
+# ============================================================
+# 🔑 Idempotency-Key 자가 점검 - 가짜 ComfyUI 사용 (GPU / ComfyUI 불필요)
+# 1. 재연결: 작업 등록 후 응답 전에 실패한 요청을 같은 키로 재시도하면 새로 등록하지 않고 기존 prompt에 재연결
+# 2. 실패한 prompt: ComfyUI에서 실패한 prompt에는 재연결하지 않고 새로 등록
+# 3. 충돌: 같은 키를 다른 파라미터로 쓰면 실행 중 / 완료 후 모두 거부, 다른 가게의 같은 키는 별개
+# 4. 결과 보관: 완료된 키는 이미지 바이트 대신 아티팩트 참조만 보관, 아티팩트가 삭제되면 이전 prompt에 재연결해 재생
+#
+# 사용법:
+#   uv run python scripts/test/idempotency_self_test.py
+# ============================================================
+
+import copy
+import os
+import sys
+import tempfile
+import threading
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+src_path = os.path.join(project_root, "src")
+for path in (src_path, os.path.dirname(__file__)):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from backend import artifacts, job_store, shared_state
+from backend.comfyui_client import ComfyUIClient
+from backend.exceptions import GPUOutOfMemoryError, IdempotencyConflictError
+from backend.idempotency import ARTIFACT_REF, IdempotencyStore
+from fake_comfyui import FakeComfyUI
+
+WORKFLOW = {
+    "7": {"class_type": "VAEDecode", "inputs": {"samples": ["6", 0], "vae": ["4", 0]}},
+    "8": {"class_type": "SaveImage", "inputs": {"filename_prefix": "self_test", "images": ["7", 0]}}
+}
+
+
+def execute(client: ComfyUIClient):
+    return client.execute_workflow(copy.deepcopy(WORKFLOW))[0]
+
+
+def check_reattach(fake: FakeComfyUI, client: ComfyUIClient):
+    store = IdempotencyStore()
+
+    def queue_then_timeout():
+        client.queue_prompt(copy.deepcopy(WORKFLOW))
+        raise TimeoutError("응답 대기 시간 초과 (흉내)")
+
+    try:
+        store.run("retry-key", "fp", queue_then_timeout, "t2i")
+        raise AssertionError("첫 시도가 실패하지 않음")
+    except TimeoutError:
+        pass
+    prompts = fake.counters["prompts"]
+    assert store.get("retry-key")["state"] == "failed"
+
+    images, replayed = store.run("retry-key", "fp", lambda: execute(client), "t2i")
+    assert fake.counters["prompts"] == prompts, "재시도가 prompt를 새로 등록함"
+    assert images[0] == fake.image and not replayed
+
+    def not_called():
+        raise AssertionError("끝난 키가 다시 실행됨")
+
+    again, replayed = store.run("retry-key", "fp", not_called, "t2i")
+    assert replayed and again[0] == fake.image
+    return "재시도가 기존 prompt에 재연결 (새 등록 0개), 끝난 키는 저장된 결과 재생"
+
+
+def check_failed_prompt(fake: FakeComfyUI, client: ComfyUIClient):
+    store = IdempotencyStore()
+    prompts = fake.counters["prompts"]
+    fake.oom_when = lambda workflow: True
+    try:
+        store.run("oom-key", "fp", lambda: execute(client), "t2i")
+        raise AssertionError("OOM이 전달되지 않음")
+    except GPUOutOfMemoryError:
+        pass
+    finally:
+        fake.oom_when = None
+
+    images, replayed = store.run("oom-key", "fp", lambda: execute(client), "t2i")
+    assert images[0] == fake.image and not replayed
+    assert fake.counters["prompts"] - prompts == 2, "실패한 prompt에 재연결함"
+    return "실패한 prompt에는 재연결하지 않고 새로 등록"
+
+
+def check_conflict(fake: FakeComfyUI, client: ComfyUIClient):
+    store = IdempotencyStore()
+    prompts = fake.counters["prompts"]
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        return execute(client)
+
+    first = {}
+    thread = threading.Thread(target=lambda: first.update(result=store.run("shared-key", "fp-a", slow, "t2i")))
+    thread.start()
+    started.wait(10)
+
+    for label in ("실행 중", "완료 후"):
+        try:
+            store.run("shared-key", "fp-b", lambda: execute(client), "t2i")
+            raise AssertionError(f"{label} 다른 파라미터가 허용됨")
+        except IdempotencyConflictError:
+            pass
+        if label == "실행 중":
+            waited, replayed = store.run("shared-key", "fp-a", lambda: execute(client), "t2i")
+            assert replayed and waited[0] == fake.image, "같은 파라미터 재시도가 결과를 받지 못함"
+            thread.join(30)
+
+    images, replayed = store.run("shared-key", "fp-b", lambda: execute(client), "t2i", tenant="다른가게")
+    assert not replayed and images[0] == fake.image
+    assert fake.counters["prompts"] - prompts == 2, f"prompt {fake.counters['prompts'] - prompts}개 등록"
+    return "다른 파라미터는 실행 중 / 완료 후 422, 같은 파라미터는 대기 후 재생, 다른 가게는 별개 실행"
+
+
+def holds_bytes(value) -> bool:
+    if isinstance(value, (bytes, bytearray)):
+        return True
+    if isinstance(value, dict):
+        return any(holds_bytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(holds_bytes(v) for v in value)
+    return False
+
+
+def check_stored_result(fake: FakeComfyUI, client: ComfyUIClient):
+    store = IdempotencyStore()
+    prompts = fake.counters["prompts"]
+    images, _ = store.run("stored-key", "fp", lambda: execute(client), "t2i")
+    entry = store._entries["stored-key"]
+    assert not holds_bytes(entry.result), "워커 메모리에 이미지 바이트가 남아 있음"
+
+    again, replayed = store.run("stored-key", "fp", lambda: execute(client), "t2i")
+    assert replayed and again[0] == images[0]
+
+    # 아티팩트 LRU 삭제 흉내 → 재생 실패 → 이전 prompt의 히스토리에 재연결 (새 등록 없음)
+    artifact_store = artifacts.get_artifact_store()
+    os.remove(artifact_store._path(entry.result[0][ARTIFACT_REF]))
+    again, replayed = store.run("stored-key", "fp", lambda: execute(client), "t2i")
+    assert again[0] == fake.image and not replayed
+    assert fake.counters["prompts"] - prompts == 1, f"prompt {fake.counters['prompts'] - prompts}개 등록"
+    return "아티팩트 참조만 보관, 아티팩트 삭제 후에는 기존 prompt에 재연결 (새 등록 0개)"
+
+
+def main():
+    with tempfile.TemporaryDirectory() as workdir:
+        shared_state._shared_state = shared_state.LocalSharedState()
+        job_store._job_store_loaded = True  # 작업 기록 사용 안 함
+        artifacts._artifact_store = artifacts.ArtifactStore(os.path.join(workdir, "artifacts"))
+
+        fake = FakeComfyUI(execution_seconds=1.0)
+        client = ComfyUIClient(base_url=fake.start(), timeout=60)
+        checks = [
+            ("재연결", check_reattach),
+            ("실패한 prompt", check_failed_prompt),
+            ("충돌", check_conflict),
+            ("결과 보관", check_stored_result),
+        ]
+        failed = 0
+        try:
+            for name, check in checks:
+                start = time.perf_counter()
+                try:
+                    print(f"✅ {name}: {check(fake, client)} ({time.perf_counter() - start:.1f}초)")
+                except Exception as e:
+                    failed += 1
+                    print(f"❌ {name}: {e!r}")
+        finally:
+            fake.stop()
+    print("=" * 60)
+    print("✅ 모든 점검 통과" if not failed else f"❌ {failed}개 실패")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
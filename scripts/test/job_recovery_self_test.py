@@ -0,0 +1,149 @@
+# scripts/test/job_recovery_self_test.py
+# ============================================================
+# ♻️ 재시작 후 작업 회수 자가 점검 - 가짜 ComfyUI 사용 (GPU / ComfyUI 불필요)
+# 1. 회수: 죽은 워커가 등록한 prompt를 완료까지 기다려 아티팩트로 저장, 합쳐진 요청(prompt 없음)은 같은 결과 공유
+# 2. 등록 전 중단: prompt가 없고 같은 요청의 회수 결과도 없으면 failed
+# 3. 실패한 prompt: ComfyUI에서 OOM으로 실패한 작업은 failed
+# 4. 히스토리 없음: 끝났지만 히스토리가 지워진 작업은 failed
+# 5. 살아 있는 워커: 주인이 살아 있는 작업은 회수하지 않음, 이미 가져간 작업은 다시 가져갈 수 없음
+#
+# 사용법:
+#   uv run python scripts/test/job_recovery_self_test.py
+# ============================================================
+
+import copy
+import os
+import sys
+import tempfile
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+src_path = os.path.join(project_root, "src")
+for path in (src_path, os.path.dirname(__file__)):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from backend import artifacts, job_store, shared_state
+from backend.comfyui_client import ComfyUIClient
+from backend.job_store import JobStore, recover_orphaned_jobs
+from fake_comfyui import FakeComfyUI
+
+WORKFLOW = {
+    "7": {"class_type": "VAEDecode", "inputs": {"samples": ["6", 0], "vae": ["4", 0]}},
+    "8": {"class_type": "SaveImage", "inputs": {"filename_prefix": "self_test", "images": ["7", 0]}}
+}
+DEAD_WORKER = "dead-worker"
+
+
+def orphan(store: JobStore, job_id: str):
+    """작업 주인을 죽은 워커로 변경 (재시작 전 프로세스가 남긴 작업 흉내)"""
+    with store._lock:
+        store._conn.execute("UPDATE jobs SET owner = ? WHERE job_id = ?", (DEAD_WORKER, job_id))
+
+
+def queued_job(store: JobStore, client: ComfyUIClient, request_key: str) -> str:
+    job_id = store.create("t2i", {"prompt": "self test"}, request_key=request_key)
+    store.add_prompt(job_id, client.queue_prompt(copy.deepcopy(WORKFLOW)))
+    orphan(store, job_id)
+    return job_id
+
+
+def check_recover(fake: FakeComfyUI, client: ComfyUIClient, store: JobStore):
+    job_id = queued_job(store, client, "req-recover")
+    twin_id = store.create("t2i", {"prompt": "self test"}, request_key="req-recover")
+    orphan(store, twin_id)
+
+    counts = recover_orphaned_jobs(store, timeout=60)
+    assert counts == {"recovered": 2}, f"회수 결과 {counts}"
+    job, twin = store.get(job_id), store.get(twin_id)
+    assert job["state"] == twin["state"] == "recovered"
+    assert job["owner"] != DEAD_WORKER, "주인이 바뀌지 않음"
+    assert len(job["artifact_ids"]) == 1 and twin["artifact_ids"] == job["artifact_ids"]
+    artifact = artifacts.get_artifact_store().get(job["artifact_ids"][0])
+    assert artifact is not None and artifact.read() == fake.image, "아티팩트 바이트가 다릅니다"
+    return "실행 중이던 prompt 완료 후 아티팩트 저장, 합쳐진 요청도 같은 아티팩트"
+
+
+def check_not_queued(fake: FakeComfyUI, client: ComfyUIClient, store: JobStore):
+    job_id = store.create("t2i", {"prompt": "self test"}, request_key="req-never-queued")
+    orphan(store, job_id)
+    counts = recover_orphaned_jobs(store, timeout=60)
+    job = store.get(job_id)
+    assert counts == {"failed": 1} and job["state"] == "failed", f"회수 결과 {counts}"
+    return f"failed ({job['error']})"
+
+
+def check_failed_prompt(fake: FakeComfyUI, client: ComfyUIClient, store: JobStore):
+    fake.oom_when = lambda workflow: True
+    try:
+        job_id = queued_job(store, client, "req-oom")
+        counts = recover_orphaned_jobs(store, timeout=60)
+    finally:
+        fake.oom_when = None
+    job = store.get(job_id)
+    assert counts == {"failed": 1} and job["state"] == "failed", f"회수 결과 {counts}"
+    assert not job["artifact_ids"]
+    return f"failed ({job['error']})"
+
+
+def check_history_gone(fake: FakeComfyUI, client: ComfyUIClient, store: JobStore):
+    job_id = queued_job(store, client, "req-history-gone")
+    prompt_id = store.get(job_id)["prompt_ids"][0]
+    deadline = time.time() + 30
+    while prompt_id not in fake.history and time.time() < deadline:
+        time.sleep(0.1)
+    assert client.delete_history([prompt_id]), "히스토리 삭제 실패"
+
+    counts = recover_orphaned_jobs(store, timeout=60)
+    job = store.get(job_id)
+    assert counts == {"failed": 1} and job["state"] == "failed", f"회수 결과 {counts}"
+    return f"failed ({job['error']})"
+
+
+def check_live_owner(fake: FakeComfyUI, client: ComfyUIClient, store: JobStore):
+    job_id = store.create("t2i", {"prompt": "self test"}, request_key="req-live")  # 주인 = 이 워커
+    assert recover_orphaned_jobs(store, timeout=60) == {}, "살아 있는 워커의 작업을 회수함"
+    assert store.get(job_id)["state"] == "running"
+
+    orphan(store, job_id)
+    assert store.claim(job_id, DEAD_WORKER), "회수 시작 실패"
+    assert not store.claim(job_id, DEAD_WORKER), "이미 가져간 작업을 다시 가져감"
+    store.finish(job_id, "failed", "점검용")
+    return "주인이 살아 있으면 건너뜀, 두 번째 claim은 False"
+
+
+def main():
+    with tempfile.TemporaryDirectory() as workdir:
+        shared_state._shared_state = shared_state.LocalSharedState()
+        job_store._job_store_loaded = True  # 요청 경로의 작업 기록은 사용 안 함 (점검용 저장소를 직접 사용)
+        artifacts._artifact_store = artifacts.ArtifactStore(os.path.join(workdir, "artifacts"))
+
+        fake = FakeComfyUI(execution_seconds=1.0)
+        base_url = fake.start()
+        client = ComfyUIClient(base_url=base_url, timeout=60)
+        store = JobStore(os.path.join(workdir, "jobs.sqlite3"), base_url=base_url)
+        checks = [
+            ("회수", check_recover),
+            ("등록 전 중단", check_not_queued),
+            ("실패한 prompt", check_failed_prompt),
+            ("히스토리 없음", check_history_gone),
+            ("살아 있는 워커", check_live_owner),
+        ]
+        failed = 0
+        try:
+            for name, check in checks:
+                start = time.perf_counter()
+                try:
+                    print(f"✅ {name}: {check(fake, client, store)} ({time.perf_counter() - start:.1f}초)")
+                except Exception as e:
+                    failed += 1
+                    print(f"❌ {name}: {e!r}")
+        finally:
+            fake.stop()
+    print("=" * 60)
+    print("✅ 모든 점검 통과" if not failed else f"❌ {failed}개 실패")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# scripts/test/oom_ladder_self_test.py
+# ============================================================
+# 🪜 GPU 메모리 부족(OOM) 사다리 자가 점검 - 가짜 ComfyUI 사용 (GPU / ComfyUI 불필요)
+# 1. tiled_vae: VAEDecode에서 OOM → VAEDecodeTiled로 재실행해 성공
+# 2. lower_quant: 타일 디코딩으로도 OOM → oom_fallback 모델(Q8 → Q4)로 재실행, seed 유지
+# 3. 사다리 끝: 적용할 단계가 없으면 GPUOutOfMemoryError 전달
+# 4. 일괄 등록: 중간 워크플로우가 OOM이면 아직 시작하지 않은 작업은 큐에서 삭제, 재시도는 결과를 받지 못한 것만 실행
+#
+# 사용법:
+#   uv run python scripts/test/oom_ladder_self_test.py
+# ============================================================
+
+import os
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+src_path = os.path.join(project_root, "src")
+for path in (src_path, os.path.dirname(__file__)):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from backend import job_store, shared_state
+from backend.comfyui_client import ComfyUIClient
+from backend.exceptions import GPUOutOfMemoryError
+from backend.oom_ladder import execute_with_oom_ladder
+from fake_comfyui import FakeComfyUI
+
+MODEL = "FLUX.1-dev-Q8"        # configs/model_config.yaml: oom_fallback = FLUX.1-dev-Q4
+FALLBACK = "FLUX.1-dev-Q4"
+
+
+def build(model_name: str, seed, index: int = 0) -> dict:
+    """샘플러 seed / 모델 이름을 담은 최소 워크플로우 (가짜 서버는 노드를 순서대로 "실행"만 함)"""
+    return {
+        "3": {"class_type": "KSampler", "inputs": {"seed": 1234 if seed is None else seed, "model": model_name}},
+        "5": {"class_type": "EmptyLatentImage", "inputs": {"width": 1024, "height": 1024, "batch_size": 1}},
+        "7": {"class_type": "VAEDecode", "inputs": {"samples": ["3", 0], "vae": ["4", 0]}},
+        "8": {"class_type": "SaveImage", "inputs": {"filename_prefix": f"ladder_{index}", "images": ["7", 0]}}
+    }
+
+
+def is_tiled(workflow: dict) -> bool:
+    return any(node["class_type"] == "VAEDecodeTiled" for node in workflow.values())
+
+
+def model_of(workflow: dict) -> str:
+    return workflow["3"]["inputs"]["model"]
+
+
+def check_tiled_vae(fake: FakeComfyUI, client: ComfyUIClient):
+    fake.oom_when = lambda workflow: not is_tiled(workflow)
+    executed = len(fake.executed)
+    images, workflow, model_name, applied = execute_with_oom_ladder(
+        client, client.base_url, build, MODEL, 1024, 1024
+    )
+    assert images[0] == fake.image, "결과 바이트가 다릅니다"
+    assert applied == "tiled_vae" and model_name == MODEL, f"단계 {applied}, 모델 {model_name}"
+    assert is_tiled(workflow)
+    assert len(fake.executed) - executed == 2, f"실행 {len(fake.executed) - executed}회"
+    return "OOM 1회 → VAEDecodeTiled로 성공"
+
+
+def check_lower_quant(fake: FakeComfyUI, client: ComfyUIClient):
+    fake.oom_when = lambda workflow: model_of(workflow) != FALLBACK
+    executed = len(fake.executed)
+    images, workflow, model_name, applied = execute_with_oom_ladder(
+        client, client.base_url, lambda name, seed: build(name, seed if seed is not None else 777),
+        MODEL, 1024, 1024
+    )
+    runs = fake.executed[executed:]
+    assert applied == "lower_quant" and model_name == FALLBACK, f"단계 {applied}, 모델 {model_name}"
+    assert [model_of(w) for w in runs] == [MODEL, MODEL, FALLBACK], f"실행 모델 {[model_of(w) for w in runs]}"
+    assert {w["3"]["inputs"]["seed"] for w in runs} == {777}, "단계가 바뀌면서 seed가 바뀜"
+    assert images[0] == fake.image
+    return f"{MODEL} OOM 2회 (기본 / 타일) → {FALLBACK}로 성공, seed 유지"
+
+
+def check_ladder_exhausted(fake: FakeComfyUI, client: ComfyUIClient):
+    fake.oom_when = lambda workflow: True
+    executed = len(fake.executed)
+    try:
+        execute_with_oom_ladder(client, client.base_url, build, FALLBACK, 1024, 1024, allow_lowres=False)
+        raise AssertionError("OOM이 전달되지 않음")
+    except GPUOutOfMemoryError:
+        pass
+    # 기본 → tiled_vae (lower_quant는 대체 모델이 없어 건너뜀, lowres_upscale은 allow_lowres=False)
+    assert len(fake.executed) - executed == 2, f"실행 {len(fake.executed) - executed}회"
+    return "적용할 단계를 모두 쓰면 GPUOutOfMemoryError (실행 2회)"
+
+
+def check_batch(fake: FakeComfyUI, client: ComfyUIClient):
+    # 두 번째 워크플로우만 타일 디코딩 전까지 OOM
+    # (ComfyUI처럼 실패 직후 세 번째가 바로 시작되므로 큐에서 삭제되는 것은 네 번째,
+    #  완료 확인 간격(2초) 안에 세 번째가 끝나지 않도록 실행 시간을 늘림)
+    fake.execution_seconds = 4.0
+    fake.oom_when = lambda workflow: workflow["8"]["inputs"]["filename_prefix"] == "ladder_1" and not is_tiled(workflow)
+    executed = len(fake.executed)
+    queue_deleted = fake.counters["queue_deleted"]
+    delivered = []
+    images, _, _, applied = execute_with_oom_ladder(
+        client, client.base_url,
+        lambda name, seed: [build(name, seed, index) for index in range(4)],
+        MODEL, 1024, 1024,
+        on_result=lambda index, result: delivered.append(index)
+    )
+    runs = [w["8"]["inputs"]["filename_prefix"] for w in fake.executed[executed:]]
+    assert applied == "tiled_vae"
+    assert len(images) == 4 and all(image == fake.image for image in images)
+    assert sorted(delivered) == [0, 1, 2, 3], f"결과 전달 순번 {delivered}"
+    assert runs == ["ladder_0", "ladder_1", "ladder_2", "ladder_1", "ladder_2", "ladder_3"], f"실행 순서 {runs}"
+    assert fake.counters["queue_deleted"] - queue_deleted == 1, "시작하지 않은 작업이 삭제되지 않음"
+    return "OOM 뒤 대기 작업 1개 삭제, 재시도는 완료한 첫 번째를 빼고 3개만 실행 (총 6회)"
+
+
+def main():
+    shared_state._shared_state = shared_state.LocalSharedState()
+    job_store._job_store_loaded = True  # 작업 기록 사용 안 함
+
+    fake = FakeComfyUI(execution_seconds=0.3)
+    client = ComfyUIClient(base_url=fake.start(), timeout=60)
+    checks = [
+        ("tiled_vae", check_tiled_vae),
+        ("lower_quant", check_lower_quant),
+        ("사다리 끝", check_ladder_exhausted),
+        ("일괄 등록", check_batch),
+    ]
+    failed = 0
+    try:
+        for name, check in checks:
+            start = time.perf_counter()
+            try:
+                print(f"✅ {name}: {check(fake, client)} ({time.perf_counter() - start:.1f}초)")
+            except Exception as e:
+                failed += 1
+                print(f"❌ {name}: {e!r}")
+            finally:
+                fake.oom_when = None
+                fake.execution_seconds = 0.3
+    finally:
+        fake.stop()
+    print("=" * 60)
+    print("✅ 모든 점검 통과" if not failed else f"❌ {failed}개 실패")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+# scripts/test/residency_self_test.py
+# ============================================================
+# 📦 모델 상주(residency) 관리 자가 점검 - 가짜 ComfyUI 사용 (GPU / ComfyUI 불필요)
+# 1. VRAM 예상치: 레지스트리의 vram_gb (없는 모델은 16GB)
+# 2. LRU 해제: 새 모델로 예산을 넘으면 /free 호출, 쓰지 않는 모델은 목록에서 제거
+# 3. 해제 대기: 다른 작업이 모델을 쓰는 중이면 그 작업이 끝난 뒤에 해제
+# 4. 언로드: 실행 중인 작업이 있으면 거부, 없으면 해제 + 선택 모델 초기화
+# 5. 해제 실패: /free 오류가 나도 사용 표시를 되돌려 다음 작업이 막히지 않음
+# 6. 느린 /free: 해제 중에도 상태 조회는 바로 응답, 새 작업은 해제가 끝난 뒤 시작
+# 7. 히스토리 동기화: 완료 시각이 없는 항목은 건너뜀 (유휴 시간이 초기화되지 않아 유휴 해제 가능)
+#
+# 사용법:
+#   uv run python scripts/test/residency_self_test.py
+# ============================================================
+
+import os
+import sys
+import threading
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+src_path = os.path.join(project_root, "src")
+for path in (src_path, os.path.dirname(__file__)):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from backend import shared_state
+from backend.comfyui_client import ComfyUIClient
+from backend.model_residency import ModelResidencyManager, estimate_vram_gb
+from fake_comfyui import FakeComfyUI
+
+LARGE = "FLUX.1-dev-Q8"   # 21GB
+SMALL = "FLUX.1-dev-Q4"   # 8GB
+
+
+def new_manager(base_url: str, **kwargs) -> ModelResidencyManager:
+    shared_state._shared_state = shared_state.LocalSharedState()
+    return ModelResidencyManager(base_url, vram_budget_gb=22, eviction_wait=30, **kwargs)
+
+
+def resident_names(manager: ModelResidencyManager) -> list:
+    return [m["name"] for m in manager.snapshot()["models"]]
+
+
+def check_vram_estimate(fake: FakeComfyUI, base_url: str):
+    values = {name: estimate_vram_gb(name) for name in (LARGE, SMALL, "unknown.gguf")}
+    assert values == {LARGE: 21, SMALL: 8, "unknown.gguf": 16.0}, f"예상치 {values}"
+    return f"{LARGE} 21GB, {SMALL} 8GB, 알 수 없는 모델 16GB"
+
+
+def check_lru(fake: FakeComfyUI, base_url: str):
+    manager = new_manager(base_url)
+    freed = fake.counters["free"]
+    with manager.use([LARGE]):
+        pass
+    with manager.use([SMALL]):
+        assert resident_names(manager) == [SMALL], f"상주 목록 {resident_names(manager)}"
+    assert fake.counters["free"] - freed == 1, "/free가 호출되지 않음"
+    with manager.use([SMALL]):
+        pass
+    assert fake.counters["free"] - freed == 1, "예산 안에서 /free 호출됨"
+    return f"{LARGE} + {SMALL} = 29GB > 22GB → /free 1회, 상주 목록 [{SMALL}]"
+
+
+def check_wait_for_in_flight(fake: FakeComfyUI, base_url: str):
+    manager = new_manager(base_url)
+    freed = fake.counters["free"]
+    events = []
+    large_started = threading.Event()
+
+    def large_job():
+        with manager.use([LARGE]):
+            large_started.set()
+            time.sleep(1.0)
+            events.append(("large_done", fake.counters["free"] - freed))
+
+    thread = threading.Thread(target=large_job)
+    thread.start()
+    large_started.wait(10)
+    with manager.use([SMALL]):
+        events.append(("small_started", fake.counters["free"] - freed))
+    thread.join(10)
+    assert events == [("large_done", 0), ("small_started", 1)], f"순서 {events}"
+    assert resident_names(manager) == [SMALL]
+    return "실행 중인 작업이 끝난 뒤 /free → 새 작업 시작"
+
+
+def check_unload(fake: FakeComfyUI, base_url: str):
+    manager = new_manager(base_url)
+    freed = fake.counters["free"]
+    manager.select(SMALL)
+    with manager.use([SMALL]):
+        result = manager.unload()
+        assert not result["success"] and result["in_flight"] == {SMALL: 1}, f"실행 중 언로드 {result}"
+    assert fake.counters["free"] == freed
+    result = manager.unload()
+    assert result["success"], result["message"]
+    assert fake.counters["free"] - freed == 1 and resident_names(manager) == []
+    assert manager.get_selected() is None, "선택 모델이 남아 있음"
+    return "실행 중 거부 → 작업 종료 후 해제, 선택 모델 초기화"
+
+
+def check_free_failure(fake: FakeComfyUI, base_url: str):
+    class BrokenClient:
+        def free_memory(self, **kwargs):
+            raise ConnectionError("ComfyUI 연결 끊김 (흉내)")
+
+    manager = new_manager(base_url, client_factory=lambda key: BrokenClient())
+    with manager.use([LARGE]):
+        pass
+    try:
+        with manager.use([SMALL]):
+            raise AssertionError("해제 실패가 전달되지 않음")
+    except ConnectionError:
+        pass
+    counts = {m["name"]: m["in_flight"] for m in manager.snapshot()["models"]}
+    assert counts == {LARGE: 0, SMALL: 0}, f"사용 표시가 남음: {counts}"
+
+    # 남은 사용 표시가 있으면 다음 해제가 eviction_wait(30초)만큼 기다리게 됨
+    start = time.perf_counter()
+    with manager.use([SMALL]):
+        pass
+    assert time.perf_counter() - start < 1.0, "다음 작업이 해제 대기에 막힘"
+    return "/free 오류 후 사용 표시 0, 다음 작업 바로 진행"
+
+
+def check_slow_free(fake: FakeComfyUI, base_url: str):
+    manager = new_manager(base_url, client_factory=lambda key: ComfyUIClient(base_url=key, timeout=30))
+    fake.free_delay = 2.0
+    with manager.use([SMALL]):
+        pass
+    unload = threading.Thread(target=manager.unload)
+    unload.start()
+    time.sleep(0.3)
+
+    start = time.perf_counter()
+    manager.snapshot()
+    snapshot_seconds = time.perf_counter() - start
+    assert snapshot_seconds < 0.5, f"상태 조회가 /free를 기다림 ({snapshot_seconds:.1f}초)"
+
+    with manager.use([SMALL]):
+        entered = time.perf_counter() - start
+    unload.join(10)
+    assert entered > 1.0, f"해제 중에 새 작업이 시작됨 ({entered:.1f}초)"
+    return f"/free 2초 동안 상태 조회 {snapshot_seconds * 1000:.0f}ms, 새 작업은 {entered:.1f}초 뒤 시작"
+
+
+def check_sync_idle(fake: FakeComfyUI, base_url: str):
+    finished = time.time() - 7200
+
+    def history_item(unet_name: str, messages: list) -> dict:
+        workflow = {"1": {"class_type": "UnetLoaderGGUF", "inputs": {"unet_name": unet_name}}}
+        return {"prompt": [1, unet_name, workflow, {}, []], "status": {"completed": True, "messages": messages}}
+
+    class HistoryClient:
+        freed = 0
+
+        def get_system_stats(self):
+            return {"devices": [{"torch_vram_total": 8 * 1024 ** 3}]}
+
+        def get_recent_history(self, max_items):
+            return {
+                "old": history_item("old.gguf", [["execution_success", {"timestamp": int(finished * 1000)}]]),
+                "no-timestamp": history_item("no_timestamp.gguf", [["execution_start", {}]])
+            }
+
+        def free_memory(self, **kwargs):
+            HistoryClient.freed += 1
+            return True
+
+    manager = new_manager(base_url, client_factory=lambda key: HistoryClient())
+    manager.idle_ttl = 900
+    for _ in range(2):  # 리퍼 주기마다 반복 동기화
+        manager.sync()
+    models = {m["name"]: m["idle_seconds"] for m in manager.snapshot()["models"]}
+    assert list(models) == ["old.gguf"], f"상주 목록 {models}"
+    assert models["old.gguf"] > 7000, f"유휴 시간이 초기화됨: {models}"
+    assert manager.reap_idle() == [base_url] and HistoryClient.freed == 1, "유휴 모델이 해제되지 않음"
+    return f"완료 시각 없는 항목 제외, 유휴 {models['old.gguf']:.0f}초 → 해제"
+
+
+def main():
+    fake = FakeComfyUI()
+    base_url = fake.start()
+    checks = [
+        ("VRAM 예상치", check_vram_estimate),
+        ("LRU 해제", check_lru),
+        ("해제 대기", check_wait_for_in_flight),
+        ("언로드", check_unload),
+        ("해제 실패", check_free_failure),
+        ("느린 /free", check_slow_free),
+        ("히스토리 동기화", check_sync_idle),
+    ]
+    failed = 0
+    try:
+        for name, check in checks:
+            try:
+                print(f"✅ {name}: {check(fake, base_url)}")
+            except Exception as e:
+                failed += 1
+                print(f"❌ {name}: {e!r}")
+            finally:
+                fake.free_delay = 0.0
+    finally:
+        fake.stop()
+    print("=" * 60)
+    print("✅ 모든 점검 통과" if not failed else f"❌ {failed}개 실패")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+# scripts/test/shared_state_self_test.py
+# ============================================================
+# 🔗 워커 간 공유 상태(SQLite 구현) 자가 점검 - 실제 프로세스 여러 개로 확인 (GPU / ComfyUI 불필요)
+# 1. set_if_absent: 여러 프로세스가 동시에 같은 키를 등록해도 하나만 성공
+# 2. 리더 선출: 한 역할의 리더는 1개, 리더 프로세스가 죽으면 다른 프로세스가 이어받음
+# 3. TTL: 만료된 키는 조회되지 않음 / 같은 스레드가 같은 잠금을 중첩해서 잡아도 멈추지 않음
+# 4. 하트비트: 다른 워커가 살아 있는 동안만 live_instances에 보임
+# 5. 모델 상주: 다른 워커의 선택 모델 / 실행 중 작업이 보임 (해제 판단에 사용)
+# 6. Idempotency-Key: 다른 워커가 실행 중인 키를 다른 파라미터로 쓰면 거부, 같은 파라미터면 대기 후 그 결과 재생
+#    (끝난 뒤 들어온 재시도도 재실행 없이 재생, 실패한 키만 재실행)
+# 7. 수락 제어: 다른 워커가 처리 중인 작업도 예상 완료 시간에 포함 (SLO 초과 시 거절, 해제되면 수락)
+#
+# 사용법:
+#   uv run python scripts/test/shared_state_self_test.py
+# ============================================================
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+src_path = os.path.join(project_root, "src")
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from backend import artifacts, job_store, shared_state
+from backend.admission import AdmissionController
+from backend.exceptions import AdmissionRejectedError, IdempotencyConflictError
+from backend.idempotency import IdempotencyStore
+from backend.model_residency import get_residency_manager
+
+HEARTBEAT = 0.5
+ADMISSION_CONFIG = {"initial_durations": {"t2i": 100}, "slo_seconds": {"t2i": 150}}
+BASE_URL = "http://127.0.0.1:1"  # 연결하지 않음 (상주 모델 사용 표시만 확인)
+
+
+def use_shared_state(path: str) -> shared_state.SharedState:
+    """이 프로세스의 공유 상태를 점검용 SQLite 파일로 지정 (작업 기록은 사용 안 함)"""
+    shared_state._shared_state = shared_state.SQLiteSharedState(path, heartbeat_interval=HEARTBEAT)
+    shared_state._shared_state.start_heartbeat()
+    job_store._job_store_loaded = True
+    artifacts._artifact_store = artifacts.ArtifactStore(os.path.join(os.path.dirname(path), "artifacts"))
+    return shared_state._shared_state
+
+
+# ---------- 자식 프로세스 ----------
+def race_set_if_absent(path, start_at, results):
+    state = use_shared_state(path)
+    time.sleep(max(0.0, start_at - time.time()))
+    results.put(state.set_if_absent("race", "key", os.getpid(), ttl=60))
+
+
+def hold_leadership(path, seconds, results):
+    state = use_shared_state(path)
+    results.put(state.try_leadership("background"))
+    time.sleep(seconds)
+
+
+def stay_alive(path, ready):
+    use_shared_state(path)
+    ready.set()
+    time.sleep(60)
+
+
+def use_model(path, seconds, ready):
+    use_shared_state(path)
+    residency = get_residency_manager()
+    residency.select("other_worker_model", BASE_URL)
+    with residency.use(["other_worker_model"], BASE_URL):
+        ready.set()
+        time.sleep(seconds)
+
+
+def hold_admission(path, seconds, ready):
+    use_shared_state(path)
+    ticket = AdmissionController(ADMISSION_CONFIG).admit("t2i")
+    ready.set()
+    time.sleep(seconds)
+    ticket.release(record=False)
+
+
+def run_idempotent(path, key, seconds, ready, fail=False):
+    use_shared_state(path)
+
+    def func():
+        ready.set()
+        time.sleep(seconds)
+        if fail:
+            raise RuntimeError("GPU 메모리 부족")
+        return [b"first-image"], {"seed": 1}
+
+    try:
+        IdempotencyStore(ttl=60).run(key, "fingerprint-a", func, endpoint="t2i")
+    except RuntimeError:
+        pass
+
+
+# ---------- 점검 ----------
+def check_set_if_absent(ctx, path):
+    results = ctx.Queue()
+    start_at = time.time() + 1.5
+    procs = [ctx.Process(target=race_set_if_absent, args=(path, start_at, results)) for _ in range(8)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    winners = [results.get() for _ in procs].count(True)
+    assert winners == 1, f"성공 {winners}개"
+    return "8개 프로세스 중 1개만 등록"
+
+
+def check_leadership(ctx, path, state):
+    results = ctx.Queue()
+    procs = [ctx.Process(target=hold_leadership, args=(path, 2, results)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    leaders = [results.get(timeout=10) for _ in procs].count(True)
+    assert leaders == 1, f"리더 {leaders}개"
+    assert not state.try_leadership("background"), "리더가 있는데 이 프로세스도 리더가 됨"
+    for p in procs:
+        p.join()
+    assert state.try_leadership("background"), "리더 종료 후 이어받지 못함"
+    return "4개 프로세스 중 리더 1개, 종료 후 이어받음"
+
+
+def check_ttl(state):
+    state.set("ttl", "short", 1, ttl=0.3)
+    state.set("ttl", "long", 2, ttl=60)
+    assert state.get("ttl", "short") == 1
+    time.sleep(0.5)
+    state.purge_expired()
+    assert state.get("ttl", "short") is None, "만료된 키가 조회됨"
+    assert state.items("ttl") == {"long": 2}
+    return "만료 키 제외 확인"
+
+
+def check_nested_lock(state):
+    entered = []
+
+    def nested():
+        with state.lock("nested"):
+            with state.lock("nested"):
+                entered.append(True)
+            with state.lock("nested"):  # 안쪽 해제 후에도 바깥 잠금 유지
+                entered.append(True)
+
+    thread = threading.Thread(target=nested, daemon=True)
+    thread.start()
+    thread.join(5)
+    assert len(entered) == 2, "중첩 잠금에서 멈춤"
+    with state.lock("nested"):  # 바깥 잠금 해제 후 다시 잡을 수 있음
+        pass
+    return "같은 스레드 중첩 잠금 통과"
+
+
+def check_heartbeat(ctx, path, state):
+    time.sleep(HEARTBEAT * 3 + 0.5)  # 앞 점검에서 끝난 프로세스의 하트비트 만료
+    ready = ctx.Event()
+    proc = ctx.Process(target=stay_alive, args=(path, ready))
+    proc.start()
+    ready.wait(30)
+    assert len(state.live_instances()) == 2, f"살아 있는 워커 {len(state.live_instances())}개"
+    proc.kill()
+    proc.join()
+    time.sleep(HEARTBEAT * 3 + 0.5)
+    assert len(state.live_instances()) == 1, "죽은 워커가 계속 보임"
+    return f"죽은 워커는 {HEARTBEAT * 3:.1f}초 후 제외"
+
+
+def check_residency(ctx, path):
+    residency = get_residency_manager()
+    ready = ctx.Event()
+    proc = ctx.Process(target=use_model, args=(path, 2, ready))
+    proc.start()
+    ready.wait(30)
+    assert residency.get_selected(BASE_URL) == "other_worker_model", "다른 워커의 선택 모델이 보이지 않음"
+    busy = residency._other_workers(BASE_URL.rstrip("/"))["in_flight"]
+    assert busy == 1, f"다른 워커 실행 중 작업 {busy}개"
+    unload = residency.unload(BASE_URL)
+    assert not unload["success"], "다른 워커가 쓰는 중인데 언로드됨"
+    proc.join()
+    assert residency._other_workers(BASE_URL.rstrip("/"))["in_flight"] == 0
+    return "선택 모델 공유, 다른 워커 사용 중 언로드 거부"
+
+
+def check_idempotency(ctx, path):
+    ready = ctx.Event()
+    proc = ctx.Process(target=run_idempotent, args=(path, "self-test-key", 2, ready))
+    proc.start()
+    ready.wait(30)
+    store = IdempotencyStore(ttl=60)
+    try:
+        store.run("self-test-key", "fingerprint-b", lambda: "other", endpoint="t2i")
+        raise AssertionError("다른 파라미터 재사용이 거부되지 않음")
+    except IdempotencyConflictError:
+        pass
+
+    started = time.time()
+    result, replayed = store.run("self-test-key", "fingerprint-a", lambda: "second", endpoint="t2i")
+    waited = time.time() - started
+    proc.join()
+    assert replayed and result == [[b"first-image"], {"seed": 1}], f"다른 워커 결과가 재생되지 않음: {result!r}"
+    assert waited >= 1.0, f"다른 워커 실행을 기다리지 않음 ({waited:.2f}초)"
+
+    # 끝난 뒤 다른 워커로 들어온 재시도 (이 워커 메모리에 없는 키)
+    result, replayed = IdempotencyStore(ttl=60).run(
+        "self-test-key", "fingerprint-a", lambda: "third", endpoint="t2i"
+    )
+    assert replayed and result[0] == [b"first-image"], f"끝난 키가 재실행됨: {result!r}"
+    return f"충돌 거부, 다른 워커 완료까지 {waited:.1f}초 대기 후 결과 재생, 끝난 키 재생"
+
+
+def check_idempotency_failed(ctx, path):
+    ready = ctx.Event()
+    proc = ctx.Process(target=run_idempotent, args=(path, "self-test-failed", 0.5, ready, True))
+    proc.start()
+    proc.join()
+    result, replayed = IdempotencyStore(ttl=60).run(
+        "self-test-failed", "fingerprint-a", lambda: "retried", endpoint="t2i"
+    )
+    assert result == "retried" and not replayed, f"실패한 키가 재실행되지 않음: {result!r}"
+    return "다른 워커에서 실패한 키는 재실행"
+
+
+def check_admission(ctx, path):
+    controller = AdmissionController(ADMISSION_CONFIG)
+    ready = ctx.Event()
+    proc = ctx.Process(target=hold_admission, args=(path, 2, ready))
+    proc.start()
+    ready.wait(30)
+    assert controller.snapshot()["in_flight"] == 1, "다른 워커의 처리 중 작업이 보이지 않음"
+    try:
+        controller.admit("t2i").release(record=False)
+        raise AssertionError("다른 워커가 처리 중인데 SLO를 넘는 작업이 수락됨")
+    except AdmissionRejectedError as e:
+        retry_after = e.retry_after
+    proc.join()
+    controller.admit("t2i").release(record=False)
+    assert controller.snapshot()["in_flight"] == 0
+    return f"다른 워커 작업 포함 예상 시간으로 거절 (Retry-After {retry_after}초), 해제 후 수락"
+
+
+def main():
+    ctx = multiprocessing.get_context("spawn")  # uvicorn --workers와 같은 방식 (워커마다 INSTANCE_ID 다름)
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "shared_state.sqlite3")
+        state = use_shared_state(path)
+        checks = [
+            ("set_if_absent", lambda: check_set_if_absent(ctx, path)),
+            ("리더 선출", lambda: check_leadership(ctx, path, state)),
+            ("TTL", lambda: check_ttl(state)),
+            ("중첩 잠금", lambda: check_nested_lock(state)),
+            ("하트비트", lambda: check_heartbeat(ctx, path, state)),
+            ("모델 상주", lambda: check_residency(ctx, path)),
+            ("Idempotency-Key", lambda: check_idempotency(ctx, path)),
+            ("Idempotency-Key 실패 후 재시도", lambda: check_idempotency_failed(ctx, path)),
+            ("수락 제어", lambda: check_admission(ctx, path)),
+        ]
+        failed = 0
+        for name, check in checks:
+            try:
+                print(f"✅ {name}: {check()}")
+            except Exception as e:
+                failed += 1
+                print(f"❌ {name}: {e!r}")
+    print("=" * 60)
+    print("✅ 모든 점검 통과" if not failed else f"❌ {failed}개 실패")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# scripts/test/single_flight_self_test.py
+# ============================================================
+# 🔁 동일 요청 합치기(single-flight) 자가 점검 - 가짜 ComfyUI 사용 (GPU / ComfyUI 불필요)
+# 1. 합치기: 동시에 들어온 같은 요청은 ComfyUI 작업 1개, 모두 같은 결과 (실행 중에만 is_running)
+# 2. 합치기 실패: 실행한 요청이 실패(OOM)하면 기다리던 요청도 같은 예외, 실패는 저장하지 않음 (다음 요청은 재실행)
+#
+# 사용법:
+#   uv run python scripts/test/single_flight_self_test.py
+# ============================================================
+
+import copy
+import os
+import sys
+import threading
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+src_path = os.path.join(project_root, "src")
+for path in (src_path, os.path.dirname(__file__)):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from backend import job_store, shared_state
+from backend.comfyui_client import ComfyUIClient
+from backend.exceptions import GPUOutOfMemoryError
+from backend.single_flight import SingleFlight
+from fake_comfyui import FakeComfyUI
+
+WORKFLOW = {
+    "7": {"class_type": "VAEDecode", "inputs": {"samples": ["6", 0], "vae": ["4", 0]}},
+    "8": {"class_type": "SaveImage", "inputs": {"filename_prefix": "self_test", "images": ["7", 0]}}
+}
+
+
+def run_threads(count: int, target) -> tuple:
+    """target()을 동시에 count번 실행 → (결과 리스트, 예외 리스트)"""
+    results, errors = [], []
+
+    def run():
+        try:
+            results.append(target())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+    return results, errors
+
+
+def execute(client: ComfyUIClient):
+    return client.execute_workflow(copy.deepcopy(WORKFLOW))[0]
+
+
+def check_single_flight(fake: FakeComfyUI, client: ComfyUIClient):
+    flight = SingleFlight()
+    prompts = fake.counters["prompts"]
+    running = []  # 실행 중 is_running (수락 판단에서 합쳐질 요청 구분)
+
+    def leader():
+        running.append(flight.is_running("same"))
+        return execute(client)
+
+    results, errors = run_threads(4, lambda: flight.do("same", leader, "t2i"))
+    assert not errors, f"예외 발생: {errors}"
+    assert running == [True] and not flight.is_running("same"), f"is_running {running}"
+    assert fake.counters["prompts"] - prompts == 1, f"prompt {fake.counters['prompts'] - prompts}개 등록"
+    assert all(images[0] == fake.image for images, _ in results), "결과 바이트가 다릅니다"
+    coalesced = sum(1 for _, flag in results if flag)
+    assert coalesced == 3, f"합쳐진 요청 {coalesced}개"
+    return f"동시 요청 4개 → prompt 1개, 합쳐진 요청 {coalesced}개"
+
+
+def check_single_flight_failure(fake: FakeComfyUI, client: ComfyUIClient):
+    flight = SingleFlight()
+    prompts = fake.counters["prompts"]
+    fake.oom_when = lambda workflow: True
+    try:
+        results, errors = run_threads(3, lambda: flight.do("oom", lambda: execute(client), "t2i"))
+    finally:
+        fake.oom_when = None
+    assert not results and len(errors) == 3, f"성공 {len(results)}개, 실패 {len(errors)}개"
+    assert all(isinstance(e, GPUOutOfMemoryError) for e in errors), f"예외 종류: {errors}"
+    assert fake.counters["prompts"] - prompts == 1, "실패한 실행이 여러 번 등록됨"
+    assert flight.in_flight() == 0, "실패한 키가 남아 있음"
+
+    images, coalesced = flight.do("oom", lambda: execute(client), "t2i")
+    assert images[0] == fake.image and not coalesced
+    assert fake.counters["prompts"] - prompts == 2, "실패 후 재요청이 실행되지 않음"
+    return "대기자 3개 모두 GPUOutOfMemoryError, 다음 요청은 재실행"
+
+
+def main():
+    shared_state._shared_state = shared_state.LocalSharedState()
+    job_store._job_store_loaded = True  # 작업 기록 사용 안 함
+
+    fake = FakeComfyUI(execution_seconds=1.0)
+    client = ComfyUIClient(base_url=fake.start(), timeout=60)
+    checks = [
+        ("합치기", check_single_flight),
+        ("합치기 실패", check_single_flight_failure),
+    ]
+    failed = 0
+    try:
+        for name, check in checks:
+            start = time.perf_counter()
+            try:
+                print(f"✅ {name}: {check(fake, client)} ({time.perf_counter() - start:.1f}초)")
+            except Exception as e:
+                failed += 1
+                print(f"❌ {name}: {e!r}")
+    finally:
+        fake.stop()
+    print("=" * 60)
+    print("✅ 모든 점검 통과" if not failed else f"❌ {failed}개 실패")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
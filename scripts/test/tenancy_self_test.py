@@ -0,0 +1,177 @@
+# scripts/test/tenancy_self_test.py
+# ============================================================
+# 🏪 가게(테넌트)별 공정 큐 / 사용량 제한 자가 점검 (GPU / ComfyUI 불필요)
+# 1. 공정 순서: 가게 A가 작업을 잔뜩 쌓아 둬도 나중에 온 가게 B의 작업이 A의 다음 작업보다 먼저 실행
+# 2. 가중치: 가중치 2인 가게는 가중치 1인 가게보다 2배 자주 실행
+# 3. 대기 순서: 대기 중인 작업의 position / 예상 대기 시간 조회
+# 4. GPU 초 버킷: 실제 실행 시간을 차감하고 잔액이 0 이하면 429 (Retry-After)
+# 5. GPT 호출 버킷: 한도 초과 시 strict=False는 False (최적화 생략), strict=True는 429
+# - 공유 상태는 점검용 SQLite 파일 사용 (uvicorn --workers N과 같은 구현)
+#
+# 사용법:
+#   uv run python scripts/test/tenancy_self_test.py
+# ============================================================
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+src_path = os.path.join(project_root, "src")
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from backend import shared_state, tenancy
+from backend.exceptions import TenantRateLimitedError
+
+
+def use_shared_state(path: str):
+    """이 프로세스의 공유 상태를 점검용 SQLite 파일로 지정"""
+    shared_state._shared_state = shared_state.SQLiteSharedState(path, heartbeat_interval=0.5)
+    shared_state._shared_state.start_heartbeat()
+
+
+def run_jobs(scheduler: tenancy.FairShareScheduler, jobs: list, hold: float = 0.1) -> list:
+    """
+    (테넌트, 예상 GPU 초) 작업을 순서대로 큐에 넣고 실행 순서 반환
+
+    첫 작업이 슬롯을 잡고 있는 동안 나머지를 모두 넣어 대기 상태에서 순서가 정해지도록 함
+    """
+    order = []
+    first_running = threading.Event()
+    all_enqueued = threading.Event()
+
+    def job(tenant, cost, first):
+        with scheduler.slot(tenant, cost):
+            order.append(tenant)
+            if first:
+                first_running.set()
+                all_enqueued.wait(10)
+            time.sleep(hold)
+
+    threads = []
+    for i, (tenant, cost) in enumerate(jobs):
+        thread = threading.Thread(target=job, args=(tenant, cost, i == 0))
+        thread.start()
+        threads.append(thread)
+        if i == 0:
+            first_running.wait(10)
+        time.sleep(0.02)  # 등록 순서 고정
+    all_enqueued.set()
+    for thread in threads:
+        thread.join()
+    return order
+
+
+def check_fair_order():
+    scheduler = tenancy.FairShareScheduler({"max_dispatched": 1, "poll_interval": 0.05})
+    order = run_jobs(scheduler, [("A", 1.0)] * 5 + [("B", 1.0)])
+    assert order.index("B") == 1, f"B가 A 뒤로 밀림: {order}"
+    return f"실행 순서 {''.join(order)} (B가 A의 쌓인 작업을 기다리지 않음)"
+
+
+def check_weights():
+    scheduler = tenancy.FairShareScheduler({"max_dispatched": 1, "poll_interval": 0.05, "weights": {"P": 2.0}})
+    order = run_jobs(scheduler, [("X", 1.0)] + [("P", 1.0)] * 6 + [("N", 1.0)] * 6, hold=0.05)
+    assert order[1:10] == list("PPNPPNPPN"), f"가중치 비율이 다름: {order}"
+    return f"실행 순서 {''.join(order)} (P:N = 2:1)"
+
+
+def check_queue_position():
+    scheduler = tenancy.FairShareScheduler({"max_dispatched": 1, "poll_interval": 0.05})
+    release = threading.Event()
+    running = threading.Event()
+
+    def hold():
+        with scheduler.slot("A", 10.0, job_id="job-a"):
+            running.set()
+            release.wait(10)
+
+    def wait(tenant, job_id):
+        with scheduler.slot(tenant, 4.0, job_id=job_id):
+            pass
+
+    threads = [threading.Thread(target=hold)]
+    threads[0].start()
+    running.wait(10)
+    for tenant, job_id in (("A", "job-a2"), ("B", "job-b")):
+        threads.append(threading.Thread(target=wait, args=(tenant, job_id)))
+        threads[-1].start()
+        time.sleep(0.1)
+
+    position = scheduler.job_position("job-b")
+    queue = scheduler.tenant_queue("A")
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert position and position["position"] == 1, f"B 대기 순서: {position}"
+    assert 5 < position["estimated_wait_seconds"] <= 10, f"예상 대기 시간: {position}"
+    assert [w["job_id"] for w in queue["waiting"]] == ["job-a2"] and queue["waiting"][0]["position"] == 2
+    assert len(queue["running"]) == 1
+    assert scheduler.job_position("job-b") is None, "끝난 작업이 큐에 남음"
+    return f"B 대기 1번째 (예상 {position['estimated_wait_seconds']}초), A 추가 작업 2번째"
+
+
+def check_gpu_budget():
+    scheduler = tenancy.FairShareScheduler({"gpu_seconds_per_minute": 60, "gpu_seconds_burst": 2})
+    tenancy._fair_scheduler = scheduler
+    scheduler.check_gpu_budget("gpu_shop")
+    with tenancy.tenant_context("gpu_shop", "t2i"):
+        with tenancy.gpu_slot():
+            tenancy.record_gpu_seconds(5.0)  # ComfyUI 실행 시간 보고
+    try:
+        scheduler.check_gpu_budget("gpu_shop")
+        raise AssertionError("GPU 한도 초과가 거부되지 않음")
+    except TenantRateLimitedError as e:
+        assert 3 <= e.retry_after <= 5, f"Retry-After {e.retry_after}"
+        retry_after = e.retry_after
+    scheduler.check_gpu_budget("other_shop")  # 다른 가게는 영향 없음
+    usage = scheduler.usage("gpu_shop")
+    assert usage["gpu_seconds"] == 5.0 and usage["jobs"] == 1, usage
+    return f"5초 사용 후 잔액 -3초 → 429 (Retry-After {retry_after}초), 다른 가게는 통과"
+
+
+def check_gpt_budget():
+    scheduler = tenancy.FairShareScheduler({"gpt_calls_per_minute": 1, "gpt_calls_burst": 2})
+    tenancy._fair_scheduler = scheduler
+    with tenancy.tenant_context("gpt_shop"):
+        assert tenancy.consume_gpt_call() and tenancy.consume_gpt_call()
+        assert not tenancy.consume_gpt_call(strict=False), "한도 초과인데 호출 허용"
+        try:
+            tenancy.consume_gpt_call()
+            raise AssertionError("GPT 한도 초과가 거부되지 않음")
+        except TenantRateLimitedError as e:
+            assert e.resource == tenancy.GPT_CALLS
+    assert tenancy.consume_gpt_call(), "테넌트 컨텍스트 밖에서 제한됨"
+    usage = scheduler.usage("gpt_shop")
+    assert usage["gpt_calls"] == 2 and usage["rate_limited"] == 2, usage
+    return "2회 허용 후 최적화 생략 / 429"
+
+
+def main():
+    with tempfile.TemporaryDirectory() as workdir:
+        use_shared_state(os.path.join(workdir, "shared_state.sqlite3"))
+        checks = [
+            ("공정 순서", check_fair_order),
+            ("가중치", check_weights),
+            ("대기 순서", check_queue_position),
+            ("GPU 초 한도", check_gpu_budget),
+            ("GPT 호출 한도", check_gpt_budget),
+        ]
+        failed = 0
+        for name, check in checks:
+            try:
+                print(f"✅ {name}: {check()}")
+            except Exception as e:
+                failed += 1
+                print(f"❌ {name}: {e!r}")
+    print("=" * 60)
+    print("✅ 모든 점검 통과" if not failed else f"❌ {failed}개 실패")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
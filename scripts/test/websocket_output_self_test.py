@@ -0,0 +1,81 @@
+# scripts/test/websocket_output_self_test.py
+# ============================================================
+# 🔌 웹소켓 결과 수신(SaveImageWebsocket) 자가 점검 - 가짜 ComfyUI 사용 (GPU / ComfyUI 불필요)
+# 1. 파일 출력: SaveImage → /view 다운로드 (기존 경로)
+# 2. 웹소켓 출력: SaveImageWebsocket → WebSocket 바이너리 수신 (/view 요청 0회, 디스크 기록 없음)
+# 3. 노드 미설치: /object_info에 노드가 없으면 파일 출력으로 자동 전환
+# 4. 이미지 유실: 웹소켓 이미지를 받지 못하면 파일 출력으로 재실행
+# - 모든 경우 결과 바이트가 같은지, 히스토리가 바로 지워지지 않고 history_ttl 뒤 정리 시 삭제되는지 확인
+#
+# 사용법:
+#   uv run python scripts/test/websocket_output_self_test.py
+# ============================================================
+
+import copy
+import os
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+src_path = os.path.join(project_root, "src")
+for path in (src_path, os.path.dirname(__file__)):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from backend.comfyui_client import ComfyUIClient
+from backend.comfyui_gc import get_comfyui_janitor
+from fake_comfyui import FakeComfyUI
+
+# VAEDecode → SaveImage만 있는 최소 워크플로우 (가짜 서버는 노드를 순서대로 "실행"만 함)
+WORKFLOW = {
+    "7": {"class_type": "VAEDecode", "inputs": {"samples": ["6", 0], "vae": ["4", 0]}},
+    "8": {"class_type": "SaveImage", "inputs": {"filename_prefix": "self_test", "images": ["7", 0]}}
+}
+
+
+def run_case(name: str, fake: FakeComfyUI, websocket_output: bool, expect_view: bool, expect_prompts: int):
+    base_url = fake.start()
+    try:
+        client = ComfyUIClient(base_url=base_url, timeout=60)
+        start = time.perf_counter()
+        images, _ = client.execute_workflow(copy.deepcopy(WORKFLOW), websocket_output=websocket_output)
+        took = time.perf_counter() - start
+
+        assert len(images) == 1, f"이미지 개수 {len(images)}"
+        assert images[0] == fake.image, "결과 바이트가 다릅니다"
+        assert (fake.counters["view_requests"] > 0) == expect_view, f"/view 요청 {fake.counters['view_requests']}회"
+        assert fake.counters["prompts"] == expect_prompts, f"prompt {fake.counters['prompts']}회"
+        assert fake.history, "히스토리가 바로 삭제되었습니다 (재연결 / 회수 불가)"
+        get_comfyui_janitor().prune_history()
+        assert not fake.history, "history_ttl이 지난 히스토리가 삭제되지 않았습니다"
+        print(
+            f"✅ {name}: {took:.2f}초, /view {fake.counters['view_requests']}회, "
+            f"웹소켓 이미지 {fake.counters['websocket_images']}개, 저장 파일 "
+            f"{sum(1 for key in fake.files if key[0] == 'output')}개, prompt {fake.counters['prompts']}회"
+        )
+    finally:
+        fake.stop()
+
+
+def main():
+    get_comfyui_janitor().history_ttl = 0  # 실행 직후 정리 대상이 되도록
+    cases = [
+        ("파일 출력", FakeComfyUI(), False, True, 1),
+        ("웹소켓 출력", FakeComfyUI(), True, False, 1),
+        ("노드 미설치 → 파일 출력", FakeComfyUI(websocket_node=False), True, True, 1),
+        ("이미지 유실 → 파일 출력 재실행", FakeComfyUI(drop_websocket_images=True), True, True, 2),
+    ]
+    failed = 0
+    for name, fake, websocket_output, expect_view, expect_prompts in cases:
+        try:
+            run_case(name, fake, websocket_output, expect_view, expect_prompts)
+        except Exception as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print("=" * 60)
+    print("✅ 모든 점검 통과" if not failed else f"❌ {failed}개 실패")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
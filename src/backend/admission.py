@@ -0,0 +1,328 @@
+# admission.py
+"""
+요청 수락 제어 (Admission Control) + 백프레셔
+- 이미지 작업: 현재 처리 중/대기 중인 작업의 남은 예상 시간 + 새 작업 예상 시간으로 완료 시각 추정
+  - 워크플로우별(t2i / i2i / edit:{모드} / drafts / refine) 소요 시간은 완료된 작업의 EWMA
+    (서비스 시간 = 완료 시각 - max(수락 시각, 직전 완료 시각) - 큐 대기 제외)
+  - 추정 완료 시간이 SLO(slo_seconds)를 넘으면 AdmissionRejectedError → 429 + Retry-After
+  - 처리 중인 작업이 없으면 항상 수락
+  - 실제로 ComfyUI를 실행하는 요청만 수락 대상 (합쳐진 요청 / Idempotency-Key 재생은 기존 작업을 기다리기만 함)
+  - 수락 판단은 comfyui 작업 풀에 넣기 전에 (executors "admission" 풀 - 작업 풀이 밀려 있어도 대기 없이 429)
+  - 처리 중인 작업 / 예상 시간은 공유 상태(shared_state)에 두어 워커가 여러 개여도 전체 기준으로 판단
+- 요청 본문 크기: 처리 중인 요청 본문 합계가 max_inflight_payload_mb를 넘으면 429 (PayloadLimitMiddleware)
+  - Content-Length가 있는 요청은 본문을 읽기 전에 판단
+  - chunked 요청은 받은 만큼 합계에 더함 (거절하지 않고 이후 요청에 반영)
+
+설정: configs/image_editing_config.yaml: comfyui.admission
+"""
+import json
+import math
+import time
+import uuid
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from . import metrics
+from .exceptions import AdmissionRejectedError
+from .shared_state import INSTANCE_ID, get_shared_state
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_TICKETS = "admission_tickets"      # 공유 상태: 티켓 ID → {workflow, expected, admitted_at, owner}
+ADMISSION_DURATIONS = "admission_durations"  # 공유 상태: 워크플로우 → 예상 소요 시간 EWMA (LAST_COMPLETION 키 = 직전 완료 시각)
+LAST_COMPLETION = "*"
+
+
+def load_admission_config() -> Dict[str, Any]:
+    """configs/image_editing_config.yaml: comfyui.admission"""
+    from .comfyui_workflows import load_image_editing_config
+
+    return load_image_editing_config().get("comfyui", {}).get("admission", {})
+
+
+class AdmissionTicket:
+    """수락된 작업 1개 (완료 시 release)"""
+
+    def __init__(self, controller: "AdmissionController", workflow: str, expected: float):
+        self.controller = controller
+        self.ticket_id = uuid.uuid4().hex
+        self.workflow = workflow
+        self.expected = expected
+        self.admitted_at = time.time()
+        self.released = False
+
+    def release(self, record: bool = True):
+        """
+        작업 종료 (여러 번 호출해도 한 번만 처리)
+
+        Args:
+            record: 소요 시간을 워크플로우 예상 시간에 반영할지 (실패한 요청은 False)
+        """
+        self.controller.release(self, record)
+
+
+class AdmissionController:
+    """예상 완료 시간 기반 이미지 작업 수락/거절 (스레드 / 워커 안전)"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.enabled = config.get("enabled", True)
+        self.default_slo = config.get("default_slo_seconds", 300)
+        self.slo_seconds: Dict[str, float] = dict(config.get("slo_seconds", {}))
+        self.parallelism = max(1, config.get("parallelism", 1))  # ComfyUI 동시 실행 수
+        self.default_duration = config.get("default_duration_seconds", 30)
+        self.alpha = config.get("ewma_alpha", 0.2)
+        self.min_retry_after = config.get("min_retry_after", 1)
+        self.max_retry_after = config.get("max_retry_after", 600)
+        self.max_ticket_age = config.get("max_ticket_age", 3600)  # 해제되지 않은 작업 정리 (초)
+        self._initial_durations: Dict[str, float] = {
+            k: float(v) for k, v in config.get("initial_durations", {}).items()
+        }
+
+    def slo(self, workflow: str) -> float:
+        """워크플로우 SLO (edit:{모드}는 edit 값으로 대체)"""
+        base = workflow.split(":", 1)[0]
+        return self.slo_seconds.get(workflow, self.slo_seconds.get(base, self.default_slo))
+
+    def _durations(self) -> Dict[str, float]:
+        """워크플로우별 예상 소요 시간 (완료 기록 EWMA → 없으면 initial_durations)"""
+        durations = dict(self._initial_durations)
+        durations.update(get_shared_state().items(ADMISSION_DURATIONS))
+        durations.pop(LAST_COMPLETION, None)
+        return durations
+
+    def expected_duration(self, workflow: str) -> float:
+        base = workflow.split(":", 1)[0]
+        durations = self._durations()
+        return durations.get(workflow, durations.get(base, self.default_duration))
+
+    def _tickets_locked(self, now: float) -> Dict[str, Dict[str, Any]]:
+        """처리 중인 작업 (죽은 워커의 작업 / 해제되지 않고 오래된 작업은 정리)"""
+        shared = get_shared_state()
+        tickets = shared.items(ADMISSION_TICKETS)
+        live = shared.live_instances()
+        for ticket_id, t in list(tickets.items()):
+            if t.get("owner") in live and now - t["admitted_at"] <= self.max_ticket_age:
+                continue
+            if t.get("owner") in live:
+                logger.warning(f"⚠️ 해제되지 않은 작업 정리: {t['workflow']}")
+            shared.delete(ADMISSION_TICKETS, ticket_id)
+            del tickets[ticket_id]
+        return tickets
+
+    def _estimate_locked(self, workflow: str, now: float, tickets: Dict[str, Dict[str, Any]]) -> float:
+        # 처리 중인 작업은 남은 예상 시간 (예상보다 오래 걸리는 작업도 최소 10%는 남았다고 가정)
+        ahead = sum(
+            max(t["expected"] - (now - t["admitted_at"]), t["expected"] * 0.1)
+            for t in tickets.values()
+        )
+        return ahead / self.parallelism + self.expected_duration(workflow)
+
+    def estimate(self, workflow: str) -> float:
+        """지금 수락하면 완료까지 걸릴 예상 시간 (초)"""
+        now = time.time()
+        with get_shared_state().lock(ADMISSION_TICKETS):
+            return self._estimate_locked(workflow, now, self._tickets_locked(now))
+
+    def admit(self, workflow: str) -> AdmissionTicket:
+        """
+        작업 수락
+
+        Raises:
+            AdmissionRejectedError: 예상 완료 시간이 SLO 초과 (retry_after: 재시도까지 권장 대기 초)
+        """
+        now = time.time()
+        shared = get_shared_state()
+        with shared.lock(ADMISSION_TICKETS):
+            tickets = self._tickets_locked(now)
+            estimate = self._estimate_locked(workflow, now, tickets)
+            slo = self.slo(workflow)
+            if self.enabled and tickets and estimate > slo:
+                retry_after = int(min(self.max_retry_after, max(self.min_retry_after, math.ceil(estimate - slo))))
+                in_flight = len(tickets)
+            else:
+                ticket = AdmissionTicket(self, workflow, self.expected_duration(workflow))
+                shared.set(ADMISSION_TICKETS, ticket.ticket_id, {
+                    "workflow": workflow,
+                    "expected": ticket.expected,
+                    "admitted_at": ticket.admitted_at,
+                    "owner": INSTANCE_ID
+                }, ttl=self.max_ticket_age * 2)
+                metrics.set_gauge("admission_in_flight", len(tickets) + 1)
+                return ticket
+
+        metrics.increment("admission_rejected_total", workflow=workflow.split(":", 1)[0])
+        logger.warning(
+            f"🚦 요청 거절: {workflow} 예상 완료 {estimate:.0f}초 > SLO {slo:.0f}초 "
+            f"(처리 중 {in_flight}건, {retry_after}초 후 재시도 권장)"
+        )
+        raise AdmissionRejectedError(
+            f"서버가 혼잡합니다. 예상 완료 시간 {estimate:.0f}초가 목표 {slo:.0f}초를 넘습니다.",
+            retry_after=retry_after,
+            estimate=estimate
+        )
+
+    def release(self, ticket: AdmissionTicket, record: bool = True):
+        now = time.time()
+        shared = get_shared_state()
+        with shared.lock(ADMISSION_TICKETS):
+            if ticket.released:
+                return
+            ticket.released = True
+            shared.delete(ADMISSION_TICKETS, ticket.ticket_id)
+            metrics.set_gauge("admission_in_flight", len(shared.items(ADMISSION_TICKETS)))
+            if record:
+                # 앞 작업(다른 워커 포함)이 끝나기를 기다린 시간은 빼고 실제 처리 시간만 반영
+                last_completion = shared.get(ADMISSION_DURATIONS, LAST_COMPLETION, 0.0)
+                service_time = now - max(ticket.admitted_at, last_completion)
+                previous = shared.get(ADMISSION_DURATIONS, ticket.workflow)
+                shared.set(ADMISSION_DURATIONS, ticket.workflow, (
+                    service_time if previous is None
+                    else (1 - self.alpha) * previous + self.alpha * service_time
+                ))
+            shared.set(ADMISSION_DURATIONS, LAST_COMPLETION, now)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """처리 중 작업 수 (모든 워커) + 워크플로우별 예상 소요 시간 (/status)"""
+        with get_shared_state().lock(ADMISSION_TICKETS):
+            in_flight = len(self._tickets_locked(time.time()))
+        return {
+            "in_flight": in_flight,
+            "expected_durations": {k: round(v, 1) for k, v in sorted(self._durations().items())}
+        }
+
+
+# ===========================
+# 요청 본문 크기 제한
+# ===========================
+class PayloadBudget:
+    """처리 중인 요청 본문 바이트 합계 제한 (스레드 안전)"""
+
+    def __init__(self, max_bytes: int, retry_after: int = 2):
+        self.max_bytes = max_bytes
+        self.retry_after = retry_after
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self, nbytes: int) -> bool:
+        """합계가 한도 이내면 예약 (한도보다 큰 단일 요청도 처리 중인 요청이 없으면 허용)"""
+        with self._lock:
+            if self.max_bytes > 0 and self._in_flight > 0 and self._in_flight + nbytes > self.max_bytes:
+                return False
+            self._in_flight += nbytes
+            in_flight = self._in_flight
+        metrics.set_gauge("inflight_payload_bytes", in_flight)
+        return True
+
+    def acquire(self, nbytes: int):
+        """거절 없이 예약 (chunked 요청)"""
+        with self._lock:
+            self._in_flight += nbytes
+            in_flight = self._in_flight
+        metrics.set_gauge("inflight_payload_bytes", in_flight)
+
+    def release(self, nbytes: int):
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - nbytes)
+            in_flight = self._in_flight
+        metrics.set_gauge("inflight_payload_bytes", in_flight)
+
+    @property
+    def in_flight(self) -> int:
+        with self._lock:
+            return self._in_flight
+
+
+class PayloadLimitMiddleware:
+    """
+    ASGI 미들웨어: 처리 중인 요청 본문 합계가 한도를 넘으면 본문을 읽기 전에 429 + Retry-After
+
+    예약은 응답이 끝날 때 해제 (디코딩된 입력 이미지가 작업 동안 메모리에 남아 있으므로)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        budget = get_payload_budget()
+        declared = None
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    pass
+                break
+
+        reserved = 0
+        if declared:
+            if not budget.try_acquire(declared):
+                metrics.increment("admission_rejected_total", workflow="payload")
+                await self._reject(send, budget)
+                return
+            reserved = declared
+
+        async def counting_receive():
+            nonlocal reserved
+            message = await receive()
+            if declared is None and message["type"] == "http.request":
+                nbytes = len(message.get("body", b""))
+                budget.acquire(nbytes)
+                reserved += nbytes
+            return message
+
+        try:
+            await self.app(scope, counting_receive, send)
+        finally:
+            budget.release(reserved)
+
+    @staticmethod
+    async def _reject(send, budget: PayloadBudget):
+        retry_after = str(budget.retry_after)
+        body = json.dumps(
+            {"detail": f"처리 중인 요청 본문이 한도({budget.max_bytes // (1024 * 1024)}MB)를 넘었습니다. 잠시 후 다시 시도하세요."},
+            ensure_ascii=False
+        ).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"retry-after", retry_after.encode("ascii"))
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# 싱글톤 인스턴스
+_admission_controller: Optional[AdmissionController] = None
+_payload_budget: Optional[PayloadBudget] = None
+_admission_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """AdmissionController 싱글톤 인스턴스"""
+    global _admission_controller
+    if _admission_controller is None:
+        with _admission_lock:
+            if _admission_controller is None:
+                _admission_controller = AdmissionController(load_admission_config())
+    return _admission_controller
+
+
+def get_payload_budget() -> PayloadBudget:
+    """PayloadBudget 싱글톤 인스턴스"""
+    global _payload_budget
+    if _payload_budget is None:
+        with _admission_lock:
+            if _payload_budget is None:
+                config = load_admission_config()
+                max_mb = config.get("max_inflight_payload_mb", 512) if config.get("enabled", True) else 0
+                _payload_budget = PayloadBudget(int(max_mb * 1024 * 1024), config.get("payload_retry_after", 2))
+    return _payload_budget
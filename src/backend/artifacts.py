@@ -0,0 +1,283 @@
+# artifacts.py
+"""
+결과 이미지 아티팩트 저장소 (내용 주소 기반)
+- 결과 이미지를 sha256 해시를 ID로 디스크에 저장하고, 응답에는 바이트 대신 아티팩트 ID / 다운로드 URL만 반환
+  - 같은 결과(같은 seed 재요청, 합쳐진 요청, 재생된 요청)는 자동으로 한 파일만 저장 (중복 제거)
+  - 경로: {path}/{id[0:2]}/{id[2:4]}/{id} (한 디렉토리에 파일이 몰리지 않도록 해시 접두어로 분산)
+- 크기 제한 LRU: 합계가 max_mb를 넘으면 가장 오래 사용하지 않은 아티팩트부터 삭제
+  - 사용 시각은 파일 mtime으로 기록 → 재시작 시 디렉토리를 스캔해 LRU 순서 복원
+- 다운로드(GET /api/artifacts/{id}): 내용이 바뀌지 않으므로 ETag = ID, Cache-Control immutable, Range 지원
+
+설정: configs/image_editing_config.yaml: image_processing.artifacts
+"""
+import os
+import re
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from . import metrics
+from .image_response import detect_media_type
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DEFAULT_ARTIFACT_PATH = os.path.join(PROJECT_ROOT, "data", "artifacts")
+ARTIFACT_URL_PREFIX = "/api/artifacts/"
+
+_ARTIFACT_ID = re.compile(r"^[0-9a-f]{64}$")
+_MAGIC_BYTES = 16  # detect_media_type에 필요한 앞부분 길이
+
+
+def load_artifacts_config() -> Dict[str, Any]:
+    """configs/image_editing_config.yaml: image_processing.artifacts"""
+    from .comfyui_workflows import load_image_editing_config
+
+    return load_image_editing_config().get("image_processing", {}).get("artifacts", {})
+
+
+def is_artifact_id(value: str) -> bool:
+    """sha256 hex (소문자 64자) 여부 - 경로 조작 방지용 검증"""
+    return bool(_ARTIFACT_ID.match(value or ""))
+
+
+@dataclass(frozen=True)
+class Artifact:
+    """저장된 아티팩트 (내용이 바뀌지 않으므로 ID가 곧 ETag)"""
+    artifact_id: str
+    size: int
+    media_type: str
+    path: str
+
+    @property
+    def url(self) -> str:
+        return ARTIFACT_URL_PREFIX + self.artifact_id
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.artifact_id}"'
+
+    def read(self, start: int = 0, end: Optional[int] = None) -> bytes:
+        """start ~ end(포함) 바이트 (end가 None이면 끝까지)"""
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            return f.read(-1 if end is None else end - start + 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"artifact_id": self.artifact_id, "url": self.url, "media_type": self.media_type, "size": self.size}
+
+
+def parse_byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Range 헤더 → (start, end) (end 포함)
+
+    단일 bytes 범위만 지원 - 헤더가 없거나 해석할 수 없으면(여러 범위 포함) None → 전체 응답
+
+    Raises:
+        ValueError: 만족할 수 없는 범위 (416)
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = (part.strip() for part in spec.strip().partition("-"))
+    if not sep or not (first.isdigit() or (not first and last.isdigit())) or (last and not last.isdigit()):
+        return None  # 문법 오류는 무시 (RFC 9110)
+    if not first:  # bytes=-N: 마지막 N바이트
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError(f"만족할 수 없는 범위입니다: {header}")
+        return max(0, size - length), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    end = int(last) if last else size - 1
+    if start >= size:
+        raise ValueError(f"만족할 수 없는 범위입니다: {header}")
+    return start, min(end, size - 1)
+
+
+class ArtifactStore:
+    """해시 분산 디렉토리 + 크기 제한 LRU (스레드 안전)"""
+
+    def __init__(self, root: str, max_bytes: int = 0):
+        """
+        Args:
+            root: 저장 디렉토리 (없으면 생성)
+            max_bytes: 합계 크기 제한 (0 = 제한 없음)
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, Tuple[int, str]]" = OrderedDict()  # id → (size, media_type), 오래 안 쓴 순
+        self._total = 0
+        self._stats = {"stored": 0, "deduplicated": 0, "evicted": 0}
+        os.makedirs(root, exist_ok=True)
+        self._scan()
+
+    def _path(self, artifact_id: str) -> str:
+        return os.path.join(self.root, artifact_id[:2], artifact_id[2:4], artifact_id)
+
+    def _scan(self):
+        """디스크의 아티팩트로 인덱스 복원 (mtime 오래된 순 = LRU 순서), 남은 임시 파일 삭제"""
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                full_path = os.path.join(dirpath, name)
+                if not is_artifact_id(name):
+                    if name.startswith(".tmp-"):
+                        try:
+                            os.remove(full_path)
+                        except OSError:
+                            pass
+                    continue
+                try:
+                    stat = os.stat(full_path)
+                    with open(full_path, "rb") as f:
+                        head = f.read(_MAGIC_BYTES)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, name, stat.st_size, detect_media_type(head)))
+        entries.sort()
+        for _, artifact_id, size, media_type in entries:
+            self._index[artifact_id] = (size, media_type)
+            self._total += size
+        if entries:
+            logger.info(f"📦 아티팩트 {len(entries)}개 복원 ({self._total / (1024 * 1024):.1f}MB): {self.root}")
+        self._evict()
+
+    def _touch(self, artifact_id: str):
+        """LRU 갱신 (mtime도 갱신해 재시작 후에도 순서 유지)"""
+        self._index.move_to_end(artifact_id)
+        try:
+            os.utime(self._path(artifact_id))
+        except OSError:
+            pass
+
+    def _evict(self, keep: Optional[str] = None):
+        """합계가 max_bytes 이하가 될 때까지 오래 안 쓴 아티팩트 삭제 (방금 저장한 keep은 제외)"""
+        if not self.max_bytes:
+            return
+        for artifact_id in list(self._index):
+            if self._total <= self.max_bytes:
+                break
+            if artifact_id == keep:
+                continue
+            size, _ = self._index.pop(artifact_id)
+            self._total -= size
+            self._stats["evicted"] += 1
+            metrics.increment("artifact_evictions_total")
+            try:
+                os.remove(self._path(artifact_id))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"⚠️ 아티팩트 삭제 실패: {artifact_id} ({e})")
+
+    def _artifact(self, artifact_id: str) -> Artifact:
+        size, media_type = self._index[artifact_id]
+        return Artifact(artifact_id, size, media_type, self._path(artifact_id))
+
+    def put(self, data: bytes) -> Artifact:
+        """바이트 저장 (같은 내용이 이미 있으면 쓰지 않고 기존 아티팩트 반환)"""
+        artifact_id = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if artifact_id in self._index and os.path.exists(self._path(artifact_id)):
+                self._touch(artifact_id)
+                self._stats["deduplicated"] += 1
+                metrics.increment("artifact_dedup_hits_total")
+                return self._artifact(artifact_id)
+
+        # 파일 쓰기는 잠금 밖에서 (같은 내용을 동시에 써도 os.replace로 한쪽만 남음)
+        path = self._path(artifact_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = os.path.join(os.path.dirname(path), f".tmp-{artifact_id}-{threading.get_ident()}")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if artifact_id not in self._index:
+                self._index[artifact_id] = (len(data), detect_media_type(data[:_MAGIC_BYTES]))
+                self._total += len(data)
+                self._stats["stored"] += 1
+                metrics.increment("artifact_stored_bytes_total", amount=len(data))
+            self._index.move_to_end(artifact_id)
+            self._evict(keep=artifact_id)
+            return self._artifact(artifact_id)
+
+    def get(self, artifact_id: str) -> Optional[Artifact]:
+        """아티팩트 조회 (없거나 이미 삭제되었으면 None)"""
+        if not is_artifact_id(artifact_id):
+            return None
+        with self._lock:
+            if artifact_id not in self._index:
+                # 다른 워커(같은 디렉토리를 쓰는 프로세스)가 저장한 아티팩트면 인덱스에 추가
+                try:
+                    size = os.path.getsize(self._path(artifact_id))
+                    with open(self._path(artifact_id), "rb") as f:
+                        head = f.read(_MAGIC_BYTES)
+                except OSError:
+                    return None
+                self._index[artifact_id] = (size, detect_media_type(head))
+                self._total += size
+            if not os.path.exists(self._path(artifact_id)):  # 외부에서 삭제됨
+                size, _ = self._index.pop(artifact_id)
+                self._total -= size
+                return None
+            self._touch(artifact_id)
+            return self._artifact(artifact_id)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """저장 개수 / 바이트 / 누적 저장·중복 제거·삭제 수 (/status)"""
+        with self._lock:
+            return {
+                "path": self.root,
+                "count": len(self._index),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                **self._stats
+            }
+
+
+# 싱글톤 인스턴스 (설정은 프로세스당 한 번만 확인)
+_artifact_store: Optional[ArtifactStore] = None
+_artifact_settings: Optional[Dict[str, Any]] = None
+_artifact_lock = threading.Lock()
+
+
+def artifact_settings() -> Dict[str, Any]:
+    """{"enabled", "path", "max_bytes", "cache_max_age"} (image_processing.artifacts)"""
+    global _artifact_settings
+    if _artifact_settings is None:
+        with _artifact_lock:
+            if _artifact_settings is None:
+                config = load_artifacts_config()
+                path = config.get("path") or DEFAULT_ARTIFACT_PATH
+                _artifact_settings = {
+                    "enabled": config.get("enabled", True),
+                    "path": path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path),
+                    "max_bytes": int(config.get("max_mb", 0) * 1024 * 1024),
+                    "cache_max_age": int(config.get("cache_max_age", 31536000))
+                }
+    return _artifact_settings
+
+
+def get_artifact_store() -> ArtifactStore:
+    """ArtifactStore 싱글톤 인스턴스 (첫 호출 시 디스크 스캔으로 LRU 복원)"""
+    global _artifact_store
+    if _artifact_store is None:
+        settings = artifact_settings()
+        with _artifact_lock:
+            if _artifact_store is None:
+                _artifact_store = ArtifactStore(settings["path"], settings["max_bytes"])
+    return _artifact_store
+
+
+def artifact_cache_control() -> str:
+    """다운로드 응답 Cache-Control (내용 주소이므로 immutable)"""
+    return f"public, max-age={artifact_settings()['cache_max_age']}, immutable"
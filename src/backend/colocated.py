@@ -0,0 +1,200 @@
+# colocated.py
+"""
+ComfyUI와 같은 서버에서 실행할 때의 빠른 경로 (co-located)
+- Unix 도메인 소켓(UDS): ComfyUI HTTP/WebSocket을 TCP loopback 대신 UDS로 호출
+  - ComfyUI 자체는 TCP만 열므로 UDS를 노출하는 프록시가 필요 (예: socat UNIX-LISTEN → TCP, nginx)
+  - requests Session에 UnixSocketAdapter를 마운트 (URL의 호스트는 Host 헤더로만 사용)
+- 공유 파일시스템 출력 읽기: /view 다운로드 대신 ComfyUI output/temp 폴더에서 파일을 직접 읽음
+  - mmap_min_bytes 이상은 mmap으로 읽기 (페이지 캐시에서 한 번 복사, HTTP 파싱/소켓 복사 없음)
+  - 경로가 폴더 밖을 가리키거나 파일이 없으면 None → 호출자가 HTTP로 대체
+
+설정: configs/image_editing_config.yaml: comfyui.colocated
+"""
+import os
+import mmap
+import socket
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+FOLDER_TYPES = ("output", "temp", "input")
+
+
+def load_colocated_config() -> Dict[str, Any]:
+    """
+    configs/image_editing_config.yaml: comfyui.colocated
+
+    comfyui_root가 없으면 comfyui.gc.comfyui_root 사용 (같은 ComfyUI 설치 경로)
+    """
+    from .comfyui_workflows import load_image_editing_config
+
+    comfyui_config = load_image_editing_config().get("comfyui", {})
+    config = dict(comfyui_config.get("colocated", {}))
+    if not config.get("comfyui_root"):
+        config["comfyui_root"] = comfyui_config.get("gc", {}).get("comfyui_root")
+    return config
+
+
+# ===========================
+# Unix 도메인 소켓 transport
+# ===========================
+class _UnixHTTPConnection(HTTPConnection):
+    def __init__(self, *args, socket_path: str = "", **kwargs):
+        self.socket_path = socket_path
+        super().__init__(*args, **kwargs)
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout if isinstance(self.timeout, (int, float)) else None)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class _UnixHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _UnixHTTPConnection
+
+    def __init__(self, host: str, socket_path: str, **kwargs):
+        super().__init__(host, **kwargs)
+        self.conn_kw["socket_path"] = socket_path
+
+
+class UnixSocketAdapter(HTTPAdapter):
+    """모든 http:// 요청을 socket_path의 Unix 도메인 소켓으로 보내는 requests 어댑터 (연결 재사용)"""
+
+    def __init__(self, socket_path: str, pool_maxsize: int = 16):
+        self.socket_path = socket_path
+        self._pool_maxsize = pool_maxsize
+        self._pools: Dict[str, _UnixHTTPConnectionPool] = {}
+        self._pools_lock = threading.Lock()
+        super().__init__(pool_connections=1, pool_maxsize=pool_maxsize)
+
+    def _pool(self, url: str) -> _UnixHTTPConnectionPool:
+        from urllib.parse import urlparse
+
+        host = urlparse(url).hostname or "localhost"
+        with self._pools_lock:
+            pool = self._pools.get(host)
+            if pool is None:
+                pool = self._pools[host] = _UnixHTTPConnectionPool(
+                    host, self.socket_path, maxsize=self._pool_maxsize
+                )
+            return pool
+
+    def get_connection(self, url, proxies=None):  # requests < 2.32
+        return self._pool(url)
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):  # requests >= 2.32
+        return self._pool(request.url)
+
+    def close(self):
+        with self._pools_lock:
+            for pool in self._pools.values():
+                pool.close()
+            self._pools.clear()
+        super().close()
+
+
+# ===========================
+# 공유 파일시스템 출력 읽기
+# ===========================
+class SharedOutputReader:
+    """ComfyUI output/temp/input 폴더의 파일을 경로로 직접 읽기"""
+
+    def __init__(self, directories: Dict[str, str], mmap_min_bytes: int = 1024 * 1024):
+        """
+        Args:
+            directories: {폴더 타입(output/temp/input): 경로}
+            mmap_min_bytes: 이 크기 이상인 파일은 mmap으로 읽기 (0이면 항상 read)
+        """
+        self.directories = {kind: os.path.realpath(path) for kind, path in directories.items()}
+        self.mmap_min_bytes = mmap_min_bytes
+
+    def resolve(self, folder_type: str, subfolder: str, filename: str) -> Optional[str]:
+        """/view 파라미터 → 파일 경로 (폴더 밖을 가리키면 None)"""
+        directory = self.directories.get(folder_type)
+        if directory is None:
+            return None
+        path = os.path.realpath(os.path.join(directory, subfolder or "", filename))
+        if os.path.commonpath([directory, path]) != directory:
+            return None
+        return path
+
+    def read(self, folder_type: str, subfolder: str, filename: str) -> Optional[bytes]:
+        """파일 내용 (읽을 수 없으면 None - 호출자가 /view로 대체)"""
+        path = self.resolve(folder_type, subfolder, filename)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size == 0:
+                    return None
+                if self.mmap_min_bytes and size >= self.mmap_min_bytes:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        data = mapped[:]
+                else:
+                    data = f.read()
+        except OSError:
+            return None
+        metrics.increment("comfyui_output_reads_total", source="filesystem")
+        return data
+
+
+# 싱글톤 인스턴스 (설정은 프로세스당 한 번만 확인)
+_output_reader: Optional[SharedOutputReader] = None
+_unix_socket: Optional[str] = None
+_loaded = False
+_colocated_lock = threading.Lock()
+
+
+def _ensure_loaded():
+    global _output_reader, _unix_socket, _loaded
+    if _loaded:
+        return
+    with _colocated_lock:
+        if _loaded:
+            return
+        config = load_colocated_config()
+        if config.get("enabled", True):
+            root = config.get("comfyui_root")
+            directories = {}
+            if config.get("shared_outputs", True):
+                for kind in FOLDER_TYPES:
+                    path = config.get(f"{kind}_dir") or (os.path.join(root, kind) if root else None)
+                    if path and os.path.isdir(path):
+                        directories[kind] = path
+            if directories:
+                _output_reader = SharedOutputReader(directories, config.get("mmap_min_bytes", 1024 * 1024))
+                logger.info(f"📂 ComfyUI 출력 직접 읽기: {', '.join(f'{k}={v}' for k, v in directories.items())}")
+
+            path = config.get("unix_socket")
+            if path and os.path.exists(path):
+                _unix_socket = path
+                logger.info(f"🔌 ComfyUI Unix 도메인 소켓 사용: {path}")
+            elif path:
+                logger.warning(f"⚠️ ComfyUI Unix 소켓이 없어 TCP를 사용합니다: {path}")
+        _loaded = True
+
+
+def get_output_reader() -> Optional[SharedOutputReader]:
+    """
+    SharedOutputReader 싱글톤 인스턴스
+
+    co-located 모드가 꺼져 있거나 ComfyUI 폴더가 없으면 None (HTTP /view 사용)
+    """
+    _ensure_loaded()
+    return _output_reader
+
+
+def get_unix_socket_path() -> Optional[str]:
+    """comfyui.colocated.unix_socket (설정이 없거나 소켓 파일이 없으면 None → TCP)"""
+    _ensure_loaded()
+    return _unix_socket
@@ -4,17 +4,338 @@ ComfyUI API 클라이언트
 백그라운드에서 실행 중인 ComfyUI와 통신
 """
 import os
+import copy
 import json
 import time
+import struct
 import base64
 import logging
+import uuid
+import threading
 import requests
-from typing import Dict, Any, Optional, Tuple
-from io import BytesIO
+from collections import OrderedDict
+from contextlib import contextmanager
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Optional, Tuple, Callable, List
 from PIL import Image
 
+from . import streaming, metrics, tracing, tenancy
+from .exceptions import WorkflowExecutionError, GPUOutOfMemoryError
+from .uploads import ImageSource, MultipartFileStream, open_image_source
+from .node_timing import get_node_timing_store, timing_key
+from .comfyui_gc import get_comfyui_janitor
+from .colocated import UnixSocketAdapter, get_output_reader, get_unix_socket_path
+from .comfyui_workflows import (
+    WEBSOCKET_OUTPUT_NODE,
+    apply_websocket_output,
+    has_websocket_output,
+    is_websocket_output_node,
+    load_websocket_output_config
+)
+
 logger = logging.getLogger(__name__)
 
+# ComfyUI 실행 에러 중 GPU 메모리 부족으로 판단할 문구
+OOM_MARKERS = ("out of memory", "outofmemoryerror", "cuda error: out of memory", "allocation on device")
+
+
+def is_oom_message(text: str) -> bool:
+    """에러 메시지가 GPU 메모리 부족(OOM)인지 판단"""
+    text = (text or "").lower()
+    return any(marker in text for marker in OOM_MARKERS)
+
+
+def execution_error_from_status(status: Dict[str, Any]) -> WorkflowExecutionError:
+    """히스토리 status(status_str == "error")의 execution_error 메시지 → 예외"""
+    for message in status.get("messages", []):
+        if len(message) == 2 and message[0] == "execution_interrupted":
+            # ComfyUI에서 작업이 취소됨 (/interrupt, UI의 Cancel)
+            metrics.increment("cancellations_total", reason="interrupted", **metrics.current_labels())
+            data = message[1]
+            return WorkflowExecutionError(
+                f"ComfyUI 작업이 중단되었습니다: {data.get('node_type', '?')}(노드 {data.get('node_id', '?')})"
+            )
+        if len(message) == 2 and message[0] == "execution_error":
+            data = message[1]
+            detail = (
+                f"{data.get('node_type', '?')}(노드 {data.get('node_id', '?')}): "
+                f"{data.get('exception_type', '')} {data.get('exception_message', '')}".strip()
+            )
+            if is_oom_message(f"{data.get('exception_type', '')} {data.get('exception_message', '')}"):
+                return GPUOutOfMemoryError(f"ComfyUI GPU 메모리 부족: {detail}")
+            return WorkflowExecutionError(f"ComfyUI 작업 실패: {detail}")
+    return WorkflowExecutionError("ComfyUI 작업 실패: 알 수 없는 오류")
+
+# base_url별 공유 세션 (요청마다 새 TCP 연결을 맺지 않도록 커넥션 풀 재사용)
+_shared_sessions: Dict[Tuple[str, Optional[str]], requests.Session] = {}
+_sessions_lock = threading.Lock()
+POOL_MAXSIZE = 16
+
+
+def get_shared_session(base_url: str, unix_socket: Optional[str] = None) -> requests.Session:
+    """
+    base_url별 공유 requests.Session 반환 (커넥션 풀 포함)
+
+    Args:
+        unix_socket: 지정하면 http:// 요청을 이 Unix 도메인 소켓으로 전송 (co-located 모드)
+    """
+    key = (base_url.rstrip("/"), unix_socket)
+    with _sessions_lock:
+        session = _shared_sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            if unix_socket:
+                session.mount("http://", UnixSocketAdapter(unix_socket, pool_maxsize=POOL_MAXSIZE))
+            else:
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+            _shared_sessions[key] = session
+        return session
+
+
+# 현재 스레드의 큐 등록 추적 (멱등성 키 → prompt_id 기록, 재시도 시 기존 작업 재연결)
+_prompt_tracking = threading.local()
+
+
+@contextmanager
+def track_prompts(
+    on_queued: Optional[Callable[[str], None]] = None,
+    resume_prompt_ids: Optional[List[str]] = None
+):
+    """
+    이 컨텍스트 안에서 호출되는 queue_prompt 추적
+
+    중첩 가능 (작업 기록 → 멱등성 키): 바깥 컨텍스트의 on_queued도 함께 호출하고,
+    resume_prompt_ids가 없으면 바깥 컨텍스트의 재연결 후보를 이어서 사용
+
+    Args:
+        on_queued: 큐 등록(또는 재연결)된 prompt_id를 받는 콜백
+        resume_prompt_ids: 새로 등록하는 대신 순서대로 재연결할 기존 prompt_id
+            (ComfyUI에서 아직 실행 중이거나 성공적으로 끝난 작업만 재연결)
+    """
+    previous = getattr(_prompt_tracking, "context", None)
+    callbacks = [callback for callback in (on_queued, previous and previous["on_queued"]) if callback]
+
+    def _on_queued(prompt_id: str):
+        for callback in callbacks:
+            callback(prompt_id)
+
+    _prompt_tracking.context = {
+        "on_queued": _on_queued if callbacks else None,
+        "resume": list(resume_prompt_ids) if resume_prompt_ids else (previous["resume"] if previous else [])
+    }
+    try:
+        yield
+    finally:
+        _prompt_tracking.context = previous
+
+
+# 스트리밍/트레이싱 요청의 /prompt 등록과 /ws 연결에 같은 client_id 사용 (진행 이벤트는 해당 client_id로만 전송됨)
+COMFYUI_CLIENT_ID = uuid.uuid4().hex
+MAX_TRACKED_PROMPTS = 256  # 노드 실행 시간을 보관할 최근 prompt 수
+
+# ComfyUI 바이너리 WebSocket 메시지 종류 (server.BinaryEventTypes, 앞 4바이트 big-endian)
+PREVIEW_IMAGE = 1                  # [이미지 형식(>I)] + 이미지 바이트 (SaveImageWebsocket 출력 포함)
+PREVIEW_IMAGE_WITH_METADATA = 4    # [메타데이터 길이(>I)] + 메타데이터 JSON(prompt_id, node_id) + 이미지 바이트
+
+
+class ComfyUIProgressListener:
+    """
+    ComfyUI WebSocket(/ws) 진행 이벤트 수신 → streaming.emit_to_prompt
+
+    - executing: 노드 실행 시작 (node)
+    - progress: 샘플링 step 진행 (step)
+    - execution_cached: 캐시로 건너뛴 노드 (cached)
+    executing 이벤트 간격으로 노드별 실행 시간도 기록 (노드 통계 / 트레이싱 노드 span / 실행 중 ETA용)
+    웹소켓 출력 노드(SaveImageWebsocket) 실행 중에 받은 바이너리 이미지는 prompt별로 보관 (pop_outputs)
+    노드 시간 수집 또는 스트리밍/트레이싱 요청이 처음 들어올 때 시작하고, 연결이 끊기면 재연결 (데몬 스레드)
+    """
+
+    def __init__(self, base_url: str, unix_socket: Optional[str] = None):
+        self.base_url = base_url.rstrip("/")
+        self.unix_socket = unix_socket  # co-located: /ws도 Unix 도메인 소켓으로 연결
+        self._lock = threading.Lock()
+        self._connected = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._unavailable = False  # websockets 미설치
+        # prompt_id → [[node_id, 시작, 종료(None=실행 중), 캐시 여부], ...]
+        self._node_timings: "OrderedDict[str, List[list]]" = OrderedDict()
+        # prompt_id → {"images": [PNG 바이트, ...], "done": 실행 종료 여부} (웹소켓 출력 노드 결과)
+        self._outputs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._outputs_cond = threading.Condition(self._lock)
+        self._executing: Tuple[Optional[str], Optional[str]] = (None, None)  # 실행 중인 (prompt_id, node_id)
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    def ensure_started(self, wait: float = 2.0) -> bool:
+        """리스너 시작 (첫 진행 이벤트를 놓치지 않도록 연결될 때까지 최대 wait초 대기)"""
+        if self._unavailable:
+            return False
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="comfyui-ws", daemon=True)
+                self._thread.start()
+        return self._connected.wait(timeout=wait)
+
+    def _run(self):
+        try:
+            from websockets.sync.client import connect, unix_connect
+        except ImportError:
+            logger.warning("⚠️ websockets 미설치 - step 단위 진행 이벤트 / 노드 span 없이 동작합니다")
+            self._unavailable = True
+            return
+
+        ws_url = f"{self.base_url.replace('http', 'ws', 1)}/ws?clientId={COMFYUI_CLIENT_ID}"
+        while True:
+            try:
+                if self.unix_socket:
+                    connection = unix_connect(self.unix_socket, ws_url, open_timeout=5, max_size=None)
+                else:
+                    connection = connect(ws_url, open_timeout=5, max_size=None)
+                with connection as ws:
+                    self._connected.set()
+                    logger.info(f"🔌 ComfyUI WebSocket 연결: {ws_url}")
+                    for message in ws:
+                        if isinstance(message, str):
+                            self._dispatch(json.loads(message))
+                        else:  # 바이너리는 미리보기 / 웹소켓 출력 이미지
+                            self._dispatch_binary(message)
+            except Exception as e:
+                logger.warning(f"⚠️ ComfyUI WebSocket 연결 끊김 - 5초 후 재연결: {e}")
+            self._connected.clear()
+            time.sleep(5)
+
+    def _dispatch(self, message: Dict[str, Any]):
+        kind = message.get("type")
+        data = message.get("data") or {}
+        prompt_id = data.get("prompt_id")
+        if not prompt_id:
+            return
+        if kind in ("executing", "execution_cached"):
+            self._record_node(kind, prompt_id, data)
+        if kind == "executing":
+            self._executing = (prompt_id, data.get("node"))
+            if data.get("node") is None:
+                self._finish_outputs(prompt_id)
+        elif kind in ("execution_success", "execution_error", "execution_interrupted"):
+            self._finish_outputs(prompt_id)
+        if kind == "progress":
+            streaming.emit_to_prompt(
+                prompt_id, "step", node_id=data.get("node"), value=data.get("value"), max=data.get("max")
+            )
+        elif kind == "executing" and data.get("node") is not None:
+            streaming.emit_to_prompt(prompt_id, "node", node_id=data["node"])
+        elif kind == "execution_cached" and data.get("nodes"):
+            streaming.emit_to_prompt(prompt_id, "cached", node_ids=data["nodes"])
+
+
+    def _dispatch_binary(self, message: bytes):
+        """웹소켓 출력 노드가 보낸 이미지만 보관 (샘플링 미리보기 등 다른 노드의 이미지는 무시)"""
+        if len(message) < 8:
+            return
+        event = struct.unpack(">I", message[:4])[0]
+        if event == PREVIEW_IMAGE:
+            prompt_id, node_id = self._executing
+            image = message[8:]
+        elif event == PREVIEW_IMAGE_WITH_METADATA:
+            size = struct.unpack(">I", message[4:8])[0]
+            try:
+                metadata = json.loads(message[8:8 + size])
+            except ValueError:
+                return
+            prompt_id, node_id = metadata.get("prompt_id"), metadata.get("node_id")
+            image = message[8 + size:]
+        else:
+            return
+        if not prompt_id or not is_websocket_output_node(node_id):
+            return
+        with self._outputs_cond:
+            self._outputs_entry(prompt_id)["images"].append(bytes(image))
+
+    def _outputs_entry(self, prompt_id: str) -> Dict[str, Any]:
+        entry = self._outputs.get(prompt_id)
+        if entry is None:
+            entry = self._outputs[prompt_id] = {"images": [], "done": False}
+            while len(self._outputs) > MAX_TRACKED_PROMPTS:
+                self._outputs.popitem(last=False)
+        return entry
+
+    def _finish_outputs(self, prompt_id: str):
+        with self._outputs_cond:
+            entry = self._outputs.get(prompt_id)
+            if entry is not None:
+                entry["done"] = True
+                self._outputs_cond.notify_all()
+
+    def expect_outputs(self, prompt_id: str):
+        """웹소켓 출력을 받을 prompt 등록 (큐 등록 직후 호출)"""
+        with self._outputs_cond:
+            self._outputs_entry(prompt_id)
+
+    def pop_outputs(self, prompt_id: str, timeout: float = 5.0) -> List[bytes]:
+        """
+        prompt의 웹소켓 출력 이미지 (조회 후 삭제)
+
+        히스토리 완료를 확인한 뒤 호출 - 실행 종료 이벤트를 받을 때까지 최대 timeout초 대기
+        (히스토리 폴링이 WebSocket 메시지보다 먼저 완료를 볼 수 있음)
+        """
+        deadline = time.time() + timeout
+        with self._outputs_cond:
+            while prompt_id in self._outputs and not self._outputs[prompt_id]["done"]:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._outputs_cond.wait(remaining)
+            entry = self._outputs.pop(prompt_id, None)
+        return entry["images"] if entry else []
+
+    def _record_node(self, kind: str, prompt_id: str, data: Dict[str, Any]):
+        now = time.time()
+        with self._lock:
+            nodes = self._node_timings.setdefault(prompt_id, [])
+            self._node_timings.move_to_end(prompt_id)
+            while len(self._node_timings) > MAX_TRACKED_PROMPTS:
+                self._node_timings.popitem(last=False)
+
+            if kind == "execution_cached":
+                nodes.extend([node_id, now, now, True] for node_id in data.get("nodes") or [])
+                return
+            # executing: 이전 노드 종료 + 다음 노드 시작 (node가 None이면 prompt 실행 종료)
+            if nodes and nodes[-1][2] is None:
+                nodes[-1][2] = now
+            if data.get("node") is not None:
+                nodes.append([data["node"], now, None, False])
+
+    def pop_node_timings(self, prompt_id: str) -> List[list]:
+        """prompt의 노드별 [node_id, 시작, 종료, 캐시 여부] (조회 후 삭제)"""
+        with self._lock:
+            return self._node_timings.pop(prompt_id, [])
+
+    def peek_node_timings(self, prompt_id: str) -> List[list]:
+        """실행 중인 prompt의 노드별 [node_id, 시작, 종료, 캐시 여부] 복사본 (ETA 계산용)"""
+        with self._lock:
+            return [list(node) for node in self._node_timings.get(prompt_id, [])]
+
+
+_progress_listeners: Dict[str, ComfyUIProgressListener] = {}
+
+
+def get_progress_listener(base_url: str) -> ComfyUIProgressListener:
+    """base_url별 ComfyUIProgressListener"""
+    key = base_url.rstrip("/")
+    with _sessions_lock:
+        listener = _progress_listeners.get(key)
+        if listener is None:
+            listener = _progress_listeners[key] = ComfyUIProgressListener(key, get_unix_socket_path())
+        return listener
+
+
+# base_url별 웹소켓 출력 노드 설치 여부 (/object_info 확인 결과 캐시)
+_websocket_output_nodes: Dict[Tuple[str, str], bool] = {}
+
 
 class ComfyUIClient:
     """ComfyUI API 클라이언트"""
@@ -27,8 +348,33 @@ class ComfyUIClient:
         """
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
-        self.session = requests.Session()
+        self.session = get_shared_session(self.base_url, get_unix_socket_path())
+        self.output_reader = get_output_reader()  # co-located: output 폴더에서 직접 읽기 (None이면 /view)
+        self._queued_at: Dict[str, float] = {}  # prompt_id → 큐 등록 시각 (큐 대기 시간 측정용)
+        self._node_types: Dict[str, Dict[str, str]] = {}  # prompt_id → {node_id: class_type} (노드 통계 / span 이름용)
+        websocket_config = load_websocket_output_config()
+        self.websocket_output = websocket_config.get("enabled", False)
+        self.websocket_previews = websocket_config.get("previews", True)
+        self.websocket_node_class = websocket_config.get("node_class", WEBSOCKET_OUTPUT_NODE)
+        self.websocket_wait_timeout = websocket_config.get("wait_timeout", 5)
+
+    def warm_connections(self, count: int = 2) -> int:
+        """
+        커넥션 풀 미리 열기 (첫 요청의 TCP 연결 비용 제거)
+
+        Args:
+            count: 미리 열어둘 연결 수
 
+        Returns:
+            성공한 연결 수
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=count) as pool:
+            results = list(pool.map(lambda _: self.check_connection(), range(count)))
+        return sum(1 for ok in results if ok)
+
+    @tracing.traced("comfyui.check_connection")
     def check_connection(self) -> bool:
         """ComfyUI 서버 연결 확인"""
         try:
@@ -41,27 +387,71 @@ class ComfyUIClient:
             logger.warning(f"⚠️ ComfyUI 연결 실패: {e}")
             return False
 
-    def upload_image(self, image_bytes: bytes, filename: str = "input.png") -> str:
+    def get_system_stats(self) -> Dict[str, Any]:
+        """
+        ComfyUI 시스템 상태 조회 (/system_stats)
+
+        Returns:
+            {"system": {...}, "devices": [{"vram_total", "vram_free", "torch_vram_total", ...}]}
+            실패 시 빈 dict
+        """
+        try:
+            response = self.session.get(
+                f"{self.base_url}/system_stats",
+                timeout=5
+            )
+            if response.status_code == 200:
+                return response.json()
+            return {}
+        except Exception as e:
+            logger.warning(f"⚠️ 시스템 상태 조회 오류: {e}")
+            return {}
+
+    def get_recent_history(self, max_items: int = 20) -> Dict[str, Any]:
+        """
+        최근 실행 히스토리 조회 (/history?max_items=N)
+
+        Args:
+            max_items: 조회할 최대 항목 수
+
+        Returns:
+            {prompt_id: history} 딕셔너리 (실패 시 빈 dict)
+        """
+        try:
+            response = self.session.get(
+                f"{self.base_url}/history",
+                params={"max_items": max_items},
+                timeout=10
+            )
+            if response.status_code == 200:
+                return response.json()
+            return {}
+        except Exception as e:
+            logger.warning(f"⚠️ 히스토리 목록 조회 오류: {e}")
+            return {}
+
+    @tracing.traced("comfyui.upload_image")
+    @metrics.timed("upload")
+    def upload_image(self, image: ImageSource, filename: str = "input.png") -> str:
         """
         ComfyUI에 이미지 업로드
 
         Args:
-            image_bytes: 이미지 바이트 데이터
+            image: 이미지 바이트, 파일 객체(업로드 임시 파일 등) 또는 InputImage
+                - 파일 내용은 블록 단위로 읽어 그대로 전송 (multipart 본문을 메모리에 만들지 않음)
             filename: 파일명
 
         Returns:
             업로드된 이미지 이름
         """
         try:
-            logger.info(f"📤 이미지 업로드 중... (크기: {len(image_bytes)/1024:.1f}KB)")
-
-            files = {
-                "image": (filename, BytesIO(image_bytes), "image/png")
-            }
+            body = MultipartFileStream("image", filename, open_image_source(image), "image/png")
+            logger.info(f"📤 이미지 업로드 중... (크기: {len(body)/1024:.1f}KB)")
 
             response = self.session.post(
                 f"{self.base_url}/upload/image",
-                files=files,
+                data=body,
+                headers={"Content-Type": body.content_type},
                 timeout=30
             )
 
@@ -77,6 +467,7 @@ class ComfyUIClient:
             logger.error(f"❌ 이미지 업로드 오류: {e}")
             raise
 
+    @tracing.traced("comfyui.queue_prompt")
     def queue_prompt(self, workflow: Dict[str, Any]) -> str:
         """
         워크플로우를 큐에 추가
@@ -87,8 +478,33 @@ class ComfyUIClient:
         Returns:
             prompt_id (작업 ID)
         """
+        context = getattr(_prompt_tracking, "context", None)
+        on_queued = context["on_queued"] if context else None
+
+        # 재시도 요청: 이전 시도에서 등록한 작업이 살아 있으면 중복 등록 대신 재연결
+        if context and context["resume"]:
+            previous_id = context["resume"].pop(0)
+            if self.is_prompt_alive(previous_id):
+                logger.info(f"🔁 기존 작업에 재연결: {previous_id}")
+                metrics.increment("retries_total", reason="reattach", **metrics.current_labels())
+                if on_queued:
+                    on_queued(previous_id)
+                streaming.bind_prompt(previous_id)
+                return previous_id
+
         try:
             payload = {"prompt": workflow}
+            timing_store = get_node_timing_store()
+            track_nodes = timing_store.enabled or (tracing.is_active() and tracing.get_trace_exporter().node_spans)
+            websocket_output = has_websocket_output(workflow)
+            if streaming.is_streaming() or track_nodes or websocket_output:
+                # 스트리밍: step 단위 진행 이벤트, 노드 통계/트레이싱: 노드별 실행 시간,
+                # 웹소켓 출력: 결과 이미지를 받기 위해 WebSocket 리스너의 client_id로 등록
+                # (스트리밍/웹소켓 출력이 아니면 연결을 기다리지 않음)
+                get_progress_listener(self.base_url).ensure_started(
+                    wait=2.0 if streaming.is_streaming() or websocket_output else 0
+                )
+                payload["client_id"] = COMFYUI_CLIENT_ID
 
             response = self.session.post(
                 f"{self.base_url}/prompt",
@@ -99,7 +515,22 @@ class ComfyUIClient:
             if response.status_code == 200:
                 result = response.json()
                 prompt_id = result.get("prompt_id")
+                self._queued_at[prompt_id] = time.time()
+                if track_nodes:
+                    self._node_types[prompt_id] = {
+                        node_id: node.get("class_type", "?") for node_id, node in workflow.items()
+                    }
+                if timing_store.enabled:
+                    timing_store.register_prompt(prompt_id, timing_key(workflow))
+                if websocket_output:
+                    get_progress_listener(self.base_url).expect_outputs(prompt_id)
+                span = tracing.current_span()
+                if span is not None:
+                    span.set_attribute("comfyui.prompt_id", prompt_id)
                 logger.info(f"✅ 워크플로우 큐 등록: {prompt_id}")
+                if on_queued:
+                    on_queued(prompt_id)
+                streaming.bind_prompt(prompt_id)
                 return prompt_id
             else:
                 raise Exception(f"큐 등록 실패: {response.status_code} - {response.text}")
@@ -108,6 +539,19 @@ class ComfyUIClient:
             logger.error(f"❌ 워크플로우 큐 등록 오류: {e}")
             raise
 
+    def is_prompt_alive(self, prompt_id: str) -> bool:
+        """작업이 큐에 있거나(실행/대기) 실패 없이 히스토리에 남아 있는지 확인"""
+        queue_info = self.get_queue_status()
+        for item in queue_info.get("queue_running", []) + queue_info.get("queue_pending", []):
+            if item[1] == prompt_id:
+                return True
+
+        history = self.get_history(prompt_id)
+        if history is None:
+            return False
+        status = history.get("status", {})
+        return "error" not in status and status.get("status_str") != "error"
+
     def get_history(self, prompt_id: str) -> Optional[Dict[str, Any]]:
         """
         작업 히스토리 조회
@@ -134,6 +578,79 @@ class ComfyUIClient:
             logger.warning(f"⚠️ 히스토리 조회 오류: {e}")
             return None
 
+    def delete_history(self, prompt_ids: List[str]) -> bool:
+        """
+        작업 히스토리 삭제 (POST /history {"delete": [...]})
+
+        출력 이미지를 다운로드한 뒤 호출 (ComfyUI 메모리 / /history 응답 크기 증가 방지)
+        삭제 후에는 is_prompt_alive로 재연결할 수 없으므로 결과를 받은 작업에만 사용
+
+        Returns:
+            성공 여부 (실패해도 작업 결과에는 영향 없음)
+        """
+        if not prompt_ids:
+            return True
+        try:
+            response = self.session.post(
+                f"{self.base_url}/history",
+                json={"delete": list(prompt_ids)},
+                timeout=10
+            )
+            if response.status_code == 200:
+                get_comfyui_janitor().record_history_deleted(len(prompt_ids))
+                return True
+            logger.warning(f"⚠️ 히스토리 삭제 실패: {response.status_code}")
+            return False
+        except Exception as e:
+            logger.warning(f"⚠️ 히스토리 삭제 오류: {e}")
+            return False
+
+    def release_history(self, prompt_ids: List[str], immediate: bool = False):
+        """
+        끝난 작업의 히스토리 삭제 (comfyui.gc.delete_history 설정 시)
+
+        기본은 history_ttl 뒤에 삭제 (그동안 같은 Idempotency-Key 재시도 / 재시작 후 회수가 결과를 읽을 수 있음)
+        워밍업처럼 다시 찾지 않는 작업만 immediate=True로 바로 삭제
+        """
+        janitor = get_comfyui_janitor()
+        if not janitor.delete_history:
+            return
+        if immediate:
+            self.delete_history(prompt_ids)
+        else:
+            janitor.schedule_history_deletion(self.base_url, prompt_ids)
+
+    def cancel_prompts(self, prompt_ids: List[str]) -> bool:
+        """
+        큐에서 대기 중인 작업 삭제 (POST /queue {"delete": [...]})
+
+        일괄 등록한 작업 중 하나가 실패했을 때 뒤에 남은 작업이 GPU를 쓰지 않도록 정리
+        (이미 실행을 시작한 작업은 취소되지 않음)
+
+        Returns:
+            성공 여부
+        """
+        if not prompt_ids:
+            return True
+        for prompt_id in prompt_ids:
+            self._forget_prompt(prompt_id)
+        try:
+            response = self.session.post(
+                f"{self.base_url}/queue",
+                json={"delete": list(prompt_ids)},
+                timeout=10
+            )
+            if response.status_code == 200:
+                metrics.increment(
+                    "cancellations_total", amount=len(prompt_ids), reason="batch_failed", **metrics.current_labels()
+                )
+                logger.info(f"🧹 남은 작업 {len(prompt_ids)}개 큐에서 삭제: {prompt_ids}")
+                return True
+            logger.warning(f"⚠️ 큐 작업 삭제 실패: {response.status_code}")
+        except Exception as e:
+            logger.warning(f"⚠️ 큐 작업 삭제 오류: {e}")
+        return False
+
     def get_queue_status(self) -> Dict[str, Any]:
         """현재 큐 상태 및 진행 중인 작업 조회"""
         try:
@@ -147,6 +664,7 @@ class ComfyUIClient:
         except:
             return {}
 
+    @tracing.traced("comfyui.wait_for_completion")
     def wait_for_completion(
         self,
         prompt_id: str,
@@ -165,9 +683,14 @@ class ComfyUIClient:
             완료된 작업 히스토리
         """
         logger.info(f"⏳ 작업 시작 (ID: {prompt_id})")
+        span = tracing.current_span()
+        if span is not None:
+            span.set_attribute("comfyui.prompt_id", prompt_id)
 
         start_time = time.time()
         last_progress = None
+        last_position = None  # 스트리밍: 마지막으로 보낸 큐 대기 순서
+        running_since = None  # 실행 시작을 처음 확인한 시각 (히스토리에 타임스탬프가 없을 때 사용)
         was_in_queue = False  # 큐에 들어갔었는지 추적
         completed_nodes = set()  # 완료된 노드 추적
 
@@ -175,6 +698,8 @@ class ComfyUIClient:
             # 타임아웃 체크
             elapsed = time.time() - start_time
             if elapsed > self.timeout:
+                self._forget_prompt(prompt_id)
+                metrics.increment("cancellations_total", reason="timeout", **metrics.current_labels())
                 raise TimeoutError(f"작업 타임아웃 ({self.timeout}초 초과)")
 
             # 큐 상태 조회 (진행 중인 작업의 progress 정보)
@@ -188,6 +713,7 @@ class ComfyUIClient:
                 if item[1] == prompt_id:
                     in_queue = True
                     was_in_queue = True
+                    running_since = running_since or time.time()
                     break
 
             if not in_queue:
@@ -197,6 +723,21 @@ class ComfyUIClient:
                         was_in_queue = True
                         break
 
+            # 스트리밍: 큐 대기 순서 변경 시 알림 (0 = 실행 중, n = 앞에 n-1개 대기)
+            if in_queue and streaming.is_streaming():
+                position = 0
+                if not any(item[1] == prompt_id for item in queue_running):
+                    pending_ids = [item[1] for item in sorted(queue_pending, key=lambda item: item[0])]
+                    position = pending_ids.index(prompt_id) + 1
+                if position != last_position:
+                    eta = get_node_timing_store().estimate_queue(
+                        queue_running, queue_pending, get_progress_listener(self.base_url).peek_node_timings
+                    ).get(prompt_id, {}).get("eta_seconds")
+                    streaming.emit(
+                        "queue", prompt_id=prompt_id, position=position, running=len(queue_running), eta=eta
+                    )
+                    last_position = position
+
             # 히스토리 확인
             history = self.get_history(prompt_id)
 
@@ -206,12 +747,21 @@ class ComfyUIClient:
 
                 if status.get("completed", False):
                     logger.info(f"✅ 작업 완료! (소요 시간: {elapsed:.1f}초)")
+                    self._record_timings(prompt_id, status, running_since)
                     return history
 
                 # 에러 확인
+                if status.get("status_str") == "error":
+                    self._forget_prompt(prompt_id)
+                    self.release_history([prompt_id])
+                    raise execution_error_from_status(status)
                 if "error" in status:
+                    self._forget_prompt(prompt_id)
+                    self.release_history([prompt_id])
                     error_msg = status.get("error", "Unknown error")
-                    raise Exception(f"ComfyUI 작업 실패: {error_msg}")
+                    if is_oom_message(str(error_msg)):
+                        raise GPUOutOfMemoryError(f"ComfyUI GPU 메모리 부족: {error_msg}")
+                    raise WorkflowExecutionError(f"ComfyUI 작업 실패: {error_msg}")
 
                 # 진행상황 추적 (완료된 노드 확인)
                 if progress_callback:
@@ -241,6 +791,80 @@ class ComfyUIClient:
             # 대기
             time.sleep(check_interval)
 
+    def _forget_prompt(self, prompt_id: str):
+        """실패/타임아웃한 prompt의 추적 정보 정리 (노드 통계에 반영하지 않음)"""
+        self._queued_at.pop(prompt_id, None)
+        if self._node_types.pop(prompt_id, None) is not None:
+            get_progress_listener(self.base_url).pop_node_timings(prompt_id)
+        get_node_timing_store().forget_prompt(prompt_id)
+        get_progress_listener(self.base_url).pop_outputs(prompt_id, timeout=0)
+
+    def _record_timings(self, prompt_id: str, status: Dict[str, Any], running_since: Optional[float]):
+        """
+        큐 대기 / 실행 시간 + 캐시된 노드 수 기록 (메트릭, 노드 통계, 트레이스 span)
+
+        히스토리 status.messages의 execution_start / execution_success 타임스탬프(ms)를 사용하고,
+        없으면 폴링으로 확인한 실행 시작 시각과 현재 시각으로 대체
+        (재연결한 작업은 등록 시각을 모르므로 큐 대기 시간을 기록하지 않음)
+        노드별 실행 시간(통계, span)은 WebSocket 리스너가 기록한 executing 이벤트 간격 사용
+        (history에는 prompt 단위 타임스탬프만 있음)
+        """
+        queued_at = self._queued_at.pop(prompt_id, None)
+        started = finished = None
+        cached_nodes = 0
+        for message in status.get("messages", []):
+            if len(message) != 2 or not isinstance(message[1], dict):
+                continue
+            event, data = message
+            if event == "execution_start" and data.get("timestamp"):
+                started = data["timestamp"] / 1000
+            elif event == "execution_success" and data.get("timestamp"):
+                finished = data["timestamp"] / 1000
+            elif event == "execution_cached":
+                cached_nodes += len(data.get("nodes", []))
+
+        started = started or running_since
+        finished = finished or time.time()
+        if queued_at is not None and started is not None:
+            metrics.observe_stage("queue_wait", started - queued_at)
+        if started is not None:
+            metrics.observe_stage("execution", finished - started)
+            tenancy.record_gpu_seconds(finished - started)
+        if cached_nodes:
+            metrics.increment("comfyui_cache_hits_total", amount=cached_nodes, **metrics.current_labels())
+
+        node_types = self._node_types.pop(prompt_id, None)
+        node_timings = []
+        if node_types is not None:
+            node_timings = get_progress_listener(self.base_url).pop_node_timings(prompt_id)
+        get_node_timing_store().record(
+            prompt_id,
+            finished - started if started is not None else None,
+            [
+                (node_id, node_types.get(node_id, "?"), (node_end or finished) - node_start, cached)
+                for node_id, node_start, node_end, cached in node_timings
+            ]
+        )
+
+        if not tracing.is_active():
+            return
+        if queued_at is not None and started is not None:
+            tracing.record_span("comfyui.queue_wait", queued_at, started, **{"comfyui.prompt_id": prompt_id})
+        if started is not None:
+            tracing.record_span(
+                "comfyui.execution", started, finished,
+                **{"comfyui.prompt_id": prompt_id, "comfyui.cached_nodes": cached_nodes}
+            )
+        if not tracing.get_trace_exporter().node_spans:
+            return
+        for node_id, node_start, node_end, cached in node_timings:
+            node_type = node_types.get(node_id, "?")
+            tracing.record_span(
+                f"comfyui.node.{node_type}", node_start, node_end or finished,
+                **{"comfyui.node_id": node_id, "comfyui.node_type": node_type, "comfyui.cached": cached}
+            )
+
+    @tracing.traced("comfyui.get_image")
     def get_image(self, filename: str, subfolder: str = "", folder_type: str = "output") -> bytes:
         """
         ComfyUI에서 생성된 이미지 다운로드
@@ -252,7 +876,15 @@ class ComfyUIClient:
 
         Returns:
             이미지 바이트 데이터
+
+        co-located 모드에서 ComfyUI 폴더를 읽을 수 있으면 /view 대신 파일을 직접 읽음 (실패 시 /view)
         """
+        if self.output_reader is not None:
+            data = self.output_reader.read(folder_type, subfolder, filename)
+            if data is not None:
+                logger.info(f"✅ 이미지 읽기 완료 (공유 폴더): {filename}")
+                return data
+
         try:
             params = {
                 "filename": filename,
@@ -268,6 +900,7 @@ class ComfyUIClient:
 
             if response.status_code == 200:
                 logger.info(f"✅ 이미지 다운로드 완료: {filename}")
+                metrics.increment("comfyui_output_reads_total", source="http")
                 return response.content
             else:
                 raise Exception(f"다운로드 실패: {response.status_code}")
@@ -276,6 +909,8 @@ class ComfyUIClient:
             logger.error(f"❌ 이미지 다운로드 오류: {e}")
             raise
 
+    @tracing.traced("comfyui.extract_output_images")
+    @metrics.timed("download")
     def extract_output_images(self, history: Dict[str, Any]) -> list[bytes]:
         """
         히스토리에서 출력 이미지 추출
@@ -311,12 +946,102 @@ class ComfyUIClient:
             logger.error(f"❌ 이미지 추출 오류: {e}")
             raise
 
+    def websocket_output_available(self) -> bool:
+        """
+        웹소켓 출력 사용 가능 여부 (WebSocket 리스너 연결 + ComfyUI에 출력 노드 설치)
+
+        노드 설치 여부는 /object_info로 한 번만 확인 (ComfyUI custom_nodes/websocket_image_save.py)
+        """
+        if not get_progress_listener(self.base_url).ensure_started(wait=2.0):
+            return False
+        key = (self.base_url, self.websocket_node_class)
+        available = _websocket_output_nodes.get(key)
+        if available is None:
+            try:
+                response = self.session.get(
+                    f"{self.base_url}/object_info/{self.websocket_node_class}",
+                    timeout=10
+                )
+                available = response.status_code == 200 and self.websocket_node_class in response.json()
+            except Exception as e:
+                logger.warning(f"⚠️ 웹소켓 출력 노드 확인 오류: {e}")
+                return False
+            _websocket_output_nodes[key] = available
+            if not available:
+                logger.warning(f"⚠️ ComfyUI에 {self.websocket_node_class} 노드가 없어 파일 출력(SaveImage)을 사용합니다")
+        return available
+
+    def prepare_output(self, workflow: Dict[str, Any], websocket_output: Optional[bool] = None) -> Optional[Dict[str, Any]]:
+        """
+        결과 수신 방식 적용 - 웹소켓 출력이면 SaveImage / PreviewImage를 웹소켓 출력 노드로 교체
+
+        Args:
+            websocket_output: True/False면 모든 출력 노드에 적용/미적용,
+                None이면 설정 (enabled: 모든 출력, previews: PreviewImage 출력만)
+
+        Returns:
+            교체 전 워크플로우 사본 (이미지를 받지 못했을 때 파일 출력으로 재실행용), 교체하지 않았으면 None
+        """
+        previews_only = False
+        if websocket_output is None:
+            previews_only = not self.websocket_output
+            websocket_output = self.websocket_output or (
+                self.websocket_previews
+                and any(node.get("class_type") == "PreviewImage" for node in workflow.values())
+            )
+        if not websocket_output or has_websocket_output(workflow) or not self.websocket_output_available():
+            return None
+
+        original = copy.deepcopy(workflow)
+        apply_websocket_output(workflow, self.websocket_node_class, previews_only=previews_only)
+        return original
+
+    def collect_output_images(
+        self,
+        prompt_id: str,
+        workflow: Dict[str, Any],
+        history: Dict[str, Any],
+        fallback: Optional[Dict[str, Any]] = None,
+        progress_callback: Optional[callable] = None
+    ) -> Tuple[list[bytes], Dict[str, Any]]:
+        """
+        완료된 작업의 출력 이미지 (웹소켓 출력: 리스너가 받은 바이트, 파일 출력: /view 다운로드)
+
+        웹소켓 출력 노드의 이미지를 받지 못하면 (연결 끊김 등) fallback 워크플로우를 파일 출력으로 재실행
+
+        Returns:
+            (출력 이미지 리스트, 히스토리)
+        """
+        output_images = []
+        if any("images" in output for output in history.get("outputs", {}).values()):
+            output_images = self.extract_output_images(history)
+        if not has_websocket_output(workflow):
+            return output_images, history
+
+        websocket_images = get_progress_listener(self.base_url).pop_outputs(prompt_id, self.websocket_wait_timeout)
+        if websocket_images:
+            logger.info(
+                f"✅ 웹소켓 출력 이미지 {len(websocket_images)}개 수신 "
+                f"({sum(len(image) for image in websocket_images) / 1024:.1f}KB)"
+            )
+            metrics.increment("websocket_output_images_total", amount=len(websocket_images))
+            return websocket_images + output_images, history
+        if fallback is None:
+            return output_images, history
+
+        logger.warning(f"⚠️ 웹소켓 출력 이미지를 받지 못해 파일 출력으로 다시 실행합니다: {prompt_id}")
+        metrics.increment("websocket_output_fallbacks_total")
+        self.release_history([prompt_id])
+        return self.execute_workflow(fallback, progress_callback=progress_callback, websocket_output=False)
+
+    @tracing.traced("comfyui.execute_workflow")
     def execute_workflow(
         self,
         workflow: Dict[str, Any],
-        input_image: Optional[bytes] = None,
+        input_image: Optional[ImageSource] = None,
         input_image_node_id: Optional[str] = None,
-        progress_callback: Optional[callable] = None
+        progress_callback: Optional[callable] = None,
+        websocket_output: Optional[bool] = None
     ) -> Tuple[list[bytes], Dict[str, Any]]:
         """
         워크플로우 실행 (전체 파이프라인)
@@ -326,6 +1051,7 @@ class ComfyUIClient:
             input_image: 입력 이미지 (선택)
             input_image_node_id: 입력 이미지가 들어갈 노드 ID (선택)
             progress_callback: 진행상황 콜백 함수 (선택)
+            websocket_output: 결과를 WebSocket으로 받을지 (None이면 comfyui.websocket_output 설정)
 
         Returns:
             (출력 이미지 리스트, 히스토리)
@@ -342,20 +1068,89 @@ class ComfyUIClient:
             if input_image_node_id in workflow:
                 workflow[input_image_node_id]["inputs"]["image"] = uploaded_name
 
-        # 3. 워크플로우 큐 등록
+        # 3. 결과 수신 방식 (웹소켓 출력이면 출력 노드 교체) + 워크플로우 큐 등록
+        fallback = self.prepare_output(workflow, websocket_output)
         prompt_id = self.queue_prompt(workflow)
 
         # 4. 완료 대기 (진행상황 추적)
         history = self.wait_for_completion(prompt_id, progress_callback=progress_callback)
 
         # 5. 출력 이미지 추출
-        output_images = self.extract_output_images(history)
+        output_images, history = self.collect_output_images(
+            prompt_id, workflow, history, fallback=fallback, progress_callback=progress_callback
+        )
 
         if not output_images:
             raise Exception("출력 이미지가 생성되지 않았습니다.")
 
+        # 6. 히스토리 삭제 (출력은 이미 받았으므로 ComfyUI에 남겨둘 필요 없음)
+        self.release_history([prompt_id])
+
         return output_images, history
 
+    @tracing.traced("comfyui.execute_workflows")
+    def execute_workflows(
+        self,
+        workflows: List[Dict[str, Any]],
+        on_result: Optional[Callable[[int, list], None]] = None,
+        websocket_output: Optional[bool] = None
+    ) -> List[Tuple[list[bytes], Dict[str, Any]]]:
+        """
+        여러 워크플로우를 한 번에 큐에 등록한 뒤 순서대로 완료 대기
+
+        하나씩 등록/대기하면 작업 사이마다 HTTP 왕복과 폴링 간격만큼 GPU가 쉬므로,
+        먼저 모두 등록해 두고 ComfyUI가 연속으로 실행하게 함
+        (같은 프롬프트의 텍스트 인코딩 등 입력이 같은 노드는 ComfyUI 캐시로 재사용됨)
+
+        Args:
+            on_result: (워크플로우 순번, 출력 이미지 리스트) - 워크플로우가 끝날 때마다 호출
+                (나머지 워크플로우를 기다리지 않고 결과를 먼저 처리/전송)
+            websocket_output: 결과를 WebSocket으로 받을지 (None이면 comfyui.websocket_output 설정)
+
+        Returns:
+            워크플로우 순서대로 (출력 이미지 리스트, 히스토리)
+
+        Raises:
+            워크플로우 하나가 실패하면 그 예외 (아직 실행하지 않은 나머지는 큐에서 삭제)
+        """
+        if not self.check_connection():
+            raise ConnectionError("ComfyUI 서버에 연결할 수 없습니다. ComfyUI가 실행 중인지 확인하세요.")
+
+        fallbacks = [self.prepare_output(workflow, websocket_output) for workflow in workflows]
+        prompt_ids = [self.queue_prompt(workflow) for workflow in workflows]
+        logger.info(f"📚 워크플로우 {len(prompt_ids)}개 일괄 등록")
+
+        results = []
+        try:
+            for prompt_id, workflow, fallback in zip(prompt_ids, workflows, fallbacks):
+                history = self.wait_for_completion(prompt_id)
+                output_images, history = self.collect_output_images(prompt_id, workflow, history, fallback=fallback)
+                if not output_images:
+                    raise Exception(f"출력 이미지가 생성되지 않았습니다. (prompt: {prompt_id})")
+                self.release_history([prompt_id])
+                if on_result:
+                    on_result(len(results), output_images)
+                results.append((output_images, history))
+        except BaseException:
+            # 실패한 작업 뒤에 등록해 둔 작업은 실행하지 않음 (OOM이면 같은 조건이라 또 실패, 재시도가 다시 등록)
+            self.cancel_prompts(prompt_ids[len(results) + 1:])
+            raise
+        return results
+
+    def get_queue_eta(self) -> Dict[str, Dict[str, Any]]:
+        """
+        ComfyUI 큐의 작업별 ETA (노드 실행 시간 통계 기반)
+
+        Returns:
+            {prompt_id: {"state": running/pending, "position", "workflow", "eta_seconds"}}
+        """
+        queue_info = self.get_queue_status()
+        return get_node_timing_store().estimate_queue(
+            queue_info.get("queue_running", []),
+            queue_info.get("queue_pending", []),
+            get_progress_listener(self.base_url).peek_node_timings
+        )
+
     def get_queue_info(self) -> Dict[str, Any]:
         """큐 상태 조회"""
         try:
@@ -373,6 +1168,7 @@ class ComfyUIClient:
             print(f"⚠️ 큐 조회 오류: {e}")
             return {}
 
+    @tracing.traced("comfyui.free_memory")
     def free_memory(self, unload_models: bool = True, free_memory: bool = True) -> bool:
         """
         ComfyUI 메모리 해제 (모델 언로드)
@@ -0,0 +1,255 @@
+# comfyui_gc.py
+"""
+ComfyUI 히스토리 / 출력·입력 파일 정리
+- 히스토리: 결과를 받은 prompt는 history_ttl이 지나면 /history에서 삭제 (POST /history {"delete": [...]})
+  - ComfyUI 메모리와 /history 응답 크기가 작업 수만큼 계속 커지는 것을 방지
+  - 바로 지우지 않는 이유: 같은 Idempotency-Key 재시도의 재연결, 재시작 후 작업 회수가 히스토리에서 결과를 읽음
+  - 삭제 예정 목록은 공유 상태에 기록 → 백그라운드 리더 워커 하나가 주기마다 삭제 (실패하면 다음 주기에 재시도)
+- 파일: SaveImage 출력(output)과 업로드 입력(input) 디렉토리를 주기적으로 정리 (백그라운드 스레드)
+  - ttl보다 오래된 파일 삭제 → 남은 합계가 max_mb를 넘으면 오래된 파일부터 삭제
+  - min_age_seconds 이내의 파일은 삭제하지 않음 (대기 중인 작업의 입력 / 저장 중인 출력 보호)
+  - 백엔드와 ComfyUI가 같은 서버일 때만 사용 (comfyui_root 또는 디렉토리별 path 지정)
+- 정리한 파일 수 / 바이트는 /status (gc)와 comfyui_gc_reclaimed_bytes_total 메트릭으로 확인
+
+설정: configs/image_editing_config.yaml: comfyui.gc
+"""
+import os
+import time
+import logging
+import threading
+from fnmatch import fnmatch
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import metrics
+from .shared_state import get_shared_state
+
+logger = logging.getLogger(__name__)
+
+DIRECTORY_KINDS = ("output", "input")
+DEFAULT_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+PENDING_HISTORY = "comfyui_history"  # 공유 상태 네임스페이스: prompt_id → {"base_url", "delete_at"}
+PENDING_HISTORY_GRACE = 86400  # 삭제 예정 기록 보존 (ComfyUI가 오래 내려가 있으면 삭제 포기)
+
+
+def load_gc_config() -> Dict[str, Any]:
+    """configs/image_editing_config.yaml: comfyui.gc"""
+    from .comfyui_workflows import load_image_editing_config
+
+    return load_image_editing_config().get("comfyui", {}).get("gc", {})
+
+
+class ComfyUIJanitor:
+    """ComfyUI 히스토리 삭제 여부 + 출력/입력 파일 TTL·용량 정리 (스레드 안전)"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.enabled = config.get("enabled", True)
+        self.delete_history = self.enabled and config.get("delete_history", True)
+        self.history_ttl = config.get("history_ttl", 3600)
+        self.interval = config.get("interval", 600)
+        self.min_age = config.get("min_age_seconds", 600)
+        self.extensions = tuple(ext.lower() for ext in config.get("extensions", DEFAULT_EXTENSIONS))
+        self.keep: List[str] = list(config.get("keep", ["example.png"]))
+
+        root = config.get("comfyui_root")
+        self.directories: Dict[str, Dict[str, Any]] = {}
+        for kind in DIRECTORY_KINDS:
+            settings = config.get(kind, {})
+            path = settings.get("path") or (os.path.join(root, kind) if root else None)
+            if path:
+                self.directories[kind] = {
+                    "path": path,
+                    "ttl": settings.get("ttl", 0),  # 0 = TTL 정리 안 함
+                    "max_bytes": int(settings.get("max_mb", 0) * 1024 * 1024)  # 0 = 용량 제한 없음
+                }
+
+        self._lock = threading.Lock()
+        self._history_deleted = 0
+        self._reclaimed = {kind: {"files": 0, "bytes": 0} for kind in DIRECTORY_KINDS}
+        self._last_run: Optional[Dict[str, Any]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- 히스토리 ----------
+    def record_history_deleted(self, count: int):
+        """클라이언트가 /history에서 삭제한 prompt 수"""
+        with self._lock:
+            self._history_deleted += count
+        metrics.increment("comfyui_history_deleted_total", amount=count)
+
+    def schedule_history_deletion(self, base_url: str, prompt_ids: List[str]):
+        """결과를 받은 prompt의 히스토리를 history_ttl 뒤에 삭제하도록 등록"""
+        if not self.delete_history or not prompt_ids:
+            return
+        shared = get_shared_state()
+        entry = {"base_url": base_url, "delete_at": time.time() + self.history_ttl}
+        for prompt_id in prompt_ids:
+            shared.set(PENDING_HISTORY, prompt_id, entry, ttl=self.history_ttl + PENDING_HISTORY_GRACE)
+
+    def prune_history(self) -> int:
+        """
+        삭제 시각이 지난 히스토리 삭제 1회 실행
+
+        Returns:
+            삭제한 prompt 수 (삭제 요청이 실패한 prompt는 남겨두고 다음 주기에 재시도)
+        """
+        if not self.delete_history:
+            return 0
+        from .comfyui_client import ComfyUIClient
+
+        shared = get_shared_state()
+        now = time.time()
+        due: Dict[str, List[str]] = {}
+        for prompt_id, entry in shared.items(PENDING_HISTORY).items():
+            if entry["delete_at"] <= now:
+                due.setdefault(entry["base_url"], []).append(prompt_id)
+
+        deleted = 0
+        for base_url, prompt_ids in due.items():
+            if not ComfyUIClient(base_url=base_url).delete_history(prompt_ids):
+                continue
+            for prompt_id in prompt_ids:
+                shared.delete(PENDING_HISTORY, prompt_id)
+            deleted += len(prompt_ids)
+        if deleted:
+            logger.info(f"🧹 ComfyUI 히스토리 정리: {deleted}개")
+        return deleted
+
+    # ---------- 파일 ----------
+    def _candidates(self, path: str) -> List[Tuple[float, int, str]]:
+        """정리 대상 파일 (수정 시각, 크기, 경로) - 하위 폴더 포함, 숨김/keep 파일 제외"""
+        files = []
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for name in filenames:
+                if name.startswith(".") or not name.lower().endswith(self.extensions):
+                    continue
+                if any(fnmatch(name, pattern) for pattern in self.keep):
+                    continue
+                full_path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(full_path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, full_path))
+        files.sort()
+        return files
+
+    def _prune_directory(self, kind: str, path: str, ttl: float, max_bytes: int, now: float) -> Dict[str, int]:
+        files = self._candidates(path)
+        total = sum(size for _, size, _ in files)
+        deleted = reclaimed = 0
+
+        for mtime, size, full_path in files:  # 오래된 순
+            age = now - mtime
+            if age < self.min_age:
+                break
+            expired = ttl and age > ttl
+            over_budget = max_bytes and total > max_bytes
+            if not (expired or over_budget):
+                break
+            try:
+                os.remove(full_path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"⚠️ 파일 삭제 실패: {full_path} ({e})")
+                continue
+            total -= size
+            deleted += 1
+            reclaimed += size
+
+        return {"files": deleted, "bytes": reclaimed, "remaining_bytes": total}
+
+    def prune(self) -> Dict[str, Any]:
+        """
+        출력/입력 디렉토리 정리 1회 실행
+
+        Returns:
+            {"ran_at", "duration_seconds", "directories": {kind: {"path", "files", "bytes", "remaining_bytes"}},
+             "reclaimed_bytes"}
+        """
+        started = time.time()
+        report: Dict[str, Any] = {"ran_at": started, "directories": {}, "reclaimed_bytes": 0}
+        for kind, settings in self.directories.items():
+            if not os.path.isdir(settings["path"]):
+                report["directories"][kind] = {"path": settings["path"], "error": "디렉토리가 없습니다."}
+                continue
+            result = self._prune_directory(kind, settings["path"], settings["ttl"], settings["max_bytes"], started)
+            report["directories"][kind] = {"path": settings["path"], **result}
+            report["reclaimed_bytes"] += result["bytes"]
+            if result["files"]:
+                metrics.increment("comfyui_gc_deleted_files_total", amount=result["files"], kind=kind)
+                metrics.increment("comfyui_gc_reclaimed_bytes_total", amount=result["bytes"], kind=kind)
+            with self._lock:
+                self._reclaimed[kind]["files"] += result["files"]
+                self._reclaimed[kind]["bytes"] += result["bytes"]
+
+        report["duration_seconds"] = round(time.time() - started, 3)
+        with self._lock:
+            self._last_run = report
+        if report["reclaimed_bytes"]:
+            logger.info(
+                "🧹 ComfyUI 파일 정리: "
+                + ", ".join(
+                    f"{kind} {d['files']}개 ({d['bytes'] / (1024 * 1024):.1f}MB)"
+                    for kind, d in report["directories"].items() if "files" in d
+                )
+            )
+        return report
+
+    # ---------- 백그라운드 ----------
+    def start(self):
+        """주기적 히스토리 / 파일 정리 데몬 스레드 시작 (정리할 대상이 없으면 시작하지 않음)"""
+        if not self.enabled or not (self.directories or self.delete_history):
+            return
+        if self._thread and self._thread.is_alive():
+            return
+
+        def _loop():
+            while True:
+                try:
+                    self.prune_history()
+                    if self.directories:
+                        self.prune()
+                except Exception as e:
+                    logger.warning(f"⚠️ ComfyUI 정리 스레드 오류: {e}")
+                if self._stop.wait(self.interval):
+                    return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=_loop, name="comfyui-gc", daemon=True)
+        self._thread.start()
+        targets = (["history"] if self.delete_history else []) + list(self.directories)
+        logger.info(f"✅ ComfyUI 정리 시작 ({', '.join(targets)}, {self.interval}초 주기)")
+
+    def stop(self):
+        self._stop.set()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """삭제한 히스토리 수 + 디렉토리별 누적 정리량 + 마지막 실행 결과 (/status)"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "delete_history": self.delete_history,
+                "history_ttl": self.history_ttl,
+                "history_deleted": self._history_deleted,
+                "directories": {kind: settings["path"] for kind, settings in self.directories.items()},
+                "reclaimed": {kind: dict(v) for kind, v in self._reclaimed.items()},
+                "last_run": self._last_run
+            }
+
+
+# 싱글톤 인스턴스
+_janitor: Optional[ComfyUIJanitor] = None
+_janitor_lock = threading.Lock()
+
+
+def get_comfyui_janitor() -> ComfyUIJanitor:
+    """ComfyUIJanitor 싱글톤 인스턴스"""
+    global _janitor
+    if _janitor is None:
+        with _janitor_lock:
+            if _janitor is None:
+                _janitor = ComfyUIJanitor(load_gc_config())
+    return _janitor
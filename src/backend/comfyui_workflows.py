@@ -5,11 +5,11 @@ ComfyUI 워크플로우 정의
 """
 import yaml
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 
 def load_image_editing_config() -> Dict[str, Any]:
-    """이미지 편집 설정 로드"""
+    """이미지 편집 설정 로드 (COMFYUI_BASE_URL 환경변수가 있으면 comfyui.base_url 대신 사용)"""
     config_path = os.path.join(
         os.path.dirname(__file__),
         "..", "..",
@@ -17,7 +17,12 @@ def load_image_editing_config() -> Dict[str, Any]:
     )
 
     with open(config_path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+        config = yaml.safe_load(f)
+
+    base_url = os.getenv("COMFYUI_BASE_URL")
+    if base_url:
+        config.setdefault("comfyui", {})["base_url"] = base_url
+    return config
 
 
 def get_pipeline_steps_for_mode(experiment_id: str) -> Dict[str, str]:
@@ -227,6 +232,273 @@ def get_flux_t2i_workflow() -> Dict[str, Any]:
     return workflow
 
 
+def _find_nodes(workflow: Dict[str, Any], *class_types: str) -> list:
+    """class_type이 일치하는 노드 ID 목록"""
+    return [node_id for node_id, node in workflow.items() if node.get("class_type") in class_types]
+
+
+def apply_tiled_vae_decode(workflow: Dict[str, Any], tile_size: int = 512, overlap: int = 64) -> Dict[str, Any]:
+    """
+    VAEDecode → VAEDecodeTiled 교체 (OOM 사다리 1단계)
+
+    디코딩을 타일 단위로 나눠 고해상도 VAE 디코딩의 피크 VRAM을 줄인다.
+    """
+    for node_id in _find_nodes(workflow, "VAEDecode"):
+        inputs = workflow[node_id]["inputs"]
+        workflow[node_id] = {
+            "class_type": "VAEDecodeTiled",
+            "inputs": {
+                "samples": inputs["samples"],
+                "vae": inputs["vae"],
+                "tile_size": tile_size,
+                "overlap": overlap,
+                "temporal_size": 64,     # 이미지에는 영향 없음 (신규 ComfyUI 필수 입력)
+                "temporal_overlap": 8
+            }
+        }
+    return workflow
+
+
+def apply_lowres_upscale(
+    workflow: Dict[str, Any],
+    target_width: int,
+    target_height: int,
+    scale: float = 0.5,
+    upscale_model: str = None
+) -> Dict[str, Any]:
+    """
+    저해상도 생성 + 업스케일 (OOM 사다리 마지막 단계)
+
+    EmptyLatentImage를 scale 배로 줄여 생성한 뒤, 같은 워크플로우 안에서
+    업스케일 모델(선택) + ImageScale로 요청한 출력 크기를 그대로 맞춘다.
+
+    Args:
+        target_width, target_height: 최종 출력 크기 (요청 크기)
+        scale: 생성 해상도 비율
+        upscale_model: ComfyUI models/upscale_models 파일명 (None이면 lanczos 리사이즈만)
+    """
+    latent_ids = _find_nodes(workflow, "EmptyLatentImage")
+    decode_ids = _find_nodes(workflow, "VAEDecode", "VAEDecodeTiled")
+    if not latent_ids or not decode_ids:
+        raise ValueError("저해상도 업스케일을 적용할 수 없는 워크플로우입니다.")
+
+    for node_id in latent_ids:
+        workflow[node_id]["inputs"]["width"] = max(64, int(target_width * scale) // 64 * 64)
+        workflow[node_id]["inputs"]["height"] = max(64, int(target_height * scale) // 64 * 64)
+
+    decode_id = decode_ids[0]
+    image_source = [decode_id, 0]
+
+    if upscale_model:
+        workflow["90"] = {
+            "class_type": "UpscaleModelLoader",
+            "inputs": {"model_name": upscale_model}
+        }
+        workflow["91"] = {
+            "class_type": "ImageUpscaleWithModel",
+            "inputs": {"upscale_model": ["90", 0], "image": image_source}
+        }
+        image_source = ["91", 0]
+
+    # 업스케일 배율과 관계없이 최종 크기를 요청 크기로 정확히 맞춤
+    workflow["92"] = {
+        "class_type": "ImageScale",
+        "inputs": {
+            "image": image_source,
+            "upscale_method": "lanczos",
+            "width": target_width,
+            "height": target_height,
+            "crop": "disabled"
+        }
+    }
+
+    # 디코딩 결과를 쓰던 노드(SaveImage, FaceDetailer 등)가 업스케일 결과를 쓰도록 재연결
+    for node_id, node in workflow.items():
+        if node_id in ("91", "92"):
+            continue
+        for key, value in node.get("inputs", {}).items():
+            if value == [decode_id, 0]:
+                node["inputs"][key] = ["92", 0]
+
+    return workflow
+
+
+def get_model_warmup_workflow(model_name: str) -> Dict[str, Any]:
+    """
+    모델 워밍업용 최소 워크플로우 (64x64, 1 step)
+
+    UNET(GGUF) + T5/CLIP + VAE를 실제로 한 번 실행해 ComfyUI VRAM에 올려둔다.
+    출력 노드가 없으면 ComfyUI가 prompt_no_outputs로 거부하므로
+    SaveImage 대신 디스크에 남지 않는 PreviewImage(temp)를 사용한다.
+    """
+    workflow = update_flux_t2i_workflow(
+        workflow=get_flux_t2i_workflow(),
+        model_name=model_name,
+        prompt="warmup",
+        width=64,
+        height=64,
+        steps=1,
+        guidance_scale=3.5,
+        seed=0
+    )
+
+    return apply_preview_output(workflow)
+
+
+def apply_batch_index(workflow: Dict[str, Any], batch_index: int) -> Dict[str, Any]:
+    """
+    배치 생성 결과 중 1장만 재현 (seed + batch_index)
+
+    같은 seed의 배치에서 각 이미지의 노이즈는 배치 내 위치로 결정되므로,
+    EmptyLatentImage를 batch_index+1장으로 만들고 LatentFromBatch로 해당 위치만 샘플링한다.
+    (ComfyUI는 batch_index가 있는 latent의 노이즈를 배치 생성 때와 같은 순서로 만듦)
+    """
+    latent_ids = _find_nodes(workflow, "EmptyLatentImage")
+    sampler_ids = _find_nodes(workflow, "KSampler")
+    if not latent_ids or not sampler_ids:
+        raise ValueError("batch_index를 적용할 수 없는 워크플로우입니다.")
+
+    latent_id = latent_ids[0]
+    workflow[latent_id]["inputs"]["batch_size"] = batch_index + 1
+
+    # 노드 62: 배치에서 batch_index 위치 1장만 선택
+    workflow["62"] = {
+        "class_type": "LatentFromBatch",
+        "inputs": {
+            "samples": [latent_id, 0],
+            "batch_index": batch_index,
+            "length": 1
+        }
+    }
+    for node_id in sampler_ids:
+        if workflow[node_id]["inputs"].get("latent_image") == [latent_id, 0]:
+            workflow[node_id]["inputs"]["latent_image"] = ["62", 0]
+
+    return workflow
+
+
+def apply_preview_output(workflow: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    SaveImage → PreviewImage 교체
+
+    결과를 output 폴더 대신 ComfyUI temp 폴더에 저장 (초안/워밍업처럼 보관할 필요 없는 출력용,
+    temp 폴더는 ComfyUI 재시작 시 정리됨)
+    """
+    for node_id in _find_nodes(workflow, "SaveImage"):
+        workflow[node_id] = {
+            "class_type": "PreviewImage",
+            "inputs": {
+                "images": workflow[node_id]["inputs"]["images"]
+            }
+        }
+    return workflow
+
+
+# 웹소켓 출력 노드 ID 접두사 (리스너가 이 노드 실행 중에 받은 바이너리 이미지만 결과로 보관)
+WEBSOCKET_OUTPUT_PREFIX = "ws_output_"
+WEBSOCKET_OUTPUT_NODE = "SaveImageWebsocket"
+
+
+def load_websocket_output_config() -> Dict[str, Any]:
+    """configs/image_editing_config.yaml: comfyui.websocket_output"""
+    return load_image_editing_config().get("comfyui", {}).get("websocket_output", {})
+
+
+def apply_websocket_output(
+    workflow: Dict[str, Any],
+    node_class: str = WEBSOCKET_OUTPUT_NODE,
+    previews_only: bool = False
+) -> Dict[str, Any]:
+    """
+    SaveImage / PreviewImage → 웹소켓 이미지 출력 노드 교체
+
+    ComfyUI가 결과를 디스크에 쓰지 않고 PNG 바이트를 WebSocket으로 바로 전송
+    (/view 다운로드 없음, ComfyUIClient가 리스너로 수신)
+    교체한 노드는 WEBSOCKET_OUTPUT_PREFIX + 기존 ID로 바뀜 (출력 노드라 참조하는 노드 없음)
+
+    Args:
+        node_class: 웹소켓 출력 노드 (ComfyUI custom_nodes/websocket_image_save.py)
+        previews_only: True면 PreviewImage(초안/미리보기)만 교체
+    """
+    class_types = ("PreviewImage",) if previews_only else ("SaveImage", "PreviewImage")
+    for node_id in _find_nodes(workflow, *class_types):
+        node = workflow.pop(node_id)
+        workflow[f"{WEBSOCKET_OUTPUT_PREFIX}{node_id}"] = {
+            "class_type": node_class,
+            "inputs": {
+                "images": node["inputs"]["images"]
+            }
+        }
+    return workflow
+
+
+def has_websocket_output(workflow: Dict[str, Any]) -> bool:
+    """웹소켓 출력 노드가 있는 워크플로우인지"""
+    return any(is_websocket_output_node(node_id) for node_id in workflow)
+
+
+def is_websocket_output_node(node_id: Optional[str]) -> bool:
+    return isinstance(node_id, str) and node_id.startswith(WEBSOCKET_OUTPUT_PREFIX)
+
+
+def apply_latent_upscale_refine(
+    workflow: Dict[str, Any],
+    target_width: int,
+    target_height: int,
+    steps: int,
+    denoise: float = 0.55,
+    upscale_method: str = "nearest-exact"
+) -> Dict[str, Any]:
+    """
+    초안 latent 업스케일 + 2차 샘플링 (초안 완성 "latent_upscale" 방식)
+
+    초안 워크플로우(초안 해상도/steps/seed 그대로)의 KSampler 출력 latent를 요청 해상도로
+    업스케일한 뒤 같은 seed로 denoise만큼 다시 샘플링한다.
+    같은 seed에서 초안 latent는 그대로 재현되므로 사용자가 고른 초안의 구도가 유지된다.
+
+    Args:
+        target_width, target_height: 최종 출력 크기
+        steps: 2차 샘플링 steps
+        denoise: 2차 샘플링 강도 (낮을수록 초안에 가깝고, 높을수록 디테일이 새로 생김)
+    """
+    sampler_ids = _find_nodes(workflow, "KSampler")
+    decode_ids = _find_nodes(workflow, "VAEDecode", "VAEDecodeTiled")
+    if not sampler_ids or not decode_ids:
+        raise ValueError("latent 업스케일을 적용할 수 없는 워크플로우입니다.")
+
+    sampler_id = sampler_ids[0]
+
+    # 노드 60: 초안 latent → 요청 해상도
+    workflow["60"] = {
+        "class_type": "LatentUpscale",
+        "inputs": {
+            "samples": [sampler_id, 0],
+            "upscale_method": upscale_method,
+            "width": target_width,
+            "height": target_height,
+            "crop": "disabled"
+        }
+    }
+
+    # 노드 61: 2차 KSampler (초안과 같은 모델/조건/seed)
+    workflow["61"] = {
+        "class_type": "KSampler",
+        "inputs": {
+            **workflow[sampler_id]["inputs"],
+            "steps": steps,
+            "denoise": denoise,
+            "latent_image": ["60", 0]
+        }
+    }
+
+    # 디코딩 노드가 2차 샘플링 결과를 쓰도록 재연결
+    for node_id in decode_ids:
+        if workflow[node_id]["inputs"].get("samples") == [sampler_id, 0]:
+            workflow[node_id]["inputs"]["samples"] = ["61", 0]
+
+    return workflow
+
+
 def get_flux_t2i_with_impact_workflow() -> Dict[str, Any]:
     """
     FLUX T2I + Impact Pack (FaceDetailer) 워크플로우
@@ -444,9 +716,10 @@ def update_flux_t2i_workflow(
     height: int,
     steps: int,
     guidance_scale: float,
-    seed: int = None
+    seed: int = None,
+    batch_size: int = 1
 ) -> Dict[str, Any]:
-    """FLUX T2I 워크플로우 파라미터 업데이트 (GGUF)"""
+    """FLUX T2I 워크플로우 파라미터 업데이트 (GGUF, batch_size장을 한 번에 샘플링)"""
     import random
     from .model_registry import get_model_config
 
@@ -470,6 +743,7 @@ def update_flux_t2i_workflow(
     # 이미지 크기 설정 (노드 5: EmptyLatentImage)
     workflow["5"]["inputs"]["width"] = width
     workflow["5"]["inputs"]["height"] = height
+    workflow["5"]["inputs"]["batch_size"] = batch_size
 
     # ------------------------------------------------------------
     # [핵심 수정] Guidance 값을 올바른 노드(35번)에 연결!
@@ -0,0 +1,169 @@
+# drafts.py
+"""
+초안 → 완성 (draft-then-refine)
+- 초안: 낮은 steps / 낮은 해상도 + 고정 seed로 빠르게 여러 장 생성
+- 완성: 사용자가 고른 초안만 같은 seed로 다시 생성
+  - "full": 같은 seed, 전체 steps / 해상도로 처음부터 생성
+  - "latent_upscale": 초안 latent를 요청 해상도로 업스케일 후 2차 샘플링 (초안 구도 유지)
+- 초안 세션(최종 프롬프트, seed, 크기, 모델, 초안 이미지)은 서버 메모리에 보관하므로
+  완성 요청은 draft_id와 초안 번호만 보내면 됨
+  - 이미지를 뺀 세션 정보는 공유 상태(shared_state)에도 기록 → 완성 요청이 다른 워커로 가도 처리
+    (완성은 seed로 초안을 다시 만들므로 초안 이미지는 필요 없음)
+"""
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .shared_state import get_shared_state
+
+logger = logging.getLogger(__name__)
+
+REFINE_METHODS = ("full", "latent_upscale")
+DRAFTS = "drafts"  # 공유 상태 네임스페이스: draft_id → 세션 정보 (이미지 제외)
+
+
+@dataclass
+class DraftSession:
+    """초안 묶음 1개 (같은 프롬프트 / 설정, 초안마다 다른 seed)"""
+    prompt: str                 # 사용자 원문 프롬프트
+    final_prompt: str           # 프롬프트 빌더 결과 (완성 시 그대로 재사용 - GPT 재호출 없음)
+    model_name: str
+    width: int                  # 완성 해상도
+    height: int
+    steps: int                  # 완성 steps
+    guidance_scale: Optional[float]
+    draft_width: int
+    draft_height: int
+    draft_steps: int
+    seeds: List[int] = field(default_factory=list)
+    images: List[bytes] = field(default_factory=list)  # 초안 이미지 (응답에 사용한 인코딩)
+    draft_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    created_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """이미지를 제외한 세션 정보"""
+        return {
+            "draft_id": self.draft_id,
+            "prompt": self.prompt,
+            "model": self.model_name,
+            "width": self.width,
+            "height": self.height,
+            "steps": self.steps,
+            "guidance_scale": self.guidance_scale,
+            "draft_width": self.draft_width,
+            "draft_height": self.draft_height,
+            "draft_steps": self.draft_steps,
+            "seeds": list(self.seeds),
+            "created_at": self.created_at
+        }
+
+    @classmethod
+    def from_shared(cls, data: Dict[str, Any]) -> "DraftSession":
+        """공유 상태 기록 → 세션 (초안 이미지 없음)"""
+        return cls(
+            prompt=data["prompt"],
+            final_prompt=data["final_prompt"],
+            model_name=data["model"],
+            width=data["width"],
+            height=data["height"],
+            steps=data["steps"],
+            guidance_scale=data["guidance_scale"],
+            draft_width=data["draft_width"],
+            draft_height=data["draft_height"],
+            draft_steps=data["draft_steps"],
+            seeds=list(data["seeds"]),
+            draft_id=data["draft_id"],
+            created_at=data["created_at"]
+        )
+
+
+class DraftStore:
+    """draft_id → DraftSession (메모리, TTL + 최대 개수 제한)"""
+
+    def __init__(self, ttl: int = 3600, max_sessions: int = 64):
+        """
+        Args:
+            ttl: 초안 세션 보관 시간 (초, 마지막 조회 기준)
+            max_sessions: 최대 보관 세션 수 (초과 시 오래된 세션부터 제거)
+        """
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, DraftSession]" = OrderedDict()
+        self._touched: Dict[str, float] = {}
+
+    def _purge_locked(self):
+        now = time.time()
+        for draft_id in [d for d, t in self._touched.items() if now - t > self.ttl]:
+            self._sessions.pop(draft_id, None)
+            self._touched.pop(draft_id, None)
+
+        while len(self._sessions) > self.max_sessions:
+            draft_id, _ = self._sessions.popitem(last=False)
+            self._touched.pop(draft_id, None)
+
+    def put(self, session: DraftSession) -> str:
+        """세션 저장 후 draft_id 반환"""
+        with self._lock:
+            self._sessions[session.draft_id] = session
+            self._touched[session.draft_id] = time.time()
+            self._purge_locked()
+        get_shared_state().set(DRAFTS, session.draft_id, {**session.to_dict(), "final_prompt": session.final_prompt},
+                               ttl=self.ttl)
+        logger.info(f"📝 초안 세션 저장: {session.draft_id} ({len(session.seeds)}개)")
+        return session.draft_id
+
+    def get(self, draft_id: str) -> Optional[DraftSession]:
+        """세션 조회 (없거나 만료되면 None, 조회 시 만료 시간 연장 - 다른 워커가 만든 세션은 공유 상태에서)"""
+        with self._lock:
+            self._purge_locked()
+            session = self._sessions.get(draft_id)
+            if session is not None:
+                self._sessions.move_to_end(draft_id)
+                self._touched[draft_id] = time.time()
+                return session
+
+        data = get_shared_state().get(DRAFTS, draft_id)
+        if data is None:
+            return None
+        session = DraftSession.from_shared(data)
+        with self._lock:
+            self._sessions[draft_id] = session
+            self._touched[draft_id] = time.time()
+            self._purge_locked()
+        get_shared_state().set(DRAFTS, draft_id, data, ttl=self.ttl)
+        return session
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+
+def load_drafts_config() -> Dict[str, Any]:
+    """configs/image_editing_config.yaml: comfyui.drafts"""
+    from .comfyui_workflows import load_image_editing_config
+
+    return load_image_editing_config().get("comfyui", {}).get("drafts", {})
+
+
+# 싱글톤 인스턴스
+_draft_store: Optional[DraftStore] = None
+_draft_store_lock = threading.Lock()
+
+
+def get_draft_store() -> DraftStore:
+    """DraftStore 싱글톤 인스턴스"""
+    global _draft_store
+    if _draft_store is None:
+        with _draft_store_lock:
+            if _draft_store is None:
+                config = load_drafts_config()
+                _draft_store = DraftStore(
+                    ttl=config.get("ttl", 3600),
+                    max_sessions=config.get("max_sessions", 64)
+                )
+    return _draft_store
@@ -23,6 +23,11 @@ class WorkflowExecutionError(ServiceError):
     pass
 
 
+class GPUOutOfMemoryError(WorkflowExecutionError):
+    """ComfyUI 실행 중 GPU 메모리 부족 (OOM)"""
+    pass
+
+
 class ImageProcessingError(ServiceError):
     """이미지 처리 실패"""
     pass
@@ -31,3 +36,26 @@ class ImageProcessingError(ServiceError):
 class ConfigurationError(ServiceError):
     """설정 오류"""
     pass
+
+
+class IdempotencyConflictError(ServiceError):
+    """같은 Idempotency-Key가 다른 요청 파라미터로 재사용됨"""
+    pass
+
+
+class AdmissionRejectedError(ServiceError):
+    """예상 완료 시간이 SLO를 넘어 요청을 수락하지 않음 (429 + Retry-After)"""
+
+    def __init__(self, message: str, retry_after: int, estimate: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.estimate = estimate
+
+
+class TenantRateLimitedError(AdmissionRejectedError):
+    """테넌트(가게)별 GPU 시간 / GPT 호출 한도 초과 (429 + Retry-After)"""
+
+    def __init__(self, message: str, retry_after: int, tenant: str, resource: str):
+        super().__init__(message, retry_after=retry_after, estimate=0.0)
+        self.tenant = tenant
+        self.resource = resource
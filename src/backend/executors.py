@@ -0,0 +1,118 @@
+# executors.py
+"""
+작업 종류별 스레드 풀 (기본 이벤트 루프 executor 대신 사용)
+- comfyui: ComfyUI 작업 대기 (T2I / I2I / 편집 / 초안 - 수 초~수 분 동안 스레드 점유)
+- network: 짧은 외부 API 호출 (GPT 문구 생성 등 - 이미지 큐가 가득 차도 바로 실행)
+- cpu: CPU 연산 (Pillow / rembg / mediapipe - 코어 수 이내로 제한)
+- gpu: 프로세스 내 GPU 추론 (SDXL 캘리그라피 - 동시에 1개씩)
+- admission: 이미지 작업 수락 판단 (요청 키 해시 + 공유 상태 조회 - comfyui 풀에 넣기 전에 짧게 실행,
+  이벤트 루프를 막지 않고 comfyui 풀이 밀려 있어도 바로 429 판단)
+
+풀마다 executor_queue_depth / executor_active_workers 게이지와
+executor_queue_wait_seconds 히스토그램을 기록 (/metrics, /status)
+
+설정: configs/image_editing_config.yaml: comfyui.executors (풀별 스레드 수)
+"""
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict
+
+from . import metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+WORKLOADS = ("comfyui", "network", "cpu", "gpu", "admission")
+DEFAULT_WORKERS = {"comfyui": 32, "network": 8, "cpu": 0, "gpu": 1, "admission": 4}  # 0 = CPU 코어 수
+
+
+class WorkloadExecutor(Executor):
+    """대기/실행 중인 작업 수를 메트릭으로 내보내는 스레드 풀"""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-worker")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._update(0, 0)
+
+    def _update(self, queued: int, running: int):
+        with self._lock:
+            self._queued += queued
+            self._running += running
+            queue_depth, active = self._queued, self._running
+        metrics.set_gauge("executor_queue_depth", queue_depth, pool=self.name)
+        metrics.set_gauge("executor_active_workers", active, pool=self.name)
+
+    def submit(self, fn: Callable[..., Any], /, *args, **kwargs) -> Future:
+        enqueued_at = time.perf_counter()
+        self._update(1, 0)
+
+        def run():
+            self._update(-1, 1)
+            metrics.observe("executor_queue_wait_seconds", time.perf_counter() - enqueued_at, pool=self.name)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._update(0, -1)
+
+        try:
+            return self._executor.submit(run)
+        except BaseException:
+            self._update(-1, 0)
+            raise
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {"workers": self.workers, "queued": self._queued, "running": self._running}
+
+
+def load_executors_config() -> Dict[str, Any]:
+    """configs/image_editing_config.yaml: comfyui.executors"""
+    from .comfyui_workflows import load_image_editing_config
+
+    return load_image_editing_config().get("comfyui", {}).get("executors", {})
+
+
+# 싱글톤 인스턴스 (작업 종류별)
+_executors: Dict[str, WorkloadExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(workload: str) -> WorkloadExecutor:
+    """작업 종류별 WorkloadExecutor 싱글톤 인스턴스"""
+    executor = _executors.get(workload)
+    if executor is None:
+        if workload not in WORKLOADS:
+            raise ValueError(f"알 수 없는 작업 종류입니다: {workload} (지원: {', '.join(WORKLOADS)})")
+        with _executors_lock:
+            executor = _executors.get(workload)
+            if executor is None:
+                workers = load_executors_config().get(workload, DEFAULT_WORKERS[workload])
+                if workers <= 0:
+                    workers = os.cpu_count() or 4
+                executor = _executors[workload] = WorkloadExecutor(workload, workers)
+                logger.info(f"🧵 {workload} 작업 풀 생성 (스레드 {workers}개)")
+    return executor
+
+
+async def run_in(workload: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """func(*args, **kwargs)를 작업 종류별 풀에서 실행 (현재 trace 컨텍스트 전달)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(workload), tracing.wrap(partial(func, *args, **kwargs)))
+
+
+def snapshot() -> Dict[str, Dict[str, int]]:
+    """생성된 풀별 스레드 수 / 대기 / 실행 중 작업 수 (/status)"""
+    with _executors_lock:
+        executors = dict(_executors)
+    return {name: executor.snapshot() for name, executor in executors.items()}
@@ -0,0 +1,373 @@
+# idempotency.py
+"""
+멱등성 키 (Idempotency-Key)
+- 같은 키로 다시 들어온 요청은 GPU 작업을 새로 만들지 않음
+  - 실행 중: 기존 실행이 끝날 때까지 대기 후 같은 결과 반환
+  - 완료: 저장된 결과 반환 (TTL 동안)
+  - 실패: 다시 실행하되, 이전 시도에서 등록한 ComfyUI 작업이 살아 있으면 재연결
+    (HTTP 타임아웃으로 실패했어도 ComfyUI 작업은 계속 실행 중일 수 있음)
+  - 백엔드 재시작 후: 작업 기록(job_store)에 남은 같은 키/같은 요청의 prompt에 재연결
+- 키 기록(파라미터 해시 / 상태 / prompt_id / 결과)은 공유 상태(shared_state)에도 기록 → 워커가 여러 개여도
+  다른 파라미터 재사용 거부, 다른 워커가 실행 중이면 끝날 때까지 대기, 다른 워커에서 끝난 키는 저장된 결과 반환
+  (결과의 이미지 바이트는 아티팩트 저장소에, 나머지는 JSON으로 - 다시 실행하는 것은 실패한 키뿐)
+- 완료된 키는 워커 메모리에도 아티팩트 참조 형태로만 보관 (재생할 때 아티팩트에서 읽음)
+  - 아티팩트가 이미 삭제됐으면 실패한 키처럼 다시 실행 (이전 prompt의 히스토리가 남아 있으면 재연결)
+- 같은 키를 다른 파라미터로 재사용하면 IdempotencyConflictError
+- 키는 테넌트(가게)별 ("{tenant}:{key}") - 다른 가게가 같은 키를 보내도 결과를 공유하거나 충돌하지 않음
+"""
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import metrics
+from .artifacts import get_artifact_store
+from .comfyui_client import track_prompts
+from .job_store import get_job_store
+from .shared_state import INSTANCE_ID, get_shared_state
+from .exceptions import IdempotencyConflictError
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+IDEMPOTENCY = "idempotency"  # 공유 상태 네임스페이스: 키 → {fingerprint, endpoint, state, prompt_ids, owner, result, ...}
+ARTIFACT_REF = "$artifact"  # 공유 결과에서 바이트 대신 저장하는 아티팩트 참조 ({"$artifact": id})
+
+
+def scoped_key(key: str, tenant: Optional[str] = None) -> str:
+    """
+    테넌트 범위 키 ("{tenant}:{key}", 테넌트가 없으면 키 그대로)
+
+    Raises:
+        IdempotencyConflictError: 키가 비었거나 MAX_KEY_LENGTH 초과
+    """
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise IdempotencyConflictError(f"Idempotency-Key는 1~{MAX_KEY_LENGTH}자여야 합니다.")
+    return f"{tenant}:{key}" if tenant else key
+
+
+def encode_result(value: Any) -> Any:
+    """
+    결과 → 공유 상태에 저장할 JSON 값 (바이트는 아티팩트 저장소에 저장 후 ID로 대체, 튜플은 리스트)
+
+    Raises:
+        TypeError: JSON / 바이트로 표현할 수 없는 값
+    """
+    if isinstance(value, (bytes, bytearray)):
+        return {ARTIFACT_REF: get_artifact_store().put(bytes(value)).artifact_id}
+    if isinstance(value, dict):
+        return {str(k): encode_result(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [encode_result(v) for v in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    raise TypeError(f"공유할 수 없는 결과 타입: {type(value).__name__}")
+
+
+def decode_result(value: Any) -> Any:
+    """
+    encode_result의 역변환 (리스트는 리스트 그대로 - 언패킹은 튜플과 같음)
+
+    Raises:
+        LookupError: 아티팩트가 이미 삭제됨
+    """
+    if isinstance(value, dict):
+        if set(value) == {ARTIFACT_REF}:
+            artifact = get_artifact_store().get(value[ARTIFACT_REF])
+            if artifact is None:
+                raise LookupError(f"삭제된 아티팩트: {value[ARTIFACT_REF]}")
+            return artifact.read()
+        return {k: decode_result(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [decode_result(v) for v in value]
+    return value
+
+
+class _Entry:
+    """키 1개에 대한 실행 기록"""
+
+    def __init__(self, fingerprint: str, endpoint: str):
+        self.fingerprint = fingerprint
+        self.endpoint = endpoint
+        self.state = "running"  # running / done / failed
+        self.prompt_ids: List[str] = []
+        self.result: Any = None  # 완료 결과 (encoded면 encode_result 형태 - 이미지 바이트 대신 아티팩트 참조)
+        self.encoded = False
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.done = threading.Event()
+
+    def replay(self) -> Any:
+        """
+        저장된 결과
+
+        Raises:
+            LookupError: 결과 아티팩트가 이미 삭제됨
+        """
+        return decode_result(self.result) if self.encoded else self.result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "endpoint": self.endpoint,
+            "prompt_ids": list(self.prompt_ids),
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at
+        }
+
+
+class IdempotencyStore:
+    """멱등성 키 → prompt_id / 결과 매핑 (메모리, TTL + 최대 개수 제한)"""
+
+    def __init__(self, ttl: int = 3600, max_entries: int = 256):
+        """
+        Args:
+            ttl: 완료/실패 기록 보관 시간 (초)
+            max_entries: 최대 보관 키 수 (초과 시 오래된 완료 기록부터 제거)
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    def _purge_locked(self):
+        now = time.time()
+        for key in [k for k, e in self._entries.items()
+                    if e.finished_at is not None and now - e.finished_at > self.ttl]:
+            del self._entries[key]
+
+        finished = [k for k, e in self._entries.items() if e.finished_at is not None]
+        while len(self._entries) > self.max_entries and finished:
+            del self._entries[finished.pop(0)]
+
+    @staticmethod
+    def _store_result(entry: _Entry, result: Any):
+        """완료 결과 보관 (이미지 바이트는 아티팩트 저장소에 두고 참조만 - 워커 메모리에 바이트를 남기지 않음)"""
+        try:
+            entry.result, entry.encoded = encode_result(result), True
+        except (TypeError, OSError) as e:
+            logger.warning(f"⚠️ Idempotency-Key 결과를 아티팩트로 저장할 수 없어 메모리에 보관 (다른 워커 재시도는 재연결): {e}")
+            entry.result, entry.encoded = result, False
+
+    def _publish(self, key: str, entry: _Entry):
+        """키 기록을 공유 상태에 반영 (다른 워커가 조회 / 충돌 검사, 완료면 결과도 - 다른 워커가 재생)"""
+        record = {**entry.to_dict(), "fingerprint": entry.fingerprint, "owner": INSTANCE_ID}
+        if entry.state == "done" and entry.encoded:
+            record["result"] = entry.result
+        get_shared_state().set(IDEMPOTENCY, key, record, ttl=self.ttl)
+
+    def _claim_shared(self, key: str, fingerprint: str, endpoint: str) -> Tuple[Optional[Dict[str, Any]], str, Any]:
+        """
+        이 워커가 맡은 키: 다른 워커의 기록 확인 후 이 워커 실행으로 등록
+
+        Returns:
+            (기존 공유 기록, 처리 방법, 재생할 결과)
+            - "busy": 다른 (살아 있는) 워커가 실행 중
+            - "replay": 다른 워커(또는 메모리에서 밀려난 이 워커의 기록)가 끝낸 결과 재생
+            - "run": 이 워커가 실행 (공유 기록을 running으로 등록)
+        """
+        shared = get_shared_state()
+        with shared.lock(IDEMPOTENCY):
+            record = shared.get(IDEMPOTENCY, key)
+            if record is not None and record.get("fingerprint") != fingerprint:
+                raise IdempotencyConflictError(
+                    "이미 다른 요청 파라미터로 사용된 Idempotency-Key입니다."
+                )
+            if (
+                record is not None and record.get("state") == "running"
+                and record.get("owner") != INSTANCE_ID and shared.is_alive(record.get("owner"))
+            ):
+                return record, "busy", None
+            if record is not None and record.get("state") == "done" and "result" in record:
+                try:
+                    return record, "replay", decode_result(record["result"])
+                except LookupError as e:
+                    logger.warning(f"⚠️ 저장된 결과를 읽을 수 없어 다시 실행 (이전 prompt에 재연결 시도): {e}")
+            shared.set(IDEMPOTENCY, key, {
+                "state": "running", "endpoint": endpoint,
+                "prompt_ids": [], "fingerprint": fingerprint, "owner": INSTANCE_ID
+            }, ttl=self.ttl)
+            return record, "run", None
+
+    def _wait_remote(self, key: str):
+        """다른 워커가 실행 중인 키가 끝날 때까지 대기 (워커가 죽어도 종료)"""
+        shared = get_shared_state()
+        while True:
+            record = shared.get(IDEMPOTENCY, key)
+            if not record or record.get("state") != "running" or not shared.is_alive(record.get("owner")):
+                return
+            time.sleep(1)
+
+    def run(
+        self,
+        key: str,
+        fingerprint: str,
+        func: Callable[[], Any],
+        endpoint: str = "",
+        is_success: Optional[Callable[[Any], bool]] = None,
+        tenant: Optional[str] = None
+    ) -> Tuple[Any, bool]:
+        """
+        키 단위로 func()를 최대 한 번만 성공 실행
+
+        Args:
+            key: 클라이언트가 보낸 Idempotency-Key (tenant 범위 - 작업 기록에는 scoped_key로 저장)
+            fingerprint: 요청 파라미터 해시 (같은 키 재사용 검증용)
+            func: 실제 실행 함수
+            is_success: 예외 없이 실패를 반환하는 함수용 판정 (False면 결과를 저장하지 않음)
+            tenant: 키를 요청한 테넌트
+
+        Returns:
+            (결과, 저장된/진행 중인 결과를 재사용했는지 여부)
+
+        Raises:
+            IdempotencyConflictError: 같은 키가 다른 파라미터로 사용됨
+        """
+        return self._run(scoped_key(key, tenant), fingerprint, func, endpoint, is_success)
+
+    def _run(
+        self,
+        key: str,
+        fingerprint: str,
+        func: Callable[[], Any],
+        endpoint: str,
+        is_success: Optional[Callable[[Any], bool]]
+    ) -> Tuple[Any, bool]:
+        """run 본체 (key는 테넌트 범위 키)"""
+        with self._lock:
+            self._purge_locked()
+            entry = self._entries.get(key)
+
+            if entry is not None and entry.fingerprint != fingerprint:
+                raise IdempotencyConflictError(
+                    "이미 다른 요청 파라미터로 사용된 Idempotency-Key입니다."
+                )
+            if entry is not None and entry.state != "failed":
+                owner = False
+            else:
+                # 이 스레드가 키를 맡음 (같은 워커의 다른 재시도는 이 기록을 기다림)
+                previous = entry.to_dict() if entry is not None else None
+                entry = _Entry(fingerprint, endpoint)
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                owner = True
+
+        if not owner:
+            metrics.increment("idempotent_replays_total", endpoint=endpoint, state=entry.state)
+            if entry.state == "running":
+                logger.info(f"🔁 Idempotency-Key 재시도 - 진행 중인 작업에 재연결 (prompt: {entry.prompt_ids})")
+            entry.done.wait()
+            if entry.state == "failed":
+                # 실행 중이던 원래 요청이 실패 - 이번 요청이 재실행
+                return self._run(key, fingerprint, func, endpoint, is_success)
+            try:
+                return entry.replay(), True
+            except LookupError as e:
+                logger.warning(f"⚠️ 저장된 결과를 읽을 수 없어 다시 실행 (이전 prompt에 재연결 시도): {e}")
+                with self._lock:
+                    if self._entries.get(key) is entry:
+                        entry.state = "failed"
+                return self._run(key, fingerprint, func, endpoint, is_success)
+
+        # 다른 워커의 기록 확인 (공유 상태 잠금 / 파일 I/O는 self._lock 밖에서)
+        try:
+            while True:
+                record, action, replay = self._claim_shared(key, fingerprint, endpoint)
+                if action != "busy":
+                    break
+                metrics.increment("idempotent_replays_total", endpoint=endpoint, state="running")
+                logger.info(f"🔁 Idempotency-Key 재시도 - 다른 워커가 실행 중인 작업이 끝날 때까지 대기 (prompt: {record.get('prompt_ids')})")
+                self._wait_remote(key)
+        except BaseException:
+            # 충돌 등 - 이 기록을 기다리던 같은 워커의 재시도도 다시 판단하도록 제거
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            entry.state = "failed"
+            entry.finished_at = time.time()
+            entry.done.set()
+            raise
+
+        if action == "replay":
+            metrics.increment("idempotent_replays_total", endpoint=endpoint, state="done")
+            logger.info(f"🔁 Idempotency-Key 재시도 - 다른 워커가 끝낸 결과 반환 (prompt: {record.get('prompt_ids')})")
+            entry.prompt_ids = list(record.get("prompt_ids") or [])
+            entry.result, entry.encoded = record["result"], True
+            entry.state = "done"
+            entry.finished_at = record.get("finished_at") or time.time()
+            entry.done.set()
+            return replay, True
+
+        previous = previous or record
+        if previous is not None and previous.get("state") == "failed":
+            # 실패한 키로 다시 들어온 요청 (또는 진행 중이던 원래 요청이 실패) - 재실행
+            metrics.increment("retries_total", reason="idempotency", endpoint=endpoint)
+        if previous is not None and previous.get("prompt_ids"):
+            resume_ids = list(previous["prompt_ids"])
+        else:
+            # 처음 보는 키: 재시작 전에 같은 요청으로 등록한 prompt가 있으면 재연결
+            job_store = get_job_store()
+            resume_ids = job_store.resume_prompt_ids(key, fingerprint) if job_store else []
+
+        def on_queued(prompt_id: str):
+            entry.prompt_ids.append(prompt_id)
+            self._publish(key, entry)
+
+        self._publish(key, entry)
+        try:
+            with track_prompts(on_queued=on_queued, resume_prompt_ids=resume_ids):
+                result = func()
+            if is_success is not None and not is_success(result):
+                entry.state = "failed"
+                return result, False
+            self._store_result(entry, result)
+            entry.state = "done"
+            return result, False
+        except Exception as e:
+            entry.error = str(e)
+            entry.state = "failed"
+            raise
+        finally:
+            entry.finished_at = time.time()
+            self._publish(key, entry)
+            entry.done.set()
+
+    def get(self, key: str, tenant: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """테넌트의 키 상태 조회 (없거나 만료되면 None, 다른 워커가 실행한 키는 공유 기록)"""
+        try:
+            key = scoped_key(key, tenant)
+        except IdempotencyConflictError:
+            return None
+        with self._lock:
+            self._purge_locked()
+            entry = self._entries.get(key)
+            if entry:
+                return entry.to_dict()
+        record = get_shared_state().get(IDEMPOTENCY, key)
+        if record is None:
+            return None
+        return {k: v for k, v in record.items() if k not in ("fingerprint", "owner", "result")}
+
+
+# 싱글톤 인스턴스
+_idempotency_store: Optional[IdempotencyStore] = None
+_store_lock = threading.Lock()
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    """IdempotencyStore 싱글톤 인스턴스"""
+    global _idempotency_store
+    if _idempotency_store is None:
+        with _store_lock:
+            if _idempotency_store is None:
+                from .comfyui_workflows import load_image_editing_config
+
+                config = load_image_editing_config().get("comfyui", {}).get("idempotency", {})
+                _idempotency_store = IdempotencyStore(
+                    ttl=config.get("ttl", 3600),
+                    max_entries=config.get("max_entries", 256)
+                )
+    return _idempotency_store
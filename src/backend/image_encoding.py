@@ -0,0 +1,228 @@
+# image_encoding.py
+"""
+출력 이미지 인코딩
+- output_format: png(compress_level) / webp / jpeg / avif (+ quality)
+- 인코딩은 별도 프로세스 풀에서 수행 (GIL/이벤트 루프와 분리, 동시 작업 수 제한)
+- 투명도(알파)가 있는 이미지는 투명도를 유지할 수 있는 포맷으로만 저장
+  (jpeg 요청 시 webp로 대체 - 캘리그라피/제품 배경 제거 레이어)
+
+주의: 워커 프로세스는 spawn으로 시작하므로 이 모듈은 torch 등 무거운 모듈을 import하지 않음
+"""
+import io
+import logging
+import threading
+import multiprocessing
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from PIL import Image
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_FORMATS = ("png", "webp", "jpeg", "avif")
+_FORMAT_ALIASES = {"jpg": "jpeg"}
+
+# PIL 저장 포맷 이름
+_PIL_FORMATS = {"png": "PNG", "webp": "WEBP", "jpeg": "JPEG", "avif": "AVIF"}
+
+
+@dataclass(frozen=True)
+class EncodeOptions:
+    """출력 인코딩 옵션"""
+    format: str = "png"
+    quality: int = 90                     # webp / jpeg / avif
+    compress_level: Optional[int] = None  # png 전용 (0~9), None이면 설정 기본값
+    webp_method: int = 4                  # webp 속도/압축 트레이드오프 (0=빠름, 6=느림)
+
+
+def _has_alpha(image: Image.Image) -> bool:
+    return image.mode in ("RGBA", "LA", "PA") or (
+        image.mode == "P" and "transparency" in image.info
+    )
+
+
+def _avif_supported() -> bool:
+    """AVIF 저장 가능 여부 (Pillow 11.2+ 내장 또는 pillow-avif-plugin)"""
+    try:
+        import pillow_avif  # noqa: F401
+    except ImportError:
+        pass
+    Image.init()
+    return "AVIF" in Image.SAVE
+
+
+def _encode_pil(image: Image.Image, options: EncodeOptions, default_compress_level: int) -> bytes:
+    """PIL 이미지를 지정한 포맷으로 인코딩 (워커 프로세스에서 실행)"""
+    fmt = options.format
+    alpha = _has_alpha(image)
+
+    if fmt == "avif" and not _avif_supported():
+        fmt = "webp"
+    if fmt == "jpeg" and alpha:
+        # jpeg는 알파 채널을 지원하지 않으므로 투명도를 유지할 수 있는 webp로 대체
+        fmt = "webp"
+
+    if fmt == "jpeg":
+        image = image.convert("RGB") if image.mode not in ("RGB", "L") else image
+    elif image.mode not in ("RGB", "RGBA", "L", "LA"):
+        image = image.convert("RGBA" if alpha else "RGB")
+
+    buf = io.BytesIO()
+    if fmt == "png":
+        level = options.compress_level if options.compress_level is not None else default_compress_level
+        image.save(buf, format="PNG", compress_level=level)
+    elif fmt == "webp":
+        image.save(buf, format="WEBP", quality=options.quality, method=options.webp_method)
+    elif fmt == "jpeg":
+        image.save(buf, format="JPEG", quality=options.quality)
+    else:
+        image.save(buf, format=_PIL_FORMATS[fmt], quality=options.quality)
+    return buf.getvalue()
+
+
+def _encode_raw(mode: str, size: tuple, data: bytes,
+                options: EncodeOptions, default_compress_level: int) -> bytes:
+    """워커 진입점: 픽셀 버퍼 → 인코딩 (PIL 이미지 객체 대신 원시 바이트를 전달)"""
+    image = Image.frombytes(mode, size, data)
+    return _encode_pil(image, options, default_compress_level)
+
+
+def _transcode(data: bytes, options: EncodeOptions, default_compress_level: int) -> bytes:
+    """워커 진입점: 인코딩된 이미지 바이트 → 다른 포맷으로 재인코딩"""
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return _encode_pil(image, options, default_compress_level)
+
+
+class ImageEncoderPool:
+    """
+    인코딩 전용 프로세스 풀 (동시 제출 수 제한)
+
+    workers=0 이거나 풀이 손상되면 호출 스레드에서 직접 인코딩
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 8, default_compress_level: int = 6):
+        self.workers = workers
+        self.default_compress_level = default_compress_level
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                # CUDA가 초기화된 부모 프로세스를 fork하지 않도록 spawn 사용
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def run(self, func, *args) -> bytes:
+        """func(*args, default_compress_level)을 풀에서 실행하고 결과 대기"""
+        args = args + (self.default_compress_level,)
+        with self._slots:
+            executor = self._get_executor()
+            if executor is None:
+                return func(*args)
+            try:
+                return executor.submit(func, *args).result()
+            except BrokenProcessPool:
+                logger.warning("⚠️ 인코딩 프로세스 풀 손상 - 풀을 재생성하고 현재 스레드에서 인코딩합니다")
+                with self._lock:
+                    self._executor = None
+                return func(*args)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# 싱글톤 인스턴스
+_encoder_pool: Optional[ImageEncoderPool] = None
+_encoder_pool_lock = threading.Lock()
+
+
+def _load_encoding_config() -> dict:
+    from .comfyui_workflows import load_image_editing_config
+
+    return load_image_editing_config().get("image_processing", {}).get("output_encoding", {})
+
+
+def get_encoder_pool() -> ImageEncoderPool:
+    """ImageEncoderPool 싱글톤 인스턴스"""
+    global _encoder_pool
+    if _encoder_pool is None:
+        with _encoder_pool_lock:
+            if _encoder_pool is None:
+                config = _load_encoding_config()
+                _encoder_pool = ImageEncoderPool(
+                    workers=config.get("pool_workers", 2),
+                    max_pending=config.get("max_pending", 8),
+                    default_compress_level=config.get("png_compress_level", 6)
+                )
+    return _encoder_pool
+
+
+def resolve_encode_options(
+    output_format: Optional[str] = None,
+    quality: Optional[int] = None,
+    compress_level: Optional[int] = None
+) -> EncodeOptions:
+    """
+    요청 파라미터 + 설정 기본값으로 EncodeOptions 생성
+
+    Raises:
+        ValueError: 지원하지 않는 포맷 또는 범위를 벗어난 값
+    """
+    config = _load_encoding_config()
+    fmt = (output_format or config.get("default_format", "png")).lower()
+    fmt = _FORMAT_ALIASES.get(fmt, fmt)
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError(f"지원하지 않는 출력 포맷입니다: {output_format} (지원: {', '.join(SUPPORTED_FORMATS)})")
+
+    if quality is None:
+        quality = config.get("quality", 90)
+    if not 1 <= quality <= 100:
+        raise ValueError(f"quality는 1~100 사이여야 합니다: {quality}")
+    if compress_level is not None and not 0 <= compress_level <= 9:
+        raise ValueError(f"compress_level은 0~9 사이여야 합니다: {compress_level}")
+
+    return EncodeOptions(
+        format=fmt,
+        quality=quality,
+        compress_level=compress_level,
+        webp_method=config.get("webp_method", 4)
+    )
+
+
+@metrics.timed("encoding")
+def encode_image(image: Image.Image, options: Optional[EncodeOptions] = None) -> bytes:
+    """PIL 이미지 인코딩 (프로세스 풀)"""
+    options = options or resolve_encode_options()
+    if image.mode in ("P", "PA"):
+        # 팔레트는 원시 바이트로 전달되지 않으므로 미리 변환
+        image = image.convert("RGBA" if _has_alpha(image) else "RGB")
+    return get_encoder_pool().run(_encode_raw, image.mode, image.size, image.tobytes(), options)
+
+
+@metrics.timed("encoding")
+def transcode_image(data: bytes, options: Optional[EncodeOptions] = None) -> bytes:
+    """
+    인코딩된 이미지(ComfyUI SaveImage PNG 등)를 요청 포맷으로 재인코딩
+
+    PNG → PNG이고 compress_level을 지정하지 않았으면 디코딩 없이 그대로 반환
+    """
+    options = options or resolve_encode_options()
+    if options.format == "png" and options.compress_level is None and data.startswith(b"\x89PNG"):
+        return data
+    return get_encoder_pool().run(_transcode, data, options)
+
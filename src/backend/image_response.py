@@ -0,0 +1,297 @@
+# image_response.py
+"""
+이미지 응답 직렬화 (Content Negotiation)
+- Accept: image/*      → 이미지 바이트 그대로 반환, 메타데이터는 X-* 헤더
+- Accept: multipart/*  → multipart/mixed (JSON 메타데이터 파트 + 이미지 파트들)
+- Accept: application/vnd.artifact+json → 이미지는 아티팩트 저장소에 저장하고 ID / 다운로드 URL만 JSON으로 반환
+- 그 외 (application/json, */*) → 기존 Base64-in-JSON (레거시 호환)
+- 아티팩트 다운로드 응답 (ETag / 304 / Range 206 / 416)
+"""
+import json
+import uuid
+import base64
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+# 응답 모드
+FORMAT_BINARY = "binary"
+FORMAT_MULTIPART = "multipart"
+FORMAT_JSON = "json"
+FORMAT_ARTIFACT = "artifact"
+
+ARTIFACT_MEDIA_TYPE = "application/vnd.artifact+json"
+
+# ?response_format= 쿼리로 강제 지정 시 허용 값
+_FORMAT_ALIASES = {
+    "binary": FORMAT_BINARY,
+    "image": FORMAT_BINARY,
+    "multipart": FORMAT_MULTIPART,
+    "json": FORMAT_JSON,
+    "base64": FORMAT_JSON,
+    "artifact": FORMAT_ARTIFACT,
+    "url": FORMAT_ARTIFACT
+}
+
+META_HEADER_PREFIX = "X-Image-"
+
+# 매직 바이트 → MIME 타입
+_MAGIC_MEDIA_TYPES = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF8", "image/gif")
+]
+
+
+def detect_media_type(data: bytes) -> str:
+    """이미지 바이트의 MIME 타입 추정 (알 수 없으면 application/octet-stream)"""
+    for magic, media_type in _MAGIC_MEDIA_TYPES:
+        if data.startswith(magic):
+            return media_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[4:12] in (b"ftypavif", b"ftypavis"):
+        return "image/avif"
+    return "application/octet-stream"
+
+
+def negotiate_format(request: Request) -> str:
+    """
+    요청의 Accept 헤더(또는 ?response_format=)로 응답 모드 결정
+
+    명시적으로 image/* 또는 multipart/*를 요청한 경우에만 바이너리로 응답하고,
+    기존 클라이언트(Accept 없음, */*, application/json)는 Base64 JSON을 유지
+    """
+    forced = request.query_params.get("response_format")
+    if forced:
+        return _FORMAT_ALIASES.get(forced.lower(), FORMAT_JSON)
+
+    accept = request.headers.get("accept", "").lower()
+    media_ranges = [part.split(";")[0].strip() for part in accept.split(",")]
+    for media_range in media_ranges:
+        if media_range.startswith("multipart/"):
+            return FORMAT_MULTIPART
+        if media_range.startswith("image/"):
+            return FORMAT_BINARY
+        if media_range == ARTIFACT_MEDIA_TYPE:
+            return FORMAT_ARTIFACT
+    return FORMAT_JSON
+
+
+def metadata_headers(metadata: Dict[str, Any]) -> Dict[str, str]:
+    """
+    메타데이터 → X-Image-* 헤더 (None 제외, 비 ASCII 값은 퍼센트 인코딩)
+
+    예: {"seed": 42, "elapsed_time": 12.3} → {"X-Image-Seed": "42", "X-Image-Elapsed-Time": "12.3"}
+    """
+    headers = {}
+    for key, value in metadata.items():
+        if value is None:
+            continue
+        name = META_HEADER_PREFIX + "-".join(word.capitalize() for word in key.split("_"))
+        if isinstance(value, float):
+            value = round(value, 3)
+        elif isinstance(value, (list, tuple)):
+            value = ",".join(str(v) for v in value)  # 예: seeds [1, 2] → "1,2"
+        headers[name] = quote(str(value), safe=" ,.:/=+-_()[]")
+    if headers:
+        headers["Access-Control-Expose-Headers"] = ", ".join(headers)
+    return headers
+
+
+def parse_metadata_headers(headers) -> Dict[str, str]:
+    """X-Image-* 헤더 → 메타데이터 dict (metadata_headers의 역변환, 값은 문자열)"""
+    metadata = {}
+    prefix = META_HEADER_PREFIX.lower()
+    for name, value in headers.items():
+        if name.lower().startswith(prefix):
+            key = name[len(prefix):].lower().replace("-", "_")
+            metadata[key] = unquote(value)
+    return metadata
+
+
+def encode_multipart(
+    metadata: Dict[str, Any],
+    images: List[Tuple[str, bytes]],
+    boundary: Optional[str] = None
+) -> Tuple[bytes, str]:
+    """
+    multipart/mixed 본문 생성
+
+    Args:
+        metadata: 첫 번째 파트에 들어갈 JSON 메타데이터
+        images: (파트 이름, 이미지 바이트) 목록 - 바이트가 None이면 생략
+
+    Returns:
+        (본문 바이트, Content-Type 헤더 값)
+    """
+    boundary = boundary or uuid.uuid4().hex
+    delimiter = f"--{boundary}\r\n".encode("ascii")
+
+    chunks = [
+        delimiter,
+        b'Content-Type: application/json; charset=utf-8\r\n'
+        b'Content-Disposition: inline; name="metadata"\r\n\r\n',
+        json.dumps(metadata, ensure_ascii=False).encode("utf-8"),
+        b"\r\n"
+    ]
+    for name, data in images:
+        if data is None:
+            continue
+        media_type = detect_media_type(data)
+        extension = media_type.split("/")[-1] if media_type.startswith("image/") else "bin"
+        chunks += [
+            delimiter,
+            f"Content-Type: {media_type}\r\n"
+            f'Content-Disposition: inline; name="{name}"; filename="{name}.{extension}"\r\n'
+            f"Content-Length: {len(data)}\r\n\r\n".encode("ascii"),
+            data,
+            b"\r\n"
+        ]
+    chunks.append(f"--{boundary}--\r\n".encode("ascii"))
+
+    return b"".join(chunks), f"multipart/mixed; boundary={boundary}"
+
+
+def decode_multipart(body: bytes, content_type: str) -> Tuple[Dict[str, Any], Dict[str, bytes]]:
+    """
+    encode_multipart 응답 파싱 (클라이언트/벤치마크용)
+
+    Returns:
+        (메타데이터 dict, {파트 이름: 바이트})
+    """
+    boundary = None
+    for param in content_type.split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "boundary":
+            boundary = value.strip('"')
+    if not boundary:
+        raise ValueError("multipart boundary가 없습니다.")
+
+    metadata: Dict[str, Any] = {}
+    parts: Dict[str, bytes] = {}
+    delimiter = f"--{boundary}".encode("ascii")
+
+    for raw_part in body.split(delimiter)[1:]:
+        if raw_part.startswith(b"--"):
+            break
+        head, _, data = raw_part.partition(b"\r\n\r\n")
+        data = data[:-2] if data.endswith(b"\r\n") else data
+
+        name = None
+        part_type = ""
+        for line in head.decode("latin-1").split("\r\n"):
+            header, _, value = line.partition(":")
+            header = header.strip().lower()
+            if header == "content-type":
+                part_type = value.strip().lower()
+            elif header == "content-disposition":
+                for param in value.split(";"):
+                    key, _, val = param.strip().partition("=")
+                    if key == "name":
+                        name = val.strip('"')
+
+        if part_type.startswith("application/json"):
+            metadata = json.loads(data.decode("utf-8"))
+        elif name:
+            parts[name] = data
+
+    return metadata, parts
+
+
+def build_image_response(
+    response_format: str,
+    images: List[Tuple[str, Optional[bytes]]],
+    metadata: Dict[str, Any],
+    legacy_body: Dict[str, Any],
+    on_artifacts: Optional[Callable[[List[str]], None]] = None
+) -> Response:
+    """
+    협상된 모드로 이미지 응답 생성
+
+    Args:
+        response_format: negotiate_format() 결과
+        images: (파트 이름, 이미지 바이트) 목록 - 첫 번째가 대표 이미지
+        metadata: seed, 소요 시간, 실험 이름 등
+        legacy_body: JSON 모드 응답 본문 (이미지 필드 제외)
+            - 각 이미지는 "{파트 이름}_base64" 키로 추가됨
+            - 아티팩트 모드는 metadata와 합친 뒤 "{파트 이름}_artifact_id" / "{파트 이름}_url" 키로 추가됨
+              (아티팩트 저장소가 꺼져 있으면 JSON 모드)
+        on_artifacts: 아티팩트 모드에서 저장한 아티팩트 ID 목록을 받는 콜백 (작업 기록)
+    """
+    if response_format == FORMAT_BINARY:
+        data = images[0][1]
+        # 대표 이미지 외의 출력이 있으면 multipart로 받을 수 있음을 알림
+        extra = [name for name, part in images[1:] if part is not None]
+        if extra:
+            metadata = {**metadata, "additional_parts": ",".join(extra)}
+        headers = metadata_headers(metadata)
+        return Response(content=data, media_type=detect_media_type(data), headers=headers)
+
+    if response_format == FORMAT_MULTIPART:
+        body, content_type = encode_multipart(metadata, images)
+        return Response(content=body, headers={"Content-Type": content_type})
+
+    if response_format == FORMAT_ARTIFACT:
+        from .artifacts import artifact_settings, get_artifact_store
+
+        if artifact_settings()["enabled"]:
+            store = get_artifact_store()
+            body = {**metadata, **legacy_body}
+            artifact_ids = []
+            for name, data in images:
+                artifact = store.put(data) if data is not None else None
+                body[f"{name}_artifact_id"] = artifact.artifact_id if artifact else None
+                body[f"{name}_url"] = artifact.url if artifact else None
+                if artifact:
+                    artifact_ids.append(artifact.artifact_id)
+            if on_artifacts is not None:
+                on_artifacts(artifact_ids)
+            return JSONResponse(content=body)
+
+    body = dict(legacy_body)
+    for name, data in images:
+        body[f"{name}_base64"] = base64.b64encode(data).decode("utf-8") if data is not None else None
+    return JSONResponse(content=body)
+
+
+def build_artifact_response(request: Request, artifact) -> Response:
+    """
+    아티팩트 다운로드 응답 (GET / HEAD /api/artifacts/{id})
+
+    - ETag = 아티팩트 ID (내용 해시) → If-None-Match가 같으면 304
+    - Range: bytes=start-end 단일 범위 → 206 (If-Range가 ETag와 다르면 전체), 만족할 수 없으면 416
+    - HEAD는 본문 없이 GET과 같은 헤더 (Content-Length 포함)
+
+    Args:
+        artifact: artifacts.Artifact
+    """
+    from .artifacts import artifact_cache_control, parse_byte_range
+
+    headers = {"ETag": artifact.etag, "Cache-Control": artifact_cache_control(), "Accept-Ranges": "bytes"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if "*" in tags or artifact.etag in tags:
+            return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if not if_range or if_range.strip() == artifact.etag:
+        try:
+            byte_range = parse_byte_range(request.headers.get("range"), artifact.size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{artifact.size}"})
+
+    status_code = 200
+    start, end = 0, artifact.size - 1
+    if byte_range is not None:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{artifact.size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    content = b"" if request.method == "HEAD" else artifact.read(start, end)
+    return Response(content=content, status_code=status_code, media_type=artifact.media_type, headers=headers)
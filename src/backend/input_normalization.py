@@ -0,0 +1,224 @@
+# input_normalization.py
+"""
+입력 이미지 정규화 (I2I / 편집 - ComfyUI 업로드 전)
+- 한 번만 디코딩 → EXIF 회전 적용 → 모델 max_size / 메가픽셀 예산에 맞게 축소 → 빠른 재인코딩
+  - JPEG는 draft 모드로 디코딩 단계에서 1/2~1/8 축소 (전체 해상도 디코딩 생략)
+  - 회전/축소가 필요 없으면 원본을 그대로 업로드 (재인코딩 없음)
+- 정규화 결과는 내용 해시(+ 목표 크기)로 캐시 (같은 사진으로 반복 편집 시 재사용)
+- 선택: 결과 이미지를 원본 크기로 다시 확대 (restore_size)
+
+설정: configs/image_editing_config.yaml: image_processing.input_normalization
+"""
+import io
+import math
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from . import metrics, tracing
+from .image_encoding import EncodeOptions, encode_image
+from .uploads import ImageSource, InputImage, image_source_size, open_image_source
+
+logger = logging.getLogger(__name__)
+
+SIZE_ALIGNMENT = 8  # VAE 다운샘플 배수 (정규화 크기는 8의 배수)
+_EXIF_ORIENTATION = 0x0112
+
+
+@dataclass(frozen=True)
+class NormalizedImage:
+    """정규화된 입력 이미지"""
+    source: ImageSource          # ComfyUI에 업로드할 이미지 (변경 없으면 원본 그대로)
+    original_size: Tuple[int, int]
+    size: Tuple[int, int]
+    transformed: bool = False    # 회전/축소 여부 (False면 source는 원본)
+
+    @property
+    def downscaled(self) -> bool:
+        return self.size != self.original_size and (
+            self.size[0] * self.size[1] < self.original_size[0] * self.original_size[1]
+        )
+
+
+def load_input_normalization_config() -> Dict[str, Any]:
+    """configs/image_editing_config.yaml: image_processing.input_normalization"""
+    from .comfyui_workflows import load_image_editing_config
+
+    return load_image_editing_config().get("image_processing", {}).get("input_normalization", {})
+
+
+def _content_hash(image: ImageSource) -> bytes:
+    if isinstance(image, InputImage):
+        return image.sha256()
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(image).digest()
+    digest = hashlib.sha256()
+    stream = open_image_source(image)
+    for chunk in iter(lambda: stream.read(1024 * 1024), b""):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.digest()
+
+
+def fit_size(
+    size: Tuple[int, int],
+    max_size: Optional[Tuple[int, int]] = None,
+    max_megapixels: Optional[float] = None
+) -> Tuple[int, int]:
+    """
+    비율을 유지하며 max_size(가로, 세로)와 메가픽셀 예산 안에 들어가는 크기 (확대하지 않음)
+
+    축소할 때만 8의 배수로 내림 (원본 크기가 예산 안이면 그대로 반환)
+    """
+    width, height = size
+    scale = 1.0
+    if max_size:
+        scale = min(scale, max_size[0] / width, max_size[1] / height)
+    if max_megapixels:
+        scale = min(scale, math.sqrt(max_megapixels * 1_000_000 / (width * height)))
+    if scale >= 1.0:
+        return width, height
+    return (
+        max(SIZE_ALIGNMENT, int(width * scale) // SIZE_ALIGNMENT * SIZE_ALIGNMENT),
+        max(SIZE_ALIGNMENT, int(height * scale) // SIZE_ALIGNMENT * SIZE_ALIGNMENT)
+    )
+
+
+class InputNormalizer:
+    """입력 이미지 정규화 + 내용 해시 LRU 캐시 (스레드 안전)"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.enabled = config.get("enabled", True)
+        self.max_megapixels = config.get("max_megapixels", 2.0)
+        self.default_max_size = tuple(config.get("default_max_size", [2048, 2048]))
+        self.restore_output_size = config.get("restore_output_size", False)
+        self.encoding = EncodeOptions(
+            format=config.get("format", "png"),
+            quality=config.get("quality", 95),
+            compress_level=config.get("png_compress_level", 1)
+        )
+        self.cache_size = config.get("cache_size", 32)
+        self.cache_max_bytes = config.get("cache_max_mb", 256) * 1024 * 1024
+        # 키 → (정규화 바이트 또는 None(변환 불필요), 원본 크기, 정규화 크기)
+        self._cache: "OrderedDict[tuple, Tuple[Optional[bytes], Tuple[int, int], Tuple[int, int]]]" = OrderedDict()
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+
+    def _cache_get(self, key: tuple):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+            return entry
+
+    def _cache_put(self, key: tuple, data: Optional[bytes], original_size: Tuple[int, int], size: Tuple[int, int]):
+        nbytes = len(data) if data is not None else 0
+        if self.cache_size <= 0 or nbytes > self.cache_max_bytes:
+            return
+        with self._lock:
+            previous = self._cache.pop(key, None)
+            if previous is not None and previous[0] is not None:
+                self._cache_bytes -= len(previous[0])
+            self._cache[key] = (data, original_size, size)
+            self._cache_bytes += nbytes
+            while len(self._cache) > self.cache_size or self._cache_bytes > self.cache_max_bytes:
+                _, (evicted, _, _) = self._cache.popitem(last=False)
+                if evicted is not None:
+                    self._cache_bytes -= len(evicted)
+
+    @tracing.traced("input.normalize")
+    @metrics.timed("input_normalization")
+    def normalize(
+        self,
+        image: ImageSource,
+        max_size: Optional[Tuple[int, int]] = None
+    ) -> NormalizedImage:
+        """
+        입력 이미지 정규화
+
+        Args:
+            image: 입력 이미지 (바이트, 파일 객체 또는 InputImage)
+            max_size: 모델 최대 크기 (가로, 세로), 없으면 설정의 default_max_size
+
+        Returns:
+            NormalizedImage (변환이 없으면 source는 입력 그대로, 캐시되지 않음)
+
+        Raises:
+            ValueError: 이미지로 디코딩할 수 없는 입력
+        """
+        max_size = tuple(max_size or self.default_max_size)
+        if not self.enabled:
+            return NormalizedImage(source=image, original_size=(0, 0), size=(0, 0))
+
+        key = (_content_hash(image), max_size, self.max_megapixels, self.encoding)
+        cached = self._cache_get(key)
+        if cached is not None:
+            data, original_size, size = cached
+            metrics.increment("input_normalization_cache_hits_total")
+            if data is None:
+                return NormalizedImage(source=image, original_size=original_size, size=size)
+            return NormalizedImage(source=data, original_size=original_size, size=size, transformed=True)
+
+        try:
+            decoded = Image.open(open_image_source(image))
+            orientation = decoded.getexif().get(_EXIF_ORIENTATION, 1)
+            rotated = orientation in (5, 6, 7, 8)
+            stored_size = decoded.size
+            original_size = stored_size[::-1] if rotated else stored_size
+            target = fit_size(original_size, max_size, self.max_megapixels)
+
+            if target == original_size and orientation == 1:
+                # 원본은 캐시에 두지 않고 "변환 불필요" 판정만 저장
+                self._cache_put(key, None, original_size, original_size)
+                return NormalizedImage(source=image, original_size=original_size, size=original_size)
+
+            # JPEG: 목표 크기 이상을 유지하는 범위에서 디코딩 단계 축소 (회전 전 기준 크기)
+            decoded.draft("RGB", target[::-1] if rotated else target)
+            decoded = ImageOps.exif_transpose(decoded)
+            if decoded.mode not in ("RGB", "RGBA", "L", "LA"):
+                decoded = decoded.convert("RGBA" if decoded.has_transparency_data else "RGB")
+            if decoded.size != target:
+                decoded = decoded.resize(target, Image.LANCZOS, reducing_gap=2.0)
+            data = encode_image(decoded, self.encoding)
+        except (OSError, SyntaxError, Image.DecompressionBombError) as e:  # UnidentifiedImageError 포함
+            raise ValueError(f"입력 이미지를 읽을 수 없습니다: {e}")
+
+        logger.info(
+            f"📐 입력 이미지 정규화: {original_size[0]}x{original_size[1]} → {target[0]}x{target[1]} "
+            f"(EXIF 회전={orientation}, {image_source_size(image) / 1024:.0f}KB → {len(data) / 1024:.0f}KB)"
+        )
+        self._cache_put(key, data, original_size, target)
+        return NormalizedImage(source=data, original_size=original_size, size=target, transformed=True)
+
+    def should_restore(self, normalized: NormalizedImage, restore: Optional[bool] = None) -> bool:
+        """결과를 원본 크기로 확대할지 (요청 값 우선, 없으면 설정)"""
+        if restore is None:
+            restore = self.restore_output_size
+        return bool(restore) and normalized.downscaled
+
+    @tracing.traced("output.restore_size")
+    def restore_size(self, image_bytes: bytes, normalized: NormalizedImage) -> Image.Image:
+        """결과 이미지를 원본 입력 크기로 확대 (인코딩은 호출자가 요청 포맷으로 수행)"""
+        image = Image.open(io.BytesIO(image_bytes))
+        return image.resize(normalized.original_size, Image.LANCZOS)
+
+
+# 싱글톤 인스턴스
+_input_normalizer: Optional[InputNormalizer] = None
+_normalizer_lock = threading.Lock()
+
+
+def get_input_normalizer() -> InputNormalizer:
+    """InputNormalizer 싱글톤 인스턴스"""
+    global _input_normalizer
+    if _input_normalizer is None:
+        with _normalizer_lock:
+            if _input_normalizer is None:
+                _input_normalizer = InputNormalizer(load_input_normalization_config())
+    return _input_normalizer
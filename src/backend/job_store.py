@@ -0,0 +1,356 @@
+# job_store.py
+"""
+작업 기록 저장소 (SQLite) - 백엔드 재시작 후에도 진행 중이던 작업의 결과를 회수
+- 요청마다 작업 1개 기록: 엔드포인트, 요청 파라미터, Idempotency-Key, ComfyUI 주소, prompt_id, 상태, 아티팩트 ID
+  - 상태: running → done / failed (재시작으로 주인 프로세스가 사라진 작업은 recovering → recovered / failed)
+  - 주인 = 작업을 시작한 워커 (shared_state.INSTANCE_ID), 하트비트가 끊긴 워커의 작업만 회수 대상
+    (여러 워커가 같은 파일을 공유해도 다른 워커가 실행 중인 작업은 건드리지 않음)
+- 재시작 시 (startup): 이전 프로세스의 running 작업을 백그라운드에서 회수 (리더 워커만)
+  - prompt가 아직 큐에 있으면 완료까지 대기, 끝났으면 /history에서 출력 이미지를 받아 아티팩트 저장소에 저장
+  - 회수한 결과는 ComfyUI 출력 그대로 (후처리 전) → GET /api/jobs/{job_id}, GET /api/requests/{key}에서 URL로 제공
+  - 회수 후에도 히스토리는 삭제하지 않음: 같은 Idempotency-Key로 재시도하면 기존 prompt에 재연결해
+    후처리까지 정상 응답 (GPU 재실행 없음)
+  - 같은 요청에 합쳐졌던(coalesced) 작업은 prompt가 없으므로 같은 요청 키의 회수 결과를 공유
+- 웹소켓 출력(SaveImageWebsocket)만 쓰는 작업은 디스크/히스토리에 이미지가 없어 회수할 수 없음 (failed)
+
+설정: configs/image_editing_config.yaml: comfyui.jobs
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from . import metrics
+from .shared_state import INSTANCE_ID, get_shared_state
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DEFAULT_JOB_STORE_PATH = os.path.join(PROJECT_ROOT, "data", "jobs.sqlite3")
+
+UNFINISHED_STATES = ("running", "recovering")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    request_key TEXT,
+    idempotency_key TEXT,
+    params TEXT,
+    base_url TEXT,
+    prompt_ids TEXT NOT NULL DEFAULT '[]',
+    artifact_ids TEXT NOT NULL DEFAULT '[]',
+    state TEXT NOT NULL,
+    error TEXT,
+    owner TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_idempotency_key ON jobs (idempotency_key, created_at);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state);
+"""
+
+
+def load_jobs_config() -> Dict[str, Any]:
+    """configs/image_editing_config.yaml: comfyui.jobs"""
+    from .comfyui_workflows import load_image_editing_config
+
+    return load_image_editing_config().get("comfyui", {}).get("jobs", {})
+
+
+class JobStore:
+    """작업 기록 SQLite 저장소 (스레드 안전, WAL)"""
+
+    def __init__(
+        self,
+        path: str,
+        ttl: int = 7 * 86400,
+        max_jobs: int = 10000,
+        base_url: str = "http://localhost:8188"
+    ):
+        """
+        Args:
+            path: SQLite 파일 경로 (":memory:" 가능)
+            ttl: 끝난 작업 보관 시간 (초)
+            max_jobs: 최대 보관 작업 수 (초과 시 오래된 끝난 작업부터 삭제)
+            base_url: 작업을 실행하는 ComfyUI 주소 (create에서 지정하지 않은 경우)
+        """
+        self.path = path
+        self.base_url = base_url
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._inserts = 0
+        self.purge()
+
+    # ---------- 기록 ----------
+    def create(
+        self,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        request_key: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
+        base_url: Optional[str] = None
+    ) -> str:
+        """running 작업 추가 → job_id"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, endpoint, request_key, idempotency_key, params, base_url,"
+                " state, owner, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, 'running', ?, ?, ?)",
+                (job_id, endpoint, request_key, idempotency_key,
+                 json.dumps(params or {}, ensure_ascii=False, default=str), base_url or self.base_url,
+                 INSTANCE_ID, now, now)
+            )
+            self._inserts += 1
+            purge = self._inserts % 100 == 0
+        if purge:
+            self.purge()
+        return job_id
+
+    def add_prompt(self, job_id: str, prompt_id: str):
+        """ComfyUI에 등록(또는 재연결)한 prompt_id 추가"""
+        with self._lock:
+            row = self._conn.execute("SELECT prompt_ids FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            prompt_ids = json.loads(row["prompt_ids"])
+            if prompt_id not in prompt_ids:
+                prompt_ids.append(prompt_id)
+            self._conn.execute(
+                "UPDATE jobs SET prompt_ids = ?, updated_at = ? WHERE job_id = ?",
+                (json.dumps(prompt_ids), time.time(), job_id)
+            )
+
+    def set_artifacts(self, job_id: str, artifact_ids: List[str]):
+        """결과 아티팩트 ID 기록 (아티팩트 응답 / 재시작 후 회수)"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET artifact_ids = ?, updated_at = ? WHERE job_id = ?",
+                (json.dumps(artifact_ids), time.time(), job_id)
+            )
+
+    def finish(self, job_id: str, state: str, error: Optional[str] = None):
+        """작업 종료 (done / failed / recovered)"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, error = ?, updated_at = ?, finished_at = ? WHERE job_id = ?",
+                (state, error, now, now, job_id)
+            )
+        metrics.increment("jobs_finished_total", state=state)
+
+    # ---------- 조회 ----------
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["params"] = json.loads(job["params"] or "{}")
+        job["prompt_ids"] = json.loads(job["prompt_ids"])
+        job["artifact_ids"] = json.loads(job["artifact_ids"])
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def latest_for_key(self, idempotency_key: str) -> Optional[Dict[str, Any]]:
+        """Idempotency-Key로 기록된 가장 최근 작업"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE idempotency_key = ? ORDER BY created_at DESC LIMIT 1",
+                (idempotency_key,)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def resume_prompt_ids(self, idempotency_key: str, request_key: str) -> List[str]:
+        """
+        재시작 전 같은 키/같은 요청으로 등록한 prompt_id (멱등성 재시도 시 재연결 후보)
+
+        이 프로세스에서 실행 중인 작업(재시도 요청 자신)은 제외, 끝난 작업은 포함
+        (히스토리가 남아 있으면 재연결 - 살아 있는지는 queue_prompt가 확인)
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT prompt_ids FROM jobs WHERE idempotency_key = ? AND request_key = ?"
+                " AND prompt_ids != '[]' AND NOT (owner = ? AND state = 'running')"
+                " ORDER BY created_at DESC LIMIT 1",
+                (idempotency_key, request_key, INSTANCE_ID)
+            ).fetchone()
+        return json.loads(row["prompt_ids"]) if row else []
+
+    def orphaned(self) -> List[Dict[str, Any]]:
+        """하트비트가 끊긴(종료/크래시한) 워커가 시작하고 끝내지 못한 작업 - prompt가 있는 작업 먼저"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM jobs WHERE state IN ({','.join('?' * len(UNFINISHED_STATES))}) ORDER BY created_at",
+                UNFINISHED_STATES
+            ).fetchall()
+        live = get_shared_state().live_instances()
+        jobs = [self._to_dict(row) for row in rows if row["owner"] not in live]
+        return sorted(jobs, key=lambda job: not job["prompt_ids"])
+
+    def claim(self, job_id: str, previous_owner: Optional[str]) -> bool:
+        """회수 시작 (이 워커가 주인이 됨, 다른 워커가 먼저 가져갔으면 False)"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET state = 'recovering', owner = ?, updated_at = ?"
+                " WHERE job_id = ? AND owner IS ?",
+                (INSTANCE_ID, time.time(), job_id, previous_owner)
+            )
+        return cursor.rowcount == 1
+
+    def recovered_twin(self, request_key: str) -> Optional[Dict[str, Any]]:
+        """같은 요청 키로 회수에 성공한 작업 (합쳐진 요청의 결과 공유)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE request_key = ? AND state = 'recovered'"
+                " ORDER BY finished_at DESC LIMIT 1",
+                (request_key,)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def purge(self):
+        """ttl이 지났거나 max_jobs를 넘는 끝난 작업 삭제"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (time.time() - self.ttl,)
+            )
+            self._conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND job_id NOT IN"
+                " (SELECT job_id FROM jobs ORDER BY created_at DESC LIMIT ?)",
+                (self.max_jobs,)
+            )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """상태별 작업 수 (/status)"""
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) AS count FROM jobs GROUP BY state").fetchall()
+        return {"path": self.path, "states": {row["state"]: row["count"] for row in rows}}
+
+
+# ===========================
+# 재시작 후 회수
+# ===========================
+def recover_job(store: JobStore, job: Dict[str, Any], timeout: int = 1800) -> str:
+    """
+    이전 프로세스의 작업 1개 회수 → 최종 상태 (recovered / failed)
+
+    prompt가 큐에 남아 있으면 완료를 기다리고, 히스토리의 출력 이미지를 아티팩트로 저장
+    """
+    from .artifacts import get_artifact_store
+    from .comfyui_client import ComfyUIClient
+
+    job_id = job["job_id"]
+    if not job["prompt_ids"]:
+        twin = store.recovered_twin(job["request_key"]) if job["request_key"] else None
+        if twin is None:
+            store.finish(job_id, "failed", "백엔드 재시작으로 중단됨 (ComfyUI 작업 등록 전)")
+            return "failed"
+        store.set_artifacts(job_id, twin["artifact_ids"])
+        store.finish(job_id, "recovered")
+        return "recovered"
+
+    client = ComfyUIClient(base_url=job["base_url"] or "http://localhost:8188", timeout=timeout)
+    artifact_store = get_artifact_store()
+    artifact_ids = []
+    try:
+        for prompt_id in job["prompt_ids"]:
+            if client.is_prompt_alive(prompt_id):
+                history = client.wait_for_completion(prompt_id)
+            else:
+                history = None
+            if history is None:
+                raise RuntimeError(f"ComfyUI 히스토리에 결과가 없습니다: {prompt_id}")
+            images = client.extract_output_images(history)
+            if not images:
+                raise RuntimeError(f"회수할 출력 이미지가 없습니다 (웹소켓 출력 작업일 수 있음): {prompt_id}")
+            artifact_ids += [artifact_store.put(image).artifact_id for image in images]
+    except Exception as e:
+        store.set_artifacts(job_id, artifact_ids)
+        store.finish(job_id, "failed", f"재시작 후 회수 실패: {e}")
+        logger.warning(f"⚠️ 작업 회수 실패 ({job_id}): {e}")
+        return "failed"
+
+    store.set_artifacts(job_id, artifact_ids)
+    store.finish(job_id, "recovered")
+    logger.info(f"♻️ 작업 회수 완료 ({job['endpoint']}, {job_id}): 이미지 {len(artifact_ids)}개")
+    return "recovered"
+
+
+def recover_orphaned_jobs(store: JobStore, timeout: int = 1800) -> Dict[str, int]:
+    """이전 프로세스가 끝내지 못한 작업 전부 회수 → 상태별 개수"""
+    counts: Dict[str, int] = {}
+    for job in store.orphaned():
+        if not store.claim(job["job_id"], job["owner"]):
+            continue
+        try:
+            state = recover_job(store, job, timeout)
+        except Exception as e:
+            store.finish(job["job_id"], "failed", f"재시작 후 회수 실패: {e}")
+            state = "failed"
+        counts[state] = counts.get(state, 0) + 1
+        metrics.increment("jobs_recovered_total", state=state)
+    if counts:
+        logger.info(f"♻️ 재시작 전 작업 회수: {counts}")
+    return counts
+
+
+def start_recovery():
+    """재시작 전 작업 회수 백그라운드 스레드 시작 (comfyui.jobs.recover_on_startup)"""
+    config = load_jobs_config()
+    store = get_job_store()
+    if store is None or not config.get("recover_on_startup", True):
+        return
+
+    def _run():
+        try:
+            recover_orphaned_jobs(store, config.get("recovery_timeout", 1800))
+        except Exception as e:
+            logger.warning(f"⚠️ 작업 회수 스레드 오류: {e}")
+
+    threading.Thread(target=_run, name="job-recovery", daemon=True).start()
+
+
+# 싱글톤 인스턴스
+_job_store: Optional[JobStore] = None
+_job_store_loaded = False
+_job_store_lock = threading.Lock()
+
+
+def get_job_store() -> Optional[JobStore]:
+    """JobStore 싱글톤 인스턴스 (comfyui.jobs.enabled가 false면 None)"""
+    global _job_store, _job_store_loaded
+    if not _job_store_loaded:
+        with _job_store_lock:
+            if not _job_store_loaded:
+                from .comfyui_workflows import load_image_editing_config
+
+                comfyui_config = load_image_editing_config().get("comfyui", {})
+                config = comfyui_config.get("jobs", {})
+                if config.get("enabled", True):
+                    path = config.get("path") or DEFAULT_JOB_STORE_PATH
+                    if path != ":memory:" and not os.path.isabs(path):
+                        path = os.path.join(PROJECT_ROOT, path)
+                    _job_store = JobStore(
+                        path,
+                        ttl=config.get("ttl", 7 * 86400),
+                        max_jobs=config.get("max_jobs", 10000),
+                        base_url=comfyui_config.get("base_url", "http://localhost:8188")
+                    )
+                _job_store_loaded = True
+    return _job_store
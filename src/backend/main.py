@@ -1,22 +1,44 @@
 # main.py (개선)
-import base64
+import json
 import time
 import logging
 import sys
 from typing import Optional, List
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-import asyncio
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from functools import partial
 
-from . import services
+from . import services, metrics, tracing, executors
+from .image_response import (
+    FORMAT_BINARY,
+    FORMAT_JSON,
+    FORMAT_MULTIPART,
+    negotiate_format,
+    build_image_response,
+    build_artifact_response,
+    detect_media_type
+)
+from .image_encoding import EncodeOptions, resolve_encode_options
+from .single_flight import get_single_flight, normalize_prompt, request_key
+from .idempotency import MAX_KEY_LENGTH, get_idempotency_store, scoped_key
+from .job_store import get_job_store
+from .comfyui_client import track_prompts
+from .drafts import get_draft_store, load_drafts_config
+from .streaming import sse_stream, load_streaming_config
+from .uploads import InputImage
+from .artifacts import get_artifact_store
+from .admission import PayloadLimitMiddleware, get_admission_controller
+from .tenancy import get_fair_scheduler, tenant_context, with_tenant
 from .exceptions import (
     ServiceError,
     PromptOptimizationError,
     ModelLoadError,
     WorkflowExecutionError,
     ImageProcessingError,
-    ConfigurationError
+    ConfigurationError,
+    IdempotencyConflictError,
+    AdmissionRejectedError
 )
 
 # 로깅 설정 - stdout으로 출력하여 uvicorn 로그에 포함
@@ -32,6 +54,66 @@ app = FastAPI(title="소상공인 AI 콘텐츠 API (개선)")
 # 서버 시작 시간 (재시작 감지용)
 SERVER_START_TIME = time.time()
 
+# 처리 중인 요청 본문 합계 제한 (초과 시 본문을 읽기 전에 429)
+app.add_middleware(PayloadLimitMiddleware)
+
+@app.middleware("http")
+async def record_request_duration(request: Request, call_next):
+    """요청 전체 소요 시간 (http_request_duration_seconds{method, route, status})"""
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # 경로 파라미터(draft_id 등)로 라벨이 늘어나지 않도록 라우트 템플릿 사용
+        route = request.scope.get("route")
+        metrics.observe(
+            "http_request_duration_seconds",
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status_code
+        )
+
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    """
+    요청 trace (응답에 Server-Timing 헤더, 느린 요청은 trace 로그로 내보냄)
+
+    trace 종료는 응답 본문 전송 후 (스트리밍 응답의 Server-Timing은 헤더 전송 시점까지의 span만 포함)
+    """
+    with tracing.start_trace(
+        f"{request.method} {request.url.path}",
+        traceparent=request.headers.get("traceparent"),
+        **{"http.method": request.method, "http.target": request.url.path}
+    ) as root:
+        try:
+            response = await call_next(request)
+        except Exception:
+            tracing.finish_trace(root, 500)
+            raise
+
+        route = getattr(request.scope.get("route"), "path", None)
+        if route:
+            root.name = f"{request.method} {route}"
+            root.set_attribute("http.route", route)
+        if tracing.get_trace_exporter().server_timing:
+            response.headers["Server-Timing"] = root.trace.server_timing(root)
+
+    body_iterator = response.body_iterator
+
+    async def finish_after_body():
+        try:
+            async for chunk in body_iterator:
+                yield chunk
+        finally:
+            tracing.finish_trace(root, response.status_code)
+
+    response.body_iterator = finish_after_body()
+    return response
+
 # Pydantic schemas
 class CaptionRequest(BaseModel):
     shop_name: str
@@ -44,7 +126,14 @@ class CaptionRequest(BaseModel):
 class CaptionResponse(BaseModel):
     output_text: str
 
-class T2IRequest(BaseModel):
+# 출력 인코딩 공통 파라미터 (생략 시 configs/image_editing_config.yaml: image_processing.output_encoding)
+class OutputEncodingParams(BaseModel):
+    output_format: Optional[str] = None  # "png", "webp", "jpeg", "avif"
+    quality: Optional[int] = None  # webp/jpeg/avif 품질 (1~100)
+    png_compress_level: Optional[int] = None  # png 압축 레벨 (0~9)
+    shop_name: Optional[str] = None  # 테넌트(가게) - X-Tenant-ID 헤더가 없을 때 사용 (comfyui.tenancy)
+
+class T2IRequest(OutputEncodingParams):
     prompt: str
     width: int = 1024
     height: int = 1024
@@ -54,12 +143,35 @@ class T2IRequest(BaseModel):
     enable_adetailer: bool = False  # legacy
     adetailer_targets: Optional[List[str]] = None
     model_name: Optional[str] = None  # 사용할 모델 이름 (프론트엔드에서 선택한 모델)
+    seed: Optional[int] = None  # 고정 seed (없으면 랜덤)
+    num_images: int = 1  # 같은 프롬프트로 한 번에 생성할 개수 (latent 배치)
+    prompt_variations: Optional[List[str]] = None  # 이미지마다 다른 프롬프트 (지정 시 prompt 대신 사용)
+    batch_index: Optional[int] = None  # 배치 결과 재현용 (seed + batch_index, num_images=1)
+
+# 초안 → 완성 (width/height/steps/guidance_scale은 완성 시 사용할 최종 설정)
+class DraftRequest(OutputEncodingParams):
+    prompt: str
+    width: int = 1024
+    height: int = 1024
+    steps: int = 28  # 완성 steps
+    guidance_scale: Optional[float] = None
+    num_drafts: Optional[int] = None  # 생략 시 comfyui.drafts.num_drafts
+    draft_steps: Optional[int] = None  # 생략 시 comfyui.drafts.steps
+    draft_scale: Optional[float] = None  # 초안 해상도 비율 (생략 시 comfyui.drafts.scale)
+    model_name: Optional[str] = None
+    seed: Optional[int] = None  # 지정 시 초안 seed는 seed, seed+1, ...
+
+class RefineDraftRequest(OutputEncodingParams):
+    index: int = 0  # 완성할 초안 번호
+    method: Optional[str] = None  # "full", "latent_upscale" (생략 시 설정값)
+    steps: Optional[int] = None
+    denoise: Optional[float] = None  # latent_upscale 2차 샘플링 강도
 
 class T2IResponse(BaseModel):
     image_base64: str
 
-class I2IRequest(BaseModel):
-    input_image_base64: str
+# I2I / 편집 파라미터 (입력 이미지 제외 - multipart 업로드는 params 필드에 JSON으로 전달)
+class I2IParams(OutputEncodingParams):
     prompt: str
     strength: float = 0.75
     width: int = 1024
@@ -70,11 +182,15 @@ class I2IRequest(BaseModel):
     enable_adetailer: bool = False  # legacy
     adetailer_targets: Optional[List[str]] = None
     model_name: Optional[str] = None  # 사용할 모델 이름 (프론트엔드에서 선택한 모델)
+    seed: Optional[int] = None  # 고정 seed (없으면 랜덤)
+    restore_input_size: Optional[bool] = None  # 축소된 입력의 결과를 원본 크기로 확대 (없으면 설정값)
+
+class I2IRequest(I2IParams):
+    input_image_base64: str
 
 # 🆕 이미지 편집 실험 스키마
-class ImageEditingRequest(BaseModel):
+class ImageEditingParams(OutputEncodingParams):
     experiment_id: str  # "portrait_mode", "product_mode", "hybrid_mode", "ben2_flux_fill"
-    input_image_base64: str
     prompt: str
     negative_prompt: Optional[str] = ""
     steps: Optional[int] = None
@@ -87,6 +203,10 @@ class ImageEditingRequest(BaseModel):
     denoise_strength: Optional[float] = 1.0  # 변경 강도
     blending_strength: Optional[float] = 0.35  # 합성 자연스러움 (Product)
     background_prompt: Optional[str] = None  # 배경 프롬프트 (Product)
+    restore_input_size: Optional[bool] = None  # 축소된 입력의 결과를 원본 크기로 확대 (없으면 설정값)
+
+class ImageEditingRequest(ImageEditingParams):
+    input_image_base64: str
 
 class ImageEditingResponse(BaseModel):
     success: bool
@@ -97,25 +217,225 @@ class ImageEditingResponse(BaseModel):
     error: Optional[str] = None
     elapsed_time: Optional[float] = None
 
-class CalligraphyRequest(BaseModel):
+class SwitchModelRequest(BaseModel):
+    model_name: str
+
+class CalligraphyRequest(OutputEncodingParams):
     text: str
     color_hex: str = "#FFFFFF"  # 기본값: 흰색
     style: str = "default"
     font_path: str = ""  # 비어있으면 기본 폰트 사용
 
+def resolve_encoding(req: OutputEncodingParams) -> EncodeOptions:
+    """요청의 출력 인코딩 파라미터 검증 (잘못된 값은 400)"""
+    try:
+        return resolve_encode_options(req.output_format, req.quality, req.png_compress_level)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+def admission_rejected(e: AdmissionRejectedError) -> HTTPException:
+    """수락 거절 → 429 + Retry-After"""
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+def resolve_tenant(request: Request, req: Optional[BaseModel] = None) -> str:
+    """테넌트 ID (X-Tenant-ID 헤더 → 요청 본문 shop_name → default_tenant)"""
+    scheduler = get_fair_scheduler()
+    return scheduler.resolve_tenant(request.headers.get(scheduler.header), getattr(req, "shop_name", None))
+
+def acquire_ticket(workflow: str, tenant: Optional[str]):
+    """가게별 GPU 사용 한도 확인 + 수락 티켓 (공유 상태 조회 - admission 풀에서 호출)"""
+    if tenant:
+        get_fair_scheduler().check_gpu_budget(tenant)
+    return get_admission_controller().admit(workflow)
+
+async def admit(workflow: str, tenant: str):
+    """
+    이미지 작업 수락 (가게별 GPU 사용 한도를 넘었거나 예상 완료 시간이 SLO를 넘으면 429)
+
+    공유 상태(sqlite 백엔드면 파일 잠금 + SQLite) 조회는 admission 풀에서 (이벤트 루프를 막지 않도록)
+    """
+    try:
+        return await executors.run_in("admission", acquire_ticket, workflow, tenant)
+    except AdmissionRejectedError as e:
+        raise admission_rejected(e)
+
+def release_when_done(ticket, func):
+    """func 실행이 끝나면 수락 티켓 해제 (스트리밍 작업용)"""
+    def run():
+        completed = False
+        try:
+            result = func()
+            completed = True
+            return result
+        finally:
+            ticket.release(record=completed)
+    return run
+
+def parse_form_params(model, params: str):
+    """multipart 요청의 params 필드(JSON) 검증 (잘못된 값은 422)"""
+    try:
+        return model.model_validate_json(params or "{}")
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=json.loads(e.json(include_url=False)))
+
+def coalesce_params(req: BaseModel, exclude: set, **normalized) -> dict:
+    """동일 요청 판별용 파라미터 (요청 필드 + 정규화된 값 + 실제 사용할 모델)"""
+    params = req.model_dump(exclude=exclude | {"prompt", "shop_name"})  # 가게가 달라도 같은 요청이면 합침
+    params.update(normalized)
+    params["prompt"] = normalize_prompt(getattr(req, "prompt", ""))
+    if "model_name" in params:
+        params["model_name"] = params["model_name"] or services.get_current_comfyui_model()
+    return params
+
+async def run_coalesced(
+    endpoint: str,
+    params: dict,
+    func,
+    *blobs: bytes,
+    idempotency_key: Optional[str] = None,
+    is_success=None,
+    workflow: Optional[str] = None,
+    tenant: Optional[str] = None
+):
+    """
+    동일 요청 합치기 (+ Idempotency-Key) 후 executor에서 실행
+
+    comfyui 작업 풀에서 실행 (문구 생성 등 짧은 요청이 이미지 작업에 밀리지 않도록)
+    수락 판단은 comfyui 풀에 넣기 전에 admission 풀에서 (풀이 밀려 있어도 기다리지 않고 바로 429,
+    입력 이미지 해시(요청 키) / 공유 상태 조회가 이벤트 루프를 막지 않도록)
+    - 가게별 GPU 사용 한도는 합치기 전에 요청마다 자기 tenant로 확인 (TenantRateLimitedError - 다른 가게의
+      한도 때문에 거절되지 않음)
+    - 예상 완료 시간은 실제로 실행할 요청만 수락 제어 (workflow별 예상 완료 시간이 SLO를 넘으면
+      AdmissionRejectedError) - 같은 요청이 진행 중이거나 Idempotency-Key가 진행 중 / 완료면 수락 티켓 없이
+      기존 작업 결과만 기다림 (판단 뒤에 진행 중이던 작업이 끝나 직접 실행하게 되면 그때 수락 제어)
+    ComfyUI 실행은 tenant 차례에 (comfyui.tenancy 공정 큐)
+    GPU 사용량은 실행한 요청의 tenant에만 청구 (합쳐진 / 재생된 요청의 tenant는 청구하지 않음)
+    idempotency_key는 tenant 범위 (다른 가게의 같은 키와 섞이지 않음)
+
+    Returns:
+        (func 결과, 메타데이터 플래그 {"coalesced": ..., "replayed": ...})
+    """
+    labeled = metrics.with_labels(func, endpoint=endpoint)  # 단계 시간/카운터 라벨
+    succeeded = (lambda outcome: is_success(outcome[0])) if is_success else None
+    pending = {}  # 미리 받은 수락 티켓 (comfyui 풀에서 실행을 시작하면 가져감)
+
+    def prepare() -> str:
+        """요청 키 계산 + 수락 판단 (admission 풀)"""
+        key = request_key(endpoint, params, *blobs)
+        if tenant:
+            # 합쳐질 요청도 자기 가게 한도로 판단 (실행하는 요청의 가게 한도가 다른 가게 요청을 거절하지 않도록)
+            get_fair_scheduler().check_gpu_budget(tenant)
+        if get_single_flight().is_running(key):
+            return key  # 진행 중인 같은 요청에 합쳐짐
+        if idempotency_key:
+            entry = get_idempotency_store().get(idempotency_key, tenant)
+            if entry is not None and entry["state"] in ("running", "done"):
+                return key  # 진행 중인 작업에 재연결 / 저장된 결과 재생
+        pending["ticket"] = get_admission_controller().admit(workflow or endpoint)
+        return key
+
+    def admitted(reserved: list):
+        # 미리 받은 티켓이 없으면 (판단 뒤에 진행 중이던 같은 요청이 끝남) 여기서 수락
+        ticket = reserved.pop() if reserved else get_admission_controller().admit(workflow or endpoint)
+        record = False
+        try:
+            result = labeled()
+            record = is_success is None or is_success(result)  # 실패는 예상 소요 시간에 반영하지 않음
+            return result
+        finally:
+            ticket.release(record=record)
+
+    def execute(key: str, reserved: list):
+        coalesce = partial(get_single_flight().do, key, partial(admitted, reserved), endpoint)
+        if not idempotency_key:
+            result, coalesced = coalesce()
+            return result, {"coalesced": coalesced}
+
+        # 같은 키의 재시도는 진행 중인 작업에 재연결하거나 저장된 결과를 반환
+        (result, coalesced), replayed = get_idempotency_store().run(
+            idempotency_key, key, coalesce, endpoint, succeeded, tenant=tenant
+        )
+        return result, {"coalesced": coalesced, "replayed": replayed, "idempotency_key": idempotency_key}
+
+    def run(key: str):
+        ticket = pending.pop("ticket", None)
+        reserved = [ticket] if ticket is not None else []
+        try:
+            return run_job(key, reserved)
+        finally:
+            for ticket in reserved:  # 합쳐지거나 재생됨 - 쓰지 않은 티켓 반환
+                ticket.release(record=False)
+
+    def run_job(key: str, reserved: list):
+        job_store = get_job_store()
+        if job_store is None:
+            with tenant_context(tenant, workflow or endpoint):
+                return execute(key, reserved)
+
+        # 작업 기록: 재시작 후 prompt 결과 회수 / 같은 Idempotency-Key 재시도 시 재연결용
+        job_id = job_store.create(
+            endpoint, params, key, scoped_key(idempotency_key, tenant) if idempotency_key else None
+        )
+        try:
+            with track_prompts(on_queued=partial(job_store.add_prompt, job_id)), \
+                    tenant_context(tenant, workflow or endpoint, job_id):
+                result, flags = execute(key, reserved)
+        except Exception as e:
+            job_store.finish(job_id, "failed", str(e))
+            raise
+        job_store.finish(job_id, "done" if is_success is None or is_success(result) else "failed")
+        return result, {**flags, "job_id": job_id}
+
+    key = await executors.run_in("admission", prepare)
+    try:
+        return await executors.run_in("comfyui", run, key)
+    finally:
+        ticket = pending.pop("ticket", None)
+        if ticket is not None:  # comfyui 풀에서 시작하기 전에 취소됨 (클라이언트 연결 끊김 등)
+            executors.get_executor("admission").submit(ticket.release, False)
+
+def image_response(
+    endpoint: str,
+    response_format: str,
+    parts: list,
+    meta: dict,
+    legacy_body: dict,
+    mode: Optional[str] = None
+) -> Response:
+    """
+    build_image_response + 응답 직렬화 시간 기록 (stage="serialization")
+
+    아티팩트 응답이면 저장한 아티팩트 ID를 작업 기록에 남김 (GET /api/jobs/{job_id})
+    """
+    job_store = get_job_store()
+    on_artifacts = None
+    if job_store is not None and meta.get("job_id"):
+        on_artifacts = partial(job_store.set_artifacts, meta["job_id"])
+    with metrics.stage("serialization", endpoint=endpoint, model=meta.get("model") or "none", mode=mode or "none"):
+        return build_image_response(response_format, parts, meta, legacy_body, on_artifacts=on_artifacts)
+
 # 🆕 개선: startup에서 모델 로드 (1회만)
 @app.on_event("startup")
 async def startup_event():
-    """앱 시작 시 초기화 (모델 자동 로딩은 하지 않음)"""
-    # 디폴트 unload 상태 유지를 위해 자동 로딩 제거
-    logger.info("✅ FastAPI 시작 완료 - 모델은 Unload 상태입니다.")
+    """앱 시작 시 초기화 (모델 로딩은 백그라운드 워밍업으로만 수행)"""
+    # 요청 경로에서 동기 로딩은 하지 않고, 백그라운드 스레드로만 처리
+    # - 유휴 모델 해제/상주 상태 동기화
+    # - 커넥션 풀 사전 연결 + 예측 모델 워밍업 (configs/image_editing_config.yaml: comfyui.warmup)
+    # - ComfyUI 출력/입력 파일 정리 (comfyui.gc)
+    # - 재시작 전에 끝내지 못한 작업의 ComfyUI 결과 회수 (comfyui.jobs)
+    services.start_model_residency()
+    services.start_model_warmup()
+    services.start_comfyui_gc()
+    services.start_job_recovery()
+    logger.info("✅ FastAPI 시작 완료 - 예측 모델은 백그라운드에서 워밍업됩니다.")
 
 # 🆕 개선: reload 시 모델 재로딩 방지를 위한 shutdown 핸들러 제거
 # (기존에 있었다면) - uvicorn reload 시 메모리에 모델 유지
 
 # Endpoints
 @app.post("/api/caption", response_model=CaptionResponse)
-def create_caption(req: CaptionRequest):
+async def create_caption(req: CaptionRequest, request: Request):
+    tenant = resolve_tenant(request, req)
     try:
         info = {
             "service_type": req.service_type,
@@ -123,44 +443,91 @@ def create_caption(req: CaptionRequest):
             "features": req.features,
             "location": req.location,
         }
-        output_text = services.generate_caption_core(info, req.tone)
+        # 이미지 작업과 분리된 network 풀 (이미지 큐가 가득 차도 바로 실행)
+        # 가게별 GPT 호출 한도 초과 시 429
+        generate = with_tenant(services.generate_caption_core, tenant)
+        output_text = await executors.run_in("network", generate, info, req.tone)
         return CaptionResponse(output_text=output_text)
+    except AdmissionRejectedError as e:
+        raise admission_rejected(e)
     except RuntimeError as re_err:
         raise HTTPException(status_code=503, detail=str(re_err))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"문구 생성 중 오류: {e}")
 
-@app.post("/api/generate_t2i", response_model=T2IResponse)
-async def generate_t2i_image(req: T2IRequest):
+def t2i_job(req: T2IRequest, max_batch_size: Optional[int] = None):
+    """
+    T2I 요청 검증 + 실행 함수 (일반/스트리밍 엔드포인트 공용)
+
+    Returns:
+        (generate() → (이미지 리스트, 메타데이터), 동일 요청 판별용 파라미터)
+    """
+    encoding = resolve_encoding(req)
     steps = services.ensure_steps(req.steps)
     width = services.align_to_64(req.width)
     height = services.align_to_64(req.height)
-    guidance_scale = req.guidance_scale
 
     if width > 2048 or height > 2048:
         raise HTTPException(status_code=400, detail="width/height 값이 너무 큽니다.")
 
-    try:
-        loop = asyncio.get_event_loop()
-
-        # 후처리 파라미터 준비
-        from functools import partial
-        generate_func = partial(
-            services.generate_t2i_core,
+    def generate():
+        meta = {"width": width, "height": height}
+        images = services.generate_t2i_batch_core(
             req.prompt,
             width,
             height,
             steps,
-            guidance_scale,
+            req.guidance_scale,
             req.enable_adetailer,
             req.adetailer_targets,
             req.post_process_method,
-            req.model_name  # 선택된 모델 전달
+            req.model_name,  # 선택된 모델 전달
+            meta=meta,
+            encoding=encoding,
+            seed=req.seed,
+            num_images=req.num_images,
+            prompt_variations=req.prompt_variations,
+            batch_index=req.batch_index,
+            max_batch_size=max_batch_size
+        )
+        return images, meta
+
+    params = coalesce_params(req, set(), width=width, height=height, steps=steps)
+    return generate, params
+
+@app.post("/api/generate_t2i", response_model=T2IResponse)
+async def generate_t2i_image(req: T2IRequest, request: Request):
+    """
+    T2I 생성 (num_images / prompt_variations로 여러 장)
+
+    응답 형식 (Accept 헤더):
+    - image/*: 이미지 바이트 (output_format, 기본 PNG) + X-Image-* 메타데이터 헤더
+    - multipart/*: JSON 메타데이터 파트 + 이미지 파트
+    - application/vnd.artifact+json (또는 ?response_format=artifact): {"image_artifact_id", "image_url", ...}
+      (이미지는 GET /api/artifacts/{id}로 다운로드)
+    - 그 외: {"image_base64": ...} (레거시)
+    """
+    response_format = negotiate_format(request)
+    generate, params = t2i_job(req)
+
+    try:
+        # 같은 파라미터(seed 포함)로 진행 중인 요청이 있으면 그 결과를 공유
+        (images, meta), flags = await run_coalesced(
+            "t2i", params, generate, idempotency_key=request.headers.get("idempotency-key"),
+            tenant=resolve_tenant(request, req)
         )
+        meta = {**meta, **flags}
 
-        image_bytes = await loop.run_in_executor(None, generate_func)
-        b64 = base64.b64encode(image_bytes).decode("utf-8")
-        return T2IResponse(image_base64=b64)
+        # 여러 장: image, image_1, image_2, ... (레거시 JSON은 image_base64, image_1_base64, ...)
+        parts = [("image" if i == 0 else f"image_{i}", image) for i, image in enumerate(images)]
+        legacy_body = {"seeds": meta["seeds"], "batch_indices": meta["batch_indices"]} if len(images) > 1 else {}
+        return image_response("t2i", response_format, parts, meta, legacy_body)
+    except AdmissionRejectedError as e:
+        raise admission_rejected(e)
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
     except PromptOptimizationError as e:
         # 프롬프트 처리 실패
         return JSONResponse(
@@ -193,26 +560,25 @@ async def generate_t2i_image(req: T2IRequest):
             raise HTTPException(status_code=503, detail="GPU 메모리 부족")
         raise HTTPException(status_code=500, detail=f"T2I 생성 실패: {e}")
 
-@app.post("/api/generate_i2i", response_model=T2IResponse)
-async def generate_i2i_image(req: I2IRequest):
+def i2i_job(req: I2IParams, input_image: InputImage):
+    """
+    I2I 요청 검증 + 실행 함수 (JSON/multipart/스트리밍 엔드포인트 공용)
+
+    입력 이미지 디코딩은 generate() 안(executor 스레드)에서 처음 사용할 때 수행
+
+    Returns:
+        (generate() → (이미지 바이트, 메타데이터), 동일 요청 판별용 파라미터, 입력 이미지)
+    """
+    encoding = resolve_encoding(req)
     steps = services.ensure_steps(req.steps)
     width = services.align_to_64(req.width)
     height = services.align_to_64(req.height)
     strength = float(req.strength)
 
-    try:
-        try:
-            input_bytes = base64.b64decode(req.input_image_base64)
-        except Exception:
-            raise HTTPException(status_code=400, detail="입력 이미지 Base64 디코딩 실패")
-
-        loop = asyncio.get_event_loop()
-
-        # 후처리 파라미터 준비
-        from functools import partial
-        generate_func = partial(
-            services.generate_i2i_core,
-            input_bytes,
+    def generate():
+        meta = {"width": width, "height": height}
+        image_bytes = services.generate_i2i_core(
+            input_image,
             req.prompt,
             strength,
             width,
@@ -222,12 +588,39 @@ async def generate_i2i_image(req: I2IRequest):
             req.enable_adetailer,
             req.adetailer_targets,
             req.post_process_method,
-            req.model_name  # 선택된 모델 전달
+            req.model_name,  # 선택된 모델 전달
+            meta=meta,
+            encoding=encoding,
+            seed=req.seed,
+            restore_input_size=req.restore_input_size
         )
+        return image_bytes, meta
+
+    # 입력 이미지는 내용 해시로 비교
+    params = coalesce_params(
+        req, {"input_image_base64"},
+        width=width, height=height, steps=steps, strength=strength
+    )
+    return generate, params, input_image
 
-        image_bytes = await loop.run_in_executor(None, generate_func)
-        b64 = base64.b64encode(image_bytes).decode("utf-8")
-        return T2IResponse(image_base64=b64)
+async def run_i2i(req: I2IParams, input_image: InputImage, request: Request):
+    """I2I 실행 + 응답 (JSON/multipart 엔드포인트 공용)"""
+    response_format = negotiate_format(request)
+    generate, params, input_image = i2i_job(req, input_image)
+
+    try:
+        (image_bytes, meta), flags = await run_coalesced(
+            "i2i", params, generate, input_image, idempotency_key=request.headers.get("idempotency-key"),
+            tenant=resolve_tenant(request, req)
+        )
+        meta = {**meta, **flags}
+        return image_response("i2i", response_format, [("image", image_bytes)], meta, {})
+    except AdmissionRejectedError as e:
+        raise admission_rejected(e)
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
     except RuntimeError as re_err:
         raise HTTPException(status_code=503, detail=str(re_err))
     except Exception as e:
@@ -236,6 +629,217 @@ async def generate_i2i_image(req: I2IRequest):
             raise HTTPException(status_code=503, detail="GPU 메모리 부족")
         raise HTTPException(status_code=500, detail=f"I2I 생성 실패: {e}")
 
+@app.post("/api/generate_i2i", response_model=T2IResponse)
+async def generate_i2i_image(req: I2IRequest, request: Request):
+    """I2I 편집 (응답 형식은 /api/generate_t2i와 동일한 Content Negotiation)"""
+    return await run_i2i(req, InputImage.from_base64(req.input_image_base64), request)
+
+@app.post("/api/generate_i2i/upload", response_model=T2IResponse)
+async def generate_i2i_upload(
+    request: Request,
+    image: UploadFile = File(...),
+    params: str = Form("{}")
+):
+    """
+    I2I 편집 (multipart/form-data 업로드, Base64 인코딩 불필요)
+
+    - image: 입력 이미지 파일 (임시 파일로 스트리밍 저장 후 ComfyUI까지 파일 그대로 전달)
+    - params: /api/generate_i2i 요청에서 input_image_base64를 뺀 JSON
+    응답 형식은 /api/generate_i2i와 동일
+    """
+    req = parse_form_params(I2IParams, params)
+    return await run_i2i(req, InputImage.from_upload(image), request)
+
+@app.post("/api/drafts")
+async def create_drafts(req: DraftRequest, request: Request):
+    """
+    T2I 초안 여러 장 생성 (낮은 steps / 해상도, 초안마다 고정 seed)
+
+    초안 세션은 서버에 보관되므로 완성은 /api/drafts/{draft_id}/refine 에 초안 번호만 전달
+
+    응답 형식:
+    - multipart/* 또는 image/*: JSON 메타데이터 파트 (draft_id, seeds, ...) + draft_0, draft_1, ... 파트
+    - 그 외: 메타데이터 + "draft_{i}_base64" (레거시)
+    """
+    response_format = negotiate_format(request)
+    if response_format == FORMAT_BINARY:
+        # 초안은 여러 장이므로 단일 이미지 응답 대신 multipart
+        response_format = FORMAT_MULTIPART
+
+    # 초안은 미리보기용이므로 출력 포맷 미지정 시 가벼운 포맷 사용
+    if req.output_format is None:
+        drafts_config = load_drafts_config()
+        req = req.model_copy(update={
+            "output_format": drafts_config.get("output_format"),
+            "quality": req.quality if req.quality is not None else drafts_config.get("quality")
+        })
+    encoding = resolve_encoding(req)
+    steps = services.ensure_steps(req.steps)
+    width = services.align_to_64(req.width)
+    height = services.align_to_64(req.height)
+
+    if width > 2048 or height > 2048:
+        raise HTTPException(status_code=400, detail="width/height 값이 너무 큽니다.")
+
+    try:
+        def generate():
+            meta = {}
+            session = services.generate_t2i_drafts_core(
+                req.prompt,
+                width,
+                height,
+                steps,
+                req.guidance_scale,
+                num_drafts=req.num_drafts,
+                draft_steps=req.draft_steps,
+                draft_scale=req.draft_scale,
+                model_name=req.model_name,
+                seed=req.seed,
+                meta=meta,
+                encoding=encoding
+            )
+            return session.images, meta
+
+        params = coalesce_params(req, set(), width=width, height=height, steps=steps)
+        (images, meta), flags = await run_coalesced(
+            "drafts", params, generate, idempotency_key=request.headers.get("idempotency-key"),
+            tenant=resolve_tenant(request, req)
+        )
+        meta = {**meta, **flags}
+        parts = [(f"draft_{i}", image) for i, image in enumerate(images)]
+        return image_response("drafts", response_format, parts, meta, meta)
+    except AdmissionRejectedError as e:
+        raise admission_rejected(e)
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except RuntimeError as re_err:
+        raise HTTPException(status_code=503, detail=str(re_err))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"초안 생성 실패: {e}")
+
+@app.get("/api/drafts/{draft_id}")
+def get_drafts(draft_id: str):
+    """초안 세션 조회 (이미지 제외: 프롬프트, seeds, 초안/완성 설정)"""
+    session = get_draft_store().get(draft_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="알 수 없거나 만료된 초안입니다.")
+    return session.to_dict()
+
+@app.post("/api/drafts/{draft_id}/refine", response_model=T2IResponse)
+async def refine_draft(draft_id: str, req: RefineDraftRequest, request: Request):
+    """
+    선택한 초안 완성 (같은 seed, 최종 해상도/steps)
+
+    응답 형식은 /api/generate_t2i와 동일한 Content Negotiation
+    """
+    response_format = negotiate_format(request)
+    encoding = resolve_encoding(req)
+    session = get_draft_store().get(draft_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="알 수 없거나 만료된 초안입니다.")
+
+    try:
+        def generate():
+            meta = {}
+            image_bytes = services.refine_draft_core(
+                session,
+                req.index,
+                method=req.method,
+                steps=req.steps,
+                denoise=req.denoise,
+                meta=meta,
+                encoding=encoding
+            )
+            return image_bytes, meta
+
+        params = {"draft_id": draft_id, **req.model_dump(exclude={"shop_name"})}
+        (image_bytes, meta), flags = await run_coalesced(
+            "refine", params, generate, idempotency_key=request.headers.get("idempotency-key"),
+            tenant=resolve_tenant(request, req)
+        )
+        meta = {**meta, **flags}
+        return image_response("refine", response_format, [("image", image_bytes)], meta, {})
+    except AdmissionRejectedError as e:
+        raise admission_rejected(e)
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except RuntimeError as re_err:
+        raise HTTPException(status_code=503, detail=str(re_err))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"초안 완성 실패: {e}")
+
+# ============================================================
+# 스트리밍 (Server-Sent Events)
+# 이벤트: started → plan / queue / node / step / stage / image ... → done (실패 시 error)
+# ============================================================
+def sse_response(generator) -> StreamingResponse:
+    """SSE 응답 (프록시 버퍼링 비활성화)"""
+    return StreamingResponse(
+        generator,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/generate_t2i/stream")
+async def generate_t2i_stream(req: T2IRequest, request: Request):
+    """
+    T2I 생성 스트리밍 - 완성된 이미지를 나머지를 기다리지 않고 바로 전송
+
+    첫 이미지 대기 시간이 생성 개수와 무관하도록 comfyui.streaming.max_batch_size
+    (기본 1)장씩 워크플로우를 나눠 한 번에 큐에 등록한다.
+    """
+    streaming_config = load_streaming_config()
+    generate, _ = t2i_job(req, max_batch_size=streaming_config.get("max_batch_size", 1))
+
+    def on_result(result):
+        images, meta = result
+        return [("done", meta)]  # 이미지는 생성 중 image 이벤트로 이미 전송됨
+
+    tenant = resolve_tenant(request, req)
+    generate = release_when_done(await admit("t2i", tenant), with_tenant(generate, tenant, "t2i"))
+    return sse_response(sse_stream(generate, on_result, endpoint="t2i_stream"))
+
+@app.post("/api/generate_i2i/stream")
+async def generate_i2i_stream(req: I2IRequest, request: Request):
+    """I2I 편집 스트리밍 (진행 이벤트 + 결과 image 이벤트)"""
+    generate, _, _ = i2i_job(req, InputImage.from_base64(req.input_image_base64))
+
+    def on_result(result):
+        image_bytes, meta = result
+        return [
+            ("image", {"index": 0, "seed": meta.get("seed"), "image": image_bytes}),
+            ("done", meta)
+        ]
+
+    tenant = resolve_tenant(request, req)
+    generate = release_when_done(await admit("i2i", tenant), with_tenant(generate, tenant, "i2i"))
+    return sse_response(sse_stream(generate, on_result, endpoint="i2i_stream"))
+
+@app.post("/api/edit_with_comfyui/stream")
+async def edit_image_with_comfyui_stream(req: ImageEditingRequest, request: Request):
+    """이미지 편집 스트리밍 (파이프라인 단계별 stage 이벤트 + 결과 image 이벤트)"""
+    edit_func, _, _ = edit_job(req, InputImage.from_base64(req.input_image_base64))
+
+    def on_result(result):
+        result = dict(result)
+        if not result["success"]:
+            return [("error", {"status": 500, "detail": result["error"]})]
+        events = []
+        for index, name in enumerate(("output_image", "background_removed_image")):
+            image_bytes = result.pop(name)
+            if image_bytes is not None:
+                events.append(("image", {"index": index, "name": name, "image": image_bytes}))
+        events.append(("done", {k: v for k, v in result.items() if k not in ("success", "error")}))
+        return events
+
+    tenant, workflow = resolve_tenant(request, req), f"edit:{req.experiment_id}"
+    edit_func = release_when_done(await admit(workflow, tenant), with_tenant(edit_func, tenant, workflow))
+    return sse_response(sse_stream(edit_func, on_result, endpoint="edit_stream"))
+
 @app.get("/status")
 def status():
     """서비스 상태 및 사용 가능한 모델 목록 반환"""
@@ -243,9 +847,64 @@ def status():
     result["server_start_time"] = SERVER_START_TIME
     return result
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """
+    Prometheus 메트릭 (텍스트 형식)
+
+    - stage_duration_seconds{stage, endpoint, model, mode}: 단계별 소요 시간 히스토그램
+    - http_request_duration_seconds{method, route, status}: 요청 전체 소요 시간
+    - executor_queue_depth / executor_active_workers{pool}: 작업 풀별 대기 / 실행 중 작업 수 (게이지)
+    - 카운터: coalesced_requests_total / idempotent_replays_total / comfyui_cache_hits_total (캐시 적중),
+      retries_total{reason}, gpu_oom_total, cancellations_total{reason},
+      admission_rejected_total{workflow} (429 거절, workflow=payload는 본문 크기 초과),
+      comfyui_history_deleted_total, comfyui_gc_reclaimed_bytes_total{kind} (정리한 출력/입력 파일),
+      artifact_dedup_hits_total / artifact_evictions_total (아티팩트 중복 제거 / LRU 삭제),
+      jobs_finished_total{state} / jobs_recovered_total{state} (작업 기록, 재시작 후 회수) 등
+    - 가게(테넌트)별: tenant_gpu_seconds_total / tenant_gpt_calls_total / tenant_jobs_total{tenant} (사용량),
+      tenant_rate_limited_total{tenant, resource}, tenant_queue_wait_seconds{tenant} (GPU 차례 대기 시간),
+      tenant_queue_depth{tenant} (대기 중 작업 수 게이지)
+      (워커 프로세스별 값 - 워커 전체 누적은 GET /api/tenants)
+    """
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
 # 🆕 이미지 편집 실험 엔드포인트
+def edit_job(req: ImageEditingParams, input_image: InputImage):
+    """
+    이미지 편집 요청 검증 + 실행 함수 (JSON/multipart/스트리밍 엔드포인트 공용)
+
+    입력 이미지 디코딩은 edit_func() 안(executor 스레드)에서 처음 사용할 때 수행
+
+    Returns:
+        (edit_func() → 결과 dict, 동일 요청 판별용 파라미터, 입력 이미지)
+    """
+    encoding = resolve_encoding(req)
+
+    # 서비스 레이어 호출
+    edit_func = partial(
+        services.edit_image_with_comfyui,
+        req.experiment_id,
+        input_image,
+        req.prompt,
+        req.negative_prompt,
+        req.steps,
+        req.guidance_scale,
+        req.strength,
+        # 새로운 모드 파라미터
+        req.controlnet_type,
+        req.controlnet_strength,
+        req.denoise_strength,
+        req.blending_strength,
+        req.background_prompt,
+        encoding,
+        restore_input_size=req.restore_input_size
+    )
+
+    params = coalesce_params(req, {"input_image_base64"})
+    return edit_func, params, input_image
+
 @app.post("/api/edit_with_comfyui", response_model=ImageEditingResponse)
-async def edit_image_with_comfyui(req: ImageEditingRequest):
+async def edit_image_with_comfyui(req: ImageEditingRequest, request: Request):
     """
     ComfyUI를 사용한 이미지 편집 (3가지 모드)
 
@@ -253,39 +912,60 @@ async def edit_image_with_comfyui(req: ImageEditingRequest):
     - portrait_mode: 얼굴 보존, 의상/배경 변경
     - product_mode: 제품 보존, 배경 생성/합성
     - hybrid_mode: 얼굴+제품 보존, 나머지 변경
+
+    응답 형식 (Accept 헤더):
+    - image/*: 결과 이미지 바이트 + X-Image-* 메타데이터 헤더
+    - multipart/*: JSON 메타데이터 파트 + output_image / background_removed_image 파트
+    - 그 외: ImageEditingResponse (Base64, 레거시)
+    실패 시에는 형식과 관계없이 ImageEditingResponse JSON
     """
-    try:
-        # Base64 디코딩
-        try:
-            input_bytes = base64.b64decode(req.input_image_base64)
-        except Exception:
-            raise HTTPException(status_code=400, detail="입력 이미지 Base64 디코딩 실패")
+    return await run_edit(req, InputImage.from_base64(req.input_image_base64), request)
 
-        # 서비스 레이어 호출
-        loop = asyncio.get_event_loop()
+@app.post("/api/edit_with_comfyui/upload", response_model=ImageEditingResponse)
+async def edit_image_with_comfyui_upload(
+    request: Request,
+    image: UploadFile = File(...),
+    params: str = Form(...)
+):
+    """
+    이미지 편집 (multipart/form-data 업로드, Base64 인코딩 불필요)
 
-        from functools import partial
-        edit_func = partial(
-            services.edit_image_with_comfyui,
-            req.experiment_id,
-            input_bytes,
-            req.prompt,
-            req.negative_prompt,
-            req.steps,
-            req.guidance_scale,
-            req.strength,
-            # 새로운 모드 파라미터
-            req.controlnet_type,
-            req.controlnet_strength,
-            req.denoise_strength,
-            req.blending_strength,
-            req.background_prompt
+    - image: 입력 이미지 파일 (임시 파일로 스트리밍 저장 후 ComfyUI까지 파일 그대로 전달)
+    - params: /api/edit_with_comfyui 요청에서 input_image_base64를 뺀 JSON (experiment_id 필수)
+    응답 형식은 /api/edit_with_comfyui와 동일
+    """
+    req = parse_form_params(ImageEditingParams, params)
+    return await run_edit(req, InputImage.from_upload(image), request)
+
+async def run_edit(req: ImageEditingParams, input_image: InputImage, request: Request):
+    """이미지 편집 실행 + 응답 (JSON/multipart 엔드포인트 공용)"""
+    response_format = negotiate_format(request)
+    edit_func, params, input_image = edit_job(req, input_image)
+    try:
+        result, flags = await run_coalesced(
+            "edit", params, edit_func, input_image,
+            idempotency_key=request.headers.get("idempotency-key"),
+            workflow=f"edit:{req.experiment_id}",
+            is_success=lambda r: r["success"],  # 편집 실패는 저장하지 않음 (재시도 시 재실행)
+            tenant=resolve_tenant(request, req)
         )
+        result = dict(result)  # 합쳐진 요청끼리 같은 dict를 공유하므로 복사 후 수정
 
-        result = await loop.run_in_executor(None, edit_func)
+        images = [
+            ("output_image", result.pop("output_image")),
+            ("background_removed_image", result.pop("background_removed_image"))
+        ]
+        if not result["success"]:
+            return image_response("edit", FORMAT_JSON, images, {}, result, mode=req.experiment_id)
 
-        return ImageEditingResponse(**result)
+        meta = {k: v for k, v in result.items() if k not in ("success", "error")}
+        meta.update(flags)
+        return image_response("edit", response_format, images, meta, result, mode=req.experiment_id)
 
+    except AdmissionRejectedError as e:
+        raise admission_rejected(e)
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
     except ConnectionError as ce:
@@ -293,6 +973,114 @@ async def edit_image_with_comfyui(req: ImageEditingRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"이미지 편집 실패: {e}")
 
+def job_response(job: dict) -> dict:
+    """작업 기록 → 응답 (아티팩트 ID를 다운로드 URL과 함께, 이미 삭제된 아티팩트는 null)"""
+    store = get_artifact_store()
+    artifacts = []
+    for artifact_id in job.pop("artifact_ids"):
+        artifact = store.get(artifact_id)
+        artifacts.append(artifact.to_dict() if artifact else {"artifact_id": artifact_id, "url": None})
+    job.pop("owner", None)
+    return {**job, "artifacts": artifacts}
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    """
+    작업 기록 조회 (응답 메타데이터의 job_id)
+
+    - state: running / done / failed / recovering / recovered (재시작 후 회수)
+    - artifacts: 아티팩트 응답으로 저장했거나 재시작 후 회수한 결과 이미지 URL
+      (회수한 결과는 ComfyUI 출력 그대로 - 후처리가 필요하면 같은 Idempotency-Key로 재시도)
+    - queue_position: 가게별 공정 큐에서 GPU 차례를 기다리는 중이면 대기 순서 / 예상 대기 시간
+    """
+    job_store = get_job_store()
+    job = job_store.get(job_id) if job_store else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="알 수 없거나 만료된 작업입니다.")
+    if job["state"] == "running":
+        job["queue_position"] = get_fair_scheduler().job_position(job_id)
+    if job["state"] in ("running", "recovering") and job["prompt_ids"]:
+        job["jobs"] = services.get_comfyui_job_eta(job["prompt_ids"])
+    return job_response(job)
+
+@app.get("/api/tenants")
+def get_tenants():
+    """가게(테넌트)별 실행 중 / 대기 작업 수 + 누적 사용량 (GPU 초, GPT 호출, 작업 수, 한도 초과 횟수)"""
+    return get_fair_scheduler().snapshot()
+
+@app.get("/api/tenants/{tenant_id}/queue")
+def get_tenant_queue(tenant_id: str):
+    """
+    가게(테넌트)의 공정 큐 상태
+
+    - waiting: GPU 차례를 기다리는 작업 (position: 전체 대기 순서, estimated_wait_seconds: 예상 대기 시간)
+    - running: 실행 중인 작업
+    - budgets: 남은 GPU 초 / GPT 호출 한도 (null이면 제한 없음)
+    - usage: 누적 사용량
+    """
+    scheduler = get_fair_scheduler()
+    return scheduler.tenant_queue(scheduler.resolve_tenant(tenant_id))
+
+@app.get("/api/requests/{idempotency_key}")
+def get_idempotent_request(idempotency_key: str, request: Request):
+    """
+    Idempotency-Key 상태 조회 (state, prompt_ids, 실행 중이면 prompt별 대기 순서 / ETA)
+
+    키는 가게별 - 요청할 때와 같은 X-Tenant-ID 헤더로 조회 (본문 shop_name으로 정해진 가게는 헤더에 그 이름)
+    백엔드 재시작 등으로 메모리에 없으면 작업 기록에서 조회 (재시작 후 회수한 결과 URL 포함)
+    """
+    tenant = resolve_tenant(request)
+    entry = get_idempotency_store().get(idempotency_key, tenant)
+    if entry is None:
+        job_store = get_job_store()
+        job = None
+        if job_store and 0 < len(idempotency_key) <= MAX_KEY_LENGTH:
+            job = job_store.latest_for_key(scoped_key(idempotency_key, tenant))
+        if job is None:
+            raise HTTPException(status_code=404, detail="알 수 없거나 만료된 Idempotency-Key입니다.")
+        return job_response(job)
+    if entry["state"] == "running" and entry.get("prompt_ids"):
+        entry["jobs"] = services.get_comfyui_job_eta(entry["prompt_ids"])
+    return entry
+
+@app.get("/api/comfyui/jobs/{prompt_id}")
+def get_comfyui_job(prompt_id: str):
+    """ComfyUI 작업 상태 (running/pending, 대기 순서, eta_seconds - 통계가 없으면 null)"""
+    job = services.get_comfyui_job_eta([prompt_id]).get(prompt_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="큐에 없는 작업입니다. (완료되었거나 알 수 없는 prompt_id)")
+    return {"prompt_id": prompt_id, **job}
+
+@app.get("/api/comfyui/node_timings")
+def get_node_timings(top: int = 10, workflow: Optional[str] = None):
+    """
+    노드 실행 시간 리포트
+
+    - slowest_nodes: 워크플로우 종류(편집 모드 / t2i / i2i ...)별 평균 실행 시간 상위 노드
+      (편집 모드는 step에 파이프라인 단계 이름)
+    - executions: 워크플로우/모델/해상도별 전체 실행 시간 요약
+    """
+    return services.get_node_timing_report(top=top, workflow=workflow)
+
+@app.post("/api/comfyui/gc")
+def run_comfyui_gc():
+    """ComfyUI 출력/입력 파일 정리 즉시 실행 (디렉토리별 삭제 파일 수 / 정리한 바이트)"""
+    return services.run_comfyui_gc()
+
+@app.api_route("/api/artifacts/{artifact_id}", methods=["GET", "HEAD"])
+def get_artifact(artifact_id: str, request: Request):
+    """
+    결과 이미지 아티팩트 다운로드 (응답 형식이 artifact일 때 받은 URL)
+
+    - ETag = 아티팩트 ID (내용 해시) → If-None-Match가 같으면 304
+    - Cache-Control: public, immutable (같은 URL의 내용은 바뀌지 않음)
+    - Range: bytes=start-end 단일 범위 → 206 (If-Range가 ETag와 다르면 전체), 만족할 수 없으면 416
+    """
+    artifact = get_artifact_store().get(artifact_id)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="알 수 없거나 만료된 아티팩트입니다.")
+    return build_artifact_response(request, artifact)
+
 @app.get("/api/image_editing/experiments")
 def get_image_editing_experiments():
     """사용 가능한 이미지 편집 실험 목록 조회"""
@@ -313,6 +1101,35 @@ def get_current_model():
     """현재 로드된 모델 확인"""
     return {"current_model": services.get_current_comfyui_model()}
 
+@app.get("/models")
+def list_models(request: Request):
+    """전환 가능한 생성 모델 목록 + 현재 모델 (ETag 지원)"""
+    info, etag = services.get_models_info()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=info, headers=headers)
+
+@app.post("/api/switch_model_async")
+def switch_model_async(req: SwitchModelRequest):
+    """
+    모델 전환 시작 (논블로킹)
+
+    진행 상황은 /api/switch_model_status 로 폴링
+    전환 중 들어온 생성 요청은 전환 완료 후 처리됨
+    """
+    try:
+        return services.switch_comfyui_model_async(req.model_name)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except RuntimeError as re_err:
+        raise HTTPException(status_code=409, detail=str(re_err))
+
+@app.get("/api/switch_model_status")
+def switch_model_status():
+    """모델 전환 진행 상태 (stage, percent, message)"""
+    return services.get_switch_model_status()
+
 @app.post("/api/generate_calligraphy")
 async def generate_calligraphy(req: CalligraphyRequest):
     """
@@ -322,25 +1139,25 @@ async def generate_calligraphy(req: CalligraphyRequest):
         req: CalligraphyRequest (text, color_hex, style, font_path)
     
     Returns:
-        PNG 이미지 (Response with media_type="image/png")
+        이미지 바이트 (기본 PNG, output_format 지정 시 해당 포맷 - 투명도 유지)
     """
+    encoding = resolve_encoding(req)
     try:
-        loop = asyncio.get_event_loop()
-        
-        from functools import partial
         generate_func = partial(
             services.generate_calligraphy_core,
             req.text,
             req.color_hex,
             req.style,
-            req.font_path
+            req.font_path,
+            encoding
         )
+
+        # 기본 스타일은 Pillow 렌더링만 (cpu 풀), AI 스타일은 프로세스 내 SDXL 추론 (gpu 풀, 1개씩)
+        workload = "cpu" if req.style == "basic_color" else "gpu"
+        image_bytes = await executors.run_in(workload, generate_func)
         
-        image_bytes = await loop.run_in_executor(None, generate_func)
-        
-        # PNG 이미지를 직접 반환
-        from fastapi.responses import Response
-        return Response(content=image_bytes, media_type="image/png")
+        # 이미지를 직접 반환
+        return Response(content=image_bytes, media_type=detect_media_type(image_bytes))
         
     except ImageProcessingError as e:
         # 이미지 처리 실패
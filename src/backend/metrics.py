@@ -0,0 +1,256 @@
+# metrics.py
+"""
+서비스 메트릭 (프로세스 내 카운터 / 게이지 / 히스토그램)
+- 스레드 안전한 라벨별 카운터
+- 게이지: 현재 값 (예: executor_queue_depth{pool})
+- 단계별 소요 시간 히스토그램 (stage_duration_seconds{stage, endpoint, model, mode})
+  - 단계: STAGES 참고 (프롬프트 최적화 → 워크플로우 구성 → 업로드 → 큐 대기 → 실행
+    → 다운로드 → 후처리 → 인코딩 → 응답 직렬화)
+  - endpoint / model / mode 라벨은 요청을 처리하는 스레드의 라벨 컨텍스트에서 가져옴
+    (request_labels로 시작, 모델이 정해지면 set_labels로 추가)
+- /status 의 "metrics" 항목(카운터)과 /metrics (Prometheus 텍스트 형식)로 노출
+"""
+import time
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, List, Optional, Sequence, Tuple
+
+_lock = threading.Lock()
+_counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+
+STAGE_HISTOGRAM = "stage_duration_seconds"
+STAGES = (
+    "prompt_optimization",  # GPT 프롬프트 최적화
+    "workflow_build",       # 워크플로우 템플릿 / 파라미터 구성
+    "input_normalization",  # 입력 이미지 EXIF 회전 / 축소 / 재인코딩
+    "upload",               # 입력 이미지 업로드
+    "queue_wait",           # ComfyUI 큐 대기
+    "execution",            # ComfyUI 실행
+    "download",             # 출력 이미지 다운로드
+    "post_processing",      # ADetailer 등 후처리
+    "encoding",             # 출력 포맷 인코딩
+    "serialization"         # HTTP 응답 직렬화
+)
+REQUEST_LABELS = ("endpoint", "model", "mode")
+
+# 초 단위 (직렬화 수 ms ~ ComfyUI 실행 수 분)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+
+class _Histogram:
+    """라벨 조합 1개의 히스토그램 (버킷별 개수는 누적하지 않고 저장)"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 마지막 = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+
+_histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], _Histogram] = {}
+
+
+def _label_key(labels: dict) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def increment(name: str, amount: float = 1, **labels):
+    """카운터 증가 (예: increment("coalesced_requests_total", endpoint="t2i"))"""
+    key = (name, _label_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def get_counter(name: str, **labels) -> float:
+    """카운터 값 조회 (라벨 미지정 시 전체 합계)"""
+    wanted = {k: str(v) for k, v in labels.items()}
+    with _lock:
+        return sum(
+            value for (counter, counter_labels), value in _counters.items()
+            if counter == name and wanted.items() <= dict(counter_labels).items()
+        )
+
+
+_gauges: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+
+
+def set_gauge(name: str, value: float, **labels):
+    """게이지 값 지정 (예: set_gauge("executor_queue_depth", 3, pool="comfyui"))"""
+    key = (name, _label_key(labels))
+    with _lock:
+        _gauges[key] = value
+
+
+def add_gauge(name: str, amount: float, **labels):
+    """게이지 값 증감 (예: 작업 시작 시 +1, 종료 시 -1)"""
+    key = (name, _label_key(labels))
+    with _lock:
+        _gauges[key] = _gauges.get(key, 0) + amount
+
+
+def get_gauge(name: str, **labels) -> float:
+    """게이지 값 조회 (라벨 미지정 시 전체 합계)"""
+    wanted = {k: str(v) for k, v in labels.items()}
+    with _lock:
+        return sum(
+            value for (gauge, gauge_labels), value in _gauges.items()
+            if gauge == name and wanted.items() <= dict(gauge_labels).items()
+        )
+
+
+def observe(name: str, value: float, buckets: Sequence[float] = DEFAULT_BUCKETS, **labels):
+    """히스토그램에 값 기록 (예: observe("stage_duration_seconds", 1.2, stage="execution"))"""
+    key = (name, _label_key(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = _Histogram(buckets)
+        histogram.observe(value)
+
+
+# ===========================
+# 요청 라벨 컨텍스트 (스레드 로컬)
+# ===========================
+_local = threading.local()
+
+
+@contextmanager
+def request_labels(**labels):
+    """이 컨텍스트 안에서 기록하는 단계 시간/카운터에 붙일 요청 라벨 (endpoint, model, mode)"""
+    previous = getattr(_local, "labels", None)
+    _local.labels = {**(previous or {}), **{k: v for k, v in labels.items() if v is not None}}
+    try:
+        yield
+    finally:
+        _local.labels = previous
+
+
+def set_labels(**labels):
+    """현재 요청 라벨 추가/변경 (예: 모델이 정해진 뒤 set_labels(model=...), 요청 밖에서는 무시)"""
+    current = getattr(_local, "labels", None)
+    if current is not None:
+        current.update({k: v for k, v in labels.items() if v is not None})
+
+
+def current_labels() -> Dict[str, str]:
+    """현재 요청 라벨 (지정되지 않은 라벨은 "none")"""
+    current = getattr(_local, "labels", None) or {}
+    return {name: str(current.get(name) or "none") for name in REQUEST_LABELS}
+
+
+def with_labels(func, **labels):
+    """func()을 요청 라벨 컨텍스트 안에서 실행하는 함수 반환 (executor 스레드용)"""
+    @wraps(func)
+    def run(*args, **kwargs):
+        with request_labels(**labels):
+            return func(*args, **kwargs)
+    return run
+
+
+def observe_stage(stage_name: str, seconds: float, **labels):
+    """단계 소요 시간 기록 (현재 요청 라벨 + labels)"""
+    observe(STAGE_HISTOGRAM, max(0.0, seconds), stage=stage_name, **{**current_labels(), **labels})
+
+
+@contextmanager
+def stage(stage_name: str, **labels):
+    """with 블록 소요 시간을 단계 히스토그램에 기록 (예외가 나도 기록)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage_name, time.perf_counter() - start, **labels)
+
+
+def timed(stage_name: str):
+    """함수 실행 시간을 단계 히스토그램에 기록하는 데코레이터"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ===========================
+# 노출
+# ===========================
+def snapshot() -> Dict[str, Dict[str, float]]:
+    """
+    전체 카운터 스냅샷
+
+    Returns:
+        {카운터 이름: {"endpoint=t2i": 값, ...}} (라벨이 없으면 "" 키)
+    """
+    result: Dict[str, Dict[str, float]] = {}
+    with _lock:
+        for (name, labels), value in sorted(_counters.items()):
+            label_key = ",".join(f"{k}={v}" for k, v in labels)
+            result.setdefault(name, {})[label_key] = value
+    return result
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        f'{k}="' + v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for k, v in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_prometheus() -> str:
+    """카운터 + 게이지 + 히스토그램을 Prometheus 텍스트 형식(0.0.4)으로 출력"""
+    lines: List[str] = []
+    with _lock:
+        counters = sorted(_counters.items())
+        gauges = sorted(_gauges.items())
+        histograms = sorted(
+            (key, (h.buckets, list(h.counts), h.sum, h.count)) for key, h in _histograms.items()
+        )
+
+    last_name: Optional[str] = None
+    for (name, labels), value in counters:
+        if name != last_name:
+            lines.append(f"# TYPE {name} counter")
+            last_name = name
+        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    last_name = None
+    for (name, labels), value in gauges:
+        if name != last_name:
+            lines.append(f"# TYPE {name} gauge")
+            last_name = name
+        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    last_name = None
+    for (name, labels), (buckets, counts, total, count) in histograms:
+        if name != last_name:
+            lines.append(f"# TYPE {name} histogram")
+            last_name = name
+        cumulative = 0
+        for bound, bucket_count in zip(list(buckets) + ["+Inf"], counts):
+            cumulative += bucket_count
+            le = bound if isinstance(bound, str) else _format_value(bound)
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {repr(float(total))}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+    return "\n".join(lines) + "\n"
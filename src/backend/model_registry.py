@@ -36,6 +36,10 @@ class ModelConfig:
     @property
     def supports_i2i(self) -> bool:
         return self.params.get("supports_i2i", True)
+
+    @property
+    def supports_t2i(self) -> bool:
+        return self.params.get("supports_t2i", True)
     
     @property
     def max_tokens(self) -> int:
@@ -55,6 +59,16 @@ class ModelConfig:
         size = self.params.get("max_size", [2048, 2048])
         return tuple(size)
 
+    @property
+    def vram_gb(self) -> float:
+        """상주 시 예상 VRAM (GB, 설정 없으면 보수적으로 16GB)"""
+        return float(self.params.get("vram_gb", 16))
+
+    @property
+    def oom_fallback(self) -> Optional[str]:
+        """GPU 메모리 부족 시 대신 사용할 (더 가벼운 양자화) 모델 이름"""
+        return self.params.get("oom_fallback")
+
 
 class ModelRegistry:
     """yaml 설정 파일에서 모델 정보 로드"""
@@ -169,8 +183,11 @@ class ModelRegistry:
             "requires_auth": model.requires_auth,
             "description": model.description,
             "default_steps": model.default_steps,
+            "max_steps": model.max_steps,
+            "guidance_scale": model.guidance_scale,
             "max_tokens": model.max_tokens,
-            "supports_i2i": model.supports_i2i
+            "supports_i2i": model.supports_i2i,
+            "supports_t2i": model.supports_t2i
         }
 
 
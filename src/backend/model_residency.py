@@ -0,0 +1,533 @@
+# model_residency.py
+"""
+ComfyUI 모델 상주(residency) 관리
+- ComfyUI 인스턴스별로 실제 VRAM에 올라간 모델을 추적 (/system_stats + 실행 히스토리)
+- VRAM 예산 초과 시 LRU 순서로 해제
+- 유휴 TTL이 지난 모델은 free_memory로 해제
+- 실행 중인 작업이 필요로 하는 모델은 해제하지 않음
+- 여러 워커(uvicorn --workers N)가 같은 ComfyUI를 쓰면 공유 상태(shared_state)로 조정
+  - 선택된 생성 모델은 공유 상태에 저장 (워커끼리 항상 같은 값)
+  - 워커별 실행 중 작업 수 / 마지막 사용 시각을 공유 → 다른 워커가 쓰는 중이면 해제하지 않음
+
+NOTE:
+    ComfyUI의 /free API는 특정 모델만 골라서 내릴 수 없고 전체를 해제한다.
+    따라서 해제는 "해당 인스턴스에서 다른 작업이 실행 중이지 않을 때"만 수행하고,
+    해제 후에는 추적 중인 상주 목록을 함께 비운다.
+"""
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, List, Callable, Iterable, Set
+
+from .shared_state import INSTANCE_ID, get_shared_state
+
+logger = logging.getLogger(__name__)
+
+SELECTED_MODEL = "selected_model"    # 공유 상태 네임스페이스: base_url → 선택된 모델
+WORKER_USAGE = "model_usage"         # 공유 상태 네임스페이스: "{base_url}|{워커}" → 실행 중 작업 수 / 마지막 사용 시각
+WORKER_USAGE_TTL = 86400
+
+# torch_vram_total이 이 값보다 작으면 ComfyUI에 올라간 모델이 없다고 판단 (bytes)
+EMPTY_VRAM_THRESHOLD = 512 * 1024 * 1024
+
+
+@dataclass
+class ResidentModel:
+    """ComfyUI에 상주 중인 모델 정보"""
+    name: str
+    vram_gb: float
+    last_used: float = field(default_factory=time.time)
+    in_flight: int = 0
+
+    def idle_seconds(self, now: Optional[float] = None) -> float:
+        return (now or time.time()) - self.last_used
+
+
+def get_workflow_models(workflow: Dict[str, Any]) -> List[str]:
+    """
+    워크플로우가 필요로 하는 UNET 모델 목록 추출
+
+    Args:
+        workflow: ComfyUI 워크플로우 JSON
+
+    Returns:
+        모델 이름 리스트 (레지스트리 이름으로 변환 가능하면 변환, 아니면 파일명)
+    """
+    unet_names = []
+    for node in workflow.values():
+        if not isinstance(node, dict):
+            continue
+        if node.get("class_type") in ("UnetLoaderGGUF", "UNETLoader"):
+            unet_name = node.get("inputs", {}).get("unet_name")
+            if unet_name and unet_name not in unet_names:
+                unet_names.append(unet_name)
+    return [resolve_model_name(name) for name in unet_names]
+
+
+def resolve_model_name(unet_name: str) -> str:
+    """UNET 파일명 → 레지스트리 모델 이름 (없으면 파일명 그대로)"""
+    from .model_registry import get_registry
+
+    registry = get_registry()
+    for name in registry.list_models():
+        model = registry.get_model(name)
+        if model and os.path.basename(model.id) == unet_name:
+            return name
+    return unet_name
+
+
+def estimate_vram_gb(model_name: str) -> float:
+    """레지스트리 기반 모델 VRAM 추정치 (GB)"""
+    from .model_registry import get_registry
+
+    model = get_registry().get_model(model_name)
+    if model:
+        return model.vram_gb
+    return 16.0
+
+
+class ModelResidencyManager:
+    """ComfyUI 인스턴스별 모델 상주 상태 관리 (thread-safe)"""
+
+    def __init__(
+        self,
+        default_base_url: str,
+        vram_budget_gb: float = 22.0,
+        idle_ttl: float = 900.0,
+        eviction_wait: float = 600.0,
+        history_sync_items: int = 20,
+        client_factory: Optional[Callable[[str], Any]] = None
+    ):
+        """
+        Args:
+            default_base_url: 기본 ComfyUI 서버 주소
+            vram_budget_gb: 동시에 상주시킬 모델 VRAM 예산 (GB)
+            idle_ttl: 유휴 모델 해제까지의 시간 (초)
+            eviction_wait: 사용 중 모델 해제를 기다리는 최대 시간 (초)
+            history_sync_items: 상태 동기화 시 조회할 최근 히스토리 수
+            client_factory: base_url → ComfyUIClient 생성 함수
+        """
+        self.default_base_url = default_base_url.rstrip("/")
+        self.vram_budget_gb = vram_budget_gb
+        self.idle_ttl = idle_ttl
+        self.eviction_wait = eviction_wait
+        self.history_sync_items = history_sync_items
+
+        if client_factory is None:
+            from .comfyui_client import ComfyUIClient
+            client_factory = lambda base_url: ComfyUIClient(base_url=base_url)
+        self._client_factory = client_factory
+
+        self._cond = threading.Condition()
+        self._resident: Dict[str, "OrderedDict[str, ResidentModel]"] = {}
+        self._waiting: Dict[str, int] = {}
+        self._freeing: Set[str] = set()  # /free 요청 중인 인스턴스 (새 작업은 끝날 때까지 대기)
+        self._reaper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # ------------------------------------------------------------
+    # 내부 헬퍼 (락을 잡은 상태에서 호출)
+    # ------------------------------------------------------------
+    def _key(self, base_url: Optional[str]) -> str:
+        return (base_url or self.default_base_url).rstrip("/")
+
+    def _models(self, key: str) -> "OrderedDict[str, ResidentModel]":
+        return self._resident.setdefault(key, OrderedDict())
+
+    def _in_flight(self, key: str) -> int:
+        return sum(m.in_flight for m in self._models(key).values())
+
+    def _publish_usage(self, key: str):
+        """이 워커의 실행 중 작업 수 / 마지막 사용 시각을 공유 상태에 기록"""
+        models = self._models(key).values()
+        get_shared_state().set(WORKER_USAGE, f"{key}|{INSTANCE_ID}", {
+            "in_flight": sum(m.in_flight for m in models),
+            "last_used": max((m.last_used for m in models), default=0)
+        }, ttl=WORKER_USAGE_TTL)
+
+    def _other_workers(self, key: str) -> Dict[str, float]:
+        """살아 있는 다른 워커의 실행 중 작업 수 합계 / 마지막 사용 시각"""
+        shared = get_shared_state()
+        live = shared.live_instances()
+        in_flight, last_used = 0, 0.0
+        for usage_key, usage in shared.items(WORKER_USAGE).items():
+            base_url, _, instance_id = usage_key.rpartition("|")
+            if base_url != key or instance_id == INSTANCE_ID or instance_id not in live:
+                continue
+            in_flight += usage.get("in_flight", 0)
+            last_used = max(last_used, usage.get("last_used", 0))
+        return {"in_flight": in_flight, "last_used": last_used}
+
+    def _resident_vram(self, key: str) -> float:
+        return sum(m.vram_gb for m in self._models(key).values())
+
+    def _lru_victims(self, key: str, keep: Iterable[str]) -> List[str]:
+        """예산을 맞추기 위해 내려야 할 모델 (오래 쓰지 않은 순)"""
+        models = self._models(key)
+        keep = set(keep)
+        excess = self._resident_vram(key) - self.vram_budget_gb
+        victims = []
+        for name, model in models.items():  # OrderedDict: 앞쪽이 LRU
+            if excess <= 0:
+                break
+            if name in keep:
+                continue
+            victims.append(name)
+            excess -= model.vram_gb
+        return victims
+
+    def _free(self, key: str, reason: str) -> bool:
+        """
+        인스턴스 전체 해제
+
+        사용 표시(in_flight)가 남은 항목은 아직 실행 전인 대기 작업의 모델이므로
+        추적을 유지한다 (작업 실행 시 다시 로드됨).
+
+        /free 요청 동안은 락을 놓는다 (다른 작업의 종료 / 상태 조회가 HTTP 응답을 기다리지 않도록).
+        그동안 이 인스턴스에 새로 들어오는 작업은 _enter에서 해제가 끝나기를 기다린다.
+        """
+        client = self._client_factory(key)
+        resident = self._models(key)
+        freed = [name for name, m in resident.items() if m.in_flight == 0]
+        self._freeing.add(key)
+        self._cond.release()
+        try:
+            success = client.free_memory(unload_models=True, free_memory=True)
+        finally:
+            self._cond.acquire()
+            self._freeing.discard(key)
+            self._cond.notify_all()
+        if success:
+            for name in freed:
+                model = resident.get(name)
+                if model is not None and model.in_flight == 0:
+                    del resident[name]
+            logger.info(f"🧹 ComfyUI 모델 해제 ({reason}): {', '.join(freed) or '-'}")
+        return success
+
+    # ------------------------------------------------------------
+    # 선택 모델 (사용자가 고른 생성 모델)
+    # ------------------------------------------------------------
+    def select(self, model_name: Optional[str], base_url: Optional[str] = None):
+        """현재 사용할 생성 모델 지정 (None이면 선택 해제, 모든 워커에 반영)"""
+        get_shared_state().set(SELECTED_MODEL, self._key(base_url), model_name)
+
+    def get_selected(self, base_url: Optional[str] = None) -> Optional[str]:
+        """현재 선택된 생성 모델 반환"""
+        return get_shared_state().get(SELECTED_MODEL, self._key(base_url))
+
+    # ------------------------------------------------------------
+    # 작업 단위 사용 표시
+    # ------------------------------------------------------------
+    @contextmanager
+    def use(self, models: List[str], base_url: Optional[str] = None):
+        """
+        작업 실행 동안 모델을 사용 중으로 표시
+
+        - 새 모델로 인해 VRAM 예산을 넘으면, 다른 작업이 끝나기를 기다린 뒤 LRU 모델 해제
+        - 블록 안에서는 해당 모델이 해제되지 않음
+
+        Usage:
+            with manager.use(get_workflow_models(workflow)):
+                client.execute_workflow(workflow)
+        """
+        key = self._key(base_url)
+        models = list(dict.fromkeys(models))
+        self._enter(key, models)
+        try:
+            yield
+        finally:
+            self._exit(key, models)
+
+    def _enter(self, key: str, models: List[str]):
+        with self._cond:
+            while key in self._freeing:  # 해제 중에 모델을 올리면 /free에 같이 내려감
+                self._cond.wait()
+            resident = self._models(key)
+            new_models = [name for name in models if name not in resident]
+
+            for name in models:
+                if name not in resident:
+                    resident[name] = ResidentModel(name=name, vram_gb=estimate_vram_gb(name))
+                resident[name].in_flight += 1
+                resident[name].last_used = time.time()
+                resident.move_to_end(name)
+            try:
+                self._make_room(key, models, new_models)
+            except BaseException:
+                # 사용 표시를 되돌리지 않으면 이 모델은 해제되지 않고, 다른 작업의 해제도 계속 기다림
+                self._release_locked(key, models)
+                raise
+
+    def _make_room(self, key: str, models: List[str], new_models: List[str]):
+        """사용 표시 후 VRAM 예산을 넘으면 LRU 해제 (락을 잡은 상태에서 호출)"""
+        self._publish_usage(key)
+
+        if not new_models or not self._lru_victims(key, models):
+            return
+
+        # /free는 전체 해제이므로 실행 중인 다른 작업이 모두 끝나야 호출 가능
+        # (해제를 기다리는 작업끼리는 서로 기다리지 않도록 대기 슬롯을 따로 센다)
+        self._waiting[key] = self._waiting.get(key, 0) + len(models)
+        try:
+            deadline = time.time() + self.eviction_wait
+            while (
+                self._in_flight(key) - self._waiting[key] > 0 or key in self._freeing
+                or self._other_workers(key)["in_flight"]
+            ):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    logger.warning(
+                        "⚠️ VRAM 예산 초과지만 실행 중인 작업이 있어 모델 해제를 건너뜁니다 "
+                        "(ComfyUI 자체 메모리 관리에 맡김)"
+                    )
+                    return
+                # 다른 워커의 작업 종료는 알림이 오지 않으므로 1초마다 다시 확인
+                self._cond.wait(timeout=min(remaining, 1.0))
+        finally:
+            self._waiting[key] -= len(models)
+
+        victims = self._lru_victims(key, models)
+        if not victims:
+            return
+
+        logger.info(
+            f"📦 VRAM 예산 초과 ({self._resident_vram(key):.0f}GB > {self.vram_budget_gb:.0f}GB) "
+            f"- LRU 해제 대상: {', '.join(victims)}"
+        )
+        self._free(key, reason="VRAM 예산 초과")
+
+    def _exit(self, key: str, models: List[str]):
+        with self._cond:
+            self._release_locked(key, models)
+
+    def _release_locked(self, key: str, models: List[str]):
+        """사용 표시 해제 (공유 상태 기록이 실패해도 이 워커의 사용 수는 먼저 되돌림)"""
+        resident = self._models(key)
+        now = time.time()
+        for name in models:
+            model = resident.get(name)
+            if model is None:
+                continue
+            model.in_flight = max(0, model.in_flight - 1)
+            model.last_used = now
+        self._cond.notify_all()
+        self._publish_usage(key)
+
+    # ------------------------------------------------------------
+    # 해제
+    # ------------------------------------------------------------
+    def unload(self, base_url: Optional[str] = None) -> dict:
+        """
+        인스턴스의 모든 모델 해제 (실행 중인 작업이 있으면 거부)
+
+        Returns:
+            {"success": bool, "message": str}
+        """
+        key = self._key(base_url)
+        with self._cond:
+            busy = {name: m.in_flight for name, m in self._models(key).items() if m.in_flight}
+            others = self._other_workers(key)["in_flight"]
+            if others:
+                busy["other_workers"] = others
+            if busy:
+                jobs = ", ".join(f"{name}({count})" for name, count in busy.items())
+                return {
+                    "success": False,
+                    "message": f"실행 중인 작업이 모델을 사용 중이라 언로드할 수 없습니다: {jobs}",
+                    "in_flight": busy
+                }
+
+            if self._free(key, reason="사용자 요청"):
+                self.select(None, key)
+                return {"success": True, "message": "모델 언로드 및 메모리 해제 완료"}
+            return {"success": False, "message": "메모리 해제 요청 실패"}
+
+    def reap_idle(self) -> List[str]:
+        """
+        유휴 TTL이 지난 인스턴스의 모델 해제
+
+        Returns:
+            해제된 인스턴스 base_url 리스트
+        """
+        reaped = []
+        now = time.time()
+        with self._cond:
+            # _free가 락을 잠시 놓으므로 목록을 복사해서 순회
+            for key, resident in list(self._resident.items()):
+                if not resident or key in self._freeing or self._in_flight(key) > 0:
+                    continue
+                others = self._other_workers(key)
+                if others["in_flight"]:
+                    continue
+                # 전체 해제만 가능하므로 가장 최근 사용 모델 기준으로 판단 (다른 워커의 사용 포함)
+                newest = max(max(m.last_used for m in resident.values()), others["last_used"])
+                if now - newest < self.idle_ttl:
+                    continue
+                if self._free(key, reason=f"유휴 {now - newest:.0f}초"):
+                    reaped.append(key)
+        return reaped
+
+    # ------------------------------------------------------------
+    # ComfyUI 상태 동기화
+    # ------------------------------------------------------------
+    def sync(self, base_url: Optional[str] = None) -> dict:
+        """
+        /system_stats와 실행 히스토리로 실제 상주 상태와 동기화
+
+        - torch VRAM 사용량이 비어 있으면 (ComfyUI 재시작/외부 해제) 추적 목록 초기화
+        - 최근 실행된 프롬프트의 UNET 모델을 상주 목록에 반영
+        """
+        key = self._key(base_url)
+        client = self._client_factory(key)
+
+        stats = client.get_system_stats()
+        devices = stats.get("devices") or []
+        torch_vram = sum(d.get("torch_vram_total", 0) or 0 for d in devices)
+
+        history = {}
+        if devices and torch_vram >= EMPTY_VRAM_THRESHOLD:
+            history = client.get_recent_history(self.history_sync_items)
+
+        with self._cond:
+            resident = self._models(key)
+            if not devices:
+                return self._snapshot_locked(key)
+
+            if torch_vram < EMPTY_VRAM_THRESHOLD:
+                if resident and self._in_flight(key) == 0:
+                    logger.info("ℹ️ ComfyUI VRAM이 비어 있음 - 상주 목록 초기화")
+                    resident.clear()
+                return self._snapshot_locked(key)
+
+            # 히스토리는 오래된 순으로 반영해야 LRU 순서가 맞다
+            executed = []
+            for item in history.values():
+                finished_at = _history_finished_at(item)
+                workflow = _history_workflow(item)
+                if finished_at is None or not workflow:
+                    continue
+                for name in get_workflow_models(workflow):
+                    executed.append((finished_at, name))
+
+            for finished_at, name in sorted(executed):
+                model = resident.get(name)
+                if model is None:
+                    model = ResidentModel(name=name, vram_gb=estimate_vram_gb(name), last_used=finished_at)
+                    resident[name] = model
+                elif model.in_flight == 0 and finished_at > model.last_used:
+                    model.last_used = finished_at
+                resident.move_to_end(name)
+
+            return self._snapshot_locked(key)
+
+    # ------------------------------------------------------------
+    # 상태 조회
+    # ------------------------------------------------------------
+    def _snapshot_locked(self, key: str) -> dict:
+        now = time.time()
+        return {
+            "base_url": key,
+            "selected_model": self.get_selected(key),
+            "vram_budget_gb": self.vram_budget_gb,
+            "resident_vram_gb": self._resident_vram(key),
+            "idle_ttl": self.idle_ttl,
+            "models": [
+                {
+                    "name": m.name,
+                    "vram_gb": m.vram_gb,
+                    "in_flight": m.in_flight,
+                    "idle_seconds": round(m.idle_seconds(now), 1)
+                }
+                for m in self._models(key).values()
+            ]
+        }
+
+    def snapshot(self, base_url: Optional[str] = None) -> dict:
+        """상주 상태 스냅샷 (status API용)"""
+        with self._cond:
+            return self._snapshot_locked(self._key(base_url))
+
+    # ------------------------------------------------------------
+    # 백그라운드 정리 스레드
+    # ------------------------------------------------------------
+    def start_reaper(self, interval: float = 60.0):
+        """동기화 + 유휴 모델 해제를 주기적으로 수행하는 데몬 스레드 시작"""
+        if self._reaper and self._reaper.is_alive():
+            return
+
+        def _loop():
+            while not self._stop.wait(interval):
+                try:
+                    with self._cond:
+                        keys = list(self._resident.keys()) or [self.default_base_url]
+                    for key in keys:
+                        self.sync(key)
+                    self.reap_idle()
+                except Exception as e:
+                    logger.warning(f"⚠️ 모델 상주 관리 스레드 오류: {e}")
+
+        self._stop.clear()
+        self._reaper = threading.Thread(target=_loop, name="model-residency-reaper", daemon=True)
+        self._reaper.start()
+        logger.info(f"✅ 모델 상주 관리 시작 (예산 {self.vram_budget_gb}GB, TTL {self.idle_ttl}초)")
+
+    def stop_reaper(self):
+        self._stop.set()
+
+
+def _history_workflow(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """히스토리 항목에서 워크플로우 JSON 추출 (prompt = [number, prompt_id, workflow, extra, outputs])"""
+    prompt = item.get("prompt")
+    if isinstance(prompt, (list, tuple)) and len(prompt) > 2 and isinstance(prompt[2], dict):
+        return prompt[2]
+    return None
+
+
+def _history_finished_at(item: Dict[str, Any]) -> Optional[float]:
+    """
+    히스토리 항목의 실행 완료 시각 (epoch 초)
+
+    완료되지 않았거나 완료 시각(execution_success / execution_cached timestamp)이 없으면 None
+    (현재 시각으로 대신하면 히스토리가 남아 있는 동안 동기화마다 유휴 시간이 초기화됨)
+    """
+    status = item.get("status", {})
+    if not status.get("completed", False):
+        return None
+    finished_at = None
+    for message in status.get("messages", []):
+        if isinstance(message, (list, tuple)) and len(message) == 2:
+            event, data = message
+            if event in ("execution_success", "execution_cached") and isinstance(data, dict):
+                timestamp = data.get("timestamp")
+                if timestamp:
+                    finished_at = max(finished_at or 0, timestamp / 1000.0)
+    return finished_at
+
+
+# 싱글톤 인스턴스
+_residency_manager: Optional[ModelResidencyManager] = None
+_residency_lock = threading.Lock()
+
+def get_residency_manager() -> ModelResidencyManager:
+    """ModelResidencyManager 싱글톤 인스턴스 (image_editing_config.yaml 기반)"""
+    global _residency_manager
+    if _residency_manager is None:
+        with _residency_lock:
+            if _residency_manager is None:
+                from .comfyui_workflows import load_image_editing_config
+
+                comfyui_config = load_image_editing_config().get("comfyui", {})
+                residency_config = comfyui_config.get("residency", {})
+                _residency_manager = ModelResidencyManager(
+                    default_base_url=comfyui_config.get("base_url", "http://localhost:8188"),
+                    vram_budget_gb=residency_config.get("vram_budget_gb", 22),
+                    idle_ttl=residency_config.get("idle_ttl", 900),
+                    eviction_wait=residency_config.get("eviction_wait", 600),
+                    history_sync_items=residency_config.get("history_sync_items", 20)
+                )
+    return _residency_manager
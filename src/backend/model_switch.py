@@ -0,0 +1,274 @@
+# model_switch.py
+"""
+비동기 모델 전환
+- 선택한 GGUF 모델을 백그라운드에서 ComfyUI에 워밍업 (최소 워크플로우 실행)
+- 진행 단계/퍼센트 제공 (/api/switch_model_status)
+- 전환 중 들어온 생성 요청은 전환이 끝날 때까지 대기
+- 진행 상태는 공유 상태(shared_state)에도 기록 → 다른 워커도 전환 중임을 알고 대기 / 중복 전환 거부
+"""
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+from .model_registry import get_registry
+from .model_residency import get_residency_manager, get_workflow_models
+from .shared_state import INSTANCE_ID, get_shared_state
+
+logger = logging.getLogger(__name__)
+
+# 단계별 진행률 (loading 구간은 예상 로딩 시간 대비 경과 시간으로 보간)
+STAGE_PERCENT = {
+    "idle": 0,
+    "preparing": 5,
+    "queued": 15,
+    "loading": 20,
+    "done": 100,
+    "failed": 100
+}
+LOADING_PERCENT_SPAN = 75  # loading 구간: 20% → 95%
+MODEL_SWITCH = "model_switch"  # 공유 상태 네임스페이스: base_url → 진행 상태 (+ owner 워커)
+
+
+class ModelSwitcher:
+    """백그라운드 모델 전환 관리 (한 번에 하나의 전환만 수행)"""
+
+    def __init__(self, base_url: str, timeout: int = 600):
+        """
+        Args:
+            base_url: ComfyUI 서버 주소
+            timeout: 워밍업 최대 대기 시간 (초)
+        """
+        self.base_url = base_url
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._done.set()
+        self._thread: Optional[threading.Thread] = None
+        self._state: Dict[str, Any] = self._new_state(None, None)
+
+        # 모델별 워밍업 소요 시간 (지수 이동 평균, 진행률 추정용)
+        self._warm_seconds: Dict[str, float] = {}
+
+    @staticmethod
+    def _new_state(model_name: Optional[str], previous_model: Optional[str]) -> Dict[str, Any]:
+        return {
+            "in_progress": False,
+            "success": None,
+            "model_name": model_name,
+            "previous_model": previous_model,
+            "stage": "idle",
+            "message": "",
+            "error": None,
+            "prompt_id": None,
+            "started_at": None,
+            "finished_at": None
+        }
+
+    def _expected_seconds(self, model_name: str) -> float:
+        """예상 워밍업 시간 (이력이 없으면 VRAM 크기로 추정)"""
+        if model_name in self._warm_seconds:
+            return self._warm_seconds[model_name]
+        model = get_registry().get_model(model_name)
+        vram_gb = model.vram_gb if model else 16
+        return 10 + vram_gb * 2.5
+
+    def _set(self, **kwargs):
+        with self._lock:
+            self._state.update(kwargs)
+            self._publish_locked()
+
+    def _publish_locked(self):
+        get_shared_state().set(MODEL_SWITCH, self.base_url, {**self._state, "owner": INSTANCE_ID})
+
+    def _remote_state(self) -> Optional[Dict[str, Any]]:
+        """다른 (살아 있는) 워커가 진행 중인 전환 상태 (없으면 None)"""
+        shared = get_shared_state()
+        state = shared.get(MODEL_SWITCH, self.base_url)
+        if not state or not state.get("in_progress") or state.get("owner") == INSTANCE_ID:
+            return None
+        if not shared.is_alive(state.get("owner")):
+            return None  # 전환 중 종료된 워커
+        state.pop("owner", None)
+        return state
+
+    # ------------------------------------------------------------
+    # 공개 API
+    # ------------------------------------------------------------
+    def start(self, model_name: str) -> Dict[str, Any]:
+        """
+        모델 전환 시작 (즉시 반환)
+
+        Raises:
+            ValueError: 전환할 수 없는 모델
+            RuntimeError: 다른 모델로 전환이 이미 진행 중
+        """
+        model = get_registry().get_model(model_name)
+        if not model or not model.supports_t2i:
+            raise ValueError(f"전환할 수 없는 모델입니다: {model_name}")
+
+        residency = get_residency_manager()
+
+        with self._lock, get_shared_state().lock(MODEL_SWITCH):
+            state = self._state if self._state["in_progress"] else self._remote_state()
+            if state:
+                if state["model_name"] == model_name:
+                    return self._status_of(state)
+                raise RuntimeError(
+                    f"다른 모델로 전환 중입니다: {state['model_name']}"
+                )
+
+            previous_model = residency.get_selected()
+            self._state = self._new_state(model_name, previous_model)
+            self._state.update(
+                in_progress=True,
+                stage="preparing",
+                message=f"'{model_name}' 전환 준비 중",
+                started_at=time.time()
+            )
+            self._done.clear()
+            self._publish_locked()
+
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(model_name,),
+                name="model-switch",
+                daemon=True
+            )
+            self._thread.start()
+            return self._status_locked()
+
+    def status(self) -> Dict[str, Any]:
+        """현재 전환 상태 (진행률 포함, 다른 워커가 전환 중이면 그 상태)"""
+        with self._lock:
+            if not self._state["in_progress"]:
+                remote = self._remote_state()
+                if remote:
+                    return self._status_of(remote)
+            return self._status_locked()
+
+    def _status_locked(self) -> Dict[str, Any]:
+        return self._status_of(self._state)
+
+    def _status_of(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        state = dict(state)
+        stage = state["stage"]
+        percent = STAGE_PERCENT.get(stage, 0)
+
+        if stage == "loading" and state["model_name"]:
+            loading_started = state.get("loading_started_at") or time.time()
+            expected = self._expected_seconds(state["model_name"])
+            ratio = min(1.0, (time.time() - loading_started) / max(expected, 1.0))
+            percent = STAGE_PERCENT["loading"] + int(LOADING_PERCENT_SPAN * ratio)
+
+        state["percent"] = percent
+        if state["started_at"]:
+            end = state["finished_at"] or time.time()
+            state["elapsed"] = round(end - state["started_at"], 1)
+        state.pop("loading_started_at", None)
+        return state
+
+    def is_switching(self) -> bool:
+        return not self._done.is_set() or self._remote_state() is not None
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        진행 중인 전환이 끝날 때까지 대기 (생성 요청이 전환 뒤에 줄 서도록)
+
+        Returns:
+            전환이 끝났으면 True, 타임아웃이면 False
+        """
+        if not self.is_switching():
+            return True
+        logger.info("⏳ 모델 전환 진행 중 - 전환 완료 후 생성 요청을 처리합니다")
+        deadline = time.time() + (timeout if timeout is not None else self.timeout)
+        if not self._done.wait(max(0.0, deadline - time.time())):
+            return False
+        # 다른 워커의 전환은 끝나도 알림이 오지 않으므로 1초마다 확인
+        while self._remote_state() is not None:
+            if time.time() >= deadline:
+                return False
+            time.sleep(1)
+        return True
+
+    # ------------------------------------------------------------
+    # 백그라운드 작업
+    # ------------------------------------------------------------
+    def _run(self, model_name: str):
+        from .comfyui_client import ComfyUIClient
+        from .comfyui_workflows import get_model_warmup_workflow
+
+        residency = get_residency_manager()
+        resident_names = [m["name"] for m in residency.snapshot(self.base_url)["models"]]
+
+        try:
+            # 이미 선택되어 있고 VRAM에 올라가 있으면 워밍업 생략
+            if residency.get_selected(self.base_url) == model_name and model_name in resident_names:
+                self._finish(model_name, success=True, message=f"이미 로드된 모델입니다: {model_name}")
+                return
+
+            client = ComfyUIClient(base_url=self.base_url, timeout=self.timeout)
+            if not client.check_connection():
+                raise ConnectionError("ComfyUI 서버에 연결할 수 없습니다.")
+
+            workflow = get_model_warmup_workflow(model_name)
+
+            logger.info(f"🔄 모델 전환 시작: {model_name}")
+            with residency.use(get_workflow_models(workflow), self.base_url):
+                self._set(stage="queued", message=f"'{model_name}' 워밍업 큐 등록 중")
+                prompt_id = client.queue_prompt(workflow)
+
+                loading_started = time.time()
+                self._set(
+                    stage="loading",
+                    prompt_id=prompt_id,
+                    loading_started_at=loading_started,
+                    message=f"'{model_name}' GGUF/T5/VAE 로딩 중"
+                )
+                client.wait_for_completion(prompt_id, check_interval=1)
+                client.release_history([prompt_id], immediate=True)
+
+            took = time.time() - loading_started
+            previous = self._warm_seconds.get(model_name)
+            self._warm_seconds[model_name] = took if previous is None else previous * 0.7 + took * 0.3
+
+            self._finish(model_name, success=True, message=f"모델 전환 완료: {model_name} ({took:.1f}초)")
+
+        except Exception as e:
+            logger.error(f"❌ 모델 전환 실패: {e}")
+            self._finish(model_name, success=False, error=str(e))
+
+    def _finish(self, model_name: str, success: bool, message: str = "", error: Optional[str] = None):
+        if success:
+            get_residency_manager().select(model_name, self.base_url)
+            logger.info(f"✅ {message}")
+        self._set(
+            in_progress=False,
+            success=success,
+            stage="done" if success else "failed",
+            message=message or ("모델 전환 실패" if not success else ""),
+            error=error,
+            finished_at=time.time()
+        )
+        self._done.set()
+
+
+# 싱글톤 인스턴스
+_model_switcher: Optional[ModelSwitcher] = None
+_switcher_lock = threading.Lock()
+
+def get_model_switcher() -> ModelSwitcher:
+    """ModelSwitcher 싱글톤 인스턴스"""
+    global _model_switcher
+    if _model_switcher is None:
+        with _switcher_lock:
+            if _model_switcher is None:
+                from .comfyui_workflows import load_image_editing_config
+
+                comfyui_config = load_image_editing_config().get("comfyui", {})
+                _model_switcher = ModelSwitcher(
+                    base_url=comfyui_config.get("base_url", "http://localhost:8188"),
+                    timeout=comfyui_config.get("timeout", 600)
+                )
+    return _model_switcher
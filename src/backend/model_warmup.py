@@ -0,0 +1,373 @@
+# model_warmup.py
+"""
+예측 기반 모델 워밍업
+- 최근 요청 이력으로 다음에 쓰일 모델을 예측 (시간 감쇠 빈도)
+- 서버 시작 시 / GPU 유휴 시 예측 모델에 최소 워크플로우를 실행해 VRAM에 올려둠
+- OpenAI / ComfyUI 커넥션 풀을 미리 열어 첫 요청의 연결 비용 제거
+- 콜드/웜 상태별 첫 이미지 지연 시간 측정
+"""
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, Optional, List
+
+from . import metrics
+from .model_registry import get_registry
+from .model_residency import get_residency_manager, get_workflow_models
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DEFAULT_HISTORY_PATH = os.path.join(PROJECT_ROOT, "logs", "model_request_history.json")
+
+
+class RequestHistory:
+    """모델 요청 이력 (파일에 저장되어 재배포 후에도 예측에 사용)"""
+
+    def __init__(self, path: str, max_items: int = 500):
+        self.path = path
+        self._items: deque = deque(maxlen=max_items)
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for ts, model_name in json.load(f):
+                    self._items.append((float(ts), model_name))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"⚠️ 모델 요청 이력 로드 실패: {e}")
+
+    def save(self):
+        with self._lock:
+            items = list(self._items)
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(items, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"⚠️ 모델 요청 이력 저장 실패: {e}")
+
+    def record(self, model_name: str):
+        with self._lock:
+            self._items.append((time.time(), model_name))
+
+    def last_requested(self, model_name: str) -> Optional[float]:
+        with self._lock:
+            for ts, name in reversed(self._items):
+                if name == model_name:
+                    return ts
+        return None
+
+    def scores(self, half_life: float, now: Optional[float] = None) -> Dict[str, float]:
+        """모델별 시간 감쇠 요청 점수 (최근 요청일수록 가중치 큼)"""
+        now = now or time.time()
+        scores: Dict[str, float] = {}
+        with self._lock:
+            for ts, name in self._items:
+                weight = 0.5 ** (max(0.0, now - ts) / half_life)
+                scores[name] = scores.get(name, 0.0) + weight
+        return scores
+
+
+class WarmupManager:
+    """예측 워밍업 + 커넥션 풀 사전 연결 + 콜드스타트 지연 측정"""
+
+    def __init__(self, base_url: str, timeout: int = 600, config: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            base_url: ComfyUI 서버 주소
+            timeout: 워밍업 워크플로우 최대 대기 시간 (초)
+            config: image_editing_config.yaml의 comfyui.warmup 섹션
+        """
+        config = config or {}
+        self.base_url = base_url
+        self.timeout = timeout
+        self.enabled = config.get("enabled", True)
+        self.on_startup = config.get("on_startup", True)
+        self.idle_check_interval = config.get("idle_check_interval", 30)
+        self.max_models = config.get("max_models", 1)
+        self.half_life = config.get("half_life", 3600)
+        self.min_score = config.get("min_score", 0.5)
+        self.pool_connections = config.get("pool_connections", 2)
+
+        self.history = RequestHistory(
+            path=config.get("history_path") or DEFAULT_HISTORY_PATH,
+            max_items=config.get("history_size", 500)
+        )
+
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._warming: Optional[str] = None
+
+        # 지연 시간 측정 (콜드 = 요청 시점에 모델이 VRAM에 없었음)
+        self._started_at = time.time()
+        self._first_image: Optional[Dict[str, Any]] = None
+        self._latency = {
+            "cold": {"count": 0, "total": 0.0},
+            "warm": {"count": 0, "total": 0.0}
+        }
+        self._warmups: List[Dict[str, Any]] = []
+
+    # ------------------------------------------------------------
+    # 요청 기록 / 예측
+    # ------------------------------------------------------------
+    def record_request(self, model_name: str):
+        """생성 요청에 사용된 모델 기록"""
+        if not model_name:
+            return
+        self.history.record(model_name)
+
+    def record_generation(self, model_name: str, seconds: float, cold: bool):
+        """이미지 생성 완료 기록 (콜드/웜 지연 시간 집계)"""
+        bucket = "cold" if cold else "warm"
+        with self._lock:
+            self._latency[bucket]["count"] += 1
+            self._latency[bucket]["total"] += seconds
+            if self._first_image is None:
+                self._first_image = {
+                    "model": model_name,
+                    "cold": cold,
+                    "latency": round(seconds, 2),
+                    "since_start": round(time.time() - self._started_at, 2)
+                }
+                logger.info(
+                    f"⏱️ 첫 이미지 생성: {seconds:.1f}초 ({'콜드' if cold else '웜'} 스타트, 모델: {model_name})"
+                )
+        self.history.save()
+
+    def predict(self, limit: Optional[int] = None, ignore_min_score: bool = False) -> List[str]:
+        """
+        다음에 요청될 가능성이 높은 모델 예측 (VRAM 예산 이내)
+
+        Args:
+            limit: 최대 모델 수 (기본: max_models)
+            ignore_min_score: 최소 점수 조건 무시 (서버 시작 시)
+        """
+        registry = get_registry()
+        budget = get_residency_manager().vram_budget_gb
+        limit = limit or self.max_models
+
+        scores = self.history.scores(self.half_life)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+        predicted, used_vram = [], 0.0
+        for name, score in ranked:
+            model = registry.get_model(name)
+            if not model or not model.supports_t2i:
+                continue
+            if not ignore_min_score and score < self.min_score:
+                continue
+            if used_vram + model.vram_gb > budget:
+                continue
+            predicted.append(name)
+            used_vram += model.vram_gb
+            if len(predicted) >= limit:
+                break
+        return predicted
+
+    # ------------------------------------------------------------
+    # 워밍업
+    # ------------------------------------------------------------
+    def warm_connections(self, openai_client=None, openai_model: Optional[str] = None) -> dict:
+        """ComfyUI / OpenAI 커넥션 풀 미리 열기"""
+        from .comfyui_client import ComfyUIClient
+
+        result = {"comfyui": 0, "openai": False}
+        try:
+            result["comfyui"] = ComfyUIClient(base_url=self.base_url).warm_connections(self.pool_connections)
+        except Exception as e:
+            logger.warning(f"⚠️ ComfyUI 커넥션 사전 연결 실패: {e}")
+
+        if openai_client is not None:
+            try:
+                # 토큰을 소모하지 않는 가벼운 조회로 TLS 연결만 맺어둔다
+                if openai_model:
+                    openai_client.models.retrieve(openai_model)
+                else:
+                    openai_client.models.list()
+                result["openai"] = True
+            except Exception as e:
+                logger.warning(f"⚠️ OpenAI 커넥션 사전 연결 실패: {e}")
+
+        logger.info(f"🔌 커넥션 풀 사전 연결: ComfyUI {result['comfyui']}개, OpenAI {'OK' if result['openai'] else '-'}")
+        return result
+
+    def warm_model(self, model_name: str, reason: str) -> Optional[float]:
+        """
+        최소 워크플로우로 모델을 ComfyUI VRAM에 올림
+
+        Returns:
+            소요 시간 (초), 실패 시 None
+        """
+        from .comfyui_client import ComfyUIClient
+        from .comfyui_workflows import get_model_warmup_workflow
+
+        with self._lock:
+            if self._warming:
+                return None
+            self._warming = model_name
+
+        start = time.time()
+        try:
+            client = ComfyUIClient(base_url=self.base_url, timeout=self.timeout)
+            workflow = get_model_warmup_workflow(model_name)
+            logger.info(f"🔥 모델 워밍업 시작 ({reason}): {model_name}")
+            with metrics.request_labels(endpoint="warmup", model=model_name), \
+                    get_residency_manager().use(get_workflow_models(workflow), self.base_url):
+                prompt_id = client.queue_prompt(workflow)
+                client.wait_for_completion(prompt_id, check_interval=1)
+                client.release_history([prompt_id], immediate=True)
+            took = time.time() - start
+            logger.info(f"✅ 모델 워밍업 완료: {model_name} ({took:.1f}초)")
+            with self._lock:
+                self._warmups.append({"model": model_name, "reason": reason, "seconds": round(took, 2), "at": time.time()})
+                self._warmups = self._warmups[-20:]
+            return took
+        except Exception as e:
+            logger.warning(f"⚠️ 모델 워밍업 실패 ({model_name}): {e}")
+            return None
+        finally:
+            with self._lock:
+                self._warming = None
+
+    def _gpu_idle(self) -> bool:
+        """ComfyUI 큐가 비어 있고 실행 중인 작업/모델 전환이 없으면 유휴"""
+        from .comfyui_client import ComfyUIClient
+        from .model_switch import get_model_switcher
+
+        if get_model_switcher().is_switching():
+            return False
+        snapshot = get_residency_manager().snapshot(self.base_url)
+        if any(m["in_flight"] for m in snapshot["models"]):
+            return False
+        queue = ComfyUIClient(base_url=self.base_url).get_queue_status()
+        if not queue:
+            return False
+        return not queue.get("queue_running") and not queue.get("queue_pending")
+
+    def _run_startup(self, openai_client, openai_model):
+        self.warm_connections(openai_client, openai_model)
+        if not self.on_startup:
+            return
+
+        residency = get_residency_manager()
+        predicted = self.predict(ignore_min_score=True)
+        if not predicted:
+            primary = get_registry().get_primary_model()
+            model = get_registry().get_model(primary)
+            predicted = [primary] if model and model.supports_t2i else []
+
+        for model_name in predicted:
+            if self.warm_model(model_name, reason="서버 시작") is not None:
+                # 아무 모델도 선택되지 않았다면 첫 예측 모델을 현재 모델로 지정
+                if residency.get_selected(self.base_url) is None:
+                    residency.select(model_name, self.base_url)
+
+    def _run_idle_once(self):
+        """
+        GPU 유휴 시 예측 모델 재워밍업
+
+        - 사용자가 명시적으로 언로드한 경우(선택 모델 없음)는 건너뜀
+        - 마지막 요청이 유휴 TTL보다 오래된 모델은 다시 올리지 않음 (TTL 해제와 충돌 방지)
+        """
+        residency = get_residency_manager()
+        if residency.get_selected(self.base_url) is None:
+            return
+
+        resident = {m["name"] for m in residency.snapshot(self.base_url)["models"]}
+        now = time.time()
+        for model_name in self.predict():
+            if model_name in resident:
+                continue
+            last = self.history.last_requested(model_name)
+            if last is None or now - last > residency.idle_ttl:
+                continue
+            if not self._gpu_idle():
+                return
+            self.warm_model(model_name, reason="GPU 유휴")
+
+    def start(self, openai_client=None, openai_model: Optional[str] = None, leader: bool = True):
+        """
+        서버 시작 워밍업 + 유휴 워밍업 백그라운드 스레드 시작
+
+        Args:
+            leader: False면 커넥션 풀 사전 연결만 (모델 워밍업은 리더 워커 1개만 - 워커 수만큼 중복 방지)
+        """
+        if not self.enabled:
+            logger.info("ℹ️ 모델 워밍업 비활성화")
+            return
+        if self._thread and self._thread.is_alive():
+            return
+
+        def _loop():
+            if not leader:
+                try:
+                    self.warm_connections(openai_client, openai_model)
+                except Exception as e:
+                    logger.warning(f"⚠️ 커넥션 사전 연결 오류: {e}")
+                return
+            try:
+                self._run_startup(openai_client, openai_model)
+            except Exception as e:
+                logger.warning(f"⚠️ 시작 워밍업 오류: {e}")
+            while not self._stop.wait(self.idle_check_interval):
+                try:
+                    self._run_idle_once()
+                except Exception as e:
+                    logger.warning(f"⚠️ 유휴 워밍업 오류: {e}")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=_loop, name="model-warmup", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self) -> dict:
+        """워밍업/지연 시간 상태 (status API용)"""
+        with self._lock:
+            latency = {
+                bucket: {
+                    "count": data["count"],
+                    "avg_seconds": round(data["total"] / data["count"], 2) if data["count"] else None
+                }
+                for bucket, data in self._latency.items()
+            }
+            return {
+                "enabled": self.enabled,
+                "warming": self._warming,
+                "predicted": self.predict(),
+                "first_image": self._first_image,
+                "latency": latency,
+                "recent_warmups": list(self._warmups)
+            }
+
+
+# 싱글톤 인스턴스
+_warmup_manager: Optional[WarmupManager] = None
+_warmup_lock = threading.Lock()
+
+def get_warmup_manager() -> WarmupManager:
+    """WarmupManager 싱글톤 인스턴스"""
+    global _warmup_manager
+    if _warmup_manager is None:
+        with _warmup_lock:
+            if _warmup_manager is None:
+                from .comfyui_workflows import load_image_editing_config
+
+                comfyui_config = load_image_editing_config().get("comfyui", {})
+                _warmup_manager = WarmupManager(
+                    base_url=comfyui_config.get("base_url", "http://localhost:8188"),
+                    timeout=comfyui_config.get("timeout", 600),
+                    config=comfyui_config.get("warmup", {})
+                )
+    return _warmup_manager
@@ -0,0 +1,289 @@
+# node_timing.py
+"""
+ComfyUI 노드별 실행 시간 통계 + 작업 ETA
+- 완료된 prompt마다 노드별 실행 시간 기록 (WebSocket executing 이벤트 간격, ComfyUIProgressListener)
+  - WebSocket을 쓸 수 없으면 history의 execution_start / execution_success로 전체 실행 시간만 기록
+- 통계 키: (워크플로우 종류, 모델, 해상도) - 키마다 최근 window개 실행의 롤링 통계
+  - 워크플로우 종류: 편집 모드 ID(portrait_mode 등) 또는 엔드포인트(t2i, i2i, drafts, ...)
+  - 같은 키의 기록이 없으면 같은 워크플로우 → 전체 평균 순으로 대체
+- ETA
+  - 실행 중: 아직 실행되지 않은 노드의 평균 실행 시간 합 + 현재 노드의 남은 시간
+  - 대기 중: 앞선 작업(실행 중 포함)의 남은 시간 + 자신의 예상 실행 시간
+- 느린 노드 리포트: 워크플로우 종류별 평균 실행 시간 상위 노드 (편집 모드는 단계 이름 포함)
+
+설정: configs/image_editing_config.yaml: comfyui.node_timing
+"""
+import time
+import threading
+import statistics
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from . import metrics
+
+
+@dataclass(frozen=True)
+class TimingKey:
+    """통계 키 (워크플로우 종류, 모델, 해상도)"""
+    workflow: str
+    model: str = "none"
+    resolution: str = "input"
+
+    @property
+    def label(self) -> str:
+        return f"{self.workflow}/{self.model}/{self.resolution}"
+
+
+def workflow_resolution(workflow: Dict[str, Any]) -> str:
+    """워크플로우 그래프의 출력 해상도 ("1024x1024", latent 크기를 지정하지 않으면 "input")"""
+    for node in workflow.values():
+        inputs = node.get("inputs", {}) if isinstance(node, dict) else {}
+        width, height = inputs.get("width"), inputs.get("height")
+        if isinstance(width, int) and isinstance(height, int):
+            return f"{width}x{height}"
+    return "input"
+
+
+def timing_key(workflow: Dict[str, Any]) -> TimingKey:
+    """현재 요청 라벨(endpoint / model / mode) + 워크플로우 해상도로 통계 키 생성"""
+    labels = metrics.current_labels()
+    kind = labels["mode"] if labels["mode"] != "none" else labels["endpoint"]
+    if kind.endswith("_stream"):
+        kind = kind[:-len("_stream")]
+    return TimingKey(workflow=kind, model=labels["model"], resolution=workflow_resolution(workflow))
+
+
+class _RollingStat:
+    """최근 window개 값의 통계"""
+
+    def __init__(self, window: int):
+        self.values: "deque[float]" = deque(maxlen=window)
+
+    def add(self, value: float):
+        self.values.append(max(0.0, float(value)))
+
+    @property
+    def mean(self) -> float:
+        return statistics.fmean(self.values) if self.values else 0.0
+
+    def percentile(self, q: float) -> float:
+        if not self.values:
+            return 0.0
+        ordered = sorted(self.values)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": len(self.values),
+            "mean": round(self.mean, 3),
+            "p50": round(self.percentile(0.5), 3),
+            "p90": round(self.percentile(0.9), 3),
+            "max": round(max(self.values, default=0.0), 3)
+        }
+
+
+class NodeTimingStore:
+    """노드별 실행 시간 롤링 통계 + 큐 ETA 추정 (스레드 안전)"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.enabled = config.get("enabled", True)
+        self.window = config.get("window", 50)
+        self.max_tracked_prompts = config.get("max_tracked_prompts", 256)
+        self._executions: Dict[TimingKey, _RollingStat] = {}
+        self._nodes: Dict[TimingKey, Dict[str, _RollingStat]] = {}
+        self._node_types: Dict[TimingKey, Dict[str, str]] = {}
+        self._prompts: "OrderedDict[str, TimingKey]" = OrderedDict()  # 등록 후 완료 전인 prompt
+        self._lock = threading.Lock()
+
+    # ---------- 기록 ----------
+    def register_prompt(self, prompt_id: str, key: TimingKey):
+        """큐에 등록한 prompt의 통계 키 (ETA 계산용)"""
+        with self._lock:
+            self._prompts[prompt_id] = key
+            while len(self._prompts) > self.max_tracked_prompts:
+                self._prompts.popitem(last=False)
+
+    def forget_prompt(self, prompt_id: str):
+        with self._lock:
+            self._prompts.pop(prompt_id, None)
+
+    def record(
+        self,
+        prompt_id: str,
+        execution_seconds: Optional[float],
+        nodes: Iterable[Tuple[str, str, float, bool]] = ()
+    ):
+        """
+        완료된 prompt 기록
+
+        Args:
+            execution_seconds: 전체 실행 시간 (history 타임스탬프)
+            nodes: (node_id, class_type, 실행 시간, 캐시 여부) - 캐시된 노드는 통계에서 제외
+        """
+        with self._lock:
+            key = self._prompts.pop(prompt_id, None)
+            if key is None or not self.enabled:
+                return
+            if execution_seconds is not None:
+                self._executions.setdefault(key, _RollingStat(self.window)).add(execution_seconds)
+            node_stats = self._nodes.setdefault(key, {})
+            node_types = self._node_types.setdefault(key, {})
+            for node_id, class_type, seconds, cached in nodes:
+                if cached:
+                    continue
+                node_stats.setdefault(node_id, _RollingStat(self.window)).add(seconds)
+                node_types[node_id] = class_type
+
+    # ---------- 예측 ----------
+    def _candidates(self, key: Optional[TimingKey]) -> List[TimingKey]:
+        """key와 같은 키 → 같은 워크플로우 → 전체 순 (기록이 있는 키만)"""
+        if key is not None and key in self._executions:
+            return [key]
+        if key is not None:
+            same = [k for k in self._executions if k.workflow == key.workflow]
+            if same:
+                return same
+        return list(self._executions)
+
+    def _expected_locked(self, key: Optional[TimingKey]) -> Optional[float]:
+        stats = [self._executions[k] for k in self._candidates(key)]
+        values = [v for s in stats for v in s.values]
+        return statistics.fmean(values) if values else None
+
+    def expected_execution(self, key: Optional[TimingKey]) -> Optional[float]:
+        """예상 실행 시간 (초, 기록이 전혀 없으면 None)"""
+        with self._lock:
+            return self._expected_locked(key)
+
+    def _remaining_locked(self, key: Optional[TimingKey], progress: List[list], now: float) -> Optional[float]:
+        expected = self._expected_locked(key)
+        node_stats = self._nodes.get(key) if key is not None else None
+        if not progress or not node_stats:
+            # 노드 진행 정보가 없으면 실행 시작 시각 기준
+            if expected is None:
+                return None
+            started = progress[0][1] if progress else None
+            return max(0.0, expected - (now - started)) if started else expected
+
+        done = {node_id for node_id, _, end, _ in progress if end is not None}
+        current = next((n for n in progress if n[2] is None), None)
+        remaining = sum(
+            stat.mean for node_id, stat in node_stats.items()
+            if node_id not in done and (current is None or node_id != current[0])
+        )
+        if current is not None:
+            stat = node_stats.get(current[0])
+            remaining += max(0.0, (stat.mean if stat else 0.0) - (now - current[1]))
+        return remaining
+
+    def estimate_queue(
+        self,
+        queue_running: List[list],
+        queue_pending: List[list],
+        progress: Callable[[str], List[list]]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        ComfyUI /queue 항목별 ETA
+
+        Args:
+            queue_running / queue_pending: /queue 응답 ([번호, prompt_id, prompt, ...])
+            progress: prompt_id → 리스너가 기록 중인 [[node_id, 시작, 종료, 캐시], ...]
+
+        Returns:
+            {prompt_id: {"state", "position", "workflow", "eta_seconds"}} (예측 불가 시 eta_seconds=None)
+        """
+        now = time.time()
+        result: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            ahead = 0.0
+            unknown = False
+            for item in queue_running:
+                prompt_id = item[1]
+                key = self._prompts.get(prompt_id)
+                remaining = self._remaining_locked(key, progress(prompt_id), now)
+                unknown = unknown or remaining is None
+                ahead = max(ahead, remaining or 0.0)
+                result[prompt_id] = {
+                    "state": "running",
+                    "position": 0,
+                    "workflow": key.label if key else None,
+                    "eta_seconds": None if remaining is None else round(remaining, 1)
+                }
+            for position, item in enumerate(sorted(queue_pending, key=lambda i: i[0]), start=1):
+                prompt_id = item[1]
+                key = self._prompts.get(prompt_id)
+                expected = self._expected_locked(key)
+                unknown = unknown or expected is None
+                ahead += expected or 0.0
+                result[prompt_id] = {
+                    "state": "pending",
+                    "position": position,
+                    "workflow": key.label if key else None,
+                    "eta_seconds": None if unknown else round(ahead, 1)
+                }
+        return result
+
+    # ---------- 리포트 ----------
+    def slowest_nodes(self, top: int = 10, workflow: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        워크플로우 종류별 평균 실행 시간 상위 노드
+
+        Returns:
+            {워크플로우 종류: [{"node_id", "class_type", "step", "key", count/mean/p50/p90/max}, ...]}
+        """
+        from .comfyui_workflows import get_pipeline_steps_for_mode
+
+        rows: Dict[str, List[Dict[str, Any]]] = {}
+        with self._lock:
+            for key, node_stats in self._nodes.items():
+                if workflow and key.workflow != workflow:
+                    continue
+                types = self._node_types.get(key, {})
+                for node_id, stat in node_stats.items():
+                    rows.setdefault(key.workflow, []).append({
+                        "node_id": node_id,
+                        "class_type": types.get(node_id, "?"),
+                        "key": key.label,
+                        **stat.summary()
+                    })
+
+        report = {}
+        for kind, entries in sorted(rows.items()):
+            step_names = get_pipeline_steps_for_mode(kind)
+            entries.sort(key=lambda e: e["mean"], reverse=True)
+            report[kind] = [{**e, "step": step_names.get(e["node_id"])} for e in entries[:top]]
+        return report
+
+    def snapshot(self) -> Dict[str, Any]:
+        """키별 실행 시간 요약 (/api/comfyui/node_timings)"""
+        with self._lock:
+            return {
+                "tracked_prompts": len(self._prompts),
+                "executions": {key.label: stat.summary() for key, stat in sorted(
+                    self._executions.items(), key=lambda item: item[0].label
+                )}
+            }
+
+
+def load_node_timing_config() -> Dict[str, Any]:
+    """configs/image_editing_config.yaml: comfyui.node_timing"""
+    from .comfyui_workflows import load_image_editing_config
+
+    return load_image_editing_config().get("comfyui", {}).get("node_timing", {})
+
+
+# 싱글톤 인스턴스
+_node_timing_store: Optional[NodeTimingStore] = None
+_store_lock = threading.Lock()
+
+
+def get_node_timing_store() -> NodeTimingStore:
+    """NodeTimingStore 싱글톤 인스턴스"""
+    global _node_timing_store
+    if _node_timing_store is None:
+        with _store_lock:
+            if _node_timing_store is None:
+                _node_timing_store = NodeTimingStore(load_node_timing_config())
+    return _node_timing_store
@@ -0,0 +1,146 @@
+# oom_ladder.py
+"""
+GPU 메모리 부족(OOM) 사다리 - 실패한 워크플로우를 단계적으로 완화하며 재실행
+- 단계 (configs/image_editing_config.yaml: comfyui.oom_ladder, 누적 적용)
+  1. tiled_vae: VAEDecode → VAEDecodeTiled
+  2. lower_quant: model_config.yaml의 oom_fallback 모델 (예: Q8 → Q4)
+  3. lowres_upscale: 저해상도 생성 + 업스케일 노드 (요청 크기 유지)
+- 여러 워크플로우를 일괄 등록한 요청은 결과를 받은 워크플로우를 다시 실행하지 않음
+  (실패 시 뒤에 남은 작업은 execute_workflows가 큐에서 삭제)
+"""
+import logging
+from typing import Optional
+
+from . import metrics, tenancy
+from .exceptions import GPUOutOfMemoryError
+from .model_registry import get_registry
+from .model_residency import get_residency_manager, get_workflow_models
+
+logger = logging.getLogger(__name__)
+
+
+def get_workflow_seed(workflow: dict) -> Optional[int]:
+    """워크플로우에 설정된 샘플러 seed (KSampler seed / RandomNoise noise_seed)"""
+    for node in workflow.values():
+        inputs = node.get("inputs", {})
+        for key in ("seed", "noise_seed"):
+            if isinstance(inputs.get(key), int):
+                return inputs[key]
+    return None
+
+
+OOM_LADDER_RUNGS = ("tiled_vae", "lower_quant", "lowres_upscale")
+
+
+def execute_with_oom_ladder(
+    client,
+    base_url: str,
+    build_workflow,
+    model_name: str,
+    width: int,
+    height: int,
+    allow_lowres: bool = True,
+    **execute_kwargs
+) -> tuple:
+    """
+    GPU 메모리 부족(OOM) 시 단계적으로 완화하며 워크플로우 실행
+
+    사다리 (configs/image_editing_config.yaml: comfyui.oom_ladder, 누적 적용):
+        1. tiled_vae: VAEDecode → VAEDecodeTiled
+        2. lower_quant: model_config.yaml의 oom_fallback 모델 (예: Q8 → Q4)
+        3. lowres_upscale: 저해상도 생성 + 업스케일 노드 (요청 크기 유지, allow_lowres일 때만)
+
+    Args:
+        build_workflow: (model_name, seed) → 워크플로우 (단계마다 새로 생성)
+            - 워크플로우 리스트를 반환하면 한 번에 큐에 등록하고 출력 이미지를 순서대로 합침
+              (OOM 재시도 시에는 결과를 아직 받지 못한 워크플로우만 다시 등록)
+        execute_kwargs: client.execute_workflow에 그대로 전달 (input_image 등)
+            - on_result: (워크플로우 순번, 출력 이미지 리스트) - 워크플로우가 끝날 때마다 호출
+
+    Returns:
+        (output_images, workflow(리스트를 빌드했으면 리스트), 실제 사용 모델,
+         마지막으로 적용한 단계 - 없으면 "none")
+    """
+    from .comfyui_workflows import (
+        load_image_editing_config,
+        apply_tiled_vae_decode,
+        apply_lowres_upscale
+    )
+
+    on_result = execute_kwargs.pop("on_result", None)
+    ladder = load_image_editing_config().get("comfyui", {}).get("oom_ladder", {})
+    rungs = [r for r in ladder.get("rungs", OOM_LADDER_RUNGS) if r in OOM_LADDER_RUNGS]
+    if not ladder.get("enabled", True):
+        rungs = []
+    if not allow_lowres and "lowres_upscale" in rungs:
+        rungs.remove("lowres_upscale")
+
+    tiled = False
+    lowres = False
+    seed = None
+    applied = "none"
+    pending = list(rungs)
+    finished = {}  # 워크플로우 순번 → 출력 이미지 (재시도 때 다시 실행하지 않음)
+
+    def deliver(index: int, images: list):
+        finished[index] = images
+        if on_result:
+            on_result(index, images)
+
+    while True:
+        metrics.set_labels(model=model_name)
+        with metrics.stage("workflow_build"):
+            built = build_workflow(model_name, seed)
+            workflows = built if isinstance(built, list) else [built]
+            seed = get_workflow_seed(workflows[0])  # 단계가 바뀌어도 같은 seed 유지
+            for workflow in workflows:
+                if tiled:
+                    apply_tiled_vae_decode(
+                        workflow,
+                        tile_size=ladder.get("vae_tile_size", 512),
+                        overlap=ladder.get("vae_tile_overlap", 64)
+                    )
+                if lowres:
+                    apply_lowres_upscale(
+                        workflow, width, height,
+                        scale=ladder.get("lowres_scale", 0.5),
+                        upscale_model=ladder.get("upscale_model")
+                    )
+
+        try:
+            with tenancy.gpu_slot(), get_residency_manager().use(get_workflow_models(workflows[0]), base_url):
+                if isinstance(built, list):
+                    remaining = [i for i in range(len(workflows)) if i not in finished]
+                    client.execute_workflows(
+                        [workflows[i] for i in remaining],
+                        on_result=lambda position, images: deliver(remaining[position], images)
+                    )
+                    output_images = [image for i in range(len(workflows)) for image in finished[i]]
+                else:
+                    output_images, history = client.execute_workflow(workflow=built, **execute_kwargs)
+                    if on_result:
+                        on_result(0, output_images)
+            return output_images, built, model_name, applied
+        except GPUOutOfMemoryError as e:
+            metrics.increment("gpu_oom_total", model=model_name, rung=applied)
+
+            # 다음으로 적용 가능한 단계 선택 (적용할 수 없는 단계는 건너뜀)
+            while pending:
+                rung = pending.pop(0)
+                if rung == "tiled_vae":
+                    tiled = True
+                elif rung == "lower_quant":
+                    model = get_registry().get_model(model_name)
+                    fallback = model.oom_fallback if model else None
+                    if not fallback or not get_registry().get_model(fallback):
+                        continue
+                    model_name = fallback
+                elif rung == "lowres_upscale":
+                    lowres = True
+                applied = rung
+                break
+            else:
+                raise
+
+            metrics.increment("retries_total", reason="oom", **metrics.current_labels())
+            logger.warning(f"⚠️ GPU 메모리 부족 - '{applied}' 단계로 재시도 (모델: {model_name}): {e}")
@@ -18,6 +18,8 @@ from ultralytics import YOLO
 # MediaPipe (손/얼굴 감지)
 import mediapipe as mp
 
+from . import tracing
+
 
 @dataclass
 class DetectionBox:
@@ -109,6 +111,7 @@ class PostProcessor:
                 min_detection_confidence=0.5
             )
 
+    @tracing.traced("postprocess.detect_with_yolo")
     def detect_with_yolo(self, image: Image.Image) -> List[DetectionBox]:
         """YOLO로 사람/물체 감지"""
         self._load_yolo()
@@ -135,6 +138,7 @@ class PostProcessor:
 
         return detections
 
+    @tracing.traced("postprocess.detect_hands")
     def detect_hands(self, image: Image.Image) -> List[DetectionBox]:
         """MediaPipe로 손 감지"""
         self._load_mediapipe()
@@ -261,6 +265,7 @@ class PostProcessor:
             "issues": issues
         }
 
+    @tracing.traced("postprocess.count_fingers")
     def count_fingers(self, image: Image.Image) -> Dict[str, Any]:
         """
         MediaPipe로 손가락 개수 및 관절 이상 체크
@@ -318,6 +323,7 @@ class PostProcessor:
             "hand_count": len(hands_info)
         }
 
+    @tracing.traced("postprocess.detect_faces")
     def detect_faces(self, image: Image.Image) -> List[DetectionBox]:
         """MediaPipe로 얼굴 감지"""
         self._load_mediapipe()
@@ -346,6 +352,7 @@ class PostProcessor:
 
         return detections
 
+    @tracing.traced("postprocess.detect_body_object_penetration")
     def detect_body_object_penetration(
         self,
         image: Image.Image,
@@ -476,6 +483,7 @@ class PostProcessor:
 
         return mask
 
+    @tracing.traced("postprocess.adetailer_process")
     def adetailer_process(
         self,
         image: Image.Image,
@@ -574,6 +582,7 @@ class PostProcessor:
         print("  ✅ ADetailer 처리 완료")
         return result_image
 
+    @tracing.traced("postprocess.detect_anomalies")
     def detect_anomalies(
         self,
         image: Image.Image,
@@ -662,6 +671,7 @@ class PostProcessor:
 
         return intersection / union if union > 0 else 0.0
 
+    @tracing.traced("postprocess.full_pipeline")
     def full_pipeline(
         self,
         image: Image.Image,
@@ -4,6 +4,7 @@ AI 서비스 레이어 - 설정 기반 모델 관리
 """
 import os
 import io
+import time
 import logging
 import math
 from typing import Optional
@@ -15,14 +16,32 @@ from dotenv import load_dotenv
 
 from .model_registry import get_registry
 from .model_loader import ModelLoader
+from .model_residency import get_residency_manager, get_workflow_models
+from .oom_ladder import execute_with_oom_ladder, get_workflow_seed
+from .model_switch import get_model_switcher
+from .model_warmup import get_warmup_manager
 from .text_overlay import create_base_text_image, remove_background, apply_controlnet_3d_rendering
+from .image_encoding import EncodeOptions, encode_image, transcode_image
+from .single_flight import get_single_flight
+from .uploads import ImageSource, image_source_size
+from .input_normalization import get_input_normalizer
+from .node_timing import get_node_timing_store
+from .comfyui_gc import get_comfyui_janitor
+from .artifacts import artifact_settings, get_artifact_store
+from .job_store import get_job_store, start_recovery
+from .shared_state import get_shared_state, is_background_leader
+from . import streaming
+from .drafts import DraftSession, REFINE_METHODS, get_draft_store, load_drafts_config
+from . import metrics, tracing, executors, tenancy
+from .admission import get_admission_controller, get_payload_budget
 from .exceptions import (
     ServiceError,
     PromptOptimizationError,
     ModelLoadError,
     WorkflowExecutionError,
     ImageProcessingError,
-    ConfigurationError
+    ConfigurationError,
+    GPUOutOfMemoryError
 )
 
 logger = logging.getLogger(__name__)
@@ -112,6 +131,7 @@ def init_image_pipelines():
 # ===========================
 # 프롬프트 최적화 (FLUX 3단계 통합)
 # ===========================
+@tracing.traced("prompt.expand_with_gpt")
 def expand_prompt_with_gpt(text: str) -> str:
     """
     1단계: 한국어 시각 묘사 확장
@@ -125,6 +145,8 @@ def expand_prompt_with_gpt(text: str) -> str:
         return text
     if not opt_config.get("translate_korean", True):
         return text
+    if not tenancy.consume_gpt_call(strict=False):  # 가게별 GPT 호출 한도 초과 → 원본 사용
+        return text
 
     system = """
 당신은 이미지 생성용 시각 묘사를 구체적으로 확장하는 전문가입니다.
@@ -162,6 +184,8 @@ def apply_flux_template(expanded_kor_text: str) -> str:
     opt_config = registry.get_prompt_optimization_config()
     if not opt_config.get("enabled", True):
         return expanded_kor_text
+    if not tenancy.consume_gpt_call(strict=False):
+        return expanded_kor_text
 
     system = """
 You are an expert FLUX prompt engineer. Convert the expanded Korean visual description into a compact FLUX-style English prompt.
@@ -193,6 +217,7 @@ Output ONLY the final English FLUX prompt.
         return expanded_kor_text
 
 
+@tracing.traced("prompt.optimize")
 def optimize_prompt(text: str, model_config) -> str:
     """
     3단계: FLUX/SDXL 최종 프롬프트 다듬기
@@ -205,6 +230,8 @@ def optimize_prompt(text: str, model_config) -> str:
     opt_config = registry.get_prompt_optimization_config()
     if not opt_config.get("enabled", True):
         return text
+    if not tenancy.consume_gpt_call(strict=False):
+        return text
 
     model_type = (model_config.type if model_config else "").lower()
     is_flux = "flux" in model_type
@@ -254,6 +281,8 @@ Always include relevant quality hints based on the scene to prevent artifacts
 
 
 
+@tracing.traced("prompt.build_final_prompt_v2")
+@metrics.timed("prompt_optimization")
 def build_final_prompt_v2(raw_prompt: str, context: dict = None, model_config=None) -> str:
     """통합 프롬프트 빌더 (Phase 1 개선 버전)
     
@@ -307,6 +336,8 @@ def build_final_prompt_v2(raw_prompt: str, context: dict = None, model_config=No
     # 4) 단일 GPT 호출로 처리 
     if not openai_client:
         return full_input
+    if not tenancy.consume_gpt_call(strict=False):  # 가게별 GPT 호출 한도 초과 → 원본 사용
+        return full_input
 
     try:
         if is_flux:
@@ -418,6 +449,7 @@ def build_final_prompt(raw_prompt: str, model_config=None) -> str:
 def generate_caption_core(info: dict, tone: str) -> str:
     if not openai_client:
         raise RuntimeError("OpenAI 클라이언트가 초기화되지 않았습니다.")
+    tenancy.consume_gpt_call()  # 가게별 GPT 호출 한도 초과 시 TenantRateLimitedError (429)
 
     prompt = f"""
 당신은 소상공인을 위한 전문 인스타그램 콘텐츠 크리에이터입니다.
@@ -462,6 +494,45 @@ def generate_caption_core(info: dict, tone: str) -> str:
 # ===========================
 # 🆕 이미지 생성 (T2I) - ComfyUI 기반
 # ===========================
+# T2I 프롬프트 빌더 공통 컨텍스트
+T2I_PROMPT_CONTEXT = {
+    "style": "Instagram banner, professional",
+    "mood": "vibrant, motivational"
+}
+
+
+def _prepare_t2i_model(model_name: str = None) -> tuple:
+    """
+    T2I 요청에 사용할 모델 확인 (전환 대기, 미로드 시 자동 로드, 워밍업 예측용 기록)
+
+    Returns:
+        (모델 이름, ModelConfig, 콜드 스타트 여부)
+    """
+    # 모델 전환 중이면 전환 완료까지 대기 후 현재 모델 확인
+    get_model_switcher().wait_until_ready()
+    current_model_name = get_current_comfyui_model()
+
+    # 모델이 로드되지 않았고, 요청에 model_name이 있으면 자동 로드
+    if not current_model_name and model_name:
+        logger.info(f"🔄 모델 자동 로드 시작: {model_name}")
+        get_residency_manager().select(model_name)
+        current_model_name = model_name
+    elif not current_model_name:
+        raise RuntimeError("모델이 로드되지 않았습니다. 먼저 모델을 선택하세요.")
+
+    # 워밍업 예측용 요청 기록 + 콜드 스타트 여부 (요청 시점에 VRAM에 없었는지)
+    get_warmup_manager().record_request(current_model_name)
+    cold_start = not _is_model_resident(current_model_name)
+    metrics.set_labels(model=current_model_name)
+
+    # 모델 설정 가져오기
+    model_config = registry.get_model(current_model_name)
+    if not model_config:
+        raise RuntimeError(f"모델 설정을 찾을 수 없습니다: {current_model_name}")
+
+    return current_model_name, model_config, cold_start
+
+
 def generate_t2i_core(
     prompt: str,
     width: int,
@@ -471,10 +542,14 @@ def generate_t2i_core(
     enable_adetailer: bool = True,
     adetailer_targets: list = None,
     post_process_method: str = "none",  # "none", "impact_pack", "adetailer"
-    model_name: str = None  # 사용할 모델 이름 (없으면 현재 로드된 모델 사용)
+    model_name: str = None,  # 사용할 모델 이름 (없으면 현재 로드된 모델 사용)
+    meta: dict = None,  # 응답 메타데이터 수집용 (seed, 모델, 소요 시간)
+    encoding: EncodeOptions = None,  # 출력 인코딩 (없으면 설정 기본값)
+    seed: int = None,  # 샘플러 seed (없으면 랜덤)
+    batch_index: int = None  # 배치 생성 결과 재현용 (seed와 함께 사용)
 ) -> bytes:
     """
-    ComfyUI를 사용한 T2I 이미지 생성
+    ComfyUI를 사용한 T2I 이미지 1장 생성 (여러 장은 generate_t2i_batch_core)
 
     Args:
         post_process_method: 후처리 방식
@@ -482,39 +557,89 @@ def generate_t2i_core(
             - "impact_pack": ComfyUI Impact Pack (YOLO+SAM)
             - "adetailer": 기존 ADetailer (YOLO+MediaPipe)
         model_name: 사용할 모델 이름 (선택사항, 없으면 현재 로드된 모델 사용)
+        meta: 전달 시 seed/model/steps/elapsed_time 등을 채움 (응답 헤더용)
+        encoding: 출력 포맷/품질 (PNG 기본값이면 ComfyUI 출력을 그대로 반환)
     """
+    return generate_t2i_batch_core(
+        prompt, width, height, steps, guidance_scale,
+        enable_adetailer, adetailer_targets, post_process_method, model_name,
+        meta=meta, encoding=encoding, seed=seed, batch_index=batch_index
+    )[0]
+
+
+def generate_t2i_batch_core(
+    prompt: str,
+    width: int,
+    height: int,
+    steps: int,
+    guidance_scale: float = None,
+    enable_adetailer: bool = True,
+    adetailer_targets: list = None,
+    post_process_method: str = "none",
+    model_name: str = None,
+    meta: dict = None,
+    encoding: EncodeOptions = None,
+    seed: int = None,
+    num_images: int = 1,
+    prompt_variations: list = None,
+    batch_index: int = None,
+    max_batch_size: int = None
+) -> list:
+    """
+    ComfyUI를 사용한 T2I 이미지 여러 장 생성
+
+    - 같은 프롬프트: EmptyLatentImage.batch_size로 한 번의 실행에서 샘플링
+      (comfyui.batch.max_batch_size장씩 나눈 워크플로우는 한 번에 큐에 등록)
+    - prompt_variations: 프롬프트마다 워크플로우 1개, 모두 한 번에 큐에 등록
+    - impact_pack: FaceDetailer가 배치 입력을 지원하지 않으므로 1장씩 한 번에 큐에 등록
+
+    이미지별 seed는 (seed, batch_index) 쌍으로 보고 (meta["seeds"], meta["batch_indices"]).
+    batch_index를 지정하면 해당 배치 위치의 이미지 1장만 재현한다.
+    스트리밍 요청이면 워크플로우가 끝날 때마다 해당 이미지를 "image" 이벤트로 바로 보낸다.
+
+    Args:
+        num_images: 생성 개수 (prompt_variations가 있으면 그 개수)
+        prompt_variations: 이미지마다 다른 프롬프트 (각각 프롬프트 빌더 적용)
+        max_batch_size: 워크플로우 1개의 최대 batch_size (생략 시 comfyui.batch.max_batch_size)
+
+    Returns:
+        이미지 바이트 리스트 (요청 순서)
+
+    Raises:
+        ValueError: 생성 개수 / batch_index가 허용 범위를 벗어남
+    """
+    import random
     from .comfyui_client import ComfyUIClient
     from .comfyui_workflows import (
         get_flux_t2i_workflow,
         get_flux_t2i_with_impact_workflow,
         update_flux_t2i_workflow,
+        apply_batch_index,
         load_image_editing_config
     )
 
-    # 현재 로드된 ComfyUI 모델 확인
-    current_model_name = get_current_comfyui_model()
+    request_start = time.time()
 
-    # 모델이 로드되지 않았고, 요청에 model_name이 있으면 자동 로드
-    if not current_model_name and model_name:
-        logger.info(f"🔄 모델 자동 로드 시작: {model_name}")
-        # 전역 변수 업데이트 
-        global current_comfyui_model
-        current_comfyui_model = model_name
-        current_model_name = model_name
-    elif not current_model_name:
-        raise RuntimeError("모델이 로드되지 않았습니다. 먼저 모델을 선택하세요.")
+    config = load_image_editing_config()
+    comfyui_config = config.get("comfyui", {})
+    batch_config = comfyui_config.get("batch", {})
+    max_images = batch_config.get("max_images", 8)
+    max_batch_size = max(1, max_batch_size or batch_config.get("max_batch_size", 4))
 
-    # 모델 설정 가져오기
-    model_config = registry.get_model(current_model_name)
-    if not model_config:
-        raise RuntimeError(f"모델 설정을 찾을 수 없습니다: {current_model_name}")
+    if prompt_variations:
+        num_images = len(prompt_variations)
+    if not 1 <= num_images <= max_images:
+        raise ValueError(f"생성 개수는 1~{max_images}장이어야 합니다: {num_images}")
+    if batch_index is not None and (num_images > 1 or not 0 <= batch_index < max_images):
+        raise ValueError(f"batch_index는 1장 생성 시 0~{max_images - 1} 사이여야 합니다: {batch_index}")
+
+    current_model_name, model_config, cold_start = _prepare_t2i_model(model_name)
 
     # ✅ 통합 프롬프트 빌더 사용 (Phase 1 개선)
-    context = {
-        "style": "Instagram banner, professional",
-        "mood": "vibrant, motivational"
-    }
-    final_prompt = build_final_prompt_v2(prompt, context, model_config)
+    if prompt_variations:
+        final_prompts = [build_final_prompt_v2(p, T2I_PROMPT_CONTEXT, model_config) for p in prompt_variations]
+    else:
+        final_prompts = [build_final_prompt_v2(prompt, T2I_PROMPT_CONTEXT, model_config)]
 
     # Steps 검증
     if steps < 1:
@@ -525,73 +650,408 @@ def generate_t2i_core(
     if guidance_scale is None:
         guidance_scale = model_config.guidance_scale
 
+    # 워크플로우 단위 작업: (프롬프트, batch_size)
+    if prompt_variations:
+        jobs = [(final_prompt, 1) for final_prompt in final_prompts]
+    else:
+        per_job = 1 if post_process_method == "impact_pack" else max_batch_size
+        jobs = [
+            (final_prompts[0], min(per_job, num_images - start))
+            for start in range(0, num_images, per_job)
+        ]
+
+    # 작업마다 seed 고정 (OOM 완화 단계가 바뀌어도 같은 seed)
+    base_seed = seed if seed is not None else random.randint(0, 2**32 - 1)
+    job_seeds = [(base_seed + k) % 2**32 for k in range(len(jobs))]
+    if batch_index is not None:
+        image_seeds = [(base_seed, batch_index)]
+    else:
+        image_seeds = [
+            (job_seed, i) for (_, batch_size), job_seed in zip(jobs, job_seeds) for i in range(batch_size)
+        ]
+
     logger.info(f"🎨 ComfyUI로 T2I 이미지 생성 중")
     print(f"   모델: {current_model_name}")
     print(f"   후처리: {post_process_method}")
     print(f"   Steps: {steps}")
     print(f"   크기: {width}x{height}")
     print(f"   Guidance: {guidance_scale}")
+    if num_images > 1:
+        print(f"   개수: {num_images}장 (워크플로우 {len(jobs)}개, batch_size {[b for _, b in jobs]})")
+    streaming.emit(
+        "plan",
+        num_images=num_images,
+        workflows=len(jobs),
+        seeds=[s for s, _ in image_seeds],
+        batch_indices=[i for _, i in image_seeds],
+        steps=steps
+    )
+
+    image_prompts = final_prompts if prompt_variations else final_prompts * num_images
+    job_offsets = [sum(b for _, b in jobs[:k]) for k in range(len(jobs))]
+    encoded = {}  # 이미지 순번 → 후처리/인코딩 결과 (이미지마다 한 번만)
+
+    def finish_image(index: int, image_bytes: bytes):
+        """이미지 1장 후처리 (기존 ADetailer, 선택 시) + 요청 포맷으로 인코딩 후 스트리밍 전송"""
+        if index in encoded or index >= num_images:
+            return
+        if post_process_method == "adetailer" and enable_adetailer:
+            image = Image.open(io.BytesIO(image_bytes))
+            image = apply_adetailer(
+                image=image,
+                prompt=image_prompts[index],
+                targets=adetailer_targets or ["hand"]
+            )
+            encoded[index] = encode_image(image, encoding)
+        else:
+            encoded[index] = transcode_image(image_bytes, encoding)
+        seed_value, seed_batch_index = image_seeds[index]
+        streaming.emit(
+            "image", index=index, seed=seed_value, batch_index=seed_batch_index,
+            image=encoded[index], elapsed_time=time.time() - request_start
+        )
+
+    def on_result(job_index: int, images: list):
+        for offset, image_bytes in enumerate(images):
+            finish_image(job_offsets[job_index] + offset, image_bytes)
 
     try:
         # ComfyUI 클라이언트 초기화
-        config = load_image_editing_config()
-        comfyui_config = config.get("comfyui", {})
         base_url = comfyui_config.get("base_url", "http://localhost:8188")
         timeout = comfyui_config.get("timeout", 600)
 
         client = ComfyUIClient(base_url=base_url, timeout=timeout)
 
-        # 워크플로우 선택
-        if post_process_method == "impact_pack":
-            workflow = get_flux_t2i_with_impact_workflow()
-        else:
-            workflow = get_flux_t2i_workflow()
-
-        # 워크플로우 파라미터 업데이트
-        workflow = update_flux_t2i_workflow(
-            workflow=workflow,
-            model_name=current_model_name,
-            prompt=final_prompt,
-            width=width,
-            height=height,
-            steps=steps,
-            guidance_scale=guidance_scale
+        def build_workflow(model_name: str, workflow_seed: int):
+            workflows = []
+            for (job_prompt, batch_size), job_seed in zip(jobs, job_seeds):
+                # 워크플로우 선택
+                if post_process_method == "impact_pack":
+                    workflow = get_flux_t2i_with_impact_workflow()
+                else:
+                    workflow = get_flux_t2i_workflow()
+
+                # 워크플로우 파라미터 업데이트
+                workflow = update_flux_t2i_workflow(
+                    workflow=workflow,
+                    model_name=model_name,
+                    prompt=job_prompt,
+                    width=width,
+                    height=height,
+                    steps=steps,
+                    guidance_scale=guidance_scale,
+                    seed=job_seed,
+                    batch_size=batch_size
+                )
+                if batch_index is not None:
+                    apply_batch_index(workflow, batch_index)
+                workflows.append(workflow)
+            return workflows if len(workflows) > 1 else workflows[0]
+
+        # ComfyUI 실행 (실행 동안 모델 해제 방지, GPU 메모리 부족 시 단계적 완화)
+        output_images, workflow, used_model, oom_rung = execute_with_oom_ladder(
+            client, base_url, build_workflow, current_model_name, width, height,
+            on_result=on_result
         )
 
-        # ComfyUI 실행
-        output_images, history = client.execute_workflow(workflow=workflow)
+        if len(output_images) < num_images:
+            raise Exception(f"출력 이미지가 부족합니다. ({len(output_images)}/{num_images}장)")
+        for index, image_bytes in enumerate(output_images[:num_images]):
+            finish_image(index, image_bytes)
+        results = [encoded[index] for index in range(num_images)]
+
+        elapsed_time = time.time() - request_start
+        get_warmup_manager().record_generation(used_model, elapsed_time, cold_start)
+        if num_images > 1:
+            metrics.increment("t2i_batch_images_total", amount=num_images, mode="variations" if prompt_variations else "batch")
+        if meta is not None:
+            meta.update(
+                model=used_model,
+                oom_rung=oom_rung,
+                seed=image_seeds[0][0],
+                seeds=[s for s, _ in image_seeds],
+                batch_indices=[i for _, i in image_seeds],
+                num_images=num_images,
+                steps=steps,
+                guidance_scale=guidance_scale,
+                cold_start=cold_start,
+                elapsed_time=elapsed_time
+            )
+        logger.info(f"✅ 생성 완료: {len(results)}장, {sum(len(r) for r in results)} bytes ({elapsed_time:.1f}초)")
+        return results
 
-        if not output_images:
-            raise Exception("출력 이미지가 생성되지 않았습니다.")
+    except Exception as e:
+        logger.error(f"❌ ComfyUI T2I 생성 실패: {e}")
+        import traceback
+        traceback.print_exc()
+        if isinstance(e, GPUOutOfMemoryError):
+            raise RuntimeError(f"GPU 메모리 부족 (완화 단계 모두 실패): {e}")
+        raise RuntimeError(f"이미지 생성 실패: {e}")
 
-        image_bytes = output_images[0]
 
-        # 기존 ADetailer 후처리 (선택 시)
-        if post_process_method == "adetailer" and enable_adetailer:
-            image = Image.open(io.BytesIO(image_bytes))
-            image = apply_adetailer(
-                image=image,
-                prompt=final_prompt,
-                targets=adetailer_targets or ["hand"]
+# ===========================
+# 🆕 초안 → 완성 (draft-then-refine)
+# ===========================
+def generate_t2i_drafts_core(
+    prompt: str,
+    width: int,
+    height: int,
+    steps: int,
+    guidance_scale: float = None,
+    num_drafts: int = None,
+    draft_steps: int = None,
+    draft_scale: float = None,
+    model_name: str = None,
+    seed: int = None,  # 지정 시 초안 seed는 seed, seed+1, ... (없으면 랜덤)
+    meta: dict = None,
+    encoding: EncodeOptions = None
+) -> DraftSession:
+    """
+    빠른 미리보기용 T2I 초안 여러 장 생성
+
+    초안은 낮은 steps / 낮은 해상도로 만들고, 초안마다 seed를 고정해 세션에 보관한다.
+    width/height/steps는 완성(refine_draft_core) 시 사용할 최종 설정.
+
+    Args:
+        num_drafts, draft_steps, draft_scale: 생략 시 comfyui.drafts 설정값
+
+    Returns:
+        저장된 DraftSession (draft_id, seeds, images)
+
+    Raises:
+        ValueError: 초안 개수/설정이 허용 범위를 벗어남
+    """
+    import random
+    from .comfyui_client import ComfyUIClient
+    from .comfyui_workflows import (
+        get_flux_t2i_workflow,
+        update_flux_t2i_workflow,
+        apply_preview_output,
+        load_image_editing_config
+    )
+
+    request_start = time.time()
+    drafts_config = load_drafts_config()
+
+    num_drafts = num_drafts or drafts_config.get("num_drafts", 4)
+    max_drafts = drafts_config.get("max_drafts", 8)
+    if not 1 <= num_drafts <= max_drafts:
+        raise ValueError(f"초안 개수는 1~{max_drafts}개여야 합니다: {num_drafts}")
+    draft_scale = draft_scale or drafts_config.get("scale", 0.5)
+    if not 0 < draft_scale <= 1:
+        raise ValueError(f"draft_scale은 0~1 사이여야 합니다: {draft_scale}")
+
+    current_model_name, model_config, cold_start = _prepare_t2i_model(model_name)
+    final_prompt = build_final_prompt_v2(prompt, T2I_PROMPT_CONTEXT, model_config)
+
+    # 최종 설정 (완성 시 사용)
+    if steps < 1:
+        steps = model_config.default_steps
+    steps = min(steps, model_config.max_steps)
+    if guidance_scale is None:
+        guidance_scale = model_config.guidance_scale
+
+    # 초안 설정: 해상도는 draft_scale 배 (64 정렬, min_size 이상), steps는 최종 steps 이하
+    min_size = drafts_config.get("min_size", 256)
+    draft_width = max(min(width, min_size), int(width * draft_scale) // 64 * 64)
+    draft_height = max(min(height, min_size), int(height * draft_scale) // 64 * 64)
+    draft_steps = min(draft_steps or drafts_config.get("steps", 8), steps)
+
+    if seed is None:
+        seeds = [random.randint(0, 2**32 - 1) for _ in range(num_drafts)]
+    else:
+        seeds = [(seed + i) % 2**32 for i in range(num_drafts)]
+
+    logger.info(f"⚡ T2I 초안 {num_drafts}개 생성 중")
+    print(f"   모델: {current_model_name}")
+    print(f"   초안: {draft_width}x{draft_height}, {draft_steps} steps (완성: {width}x{height}, {steps} steps)")
+    print(f"   Seeds: {seeds}")
+
+    try:
+        comfyui_config = load_image_editing_config().get("comfyui", {})
+        base_url = comfyui_config.get("base_url", "http://localhost:8188")
+        client = ComfyUIClient(base_url=base_url, timeout=comfyui_config.get("timeout", 600))
+
+        with metrics.stage("workflow_build"):
+            workflows = [
+                apply_preview_output(update_flux_t2i_workflow(
+                    workflow=get_flux_t2i_workflow(),
+                    model_name=current_model_name,
+                    prompt=final_prompt,
+                    width=draft_width,
+                    height=draft_height,
+                    steps=draft_steps,
+                    guidance_scale=guidance_scale,
+                    seed=draft_seed
+                ))
+                for draft_seed in seeds
+            ]
+
+        # 초안 전체를 한 번에 큐에 등록 (실행 동안 모델 해제 방지, 가게별 공정 큐 슬롯 1개)
+        with tenancy.gpu_slot(), get_residency_manager().use(get_workflow_models(workflows[0]), base_url):
+            results = client.execute_workflows(workflows)
+
+        images = [transcode_image(output_images[0], encoding) for output_images, _ in results]
+    except Exception as e:
+        logger.error(f"❌ ComfyUI T2I 초안 생성 실패: {e}")
+        if isinstance(e, GPUOutOfMemoryError):
+            raise RuntimeError(f"GPU 메모리 부족: {e}")
+        raise RuntimeError(f"초안 생성 실패: {e}")
+
+    session = DraftSession(
+        prompt=prompt,
+        final_prompt=final_prompt,
+        model_name=current_model_name,
+        width=width,
+        height=height,
+        steps=steps,
+        guidance_scale=guidance_scale,
+        draft_width=draft_width,
+        draft_height=draft_height,
+        draft_steps=draft_steps,
+        seeds=seeds,
+        images=images
+    )
+    get_draft_store().put(session)
+    metrics.increment("drafts_generated_total", amount=num_drafts, model=current_model_name)
+
+    elapsed_time = time.time() - request_start
+    if meta is not None:
+        meta.update(session.to_dict())
+        meta.update(cold_start=cold_start, elapsed_time=elapsed_time)
+    logger.info(f"✅ 초안 {num_drafts}개 완료 ({elapsed_time:.1f}초, draft_id: {session.draft_id})")
+    return session
+
+
+def refine_draft_core(
+    session: DraftSession,
+    index: int,
+    method: str = None,
+    steps: int = None,
+    denoise: float = None,
+    meta: dict = None,
+    encoding: EncodeOptions = None
+) -> bytes:
+    """
+    선택한 초안 완성 (초안 세션의 프롬프트/seed/모델 재사용 - 클라이언트는 다시 보낼 것이 없음)
+
+    Args:
+        index: 초안 번호 (session.seeds 인덱스)
+        method: "full" (같은 seed로 최종 해상도/steps 재생성)
+            또는 "latent_upscale" (초안 latent 업스케일 + 2차 샘플링, 초안 구도 유지)
+        steps: 생략 시 full은 세션 steps, latent_upscale은 세션 steps × denoise
+        denoise: latent_upscale 2차 샘플링 강도 (생략 시 설정값)
+
+    Raises:
+        ValueError: 잘못된 초안 번호 또는 완성 방식
+    """
+    from .comfyui_client import ComfyUIClient
+    from .comfyui_workflows import (
+        get_flux_t2i_workflow,
+        update_flux_t2i_workflow,
+        apply_latent_upscale_refine,
+        load_image_editing_config
+    )
+
+    request_start = time.time()
+    drafts_config = load_drafts_config()
+
+    if not 0 <= index < len(session.seeds):
+        raise ValueError(f"초안 번호는 0~{len(session.seeds) - 1} 사이여야 합니다: {index}")
+    method = method or drafts_config.get("refine_method", "latent_upscale")
+    if method not in REFINE_METHODS:
+        raise ValueError(f"지원하지 않는 완성 방식입니다: {method} (지원: {', '.join(REFINE_METHODS)})")
+
+    denoise = denoise if denoise is not None else drafts_config.get("refine_denoise", 0.55)
+    if not 0 < denoise <= 1:
+        raise ValueError(f"denoise는 0~1 사이여야 합니다: {denoise}")
+    if not steps:
+        steps = session.steps if method == "full" else max(1, round(session.steps * denoise))
+
+    draft_seed = session.seeds[index]
+
+    # 초안과 같은 모델로 완성 (모델 전환 중이면 완료까지 대기)
+    get_model_switcher().wait_until_ready()
+    get_warmup_manager().record_request(session.model_name)
+    cold_start = not _is_model_resident(session.model_name)
+
+    logger.info(f"🎯 초안 완성: {session.draft_id}#{index} ({method}, seed {draft_seed})")
+
+    def build_workflow(model_name: str, workflow_seed: int) -> dict:
+        if method == "latent_upscale":
+            # 초안을 그대로 재현(같은 seed/해상도/steps)한 뒤 latent 업스케일 + 2차 샘플링
+            workflow = update_flux_t2i_workflow(
+                workflow=get_flux_t2i_workflow(),
+                model_name=model_name,
+                prompt=session.final_prompt,
+                width=session.draft_width,
+                height=session.draft_height,
+                steps=session.draft_steps,
+                guidance_scale=session.guidance_scale,
+                seed=draft_seed
+            )
+            return apply_latent_upscale_refine(
+                workflow, session.width, session.height, steps, denoise,
+                upscale_method=drafts_config.get("latent_upscale_method", "nearest-exact")
             )
 
-            buf = io.BytesIO()
-            image.save(buf, format="PNG")
-            image_bytes = buf.getvalue()
+        return update_flux_t2i_workflow(
+            workflow=get_flux_t2i_workflow(),
+            model_name=model_name,
+            prompt=session.final_prompt,
+            width=session.width,
+            height=session.height,
+            steps=steps,
+            guidance_scale=session.guidance_scale,
+            seed=draft_seed
+        )
 
-        logger.info(f"✅ 생성 완료: {len(image_bytes)} bytes")
-        return image_bytes
+    try:
+        comfyui_config = load_image_editing_config().get("comfyui", {})
+        base_url = comfyui_config.get("base_url", "http://localhost:8188")
+        client = ComfyUIClient(base_url=base_url, timeout=comfyui_config.get("timeout", 600))
 
+        # latent_upscale은 이미 초안 해상도에서 시작하므로 저해상도 단계 제외
+        output_images, workflow, used_model, oom_rung = execute_with_oom_ladder(
+            client, base_url, build_workflow, session.model_name, session.width, session.height,
+            allow_lowres=(method == "full")
+        )
+        image_bytes = transcode_image(output_images[0], encoding)
     except Exception as e:
-        logger.error(f"❌ ComfyUI T2I 생성 실패: {e}")
-        import traceback
-        traceback.print_exc()
-        raise RuntimeError(f"이미지 생성 실패: {e}")
+        logger.error(f"❌ 초안 완성 실패: {e}")
+        if isinstance(e, GPUOutOfMemoryError):
+            raise RuntimeError(f"GPU 메모리 부족 (완화 단계 모두 실패): {e}")
+        raise RuntimeError(f"초안 완성 실패: {e}")
+
+    elapsed_time = time.time() - request_start
+    get_warmup_manager().record_generation(used_model, elapsed_time, cold_start)
+    metrics.increment("drafts_refined_total", method=method)
+    if meta is not None:
+        meta.update(
+            draft_id=session.draft_id,
+            draft_index=index,
+            method=method,
+            model=used_model,
+            oom_rung=oom_rung,
+            seed=draft_seed,
+            steps=steps,
+            guidance_scale=session.guidance_scale,
+            width=session.width,
+            height=session.height,
+            cold_start=cold_start,
+            elapsed_time=elapsed_time
+        )
+        if method == "latent_upscale":
+            meta["denoise"] = denoise
+    logger.info(f"✅ 초안 완성: {len(image_bytes)} bytes ({elapsed_time:.1f}초)")
+    return image_bytes
 
 
 # ===========================
 # ADetailer 후처리
 # ===========================
+@tracing.traced("postprocess.apply_adetailer")
+@metrics.timed("post_processing")
 def apply_adetailer(
     image: Image,
     prompt: str,
@@ -652,7 +1112,7 @@ def apply_adetailer(
 # 🆕 이미지 편집 (I2I) - ComfyUI 기반
 # ===========================
 def generate_i2i_core(
-    input_image_bytes: bytes,
+    input_image: ImageSource,
     prompt: str,
     strength: float,
     width: int,
@@ -662,13 +1122,17 @@ def generate_i2i_core(
     enable_adetailer: bool = False,
     adetailer_targets: list = None,
     post_process_method: str = "none",  # "none", "impact_pack", "adetailer"
-    model_name: str = None  # 사용할 모델 이름 (없으면 현재 로드된 모델 사용)
+    model_name: str = None,  # 사용할 모델 이름 (없으면 현재 로드된 모델 사용)
+    meta: dict = None,  # 응답 메타데이터 수집용 (seed, 모델, 소요 시간)
+    encoding: EncodeOptions = None,  # 출력 인코딩 (없으면 설정 기본값)
+    seed: int = None,  # 샘플러 seed (없으면 랜덤)
+    restore_input_size: bool = None  # 축소한 입력의 결과를 원본 크기로 확대 (없으면 설정)
 ) -> bytes:
     """
     ComfyUI를 사용한 I2I 이미지 편집
 
     Args:
-        input_image_bytes: 입력 이미지 바이트
+        input_image: 입력 이미지 (바이트, 파일 객체 또는 InputImage - ComfyUI로 그대로 스트리밍 업로드)
         prompt: 편집 프롬프트
         strength: 편집 강도 (0.0~1.0)
         width, height: 출력 크기
@@ -681,6 +1145,9 @@ def generate_i2i_core(
             - "impact_pack": ComfyUI Impact Pack (YOLO+SAM)
             - "adetailer": 기존 ADetailer (YOLO+MediaPipe)
         model_name: 사용할 모델 이름 (선택사항, 없으면 현재 로드된 모델 사용)
+        meta: 전달 시 seed/model/steps/elapsed_time 등을 채움 (응답 헤더용)
+        encoding: 출력 포맷/품질 (PNG 기본값이면 ComfyUI 출력을 그대로 반환)
+        restore_input_size: 입력을 정규화하며 축소했으면 결과를 원본 입력 크기로 확대
     """
     from .comfyui_client import ComfyUIClient
     from .comfyui_workflows import (
@@ -689,21 +1156,27 @@ def generate_i2i_core(
         load_image_editing_config
     )
 
-    # 현재 로드된 ComfyUI 모델 확인
+    request_start = time.time()
+
+    # 모델 전환 중이면 전환 완료까지 대기 후 현재 모델 확인
+    get_model_switcher().wait_until_ready()
     current_model_name = get_current_comfyui_model()
 
     # 모델이 로드되지 않았고, 요청에 model_name이 있으면 자동 로드
     if not current_model_name and model_name:
         logger.info(f"🔄 모델 자동 로드 시작: {model_name}")
-        # 전역 변수 업데이트 
-        global current_comfyui_model
-        current_comfyui_model = model_name
+        get_residency_manager().select(model_name)
         current_model_name = model_name
     elif not current_model_name:
         raise RuntimeError("모델이 로드되지 않았습니다. 먼저 모델을 선택하세요.")
 
+    # 워밍업 예측용 요청 기록 + 콜드 스타트 여부 (요청 시점에 VRAM에 없었는지)
+    get_warmup_manager().record_request(current_model_name)
+    cold_start = not _is_model_resident(current_model_name)
+    metrics.set_labels(model=current_model_name)
+
     # 📊 입력 이미지 및 프롬프트 검증 (디버깅)
-    logger.info(f"📸 입력 이미지 크기: {len(input_image_bytes)} bytes")
+    logger.info(f"📸 입력 이미지 크기: {image_source_size(input_image)} bytes")
     logger.info(f"📝 원본 프롬프트: {prompt[:100] if prompt else 'N/A'}...")
     logger.info(f"💪 Strength: {strength}")
 
@@ -712,6 +1185,10 @@ def generate_i2i_core(
     if not model_config:
         raise RuntimeError(f"모델 설정을 찾을 수 없습니다: {current_model_name}")
 
+    # 입력 이미지 정규화 (EXIF 회전 + 모델 max_size / 메가픽셀 예산으로 축소)
+    normalizer = get_input_normalizer()
+    normalized = normalizer.normalize(input_image, max_size=model_config.max_size)
+
     # ✅ 통합 프롬프트 빌더 사용 (Phase 1 개선)
     context = {
         "style": "professional, natural",
@@ -747,23 +1224,24 @@ def generate_i2i_core(
 
         client = ComfyUIClient(base_url=base_url, timeout=timeout)
 
-        # I2I 워크플로우 가져오기
-        workflow = get_flux_i2i_workflow()
-
-        # 워크플로우 파라미터 업데이트
-        workflow = update_flux_i2i_workflow(
-            workflow=workflow,
-            model_name=current_model_name,
-            prompt=final_prompt,
-            strength=strength,
-            steps=steps,
-            guidance_scale=guidance_scale
-        )
+        def build_workflow(model_name: str, workflow_seed: int) -> dict:
+            # I2I 워크플로우 파라미터 업데이트
+            return update_flux_i2i_workflow(
+                workflow=get_flux_i2i_workflow(),
+                model_name=model_name,
+                prompt=final_prompt,
+                strength=strength,
+                steps=steps,
+                guidance_scale=guidance_scale,
+                seed=seed if workflow_seed is None else workflow_seed
+            )
 
-        # ComfyUI 실행 (입력 이미지 포함)
-        output_images, history = client.execute_workflow(
-            workflow=workflow,
-            input_image=input_image_bytes,
+        # ComfyUI 실행 (입력 이미지 포함, 실행 동안 모델 해제 방지)
+        # - 출력 크기가 입력 이미지로 정해지므로 저해상도 업스케일 단계는 사용하지 않음
+        output_images, workflow, used_model, oom_rung = execute_with_oom_ladder(
+            client, base_url, build_workflow, current_model_name, width, height,
+            allow_lowres=False,
+            input_image=normalized.source,
             input_image_node_id="5"  # I2I 워크플로우의 LoadImage 노드 ID
         )
 
@@ -771,8 +1249,9 @@ def generate_i2i_core(
             raise Exception("출력 이미지가 생성되지 않았습니다.")
 
         image_bytes = output_images[0]
+        restore = normalizer.should_restore(normalized, restore_input_size)
 
-        # 기존 ADetailer 후처리 (선택 시)
+        # 기존 ADetailer 후처리 (선택 시) + 원본 크기 복원 (선택 시) + 요청 포맷으로 인코딩
         if post_process_method == "adetailer" and enable_adetailer:
             image = Image.open(io.BytesIO(image_bytes))
             image = apply_adetailer(
@@ -780,11 +1259,29 @@ def generate_i2i_core(
                 prompt=final_prompt,
                 targets=adetailer_targets or ["hand"]
             )
-
-            buf = io.BytesIO()
-            image.save(buf, format="PNG")
-            image_bytes = buf.getvalue()
-
+            if restore:
+                image = image.resize(normalized.original_size, Image.LANCZOS)
+            image_bytes = encode_image(image, encoding)
+        elif restore:
+            image_bytes = encode_image(normalizer.restore_size(image_bytes, normalized), encoding)
+        else:
+            image_bytes = transcode_image(image_bytes, encoding)
+
+        elapsed_time = time.time() - request_start
+        get_warmup_manager().record_generation(used_model, elapsed_time, cold_start)
+        if meta is not None:
+            meta.update(
+                model=used_model,
+                oom_rung=oom_rung,
+                seed=get_workflow_seed(workflow),
+                steps=steps,
+                guidance_scale=guidance_scale,
+                cold_start=cold_start,
+                elapsed_time=elapsed_time,
+                input_size=list(normalized.original_size),
+                normalized_size=list(normalized.size),
+                restored=restore
+            )
         logger.info(f"✅ 편집 완료: {len(image_bytes)} bytes")
         return image_bytes
 
@@ -792,6 +1289,8 @@ def generate_i2i_core(
         logger.error(f"❌ ComfyUI I2I 편집 실패: {e}")
         import traceback
         traceback.print_exc()
+        if isinstance(e, GPUOutOfMemoryError):
+            raise RuntimeError(f"GPU 메모리 부족 (완화 단계 모두 실패): {e}")
         raise RuntimeError(f"이미지 편집 실패: {e}")
 
 # ===========================
@@ -806,7 +1305,22 @@ def get_service_status() -> dict:
     status = {
         "gpt_ready": openai_client is not None,
         "image_ready": current_model is not None,
-        "current_model": current_model
+        "current_model": current_model,
+        "residency": get_residency_manager().snapshot(),
+        "warmup": get_warmup_manager().status(),
+        "in_flight_requests": get_single_flight().in_flight(),
+        "draft_sessions": len(get_draft_store()),
+        "executors": executors.snapshot(),
+        "admission": {
+            **get_admission_controller().snapshot(),
+            "inflight_payload_bytes": get_payload_budget().in_flight
+        },
+        "gc": get_comfyui_janitor().snapshot(),
+        "artifacts": get_artifact_store().snapshot() if artifact_settings()["enabled"] else None,
+        "jobs": get_job_store().snapshot() if get_job_store() else None,
+        "shared_state": get_shared_state().snapshot(),
+        "tenancy": tenancy.get_fair_scheduler().snapshot(),
+        "metrics": metrics.snapshot()
     }
 
     return status
@@ -816,7 +1330,7 @@ def get_service_status() -> dict:
 # ===========================
 def edit_image_with_comfyui(
     experiment_id: str,
-    input_image_bytes: bytes,
+    input_image: ImageSource,
     prompt: str,
     negative_prompt: str = "",
     steps: int = None,
@@ -827,14 +1341,20 @@ def edit_image_with_comfyui(
     controlnet_strength: float = 0.7,
     denoise_strength: float = 1.0,
     blending_strength: float = 0.35,
-    background_prompt: str = None
+    background_prompt: str = None,
+    encoding: EncodeOptions = None,
+    restore_input_size: bool = None
 ) -> dict:
     """
     ComfyUI를 사용한 이미지 편집
 
+    Returns:
+        결과 dict - 이미지는 원본 바이트(output_image, background_removed_image)로 반환
+        (Base64/바이너리/multipart 직렬화는 API 레이어에서 수행)
+
     Args:
         experiment_id: 실험 ID ("portrait_mode", "product_mode", "hybrid_mode", "ben2_flux_fill")
-        input_image_bytes: 입력 이미지 바이트
+        input_image: 입력 이미지 (바이트, 파일 객체 또는 InputImage - ComfyUI로 그대로 스트리밍 업로드)
         prompt: 편집 프롬프트
         steps: 추론 단계
         guidance_scale: Guidance scale
@@ -844,8 +1364,9 @@ def edit_image_with_comfyui(
         denoise_strength: 변경 강도
         blending_strength: 합성 자연스러움 (Product 모드)
         background_prompt: 배경 프롬프트 (Product 모드)
+        encoding: 출력 포맷/품질 (배경 제거 레이어는 투명도 유지)
+        restore_input_size: 입력을 정규화하며 축소했으면 결과를 원본 입력 크기로 확대
     """
-    import base64
     import time
     import logging
     from .comfyui_client import ComfyUIClient
@@ -859,6 +1380,10 @@ def edit_image_with_comfyui(
 
     logger = logging.getLogger(__name__)
     start_time = time.time()
+    metrics.set_labels(mode=experiment_id)
+
+    # 모델 전환 중이면 전환 완료까지 대기
+    get_model_switcher().wait_until_ready()
 
     try:
         # 설정 로드
@@ -879,8 +1404,8 @@ def edit_image_with_comfyui(
                 "success": False,
                 "experiment_id": experiment_id,
                 "experiment_name": "Unknown",
-                "output_image_base64": None,
-                "background_removed_image_base64": None,
+                "output_image": None,
+                "background_removed_image": None,
                 "error": f"알 수 없는 모드 ID: {experiment_id}",
                 "elapsed_time": None
             }
@@ -899,29 +1424,35 @@ def edit_image_with_comfyui(
 
         client = ComfyUIClient(base_url=base_url, timeout=timeout)
 
-        # 워크플로우 템플릿 가져오기
-        workflow = get_workflow_template(experiment_id)
+        with metrics.stage("workflow_build"):
+            # 워크플로우 템플릿 가져오기
+            workflow = get_workflow_template(experiment_id)
 
-        # 워크플로우 업데이트 (사용자 입력 반영)
-        workflow = update_workflow_inputs(
-            workflow=workflow,
-            experiment_id=experiment_id,
-            prompt=final_prompt,
-            negative_prompt=negative_prompt,
-            steps=steps,
-            guidance_scale=guidance_scale,
-            strength=strength,
-            # 새로운 모드 파라미터
-            controlnet_type=controlnet_type,
-            controlnet_strength=controlnet_strength,
-            denoise_strength=denoise_strength,
-            blending_strength=blending_strength,
-            background_prompt=background_prompt
-        )
+            # 워크플로우 업데이트 (사용자 입력 반영)
+            workflow = update_workflow_inputs(
+                workflow=workflow,
+                experiment_id=experiment_id,
+                prompt=final_prompt,
+                negative_prompt=negative_prompt,
+                steps=steps,
+                guidance_scale=guidance_scale,
+                strength=strength,
+                # 새로운 모드 파라미터
+                controlnet_type=controlnet_type,
+                controlnet_strength=controlnet_strength,
+                denoise_strength=denoise_strength,
+                blending_strength=blending_strength,
+                background_prompt=background_prompt
+            )
 
         # 입력 이미지 노드 ID
         input_node_id = get_workflow_input_image_node_id(experiment_id)
 
+        # 입력 이미지 정규화 (편집 모드는 모델 max_size 대신 설정의 default_max_size)
+        normalizer = get_input_normalizer()
+        normalized = normalizer.normalize(input_image)
+        restore = normalizer.should_restore(normalized, restore_input_size)
+
         logger.info(f"🎨 ComfyUI 이미지 편집 시작")
         logger.info(f"   모드: {mode_info['name']}")
         logger.info(f"   설명: {mode_info['description']}")
@@ -940,27 +1471,36 @@ def edit_image_with_comfyui(
             step_name = pipeline_steps.get(node_id, f"노드 {node_id}")
             step_count[0] += 1
             logger.info(f"   [{step_count[0]:2d}/{len(pipeline_steps):2d}] {step_name} (경과: {elapsed:.1f}초)")
+            streaming.emit(
+                "stage", node_id=node_id, name=step_name,
+                completed=step_count[0], total=len(pipeline_steps), elapsed=elapsed
+            )
 
         # 워크플로우 실행
         logger.info(f"🔄 워크플로우 실행 시작 (총 {len(pipeline_steps)}단계)")
-        output_images, history = client.execute_workflow(
-            workflow=workflow,
-            input_image=input_image_bytes,
-            input_image_node_id=input_node_id,
-            progress_callback=progress_callback
-        )
+        with tenancy.gpu_slot(), get_residency_manager().use(get_workflow_models(workflow), base_url):
+            output_images, history = client.execute_workflow(
+                workflow=workflow,
+                input_image=normalized.source,
+                input_image_node_id=input_node_id,
+                progress_callback=progress_callback
+            )
 
         if not output_images:
             raise Exception("출력 이미지가 생성되지 않았습니다.")
 
+        def finish(image_bytes: bytes) -> bytes:
+            if restore:
+                return encode_image(normalizer.restore_size(image_bytes, normalized), encoding)
+            return transcode_image(image_bytes, encoding)
+
         # 첫 번째 이미지를 최종 결과로 사용
-        output_image_bytes = output_images[0]
-        output_image_base64 = base64.b64encode(output_image_bytes).decode("utf-8")
+        output_image_bytes = finish(output_images[0])
 
         # 배경 제거 이미지 (선택적)
-        background_removed_base64 = None
+        background_removed_bytes = None
         if len(output_images) > 1:
-            background_removed_base64 = base64.b64encode(output_images[1]).decode("utf-8")
+            background_removed_bytes = finish(output_images[1])
 
         elapsed_time = time.time() - start_time
 
@@ -970,8 +1510,8 @@ def edit_image_with_comfyui(
             "success": True,
             "experiment_id": experiment_id,
             "experiment_name": mode_info["name"],
-            "output_image_base64": output_image_base64,
-            "background_removed_image_base64": background_removed_base64,
+            "output_image": output_image_bytes,
+            "background_removed_image": background_removed_bytes,
             "error": None,
             "elapsed_time": elapsed_time
         }
@@ -985,8 +1525,8 @@ def edit_image_with_comfyui(
             "success": False,
             "experiment_id": experiment_id,
             "experiment_name": "Unknown",
-            "output_image_base64": None,
-            "background_removed_image_base64": None,
+            "output_image": None,
+            "background_removed_image": None,
             "error": error_msg,
             "elapsed_time": elapsed_time
         }
@@ -1046,17 +1586,17 @@ def get_image_editing_experiments() -> dict:
 # ===========================
 # 🆕 ComfyUI 모델 관리 (프리로딩/언로드)
 # ===========================
-current_comfyui_model: Optional[str] = None
+# 현재 선택 모델/상주 상태는 ModelResidencyManager가 관리 (thread-safe)
 
 # 프리로드 기능 제거됨
 def _removed_preload_model_in_comfyui(experiment_id: str) -> dict:
     """
     ComfyUI에 모델 미리 로드 (최소 실행 워크플로우 전송)
     """
-    global current_comfyui_model
-    
+    residency = get_residency_manager()
+
     # 이미 로드된 모델이면 스킵
-    if current_comfyui_model == experiment_id:
+    if residency.get_selected() == experiment_id:
         return {"success": True, "message": "이미 로드된 모델입니다.", "model": experiment_id}
 
     from .comfyui_client import ComfyUIClient
@@ -1098,7 +1638,7 @@ def _removed_preload_model_in_comfyui(experiment_id: str) -> dict:
         client.queue_prompt(workflow)
         
         # 6. 상태 업데이트
-        current_comfyui_model = experiment_id
+        residency.select(experiment_id)
         
         return {"success": True, "message": "모델 로딩 요청 완료", "model": experiment_id}
         
@@ -1113,33 +1653,87 @@ def _removed_preload_model_in_comfyui(experiment_id: str) -> dict:
         return {"success": False, "message": str(e)}
 
 def unload_comfyui_model() -> dict:
-    """ComfyUI 모델 언로드 및 메모리 해제"""
-    global current_comfyui_model
-    
-    from .comfyui_client import ComfyUIClient
-    from .comfyui_workflows import load_image_editing_config
-    
+    """ComfyUI 모델 언로드 및 메모리 해제 (실행 중인 작업이 있으면 거부)"""
     try:
-        config = load_image_editing_config()
-        base_url = config.get("comfyui", {}).get("base_url", "http://localhost:8188")
-        
-        client = ComfyUIClient(base_url=base_url)
-        
-        # 메모리 해제 요청
-        success = client.free_memory(unload_models=True, free_memory=True)
-        
-        if success:
-            current_comfyui_model = None
-            return {"success": True, "message": "모델 언로드 및 메모리 해제 완료"}
-        else:
-            return {"success": False, "message": "메모리 해제 요청 실패"}
-            
+        return get_residency_manager().unload()
     except Exception as e:
         return {"success": False, "message": str(e)}
 
 def get_current_comfyui_model() -> Optional[str]:
     """현재 로드된 ComfyUI 모델 ID 반환"""
-    return current_comfyui_model
+    return get_residency_manager().get_selected()
+
+def switch_comfyui_model_async(model_name: str) -> dict:
+    """모델 전환을 백그라운드로 시작하고 현재 전환 상태 반환"""
+    return get_model_switcher().start(model_name)
+
+def get_switch_model_status() -> dict:
+    """모델 전환 진행 상태 (stage, percent 포함)"""
+    return get_model_switcher().status()
+
+# /models 응답 캐시 (레지스트리는 런타임에 바뀌지 않으므로 1회 계산)
+_models_info_cache: dict = {}
+
+def get_models_info() -> tuple:
+    """
+    전환 가능한 생성 모델 목록 + 현재 모델
+
+    Returns:
+        (응답 dict, ETag 문자열)
+    """
+    import json
+    import hashlib
+
+    if "models" not in _models_info_cache:
+        models = {
+            name: registry.get_model_info(name)
+            for name in registry.list_models()
+            if registry.get_model(name).supports_t2i
+        }
+        _models_info_cache["models"] = models
+        _models_info_cache["digest"] = hashlib.sha1(
+            json.dumps(models, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()[:16]
+
+    current = get_current_comfyui_model()
+    info = {
+        "current": current,
+        "models": _models_info_cache["models"],
+        "switching": get_model_switcher().is_switching()
+    }
+    etag = f'W/"{_models_info_cache["digest"]}-{current or "none"}-{int(info["switching"])}"'
+    return info, etag
+
+def _is_model_resident(model_name: str) -> bool:
+    """모델이 현재 ComfyUI VRAM에 상주 중인지 여부"""
+    return any(m["name"] == model_name for m in get_residency_manager().snapshot()["models"])
+
+def start_model_residency():
+    """모델 상주 관리 백그라운드 스레드 시작 (유휴 TTL 해제 + 상태 동기화)"""
+    from .comfyui_workflows import load_image_editing_config
+
+    residency_config = load_image_editing_config().get("comfyui", {}).get("residency", {})
+    get_residency_manager().start_reaper(interval=residency_config.get("reap_interval", 60))
+
+def start_comfyui_gc():
+    """ComfyUI 히스토리 / 출력·입력 파일 정리 백그라운드 스레드 시작 (comfyui.gc, 리더 워커만)"""
+    if is_background_leader():
+        get_comfyui_janitor().start()
+
+def run_comfyui_gc() -> dict:
+    """ComfyUI 출력/입력 파일 정리 즉시 실행 (정리한 파일 수 / 바이트)"""
+    return get_comfyui_janitor().prune()
+
+def start_job_recovery():
+    """재시작 전에 끝내지 못한 작업의 결과 회수 백그라운드 스레드 시작 (comfyui.jobs, 리더 워커만)"""
+    if is_background_leader():
+        start_recovery()
+
+def start_model_warmup():
+    """커넥션 풀 사전 연결 + 예측 모델 워밍업 백그라운드 스레드 시작 (모델 워밍업은 리더 워커만)"""
+    get_warmup_manager().start(
+        openai_client=openai_client, openai_model=MODEL_GPT_MINI, leader=is_background_leader()
+    )
 
 def check_comfyui_status() -> dict:
     """ComfyUI 서버 상태 확인"""
@@ -1160,7 +1754,9 @@ def check_comfyui_status() -> dict:
                 "connected": True,
                 "base_url": base_url,
                 "queue_info": queue_info,
-                "current_model": current_comfyui_model  # 현재 모델 정보 추가
+                "jobs": client.get_queue_eta(),  # prompt_id별 상태 / 대기 순서 / ETA (노드 실행 시간 통계 기반)
+                "current_model": get_current_comfyui_model(),  # 현재 모델 정보 추가
+                "residency": get_residency_manager().snapshot(base_url)
             }
         else:
             return {
@@ -1175,6 +1771,30 @@ def check_comfyui_status() -> dict:
             "error": str(e)
         }
 
+def get_comfyui_job_eta(prompt_ids: list) -> dict:
+    """
+    prompt_id별 ComfyUI 큐 상태 + ETA
+
+    Returns:
+        {prompt_id: {"state": running/pending, "position", "workflow", "eta_seconds"}}
+        (큐에 없는 prompt는 제외 - 완료되었거나 알 수 없는 작업)
+    """
+    from .comfyui_client import ComfyUIClient
+    from .comfyui_workflows import load_image_editing_config
+
+    base_url = load_image_editing_config().get("comfyui", {}).get("base_url", "http://localhost:8188")
+    jobs = ComfyUIClient(base_url=base_url).get_queue_eta()
+    return {prompt_id: jobs[prompt_id] for prompt_id in prompt_ids if prompt_id in jobs}
+
+
+def get_node_timing_report(top: int = 10, workflow: str = None) -> dict:
+    """워크플로우 종류별 느린 노드 상위 top개 + 키(워크플로우/모델/해상도)별 실행 시간 요약"""
+    store = get_node_timing_store()
+    return {
+        "slowest_nodes": store.slowest_nodes(top=top, workflow=workflow),
+        **store.snapshot()
+    }
+
 # ===========================
 # 3D 캘리그라피 생성 (텍스트 오버레이)
 # ===========================
@@ -1216,12 +1836,14 @@ def generate_calligraphy_core(
     text: str,
     color_hex: str,
     style: str,
-    font_path: str
+    font_path: str,
+    encoding: EncodeOptions = None
 ) -> bytes:
     """
     캘리그라피 생성 메인 함수
     - Basic 모드: Non-AI (Pillow) -> 즉시 생성
     - 스타일 모드: AI (SDXL) -> 스타일 입히고 생성
+    - 결과는 투명 배경(RGBA)이므로 jpeg 요청 시에도 투명도를 유지하는 포맷으로 인코딩
     """
     global model_loader
     
@@ -1265,9 +1887,7 @@ def generate_calligraphy_core(
         draw.text((tx, ty), text, font=font, fill=text_color_rgb)
         
         # 반환
-        buf = io.BytesIO()
-        img.save(buf, format="PNG")
-        return buf.getvalue()
+        return encode_image(img, encoding)
     
     # =========================================================
     # 스타일 선택 (AI - SDXL) 
@@ -1347,7 +1967,5 @@ def generate_calligraphy_core(
     # 6. 배경 제거 (Rembg)
     print("✂️ 배경 제거 중...")
     final_image = remove_background(image)
-    
-    buf = io.BytesIO()
-    final_image.save(buf, format="PNG")
-    return buf.getvalue()
+
+    return encode_image(final_image, encoding)
@@ -0,0 +1,360 @@
+# shared_state.py
+"""
+워커/프로세스 간 공유 상태 (uvicorn --workers N, 같은 서버의 API 복제본)
+- 프로세스마다 따로 가지면 안 되는 조정(coordination) 상태를 한 인터페이스(SharedState) 뒤로 모음
+  - 선택된 생성 모델, 워커별 실행 중 작업 수 (model_residency)
+  - 모델 전환 진행 상태 (model_switch)
+  - Idempotency-Key 기록 (idempotency), 초안 세션 (drafts)
+  - 살아 있는 워커 목록 (하트비트) → 작업 기록(job_store)의 주인 없는 작업 판별
+  - 백그라운드 작업(파일 정리, 재시작 후 회수, 워밍업, 유휴 모델 해제)은 리더 워커 1개만 실행
+- 구현
+  - local : 프로세스 메모리 (워커 1개 - 기존 동작과 같음)
+  - sqlite: 같은 서버의 워커끼리 SQLite 파일(WAL) + 파일 잠금(fcntl.flock) 공유
+    - 잠금은 프로세스가 죽으면 OS가 해제 → 리더가 죽으면 다른 워커가 이어받을 수 있음
+- 모델 가중치(model_loader, post_processor의 diffusers 파이프라인)와 순수 캐시(입력 정규화, /models)는
+  공유 대상이 아님 (프로세스마다 필요할 때 로드 / 계산)
+
+설정: configs/image_editing_config.yaml: comfyui.shared_state
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, ContextManager, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DEFAULT_SHARED_STATE_PATH = os.path.join(PROJECT_ROOT, "data", "shared_state.sqlite3")
+
+# 이 프로세스(워커) 식별자 - 하트비트 / 작업 주인 표시
+INSTANCE_ID = uuid.uuid4().hex
+
+INSTANCES = "instances"  # 하트비트 네임스페이스
+
+
+def load_shared_state_config() -> Dict[str, Any]:
+    """configs/image_editing_config.yaml: comfyui.shared_state"""
+    from .comfyui_workflows import load_image_editing_config
+
+    return load_image_editing_config().get("comfyui", {}).get("shared_state", {})
+
+
+class SharedState:
+    """
+    공유 상태 인터페이스 (네임스페이스별 키 → JSON 직렬화 가능한 값, 선택적 TTL)
+
+    구현체는 get / set / set_if_absent / delete / items / lock / try_leadership 제공
+    """
+
+    backend = ""
+
+    def __init__(self, heartbeat_interval: float = 10.0):
+        self.heartbeat_interval = heartbeat_interval
+        self._heartbeat: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # ---------- 키/값 ----------
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    def set_if_absent(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """키가 없을 때만 저장 (원자적) - 저장했으면 True"""
+        raise NotImplementedError
+
+    def delete(self, namespace: str, key: str):
+        raise NotImplementedError
+
+    def items(self, namespace: str) -> Dict[str, Any]:
+        """만료되지 않은 키/값 전체"""
+        raise NotImplementedError
+
+    def purge_expired(self):
+        """만료된 키 삭제 (하트비트 스레드가 주기적으로 호출)"""
+
+    # ---------- 잠금 ----------
+    def lock(self, name: str) -> "ContextManager[None]":
+        """프로세스 간 상호 배제 컨텍스트 (같은 프로세스의 스레드끼리도 배제, 같은 스레드는 중첩 가능)"""
+        raise NotImplementedError
+
+    def try_leadership(self, name: str) -> bool:
+        """name 역할의 리더가 되면 True (프로세스가 끝날 때까지 유지, 이미 리더면 True)"""
+        raise NotImplementedError
+
+    # ---------- 워커 하트비트 ----------
+    def start_heartbeat(self):
+        """살아 있음 표시 스레드 시작 (만료 = 하트비트 간격의 3배)"""
+        if self._heartbeat and self._heartbeat.is_alive():
+            return
+        self.set(INSTANCES, INSTANCE_ID, {"pid": os.getpid(), "started_at": time.time()},
+                 ttl=self.heartbeat_interval * 3)
+
+        def _loop():
+            while not self._stop.wait(self.heartbeat_interval):
+                try:
+                    self.set(INSTANCES, INSTANCE_ID, {"pid": os.getpid(), "seen_at": time.time()},
+                             ttl=self.heartbeat_interval * 3)
+                    self.purge_expired()
+                except Exception as e:
+                    logger.warning(f"⚠️ 공유 상태 하트비트 실패: {e}")
+
+        self._stop.clear()
+        self._heartbeat = threading.Thread(target=_loop, name="shared-state-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def live_instances(self) -> Set[str]:
+        """하트비트가 만료되지 않은 워커 (자기 자신 포함)"""
+        return set(self.items(INSTANCES)) | {INSTANCE_ID}
+
+    def is_alive(self, instance_id: Optional[str]) -> bool:
+        return bool(instance_id) and instance_id in self.live_instances()
+
+    def leaderships(self) -> Set[str]:
+        """이 워커가 리더인 역할"""
+        return set()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """구현 / 이 워커 / 살아 있는 워커 수 / 맡은 역할 (/status)"""
+        return {
+            "backend": self.backend,
+            "instance_id": INSTANCE_ID,
+            "pid": os.getpid(),
+            "live_instances": len(self.live_instances()),
+            "leader_of": sorted(self.leaderships())
+        }
+
+
+class LocalSharedState(SharedState):
+    """프로세스 메모리 구현 (워커 1개)"""
+
+    backend = "local"
+
+    def __init__(self, heartbeat_interval: float = 10.0):
+        super().__init__(heartbeat_interval)
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, Any]] = {}  # namespace → {key: (value, expires_at)}
+        self._locks: Dict[str, threading.RLock] = {}
+
+    def _live(self, namespace: str) -> Dict[str, Any]:
+        entries = self._data.setdefault(namespace, {})
+        now = time.time()
+        for key in [k for k, (_, expires_at) in entries.items() if expires_at and expires_at < now]:
+            del entries[key]
+        return entries
+
+    def get(self, namespace, key, default=None):
+        with self._lock:
+            entry = self._live(namespace).get(key)
+            return entry[0] if entry else default
+
+    def set(self, namespace, key, value, ttl=None):
+        with self._lock:
+            self._data.setdefault(namespace, {})[key] = (value, time.time() + ttl if ttl else None)
+
+    def set_if_absent(self, namespace, key, value, ttl=None):
+        with self._lock:
+            entries = self._live(namespace)
+            if key in entries:
+                return False
+            entries[key] = (value, time.time() + ttl if ttl else None)
+            return True
+
+    def delete(self, namespace, key):
+        with self._lock:
+            self._data.get(namespace, {}).pop(key, None)
+
+    def items(self, namespace):
+        with self._lock:
+            return {key: value for key, (value, _) in self._live(namespace).items()}
+
+    def purge_expired(self):
+        with self._lock:
+            for namespace in list(self._data):
+                self._live(namespace)
+
+    @contextmanager
+    def lock(self, name):
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.RLock())
+        with lock:
+            yield
+
+    def try_leadership(self, name):
+        return True
+
+    def leaderships(self):
+        return {"*"}  # 워커 1개 - 모든 역할
+
+
+class SQLiteSharedState(SharedState):
+    """SQLite 파일(WAL) + fcntl 파일 잠금 구현 (같은 서버의 여러 워커)"""
+
+    backend = "sqlite"
+
+    def __init__(self, path: str, heartbeat_interval: float = 10.0):
+        """
+        Args:
+            path: SQLite 파일 경로 (잠금 파일은 {path}.locks/ 아래)
+        """
+        super().__init__(heartbeat_interval)
+        self.path = path
+        self.lock_dir = f"{path}.locks"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        os.makedirs(self.lock_dir, exist_ok=True)
+
+        self._conn_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS shared_state ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._thread_locks: Dict[str, threading.RLock] = {}
+        self._lock_fds: Dict[str, Tuple[int, int]] = {}  # 잠금 이름 → (flock을 잡은 fd, 중첩 깊이)
+        self._leaderships: Dict[str, int] = {}  # 역할 → 잠금 파일 fd (프로세스 종료 시 해제)
+
+    def _execute(self, sql: str, params: tuple = ()) -> list:
+        with self._conn_lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def get(self, namespace, key, default=None):
+        rows = self._execute(
+            "SELECT value FROM shared_state WHERE namespace = ? AND key = ?"
+            " AND (expires_at IS NULL OR expires_at >= ?)",
+            (namespace, key, time.time())
+        )
+        return json.loads(rows[0][0]) if rows else default
+
+    def set(self, namespace, key, value, ttl=None):
+        self._execute(
+            "INSERT OR REPLACE INTO shared_state (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value, ensure_ascii=False), time.time() + ttl if ttl else None)
+        )
+
+    def set_if_absent(self, namespace, key, value, ttl=None):
+        now = time.time()
+        with self._conn_lock:
+            # 만료된 키는 없는 것으로 취급 (같은 트랜잭션에서 정리 후 삽입)
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "DELETE FROM shared_state WHERE namespace = ? AND key = ? AND expires_at < ?",
+                    (namespace, key, now)
+                )
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO shared_state (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (namespace, key, json.dumps(value, ensure_ascii=False), now + ttl if ttl else None)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return cursor.rowcount == 1
+
+    def delete(self, namespace, key):
+        self._execute("DELETE FROM shared_state WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def items(self, namespace):
+        rows = self._execute(
+            "SELECT key, value FROM shared_state WHERE namespace = ? AND (expires_at IS NULL OR expires_at >= ?)",
+            (namespace, time.time())
+        )
+        return {key: json.loads(value) for key, value in rows}
+
+    def purge_expired(self):
+        self._execute("DELETE FROM shared_state WHERE expires_at < ?", (time.time(),))
+
+    def _lock_path(self, name: str) -> str:
+        return os.path.join(self.lock_dir, "".join(c if c.isalnum() or c in "-_." else "_" for c in name) + ".lock")
+
+    @contextmanager
+    def lock(self, name):
+        import fcntl
+
+        with self._conn_lock:
+            thread_lock = self._thread_locks.setdefault(name, threading.RLock())
+        with thread_lock:  # flock은 프로세스 단위이므로 같은 프로세스의 스레드끼리는 따로 배제
+            # 중첩해서 잡으면 fd를 새로 열지 않음 (fd마다 flock이 따로라 같은 스레드가 자기 자신을 기다리게 됨)
+            fd, depth = self._lock_fds.get(name, (None, 0))
+            if fd is None:
+                fd = os.open(self._lock_path(name), os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                except BaseException:
+                    os.close(fd)
+                    raise
+            self._lock_fds[name] = (fd, depth + 1)
+            try:
+                yield
+            finally:
+                if depth:
+                    self._lock_fds[name] = (fd, depth)
+                else:
+                    del self._lock_fds[name]
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                    os.close(fd)
+
+    def try_leadership(self, name):
+        import fcntl
+
+        with self._conn_lock:
+            if name in self._leaderships:
+                return True
+            fd = os.open(self._lock_path(f"leader-{name}"), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return False
+            self._leaderships[name] = fd
+            logger.info(f"👑 백그라운드 작업({name}) 리더: pid {os.getpid()}")
+            return True
+
+    def leaderships(self):
+        with self._conn_lock:
+            return set(self._leaderships)
+
+
+# 싱글톤 인스턴스
+_shared_state: Optional[SharedState] = None
+_shared_state_lock = threading.Lock()
+
+
+def get_shared_state() -> SharedState:
+    """SharedState 싱글톤 인스턴스 (comfyui.shared_state.backend: local / sqlite)"""
+    global _shared_state
+    if _shared_state is None:
+        with _shared_state_lock:
+            if _shared_state is None:
+                config = load_shared_state_config()
+                backend = config.get("backend", "local")
+                interval = config.get("heartbeat_interval", 10)
+                if backend == "sqlite":
+                    path = config.get("path") or DEFAULT_SHARED_STATE_PATH
+                    if not os.path.isabs(path):
+                        path = os.path.join(PROJECT_ROOT, path)
+                    _shared_state = SQLiteSharedState(path, heartbeat_interval=interval)
+                    logger.info(f"🔗 공유 상태: SQLite ({path})")
+                else:
+                    if backend != "local":
+                        logger.warning(f"⚠️ 알 수 없는 공유 상태 구현 '{backend}' - local 사용")
+                    _shared_state = LocalSharedState(heartbeat_interval=interval)
+                _shared_state.start_heartbeat()
+    return _shared_state
+
+
+def is_background_leader(name: str = "background") -> bool:
+    """이 워커가 백그라운드 작업(정리/회수/워밍업/유휴 해제)을 맡는지 여부"""
+    leader = get_shared_state().try_leadership(name)
+    if not leader:
+        logger.info(f"ℹ️ 다른 워커가 백그라운드 작업({name})을 맡고 있습니다 (pid {os.getpid()})")
+    return leader
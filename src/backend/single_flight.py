@@ -0,0 +1,112 @@
+# single_flight.py
+"""
+동일 요청 합치기 (single-flight)
+- 정규화된 파라미터(프롬프트, 크기, steps, seed, 모델, 입력 이미지 해시 등)가 같은
+  요청이 동시에 들어오면 ComfyUI 작업은 한 번만 실행하고 모든 대기자가 같은 결과를 받음
+- 실행이 끝나면 키를 제거하므로 결과 캐시가 아님 (진행 중인 요청만 합침)
+"""
+import json
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """공백 정규화 (앞뒤 공백 제거, 연속 공백 1칸)"""
+    return " ".join((prompt or "").split())
+
+
+def request_key(endpoint: str, params: Dict[str, Any], *blobs: Optional[bytes]) -> str:
+    """
+    요청 키 생성
+
+    Args:
+        endpoint: 엔드포인트 이름 ("t2i", "i2i", "edit")
+        params: 정규화된 파라미터 (JSON 직렬화 가능해야 함)
+        blobs: 입력 이미지 등 바이너리 또는 InputImage (내용 해시로 반영)
+    """
+    digest = hashlib.sha256()
+    digest.update(endpoint.encode("utf-8"))
+    digest.update(json.dumps(params, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+    for blob in blobs:
+        if hasattr(blob, "sha256"):
+            digest.update(blob.sha256())  # InputImage: 업로드 파일을 청크 단위로 해시
+        else:
+            digest.update(hashlib.sha256(blob or b"").digest())
+    return digest.hexdigest()
+
+
+class _Call:
+    """진행 중인 실행 1건"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """키별로 진행 중인 실행을 하나로 합침 (스레드 안전)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, func: Callable[[], Any], endpoint: str = "") -> Tuple[Any, bool]:
+        """
+        같은 키로 진행 중인 실행이 있으면 그 결과를 기다리고, 없으면 func() 실행
+
+        Returns:
+            (결과, 합쳐진 요청 여부) - 실행 중 예외는 모든 대기자에게 그대로 전파
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                call.waiters += 1
+
+        if not leader:
+            metrics.increment("coalesced_requests_total", endpoint=endpoint)
+            logger.info(f"🔗 동일 요청 합침 ({endpoint}, 대기 {call.waiters}건) - 진행 중인 작업 결과를 공유합니다")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def is_running(self, key: str) -> bool:
+        """같은 키로 진행 중인 실행이 있는지 (있으면 지금 do를 호출한 요청은 합쳐짐)"""
+        with self._lock:
+            return key in self._calls
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+# 싱글톤 인스턴스
+_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """SingleFlight 싱글톤 인스턴스"""
+    return _single_flight
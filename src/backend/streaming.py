@@ -0,0 +1,184 @@
+# streaming.py
+"""
+진행 상황 / 부분 결과 스트리밍 (Server-Sent Events)
+- 서비스 코드는 emit(event, **data)로 이벤트를 보냄 (스트리밍 요청이 아니면 아무 일도 하지 않음)
+  - queue: ComfyUI 큐 대기 순서 (0 = 실행 중)
+  - node / step: 노드 실행 시작, 샘플링 step 진행 (ComfyUI WebSocket)
+  - image: 완성된 이미지 (나머지 이미지를 기다리지 않고 바로 전달)
+- 이벤트 대상(EventSink)은 서비스 함수를 실행하는 executor 스레드의 스레드 로컬로 지정
+  ComfyUI WebSocket 리스너 스레드는 prompt_id로 대상을 찾음 (bind_prompt)
+"""
+import json
+import base64
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import metrics, tracing
+from .executors import get_executor
+
+logger = logging.getLogger(__name__)
+
+KEEPALIVE_INTERVAL = 15.0  # 초 (프록시가 유휴 연결을 끊지 않도록 주석 라인 전송)
+
+
+class EventSink:
+    """작업 스레드 → asyncio 이벤트 루프로 이벤트 전달 (스레드 안전)"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._queue: "asyncio.Queue[Tuple[str, Dict[str, Any]]]" = asyncio.Queue()
+
+    def put(self, event: str, data: Dict[str, Any]):
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (event, data))
+
+    async def get(self) -> Tuple[str, Dict[str, Any]]:
+        return await self._queue.get()
+
+    def drain(self) -> List[Tuple[str, Dict[str, Any]]]:
+        items = []
+        while not self._queue.empty():
+            items.append(self._queue.get_nowait())
+        return items
+
+
+_local = threading.local()
+_prompt_sinks: Dict[str, EventSink] = {}
+_prompt_lock = threading.Lock()
+
+
+@contextmanager
+def stream_events(sink: EventSink):
+    """이 컨텍스트 안에서 호출되는 emit()을 sink로 전달"""
+    previous = getattr(_local, "sink", None)
+    _local.sink = sink
+    try:
+        yield
+    finally:
+        _local.sink = previous
+        with _prompt_lock:
+            for prompt_id in [p for p, s in _prompt_sinks.items() if s is sink]:
+                del _prompt_sinks[prompt_id]
+
+
+def is_streaming() -> bool:
+    """현재 스레드가 스트리밍 요청을 처리 중인지"""
+    return getattr(_local, "sink", None) is not None
+
+
+def emit(event: str, **data):
+    """현재 스레드의 스트리밍 대상에 이벤트 전송 (스트리밍 요청이 아니면 무시)"""
+    sink = getattr(_local, "sink", None)
+    if sink is not None:
+        sink.put(event, data)
+
+
+def bind_prompt(prompt_id: str):
+    """ComfyUI prompt_id를 현재 스레드의 스트리밍 대상에 연결 (WebSocket 이벤트 전달용)"""
+    sink = getattr(_local, "sink", None)
+    if sink is not None:
+        with _prompt_lock:
+            _prompt_sinks[prompt_id] = sink
+
+
+def emit_to_prompt(prompt_id: str, event: str, **data):
+    """prompt_id에 연결된 스트리밍 대상에 이벤트 전송 (다른 스레드에서 호출)"""
+    with _prompt_lock:
+        sink = _prompt_sinks.get(prompt_id)
+    if sink is not None:
+        sink.put(event, {"prompt_id": prompt_id, **data})
+
+
+def load_streaming_config() -> Dict[str, Any]:
+    """configs/image_editing_config.yaml: comfyui.streaming"""
+    from .comfyui_workflows import load_image_editing_config
+
+    return load_image_editing_config().get("comfyui", {}).get("streaming", {})
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """SSE 메시지 1개 (bytes 값은 "{키}_base64"로 인코딩)"""
+    payload = {}
+    for key, value in data.items():
+        if isinstance(value, bytes):
+            payload[f"{key}_base64"] = base64.b64encode(value).decode("utf-8")
+        else:
+            payload[key] = value
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n"
+
+
+def error_status(error: Exception) -> int:
+    """스트리밍 중 예외 → HTTP 상태 코드에 해당하는 값 (error 이벤트용)"""
+    if isinstance(error, ValueError):
+        return 400
+    if isinstance(error, (RuntimeError, ConnectionError)):
+        return 503
+    return 500
+
+
+async def sse_stream(
+    func: Callable[[], Any],
+    on_result: Callable[[Any], List[Tuple[str, Dict[str, Any]]]],
+    endpoint: str = "",
+    workload: str = "comfyui"
+):
+    """
+    func()을 executor에서 실행하며 발생한 이벤트를 SSE로 전달
+
+    Args:
+        func: 서비스 함수 (emit()으로 진행 이벤트 전송)
+        on_result: func 결과 → 마지막으로 보낼 이벤트 목록 (예: [("image", ...), ("done", ...)])
+        endpoint: 메트릭 라벨 (단계 시간, 연결 끊김 카운터)
+        workload: func을 실행할 작업 풀 (executors.WORKLOADS)
+
+    실패 시 마지막 이벤트는 error ({"status", "detail"})
+    클라이언트가 연결을 끊어도 작업은 끝까지 실행됨 (결과만 버려짐)
+    """
+    loop = asyncio.get_running_loop()
+    sink = EventSink(loop)
+
+    def run():
+        with stream_events(sink), metrics.request_labels(endpoint=endpoint):
+            return func()
+
+    future = loop.run_in_executor(get_executor(workload), tracing.wrap(run))  # 현재 trace를 작업 스레드로 전달
+    yield format_sse("started", {})
+
+    getter: Optional[asyncio.Future] = None
+    finished = False
+    try:
+        while True:
+            if getter is None:
+                getter = asyncio.ensure_future(sink.get())
+            done, _ = await asyncio.wait(
+                {getter, future}, timeout=KEEPALIVE_INTERVAL, return_when=asyncio.FIRST_COMPLETED
+            )
+            if getter in done:
+                yield format_sse(*getter.result())
+                getter = None
+                continue
+            if future in done:
+                # 작업 스레드가 결과보다 먼저 보낸 이벤트가 남아 있으면 모두 전달
+                for event, data in sink.drain():
+                    yield format_sse(event, data)
+                finished = True
+                break
+            yield ": keep-alive\n\n"
+    finally:
+        # 정상 종료 또는 클라이언트 연결 끊김 (작업 자체는 취소하지 않음)
+        if getter is not None:
+            getter.cancel()
+        if not finished:
+            metrics.increment("cancellations_total", reason="client_disconnect", endpoint=endpoint)
+
+    try:
+        result = future.result()
+    except Exception as e:
+        logger.error(f"❌ 스트리밍 작업 실패: {e}")
+        yield format_sse("error", {"status": error_status(e), "detail": str(e)})
+        return
+
+    for event, data in on_result(result):
+        yield format_sse(event, data)
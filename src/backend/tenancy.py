@@ -0,0 +1,500 @@
+# tenancy.py
+"""
+테넌트(가게)별 공정 분배 스케줄링 + 사용량 제한
+- 여러 가게가 GPU 1개를 나눠 쓰므로, 한 가게의 배치 반복 / 대량 작업이 ComfyUI를 오래 독점하지 않도록
+  테넌트 단위로 실행 순서를 정함
+- 테넌트 ID: X-Tenant-ID 헤더(comfyui.tenancy.header) → 요청 본문 shop_name → default_tenant
+- 가중 공정 큐 (start-time fair queuing)
+  - ComfyUI 실행 구간(워크플로우 등록 ~ 결과 수신)은 슬롯(max_dispatched)을 받은 뒤에만 진입
+    (프롬프트 최적화 등 GPU를 쓰지 않는 단계는 슬롯 없이 진행)
+  - 작업마다 가상 태그: 시작 = max(가상 시각, 같은 테넌트의 직전 종료), 종료 = 시작 + 예상 GPU 초 / 가중치
+    → 슬롯이 비면 종료 태그가 가장 작은 작업부터 (많이 쓴 테넌트는 뒤로, 가중치가 크면 더 자주)
+  - 예상 GPU 초는 수락 제어(admission)의 워크플로우별 예상 소요 시간, 끝나면 실제 실행 시간으로 태그 보정
+  - 대기 순서: GET /api/tenants/{tenant_id}/queue, GET /api/jobs/{job_id}의 queue_position
+- 토큰 버킷 (테넌트별, 분당 충전량이 0이면 제한 없음)
+  - GPU 초: 실제 ComfyUI 실행 시간(history execution_start ~ execution_success)을 끝난 뒤 차감
+    → 잔액이 0 이하면 새 이미지 요청 429 + Retry-After (실행 전에는 시간을 모르므로 후불)
+    → 합쳐진 요청(다른 가게의 같은 요청 포함) / Idempotency-Key 재생은 GPU를 새로 쓰지 않으므로 청구하지 않음
+      (실제로 실행한 요청의 테넌트만 GPU 초 / 작업 수 차감, 공정 큐에도 실행한 테넌트의 작업만 들어감)
+  - GPT 호출: 호출마다 1개 - 문구 생성은 429, 이미지 프롬프트 최적화는 원본 프롬프트로 진행
+- 큐 / 가상 시각 / 버킷 / 누적 사용량은 공유 상태(shared_state)에 두어 워커가 여러 개여도 하나의 큐로 동작
+- 메트릭: tenant_gpu_seconds_total{tenant}, tenant_gpt_calls_total{tenant}, tenant_jobs_total{tenant},
+  tenant_rate_limited_total{tenant, resource}, tenant_queue_wait_seconds{tenant}, tenant_queue_depth{tenant}
+
+설정: configs/image_editing_config.yaml: comfyui.tenancy
+"""
+import re
+import math
+import time
+import uuid
+import logging
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from . import metrics
+from .admission import get_admission_controller
+from .exceptions import TenantRateLimitedError
+from .shared_state import INSTANCE_ID, get_shared_state
+
+logger = logging.getLogger(__name__)
+
+TENANT_QUEUE = "tenant_queue"      # 공유 상태: 티켓 ID → {tenant, job_id, cost, start, finish, state, owner, ...}
+TENANT_TAGS = "tenant_tags"        # 공유 상태: 테넌트 → 직전 종료 태그 (VIRTUAL_CLOCK 키 = 가상 시각)
+TENANT_BUCKETS = "tenant_buckets"  # 공유 상태: "{tenant}|{resource}" → {tokens, updated_at}
+TENANT_USAGE = "tenant_usage"      # 공유 상태: 테넌트 → 누적 {gpu_seconds, gpt_calls, jobs, rate_limited}
+VIRTUAL_CLOCK = "*"
+
+GPU_SECONDS = "gpu_seconds"
+GPT_CALLS = "gpt_calls"
+
+MAX_TENANT_LENGTH = 64
+_TENANT_INVALID_CHARS = re.compile(r"[^\w.@-]+")  # 한글 가게 이름은 그대로, 공백/기호는 _
+
+
+def load_tenancy_config() -> Dict[str, Any]:
+    """configs/image_editing_config.yaml: comfyui.tenancy"""
+    from .comfyui_workflows import load_image_editing_config
+
+    return load_image_editing_config().get("comfyui", {}).get("tenancy", {})
+
+
+def normalize_tenant(value: Optional[str]) -> Optional[str]:
+    """테넌트 ID 정리 (허용하지 않는 문자는 _, 최대 64자) - 비어 있으면 None"""
+    if not value:
+        return None
+    tenant = _TENANT_INVALID_CHARS.sub("_", str(value).strip())[:MAX_TENANT_LENGTH].strip("_")
+    return tenant or None
+
+
+class _Ticket:
+    """공정 큐에 들어간 ComfyUI 실행 1건"""
+
+    def __init__(self, tenant: str, cost: float, job_id: Optional[str]):
+        self.ticket_id = uuid.uuid4().hex
+        self.tenant = tenant
+        self.cost = cost
+        self.job_id = job_id
+        self.enqueued_at = time.time()
+        self.dispatched_at: Optional[float] = None
+        self.gpu_seconds: Optional[float] = None  # ComfyUI가 보고한 실행 시간 합계 (없으면 슬롯 점유 시간)
+
+
+class FairShareScheduler:
+    """테넌트별 가중 공정 큐 + GPU 초 / GPT 호출 토큰 버킷 (스레드 / 워커 안전)"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.enabled = config.get("enabled", True)
+        self.header = config.get("header", "X-Tenant-ID")
+        self.default_tenant = normalize_tenant(config.get("default_tenant")) or "anonymous"
+        self.max_dispatched = max(1, config.get("max_dispatched", 1))
+        self.default_weight = float(config.get("default_weight", 1.0))
+        self.weights: Dict[str, float] = {
+            normalize_tenant(tenant): float(weight) for tenant, weight in (config.get("weights") or {}).items()
+        }
+        self.poll_interval = config.get("poll_interval", 0.25)
+        # 자원 → (초당 충전량, 최대 잔액) - 최대 잔액을 생략하면 1분 충전량
+        self.limits: Dict[str, tuple] = {}
+        for resource in (GPU_SECONDS, GPT_CALLS):
+            rate = config.get(f"{resource}_per_minute", 0) / 60
+            self.limits[resource] = (rate, config.get(f"{resource}_burst") or rate * 60)
+        self._cond = threading.Condition()
+
+    # ------------------------------------------------------------
+    # 테넌트
+    # ------------------------------------------------------------
+    def resolve_tenant(self, header_value: Optional[str] = None, body_value: Optional[str] = None) -> str:
+        """테넌트 ID (헤더 → 요청 본문 shop_name → default_tenant)"""
+        return normalize_tenant(header_value) or normalize_tenant(body_value) or self.default_tenant
+
+    def weight(self, tenant: str) -> float:
+        return max(0.01, self.weights.get(tenant, self.default_weight))
+
+    def expected_cost(self, workflow: Optional[str]) -> float:
+        """작업 1건의 예상 GPU 초 (수락 제어의 워크플로우별 예상 소요 시간)"""
+        return get_admission_controller().expected_duration(workflow or "")
+
+    # ------------------------------------------------------------
+    # 토큰 버킷
+    # ------------------------------------------------------------
+    def _bucket(self, tenant: str, resource: str, now: float) -> Dict[str, float]:
+        """충전을 반영한 잔액 (잠금 안에서 호출)"""
+        rate, burst = self.limits[resource]
+        state = get_shared_state().get(TENANT_BUCKETS, f"{tenant}|{resource}")
+        if state is None:  # 처음 보거나 가득 찬 뒤 만료된 버킷
+            return {"tokens": burst, "updated_at": now}
+        return {"tokens": min(burst, state["tokens"] + (now - state["updated_at"]) * rate), "updated_at": now}
+
+    def _save_bucket(self, tenant: str, resource: str, state: Dict[str, float]):
+        rate, burst = self.limits[resource]
+        # 가득 찰 때까지 걸리는 시간이 지나면 기록이 없어도 같음 (만료 = 가득 참)
+        ttl = max(60.0, (burst - state["tokens"]) / rate + 60)
+        get_shared_state().set(TENANT_BUCKETS, f"{tenant}|{resource}", state, ttl=ttl)
+
+    def _reject(self, tenant: str, resource: str, wait: float, label: str):
+        retry_after = max(1, math.ceil(wait))
+        metrics.increment("tenant_rate_limited_total", tenant=tenant, resource=resource)
+        self._add_usage(tenant, rate_limited=1)
+        logger.warning(f"🚦 테넌트 한도 초과: '{tenant}' {label} ({retry_after}초 후 재시도 권장)")
+        raise TenantRateLimitedError(
+            f"'{tenant}'의 {label} 한도를 초과했습니다. {retry_after}초 후 다시 시도하세요.",
+            retry_after=retry_after, tenant=tenant, resource=resource
+        )
+
+    def check_gpu_budget(self, tenant: str):
+        """
+        새 이미지 요청 전 GPU 초 잔액 확인 (차감은 실행 후 실제 시간으로)
+
+        Raises:
+            TenantRateLimitedError: 잔액이 0 이하 (retry_after: 0보다 커질 때까지 남은 초)
+        """
+        rate, _ = self.limits[GPU_SECONDS]
+        if not self.enabled or rate <= 0:
+            return
+        shared = get_shared_state()
+        with shared.lock(TENANT_BUCKETS):
+            tokens = self._bucket(tenant, GPU_SECONDS, time.time())["tokens"]
+        if tokens <= 0:
+            self._reject(tenant, GPU_SECONDS, -tokens / rate + 1, "GPU 사용 시간")
+
+    def _charge_gpu(self, tenant: str, seconds: float):
+        """실행이 끝난 GPU 초 차감 (잔액이 음수가 될 수 있음 → 다음 요청부터 대기)"""
+        rate, _ = self.limits[GPU_SECONDS]
+        if rate <= 0 or seconds <= 0:
+            return
+        shared = get_shared_state()
+        with shared.lock(TENANT_BUCKETS):
+            state = self._bucket(tenant, GPU_SECONDS, time.time())
+            state["tokens"] -= seconds
+            self._save_bucket(tenant, GPU_SECONDS, state)
+
+    def consume_gpt_call(self, tenant: str, strict: bool = True) -> bool:
+        """
+        GPT 호출 1회 차감
+
+        Args:
+            strict: True면 한도 초과 시 TenantRateLimitedError, False면 False 반환 (호출 생략)
+
+        Returns:
+            호출해도 되면 True
+        """
+        if not self.enabled:
+            return True
+        rate, _ = self.limits[GPT_CALLS]
+        if rate > 0:
+            shared = get_shared_state()
+            with shared.lock(TENANT_BUCKETS):
+                state = self._bucket(tenant, GPT_CALLS, time.time())
+                allowed = state["tokens"] >= 1
+                if allowed:
+                    state["tokens"] -= 1
+                    self._save_bucket(tenant, GPT_CALLS, state)
+            if not allowed:
+                if strict:
+                    self._reject(tenant, GPT_CALLS, (1 - state["tokens"]) / rate, "GPT 호출")
+                metrics.increment("tenant_rate_limited_total", tenant=tenant, resource=GPT_CALLS)
+                self._add_usage(tenant, rate_limited=1)
+                logger.info(f"🚦 '{tenant}' GPT 호출 한도 초과 → 프롬프트 최적화 생략")
+                return False
+        metrics.increment("tenant_gpt_calls_total", tenant=tenant)
+        self._add_usage(tenant, gpt_calls=1)
+        return True
+
+    def budgets(self, tenant: str) -> Dict[str, Any]:
+        """자원별 현재 잔액 / 분당 충전량 / 최대 잔액 (제한 없는 자원은 None)"""
+        now = time.time()
+        result = {}
+        shared = get_shared_state()
+        with shared.lock(TENANT_BUCKETS):
+            for resource, (rate, burst) in self.limits.items():
+                if rate <= 0:
+                    result[resource] = None
+                    continue
+                tokens = self._bucket(tenant, resource, now)["tokens"]
+                result[resource] = {
+                    "tokens": round(tokens, 1),
+                    "per_minute": round(rate * 60, 2),
+                    "burst": burst,
+                    "retry_after": max(0, math.ceil(-tokens / rate)) if resource == GPU_SECONDS and tokens <= 0 else 0
+                }
+        return result
+
+    # ------------------------------------------------------------
+    # 누적 사용량
+    # ------------------------------------------------------------
+    def _add_usage(self, tenant: str, **amounts: float):
+        shared = get_shared_state()
+        with shared.lock(TENANT_USAGE):
+            usage = shared.get(TENANT_USAGE, tenant) or {"gpu_seconds": 0.0, "gpt_calls": 0, "jobs": 0, "rate_limited": 0}
+            for name, amount in amounts.items():
+                usage[name] = usage.get(name, 0) + amount
+            shared.set(TENANT_USAGE, tenant, usage)
+
+    def usage(self, tenant: str) -> Dict[str, Any]:
+        return get_shared_state().get(TENANT_USAGE, tenant) or {"gpu_seconds": 0.0, "gpt_calls": 0, "jobs": 0, "rate_limited": 0}
+
+    # ------------------------------------------------------------
+    # 공정 큐
+    # ------------------------------------------------------------
+    def _entries_locked(self) -> Dict[str, Dict[str, Any]]:
+        """큐 항목 (죽은 워커의 항목은 정리)"""
+        shared = get_shared_state()
+        entries = shared.items(TENANT_QUEUE)
+        live = shared.live_instances()
+        for ticket_id in [t for t, e in entries.items() if e.get("owner") not in live]:
+            shared.delete(TENANT_QUEUE, ticket_id)
+            del entries[ticket_id]
+        return entries
+
+    @staticmethod
+    def _ordered(entries: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """대기 중인 항목을 실행 순서대로 (종료 태그 → 등록 시각)"""
+        return sorted(
+            (e for e in entries.values() if e["state"] == "waiting"),
+            key=lambda e: (e["finish"], e["enqueued_at"], e["ticket_id"])
+        )
+
+    def _enqueue(self, ticket: _Ticket):
+        shared = get_shared_state()
+        with shared.lock(TENANT_QUEUE):
+            tags = shared.items(TENANT_TAGS)
+            start = max(tags.get(VIRTUAL_CLOCK, 0.0), tags.get(ticket.tenant, 0.0))
+            finish = start + ticket.cost / self.weight(ticket.tenant)
+            shared.set(TENANT_TAGS, ticket.tenant, finish)
+            shared.set(TENANT_QUEUE, ticket.ticket_id, {
+                "ticket_id": ticket.ticket_id,
+                "tenant": ticket.tenant,
+                "job_id": ticket.job_id,
+                "cost": ticket.cost,
+                "start": start,
+                "finish": finish,
+                "state": "waiting",
+                "owner": INSTANCE_ID,
+                "enqueued_at": ticket.enqueued_at,
+                "dispatched_at": None
+            })
+        metrics.add_gauge("tenant_queue_depth", 1, tenant=ticket.tenant)
+
+    def _wait_turn(self, ticket: _Ticket):
+        """슬롯이 비고 이 티켓이 대기 순서 맨 앞이 될 때까지 대기"""
+        shared = get_shared_state()
+        logged = False
+        while True:
+            with shared.lock(TENANT_QUEUE):
+                entries = self._entries_locked()
+                entry = entries.get(ticket.ticket_id)
+                if entry is None:
+                    logger.warning(f"⚠️ 공정 큐에서 사라진 작업 - 바로 실행: {ticket.tenant}")
+                    break
+                running = sum(1 for e in entries.values() if e["state"] == "running")
+                waiting = self._ordered(entries)
+                if running < self.max_dispatched and waiting[0]["ticket_id"] == ticket.ticket_id:
+                    entry.update(state="running", dispatched_at=time.time())
+                    shared.set(TENANT_QUEUE, ticket.ticket_id, entry)
+                    virtual = shared.get(TENANT_TAGS, VIRTUAL_CLOCK, 0.0)
+                    shared.set(TENANT_TAGS, VIRTUAL_CLOCK, max(virtual, entry["start"]))
+                    break
+                position = next(i for i, e in enumerate(waiting, 1) if e["ticket_id"] == ticket.ticket_id)
+            if not logged:
+                logger.info(f"⏳ '{ticket.tenant}' GPU 차례 대기 (대기 {position}번째, 실행 중 {running}건)")
+                logged = True
+            with self._cond:
+                # 같은 워커의 작업 종료는 바로 깨우고, 다른 워커의 종료는 poll_interval마다 확인
+                self._cond.wait(self.poll_interval)
+
+        ticket.dispatched_at = time.time()
+        metrics.add_gauge("tenant_queue_depth", -1, tenant=ticket.tenant)
+        metrics.observe("tenant_queue_wait_seconds", ticket.dispatched_at - ticket.enqueued_at, tenant=ticket.tenant)
+
+    def _release(self, ticket: _Ticket):
+        """슬롯 반납 + 실제 GPU 초로 태그 보정 / 버킷 차감 / 사용량 기록"""
+        now = time.time()
+        dispatched = ticket.dispatched_at is not None
+        gpu_seconds = 0.0
+        if dispatched:
+            gpu_seconds = ticket.gpu_seconds if ticket.gpu_seconds is not None else now - ticket.dispatched_at
+        else:
+            metrics.add_gauge("tenant_queue_depth", -1, tenant=ticket.tenant)
+
+        shared = get_shared_state()
+        with shared.lock(TENANT_QUEUE):
+            shared.delete(TENANT_QUEUE, ticket.ticket_id)
+            tags = shared.items(TENANT_TAGS)
+            if dispatched and ticket.tenant in tags:
+                # 예상보다 오래 쓴 만큼 다음 작업이 뒤로 (덜 쓰면 앞으로, 가상 시각보다 앞으로는 가지 않음)
+                corrected = tags[ticket.tenant] + (gpu_seconds - ticket.cost) / self.weight(ticket.tenant)
+                shared.set(TENANT_TAGS, ticket.tenant, max(tags.get(VIRTUAL_CLOCK, 0.0), corrected))
+            if not self._entries_locked():
+                # 큐가 비면 과거 사용량은 잊음 (다음 작업부터 모든 테넌트가 같은 출발선)
+                for tenant in tags:
+                    if tenant != VIRTUAL_CLOCK:
+                        shared.delete(TENANT_TAGS, tenant)
+                shared.set(TENANT_TAGS, VIRTUAL_CLOCK, max(tags.values(), default=0.0))
+        with self._cond:
+            self._cond.notify_all()
+
+        if dispatched:
+            self._charge_gpu(ticket.tenant, gpu_seconds)
+            self._add_usage(ticket.tenant, gpu_seconds=gpu_seconds, jobs=1)
+            metrics.increment("tenant_gpu_seconds_total", amount=gpu_seconds, tenant=ticket.tenant)
+            metrics.increment("tenant_jobs_total", tenant=ticket.tenant)
+
+    @contextmanager
+    def slot(self, tenant: str, cost: float, job_id: Optional[str] = None) -> Iterator[_Ticket]:
+        """테넌트 차례가 올 때까지 대기 후 ComfyUI 실행 구간 진입 (종료 시 반납)"""
+        ticket = _Ticket(tenant, cost, job_id)
+        self._enqueue(ticket)
+        try:
+            self._wait_turn(ticket)
+            yield ticket
+        finally:
+            self._release(ticket)
+
+    # ------------------------------------------------------------
+    # 조회
+    # ------------------------------------------------------------
+    def _queue_view(self) -> tuple:
+        """(실행 중 항목, 순서대로 대기 항목 - position / 앞 작업 예상 대기 초 포함)"""
+        shared = get_shared_state()
+        with shared.lock(TENANT_QUEUE):
+            entries = self._entries_locked()
+        now = time.time()
+        running = [e for e in entries.values() if e["state"] == "running"]
+        # 실행 중인 작업은 남은 예상 시간 (예상보다 오래 걸리는 작업도 최소 10%는 남았다고 가정)
+        ahead = sum(max(e["cost"] - (now - e["dispatched_at"]), e["cost"] * 0.1) for e in running)
+        waiting = []
+        for position, entry in enumerate(self._ordered(entries), 1):
+            waiting.append({
+                "tenant": entry["tenant"],
+                "job_id": entry["job_id"],
+                "position": position,
+                "waited_seconds": round(now - entry["enqueued_at"], 1),
+                "estimated_wait_seconds": round(ahead / self.max_dispatched, 1)
+            })
+            ahead += entry["cost"]
+        return running, waiting
+
+    def job_position(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """작업 기록 ID의 공정 큐 대기 순서 (대기 중이 아니면 None)"""
+        _, waiting = self._queue_view()
+        return next((w for w in waiting if w["job_id"] == job_id), None)
+
+    def tenant_queue(self, tenant: str) -> Dict[str, Any]:
+        """테넌트의 대기 / 실행 중 작업, 전체 대기 길이, 남은 한도, 누적 사용량"""
+        running, waiting = self._queue_view()
+        return {
+            "tenant": tenant,
+            "weight": self.weight(tenant),
+            "queue_length": len(waiting),
+            "running": [
+                {"job_id": e["job_id"], "running_seconds": round(time.time() - e["dispatched_at"], 1)}
+                for e in running if e["tenant"] == tenant
+            ],
+            "waiting": [w for w in waiting if w["tenant"] == tenant],
+            "budgets": self.budgets(tenant),
+            "usage": self.usage(tenant)
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """실행 중 / 대기 작업 수 + 테넌트별 대기 수 + 누적 사용량 (/status, /api/tenants)"""
+        running, waiting = self._queue_view()
+        tenants: Dict[str, Dict[str, Any]] = {}
+        for tenant, usage in get_shared_state().items(TENANT_USAGE).items():
+            tenants[tenant] = {"running": 0, "waiting": 0, "usage": usage}
+        for entry in running:
+            tenants.setdefault(entry["tenant"], {"running": 0, "waiting": 0, "usage": None})["running"] += 1
+        for entry in waiting:
+            tenants.setdefault(entry["tenant"], {"running": 0, "waiting": 0, "usage": None})["waiting"] += 1
+        return {
+            "enabled": self.enabled,
+            "max_dispatched": self.max_dispatched,
+            "running": len(running),
+            "waiting": len(waiting),
+            "tenants": tenants
+        }
+
+
+# ===========================
+# 요청 스레드의 테넌트 컨텍스트
+# ===========================
+_local = threading.local()
+
+
+@contextmanager
+def tenant_context(tenant: Optional[str], workflow: Optional[str] = None, job_id: Optional[str] = None):
+    """
+    이 컨텍스트 안의 ComfyUI 실행(gpu_slot) / GPT 호출(consume_gpt_call)을 tenant 몫으로 처리
+
+    Args:
+        workflow: 수락 제어 워크플로우 이름 (예상 GPU 초)
+        job_id: 작업 기록 ID (GET /api/jobs/{job_id}의 대기 순서)
+    """
+    previous = getattr(_local, "context", None)
+    _local.context = {"tenant": tenant, "workflow": workflow, "job_id": job_id, "ticket": None} if tenant else None
+    try:
+        yield
+    finally:
+        _local.context = previous
+
+
+def with_tenant(func: Callable[..., Any], tenant: Optional[str], workflow: Optional[str] = None) -> Callable[..., Any]:
+    """func()을 테넌트 컨텍스트 안에서 실행하는 함수 반환 (executor 스레드용)"""
+    @wraps(func)
+    def run(*args, **kwargs):
+        with tenant_context(tenant, workflow):
+            return func(*args, **kwargs)
+    return run
+
+
+@contextmanager
+def gpu_slot():
+    """
+    ComfyUI 실행 구간 - 현재 테넌트 차례가 올 때까지 대기
+
+    테넌트 컨텍스트 밖(워밍업, 재시작 후 회수 등)이거나 이미 슬롯을 가진 스레드(OOM 재시도 등 중첩)는 바로 진행
+    """
+    context = getattr(_local, "context", None)
+    scheduler = get_fair_scheduler()
+    if context is None or context["ticket"] is not None or not scheduler.enabled:
+        yield
+        return
+    cost = scheduler.expected_cost(context["workflow"])
+    with scheduler.slot(context["tenant"], cost, context["job_id"]) as ticket:
+        context["ticket"] = ticket
+        try:
+            yield
+        finally:
+            context["ticket"] = None
+
+
+def record_gpu_seconds(seconds: float):
+    """ComfyUI가 보고한 prompt 실행 시간을 현재 슬롯에 기록 (슬롯 반납 시 테넌트에 청구)"""
+    context = getattr(_local, "context", None)
+    ticket = context["ticket"] if context else None
+    if ticket is not None and seconds > 0:
+        ticket.gpu_seconds = (ticket.gpu_seconds or 0.0) + seconds
+
+
+def consume_gpt_call(strict: bool = True) -> bool:
+    """현재 테넌트의 GPT 호출 1회 차감 (테넌트 컨텍스트 밖이면 항상 True)"""
+    context = getattr(_local, "context", None)
+    if context is None:
+        return True
+    return get_fair_scheduler().consume_gpt_call(context["tenant"], strict=strict)
+
+
+# 싱글톤 인스턴스
+_fair_scheduler: Optional[FairShareScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_fair_scheduler() -> FairShareScheduler:
+    """FairShareScheduler 싱글톤 인스턴스"""
+    global _fair_scheduler
+    if _fair_scheduler is None:
+        with _scheduler_lock:
+            if _fair_scheduler is None:
+                _fair_scheduler = FairShareScheduler(load_tenancy_config())
+    return _fair_scheduler
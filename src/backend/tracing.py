@@ -0,0 +1,328 @@
+# tracing.py
+"""
+요청 트레이싱 (OpenTelemetry 호환 span 구조, 외부 의존성 없음)
+- 요청마다 trace 1개 (HTTP 미들웨어에서 시작, W3C traceparent 헤더가 있으면 이어받음)
+- span: 프롬프트 빌더(GPT), ComfyUIClient 호출, ComfyUI 노드 실행, 후처리 detector
+  - ComfyUI 큐 대기/실행은 history 타임스탬프, 노드별 실행은 WebSocket executing 이벤트로 기록
+- 현재 span은 contextvars로 전달 (executor 스레드로 넘길 때는 wrap()으로 컨텍스트 복사)
+- 응답에 Server-Timing 헤더 (span 이름별 소요 시간 합계)
+- 느린 요청(slow_threshold_ms 이상)과 실패 요청, sample_rate 비율의 요청만 내보냄
+  - file: 롤링 JSONL (configs/image_editing_config.yaml: comfyui.tracing.path)
+  - console: 로그에 span 트리 출력
+
+trace가 없는 곳(백그라운드 스레드 등)에서는 span()/traced()가 아무 일도 하지 않음
+"""
+import os
+import re
+import json
+import time
+import random
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import wraps
+from logging.handlers import RotatingFileHandler
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DEFAULT_TRACE_PATH = os.path.join(PROJECT_ROOT, "logs", "traces.jsonl")
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+_TOKEN_UNSAFE = re.compile(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]")  # Server-Timing 이름은 HTTP token
+
+
+def _new_id(nbytes: int) -> str:
+    return os.urandom(nbytes).hex()
+
+
+@dataclass
+class Span:
+    """OpenTelemetry span (시간은 epoch 초, 내보낼 때 나노초로 변환)"""
+    name: str
+    trace: "Trace"
+    parent_id: Optional[str]
+    start: float
+    end: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = "UNSET"  # UNSET / OK / ERROR
+    status_message: str = ""
+    span_id: str = field(default_factory=lambda: _new_id(8))
+
+    @property
+    def duration(self) -> float:
+        return ((self.end or time.time()) - self.start)
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_error(self, error: BaseException):
+        self.status = "ERROR"
+        self.status_message = f"{type(error).__name__}: {error}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "startTimeUnixNano": int(self.start * 1e9),
+            "endTimeUnixNano": int((self.end or self.start) * 1e9),
+            "attributes": self.attributes,
+            "status": {"code": self.status, "message": self.status_message}
+        }
+
+
+class Trace:
+    """요청 1건의 span 모음 (여러 스레드에서 span 추가, 스레드 안전)"""
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or _new_id(16)
+        self.spans: List[Span] = []
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            if not self.finished:
+                self.spans.append(span)
+
+    def close(self):
+        """이후 추가되는 span 무시"""
+        with self._lock:
+            self.finished = True
+
+    def snapshot(self) -> List[Span]:
+        with self._lock:
+            return list(self.spans)
+
+    def server_timing(self, root: Optional[Span] = None) -> str:
+        """
+        Server-Timing 헤더 값: span 이름별 소요 시간 합계 (ms, 시작 순서)
+        예: prompt.build_final_prompt_v2;dur=812.4, comfyui.wait_for_completion;dur=9310.2, total;dur=10422.7
+        """
+        totals: Dict[str, float] = {}
+        for span in self.snapshot():
+            if span is root or span.end is None:
+                continue
+            totals[span.name] = totals.get(span.name, 0.0) + span.duration
+        entries = [f"{_TOKEN_UNSAFE.sub('_', name)};dur={seconds * 1000:.1f}" for name, seconds in totals.items()]
+        if root is not None:
+            entries.append(f"total;dur={root.duration * 1000:.1f}")
+        entries.append(f'trace;desc="{self.trace_id}"')
+        return ", ".join(entries)
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current_span.get()
+    return span.trace.trace_id if span else None
+
+
+@contextmanager
+def start_trace(name: str, traceparent: Optional[str] = None, **attributes):
+    """
+    요청 trace 시작 (루트 span을 현재 span으로 지정)
+
+    Args:
+        traceparent: W3C traceparent 헤더 (있으면 trace_id / 부모 span을 이어받음)
+
+    Yields:
+        루트 Span (종료/내보내기는 finish_trace)
+    """
+    trace_id = parent_id = None
+    match = _TRACEPARENT.match((traceparent or "").strip().lower())
+    if match:
+        trace_id, parent_id = match.group(1), match.group(2)
+
+    trace = Trace(trace_id)
+    root = Span(name=name, trace=trace, parent_id=parent_id, start=time.time(), attributes=dict(attributes))
+    trace.add(root)
+    token = _current_span.set(root)
+    try:
+        yield root
+    finally:
+        _current_span.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """현재 trace에 하위 span 기록 (trace가 없으면 None을 yield하고 아무것도 기록하지 않음)"""
+    parent = _current_span.get()
+    if parent is None or parent.trace.finished:
+        yield None
+        return
+
+    child = Span(
+        name=name, trace=parent.trace, parent_id=parent.span_id,
+        start=time.time(), attributes=dict(attributes)
+    )
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.set_error(e)
+        raise
+    finally:
+        child.end = time.time()
+        _current_span.reset(token)
+        parent.trace.add(child)
+
+
+def traced(name: str):
+    """함수 호출을 span으로 기록하는 데코레이터"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_span(name: str, start: float, end: float, **attributes) -> Optional[Span]:
+    """이미 끝난 구간을 현재 span의 하위 span으로 기록 (ComfyUI history / WebSocket 타임스탬프)"""
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    recorded = Span(
+        name=name, trace=parent.trace, parent_id=parent.span_id,
+        start=start, end=max(start, end), attributes=dict(attributes)
+    )
+    parent.trace.add(recorded)
+    return recorded
+
+
+def is_active() -> bool:
+    """현재 컨텍스트에 trace가 있는지 (노드 span 수집 여부 판단용)"""
+    return _current_span.get() is not None
+
+
+def wrap(func: Callable[..., Any]) -> Callable[..., Any]:
+    """현재 컨텍스트(현재 span 포함)에서 func을 실행하는 함수 반환 (run_in_executor용)"""
+    context = contextvars.copy_context()
+
+    @wraps(func)
+    def run(*args, **kwargs):
+        return context.run(func, *args, **kwargs)
+    return run
+
+
+# ===========================
+# 내보내기 (exporter)
+# ===========================
+def load_tracing_config() -> Dict[str, Any]:
+    """configs/image_editing_config.yaml: comfyui.tracing"""
+    from .comfyui_workflows import load_image_editing_config
+
+    return load_image_editing_config().get("comfyui", {}).get("tracing", {})
+
+
+class TraceExporter:
+    """끝난 trace 중 느린/실패/샘플링된 요청만 file(롤링 JSONL) 또는 console로 내보냄"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.enabled = config.get("enabled", True)
+        self.exporter = config.get("exporter", "file")
+        self.slow_threshold = config.get("slow_threshold_ms", 10000) / 1000
+        self.sample_rate = config.get("sample_rate", 0.0)
+        self.node_spans = config.get("node_spans", True)
+        self.server_timing = config.get("server_timing", True)
+        self._file_logger: Optional[logging.Logger] = None
+
+        if self.enabled and self.exporter == "file":
+            path = config.get("path") or DEFAULT_TRACE_PATH
+            if not os.path.isabs(path):
+                path = os.path.join(PROJECT_ROOT, path)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                handler = RotatingFileHandler(
+                    path,
+                    maxBytes=config.get("max_bytes", 10 * 1024 * 1024),
+                    backupCount=config.get("backup_count", 5),
+                    encoding="utf-8"
+                )
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                self._file_logger = logging.getLogger(f"{__name__}.file")
+                self._file_logger.setLevel(logging.INFO)
+                self._file_logger.propagate = False
+                self._file_logger.addHandler(handler)
+            except OSError as e:
+                logger.warning(f"⚠️ 트레이스 파일을 열 수 없어 콘솔로 출력합니다 ({path}): {e}")
+                self.exporter = "console"
+
+    def should_export(self, root: Span) -> bool:
+        if not self.enabled or self.exporter == "none":
+            return False
+        if root.duration >= self.slow_threshold or root.status == "ERROR":
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def export(self, trace: Trace, root: Span):
+        spans = sorted(trace.snapshot(), key=lambda s: s.start)
+        if self._file_logger is not None:
+            self._file_logger.info(json.dumps(
+                {
+                    "traceId": trace.trace_id,
+                    "name": root.name,
+                    "durationMs": round(root.duration * 1000, 1),
+                    "spans": [s.to_dict() for s in spans]
+                },
+                ensure_ascii=False, default=str
+            ))
+            return
+
+        depth = {root.span_id: 0}
+        lines = [f"🐢 느린 요청 trace {trace.trace_id} - {root.name} ({root.duration * 1000:.0f}ms)"]
+        for s in spans:
+            if s is root:
+                continue
+            level = depth.get(s.parent_id, 0) + 1
+            depth[s.span_id] = level
+            mark = " ❌" if s.status == "ERROR" else ""
+            lines.append(f"{'   ' * level}{s.name} {s.duration * 1000:.1f}ms{mark}")
+        logger.info("\n".join(lines))
+
+
+def finish_trace(root: Span, status_code: Optional[int] = None):
+    """루트 span 종료 + 내보내기 판단 (이후 추가되는 span은 무시)"""
+    if root.trace.finished:
+        return
+    root.end = time.time()
+    if status_code is not None:
+        root.set_attribute("http.status_code", status_code)
+        if status_code >= 500:
+            root.status = "ERROR"
+    root.trace.close()
+
+    exporter = get_trace_exporter()
+    if exporter.should_export(root):
+        try:
+            exporter.export(root.trace, root)
+        except Exception as e:
+            logger.warning(f"⚠️ 트레이스 내보내기 실패: {e}")
+
+
+# 싱글톤 인스턴스
+_trace_exporter: Optional[TraceExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def get_trace_exporter() -> TraceExporter:
+    """TraceExporter 싱글톤 인스턴스"""
+    global _trace_exporter
+    if _trace_exporter is None:
+        with _exporter_lock:
+            if _trace_exporter is None:
+                _trace_exporter = TraceExporter(load_tracing_config())
+    return _trace_exporter
@@ -0,0 +1,149 @@
+# uploads.py
+"""
+요청 입력 이미지 (I2I / 편집)
+- JSON 요청: input_image_base64 문자열
+- multipart/form-data 요청: 업로드 파일 (Starlette가 SpooledTemporaryFile에 스트리밍으로 저장)
+- 디코딩 / 해시 / 읽기는 모두 executor 스레드에서 수행 (이벤트 루프를 막지 않음)
+- ComfyUI 업로드는 파일 객체를 그대로 스트리밍 (MultipartFileStream, 전체 바이트 복사 없음)
+"""
+import io
+import uuid
+import base64
+import hashlib
+import binascii
+import threading
+from typing import BinaryIO, List, Optional, Union
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class InputImage:
+    """입력 이미지 1개 (base64 문자열 또는 업로드 파일, 디코딩은 처음 사용할 때 한 번만)"""
+
+    def __init__(
+        self,
+        base64_data: Optional[str] = None,
+        file: Optional[BinaryIO] = None,
+        filename: str = "input.png"
+    ):
+        if (base64_data is None) == (file is None):
+            raise ValueError("base64_data와 file 중 하나만 지정해야 합니다.")
+        self._base64 = base64_data
+        self._file = file
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._sha256: Optional[bytes] = None
+
+    @classmethod
+    def from_base64(cls, data: str) -> "InputImage":
+        return cls(base64_data=data)
+
+    @classmethod
+    def from_upload(cls, upload) -> "InputImage":
+        """FastAPI UploadFile (upload.file: SpooledTemporaryFile)"""
+        return cls(file=upload.file, filename=upload.filename or "input.png")
+
+    def open(self) -> BinaryIO:
+        """
+        처음 위치로 되돌린 파일 객체 (base64는 이때 한 번만 디코딩)
+
+        Raises:
+            ValueError: base64 디코딩 실패
+        """
+        with self._lock:
+            if self._file is None:
+                try:
+                    self._file = io.BytesIO(base64.b64decode(self._base64, validate=False))
+                except (binascii.Error, ValueError) as e:
+                    raise ValueError(f"입력 이미지 Base64 디코딩 실패: {e}")
+                self._base64 = None
+        self._file.seek(0)
+        return self._file
+
+    def read(self) -> bytes:
+        """전체 바이트 (PIL 등 바이트가 필요한 경로용)"""
+        return self.open().read()
+
+    def sha256(self) -> bytes:
+        """내용 해시 (동일 요청 판별용, 청크 단위로 계산 후 캐시)"""
+        if self._sha256 is None:
+            digest = hashlib.sha256()
+            stream = self.open()
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+            stream.seek(0)
+            self._sha256 = digest.digest()
+        return self._sha256
+
+
+ImageSource = Union[bytes, bytearray, memoryview, BinaryIO, InputImage]
+
+
+def open_image_source(image: ImageSource) -> BinaryIO:
+    """바이트 / 파일 객체 / InputImage → 처음 위치의 파일 객체"""
+    if isinstance(image, InputImage):
+        return image.open()
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return io.BytesIO(image)  # bytes는 복사하지 않고 버퍼 공유
+    image.seek(0)
+    return image
+
+
+def image_source_size(image: ImageSource) -> int:
+    """입력 이미지 크기 (바이트, 내용을 읽지 않음)"""
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return len(image)
+    stream = open_image_source(image)
+    stream.seek(0, io.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    return size
+
+
+class MultipartFileStream(io.RawIOBase):
+    """
+    파일 1개짜리 multipart/form-data 본문을 순차적으로 읽는 스트림
+
+    requests의 data=로 넘기면 Content-Length를 알려 주고 블록 단위로 읽어 전송하므로
+    업로드 파일 전체를 메모리에 올리거나 multipart 본문을 따로 만들지 않음
+    """
+
+    def __init__(self, field: str, filename: str, fileobj: BinaryIO, content_type: str = "application/octet-stream"):
+        self.boundary = uuid.uuid4().hex
+        head = (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode("utf-8")
+        tail = f"\r\n--{self.boundary}--\r\n".encode("utf-8")
+
+        fileobj.seek(0, io.SEEK_END)
+        file_size = fileobj.tell()
+        fileobj.seek(0)
+
+        self._parts: List[BinaryIO] = [io.BytesIO(head), fileobj, io.BytesIO(tail)]
+        self._length = len(head) + file_size + len(tail)
+        self._position = 0
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return self._length
+
+    def readable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        while self._parts:
+            data = self._parts[0].read(len(buffer))
+            if data:
+                buffer[:len(data)] = data
+                self._position += len(data)
+                return len(data)
+            self._parts.pop(0)
+        return 0
@@ -9,9 +9,13 @@ import requests
 from io import BytesIO
 from PIL import Image
 import base64
+import json
+import uuid
+import hashlib
 import yaml
 from typing import Optional, Dict, Any, List
 from pathlib import Path
+from urllib.parse import unquote
 
 # ============================================================
 # 설정 로더
@@ -79,10 +83,14 @@ class APIClient:
 
         # 백엔드 모델 정보 캐싱
         self._model_info = None
+        self._model_info_etag = None
         self._backend_status = None
 
         # 서버 시작 시간 (재시작 감지용)
         self._server_start_time = None
+
+        # 마지막 이미지 응답 메타데이터 (seed, model, elapsed_time 등)
+        self.last_image_meta: Dict[str, str] = {}
     
     def get_backend_status(self, force_refresh: bool = False) -> Optional[Dict]:
         """백엔드 상태 조회 (캐싱)"""
@@ -115,16 +123,28 @@ class APIClient:
             return self._model_info
 
         try:
-            resp = requests.get(f"{self.base_url}/models", timeout=5)
+            headers = {}
+            if self._model_info and self._model_info_etag:
+                headers["If-None-Match"] = self._model_info_etag
+
+            resp = requests.get(f"{self.base_url}/models", headers=headers, timeout=5)
+            if resp.status_code == 304:
+                return self._model_info
             resp.raise_for_status()
             self._model_info = resp.json()
+            self._model_info_etag = resp.headers.get("ETag")
             return self._model_info
         except Exception as e:
             st.warning(f"⚠️ 모델 정보 조회 실패: {e}")
             return None
 
-    def switch_model(self, model_name: str) -> Dict:
-        """모델 전환 (비동기 방식)"""
+    def switch_model(self, model_name: str, progress_callback=None) -> Dict:
+        """모델 전환 (비동기 방식)
+
+        Args:
+            model_name: 전환할 모델 이름
+            progress_callback: 진행 상황 콜백 (percent, message)
+        """
         import time
 
         # 1. 비동기 전환 시작
@@ -155,6 +175,9 @@ class APIClient:
                 status_resp.raise_for_status()
                 status = status_resp.json()
 
+                if progress_callback:
+                    progress_callback(status.get("percent", 0), status.get("message", ""))
+
                 # 전환 완료 확인
                 if not status.get("in_progress", True):
                     if status.get("success"):
@@ -173,6 +196,106 @@ class APIClient:
 
         raise Exception("모델 전환 타임아웃 (5분 초과)")
     
+    # 백엔드 OOM 완화 단계 표시 이름
+    OOM_RUNG_LABELS = {
+        "tiled_vae": "타일 VAE 디코딩",
+        "lower_quant": "저용량(Q4) 모델",
+        "lowres_upscale": "저해상도 생성 + 업스케일"
+    }
+
+    # 이미지 바이트를 그대로 받고 메타데이터(seed 등)는 X-Image-* 헤더로 받음
+    IMAGE_ACCEPT_HEADERS = {"Accept": "image/png, image/*;q=0.9, application/json;q=0.5"}
+
+    def _read_image_response(self, resp: requests.Response) -> BytesIO:
+        """이미지 응답 읽기 (바이너리 응답 우선, 구버전 백엔드의 Base64 JSON도 지원)"""
+        if resp.headers.get("Content-Type", "").startswith("application/json"):
+            self.last_image_meta = {}
+            return BytesIO(base64.b64decode(resp.json()["image_base64"]))
+
+        self.last_image_meta = {
+            name[len("x-image-"):].replace("-", "_"): unquote(value)
+            for name, value in ((k.lower(), v) for k, v in resp.headers.items())
+            if name.startswith("x-image-")
+        }
+        return BytesIO(resp.content)
+
+    def _idempotency_key(self, endpoint: str, payload: Dict) -> str:
+        """
+        요청별 Idempotency-Key (같은 payload면 재시도/Streamlit rerun에도 같은 키 사용)
+
+        응답을 받기 전에 rerun되어도 다음 실행에서 같은 키로 재요청하므로
+        백엔드는 진행 중인 ComfyUI 작업에 재연결함 (GPU 작업 중복 없음)
+        """
+        digest = hashlib.sha256(
+            (endpoint + json.dumps(payload, sort_keys=True, ensure_ascii=False)).encode("utf-8")
+        ).hexdigest()
+        pending = st.session_state.setdefault("_pending_idempotency_keys", {})
+        return pending.setdefault(digest, uuid.uuid4().hex)
+
+    def _release_idempotency_key(self, endpoint: str, payload: Dict):
+        """요청이 끝나면 키 해제 (같은 설정으로 다시 생성하면 새 이미지)"""
+        digest = hashlib.sha256(
+            (endpoint + json.dumps(payload, sort_keys=True, ensure_ascii=False)).encode("utf-8")
+        ).hexdigest()
+        st.session_state.get("_pending_idempotency_keys", {}).pop(digest, None)
+
+    def _read_image_list_response(self, resp: requests.Response) -> List[BytesIO]:
+        """여러 장 응답 읽기 (레거시 JSON: image_base64, image_1_base64, ...)"""
+        body = resp.json()
+        self.last_image_meta = {k: v for k, v in body.items() if not k.endswith("_base64")}
+        images = [BytesIO(base64.b64decode(body["image_base64"]))]
+        while f"image_{len(images)}_base64" in body:
+            images.append(BytesIO(base64.b64decode(body[f"image_{len(images)}_base64"])))
+        return images
+
+    def _post_image(self, endpoint: str, payload: Dict, label: str, multiple: bool = False):
+        """
+        이미지 생성 요청 (재시도 포함)
+
+        - 타임아웃/연결 끊김: 같은 Idempotency-Key로 재요청 (기존 작업에 재연결)
+        - GPU 메모리 부족: 백엔드가 tiled VAE → 저용량 모델 → 저해상도+업스케일 순으로
+          직접 처리하므로 클라이언트에서 해상도를 낮춰 다시 생성하지 않음
+        - multiple: 여러 장 응답 (JSON으로 받아 BytesIO 리스트 반환)
+        """
+        current_payload = payload.copy()
+
+        for attempt in range(self.retry_attempts + 1):
+            headers = {
+                **({} if multiple else self.IMAGE_ACCEPT_HEADERS),
+                "Idempotency-Key": self._idempotency_key(endpoint, current_payload)
+            }
+            try:
+                resp = requests.post(
+                    f"{self.base_url}{endpoint}",
+                    json=current_payload,
+                    headers=headers,
+                    timeout=self.timeout
+                )
+                resp.raise_for_status()
+                if multiple:
+                    image = self._read_image_list_response(resp)
+                else:
+                    image = self._read_image_response(resp)
+                self._release_idempotency_key(endpoint, current_payload)
+
+                oom_rung = self.last_image_meta.get("oom_rung", "none")
+                if oom_rung != "none":
+                    st.info(f"⚠️ GPU 메모리 부족으로 '{self.OOM_RUNG_LABELS.get(oom_rung, oom_rung)}' 방식으로 생성했습니다.")
+                return image
+
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                if attempt < self.retry_attempts:
+                    st.info(f"⏳ 응답 지연 - 진행 중인 작업에 다시 연결합니다 ({attempt + 1}/{self.retry_attempts})")
+                    continue
+                raise Exception(f"{label} 요청 실패: {e}")
+            except requests.exceptions.HTTPError as e:
+                self._release_idempotency_key(endpoint, current_payload)
+                raise Exception(f"{label} 실패: {e.response.json().get('detail', str(e))}")
+            except Exception as e:
+                raise Exception(f"{label} 요청 실패: {e}")
+
+        return None
+
     def call_caption(self, payload: Dict) -> str:
         """문구 생성 API 호출"""
         try:
@@ -188,74 +311,98 @@ class APIClient:
     
     def call_t2i(self, payload: Dict) -> Optional[BytesIO]:
         """T2I 이미지 생성 (자동 재시도 포함)"""
-        current_payload = payload.copy()
-        
-        for attempt in range(self.retry_attempts + 1):
-            try:
-                resp = requests.post(
-                    f"{self.base_url}/api/generate_t2i",
-                    json=current_payload,
-                    timeout=self.timeout
-                )
-                resp.raise_for_status()
-                b64 = resp.json()["image_base64"]
-                return BytesIO(base64.b64decode(b64))
-            
-            except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 503 and attempt < self.retry_attempts:
-                    # GPU OOM 시 해상도 줄여서 재시도
-                    detail = e.response.json().get("detail", "")
-                    if "메모리" in detail or "GPU" in detail:
-                        w = current_payload["width"]
-                        h = current_payload["height"]
-                        new_w = max(64, align_to_64(w // 2))
-                        new_h = max(64, align_to_64(h // 2))
-                        st.info(f"⚠️ 메모리 부족 - 해상도 낮춤: {w}x{h} → {new_w}x{new_h}")
-                        current_payload["width"] = new_w
-                        current_payload["height"] = new_h
-                        continue
-                raise Exception(f"T2I 생성 실패: {e.response.json().get('detail', str(e))}")
-            except Exception as e:
-                raise Exception(f"T2I 요청 실패: {e}")
-        
-        return None
+        return self._post_image("/api/generate_t2i", payload, "T2I 생성")
     
+    def call_t2i_batch(self, payload: Dict) -> List[BytesIO]:
+        """T2I 여러 장 생성 (num_images - 백엔드가 한 번의 ComfyUI 실행으로 배치 생성)"""
+        return self._post_image("/api/generate_t2i", payload, "T2I 생성", multiple=True) or []
+
+    def stream_events(self, endpoint: str, payload: Dict):
+        """
+        스트리밍 요청 (Server-Sent Events) - (이벤트 이름, 데이터)를 도착 순서대로 yield
+
+        image 이벤트의 image_base64는 BytesIO("image")로 변환, error 이벤트는 예외로 변환
+        """
+        with requests.post(
+            f"{self.base_url}{endpoint}",
+            json=payload,
+            stream=True,
+            timeout=(10, self.timeout)  # 읽기 타임아웃은 이벤트 간격 기준 (서버가 15초마다 keep-alive)
+        ) as resp:
+            if resp.status_code >= 400:
+                raise Exception(resp.json().get("detail", resp.text))
+
+            event, data_lines = None, []
+            for line in resp.iter_lines(decode_unicode=True):
+                if line is None:
+                    continue
+                if line.startswith(":"):  # keep-alive 주석
+                    continue
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    data_lines.append(line[len("data:"):].strip())
+                elif not line and event:
+                    data = json.loads("\n".join(data_lines) or "{}")
+                    if "image_base64" in data:
+                        data["image"] = BytesIO(base64.b64decode(data.pop("image_base64")))
+                    if event == "error":
+                        raise Exception(data.get("detail", "알 수 없는 오류"))
+                    yield event, data
+                    event, data_lines = None, []
+
+    def call_t2i_drafts(self, payload: Dict) -> Dict:
+        """
+        T2I 초안 생성 (낮은 steps/해상도 미리보기)
+
+        Returns:
+            {"draft_id", "seeds", "images": [BytesIO, ...], ...메타데이터}
+        """
+        try:
+            resp = requests.post(
+                f"{self.base_url}/api/drafts",
+                json=payload,
+                timeout=self.timeout
+            )
+            resp.raise_for_status()
+            body = resp.json()
+            body["images"] = [
+                BytesIO(base64.b64decode(body.pop(f"draft_{i}_base64")))
+                for i in range(len(body["seeds"]))
+            ]
+            return body
+        except requests.exceptions.HTTPError as e:
+            raise Exception(f"초안 생성 실패: {e.response.json().get('detail', str(e))}")
+        except Exception as e:
+            raise Exception(f"초안 생성 실패: {e}")
+
+    def call_refine_draft(self, draft_id: str, index: int, method: Optional[str] = None) -> Optional[BytesIO]:
+        """선택한 초안 완성 (프롬프트/seed는 서버에 보관된 초안 세션 사용)"""
+        return self._post_image(
+            f"/api/drafts/{draft_id}/refine",
+            {"index": index, "method": method},
+            "초안 완성"
+        )
+
     def call_i2i(self, payload: Dict) -> Optional[BytesIO]:
         """I2I 이미지 편집 (자동 재시도 포함)"""
-        current_payload = payload.copy()
-        
-        for attempt in range(self.retry_attempts + 1):
-            try:
-                resp = requests.post(
-                    f"{self.base_url}/api/generate_i2i",
-                    json=current_payload,
-                    timeout=self.timeout
-                )
-                resp.raise_for_status()
-                b64 = resp.json()["image_base64"]
-                return BytesIO(base64.b64decode(b64))
-            
-            except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 503 and attempt < self.retry_attempts:
-                    detail = e.response.json().get("detail", "")
-                    if "메모리" in detail or "GPU" in detail:
-                        w = current_payload["width"]
-                        h = current_payload["height"]
-                        new_w = max(64, align_to_64(w // 2))
-                        new_h = max(64, align_to_64(h // 2))
-                        st.info(f"⚠️ 메모리 부족 - 해상도 낮춤: {w}x{h} → {new_w}x{new_h}")
-                        current_payload["width"] = new_w
-                        current_payload["height"] = new_h
-                        continue
-                raise Exception(f"I2I 편집 실패: {e.response.json().get('detail', str(e))}")
-            except Exception as e:
-                raise Exception(f"I2I 요청 실패: {e}")
-        
-        return None
+        return self._post_image("/api/generate_i2i", payload, "I2I 편집")
 
 # ============================================================
 # 유틸리티 함수
 # ============================================================
+def describe_stream_event(event: str, data: Dict) -> Optional[str]:
+    """스트리밍 진행 이벤트 → 상태 문구 (표시하지 않는 이벤트는 None)"""
+    if event == "queue":
+        if data.get("position", 0) == 0:
+            return "🎨 ComfyUI에서 생성 중..."
+        return f"⏳ 대기 중... (대기 순서 {data['position']}번째)"
+    if event == "step" and data.get("max"):
+        return f"🔄 샘플링 {data['value']}/{data['max']} step"
+    if event == "stage":
+        return f"🔧 [{data['completed']}/{data['total']}] {data['name']}"
+    return None
+
 def align_to_64(val: int) -> int:
     """64의 배수로 정렬"""
     v = max(64, int(val))
@@ -339,9 +486,15 @@ def main():
             # 모델 전환 버튼
             if selected_model != current_model:
                 if st.sidebar.button("🔄 모델 전환", type="primary"):
+                    switch_progress = st.sidebar.progress(0, text=f"'{selected_model}' 로딩 중...")
                     with st.spinner(f"'{selected_model}' 로딩 중..."):
                         try:
-                            result = api.switch_model(selected_model)
+                            result = api.switch_model(
+                                selected_model,
+                                progress_callback=lambda pct, msg: switch_progress.progress(
+                                    min(int(pct), 100), text=msg or None
+                                )
+                            )
                             st.sidebar.success(result["message"])
                             api.get_model_info(force_refresh=True)
                             st.rerun()
@@ -564,7 +717,13 @@ def render_t2i_page(config: ConfigLoader, api: APIClient, connect_mode: bool):
         max_value=5,
         value=1,
         step=1,
-        help="여러 개 생성 시 각각 다른 랜덤 seed 사용 (시간: 약 30-60초/이미지)"
+        help="여러 개 생성 시 한 번의 배치로 생성되며 이미지마다 다른 노이즈 사용"
+    )
+
+    # 초안 모드: 빠른 미리보기 후 고른 초안만 완성
+    draft_mode = st.checkbox(
+        "⚡ 초안 모드 (빠른 미리보기 후 고른 이미지만 완성)",
+        help="낮은 해상도/steps로 초안을 먼저 만들고, 마음에 드는 초안만 같은 seed로 완성합니다"
     )
 
     # 생성 중 상태 확인
@@ -573,9 +732,33 @@ def render_t2i_page(config: ConfigLoader, api: APIClient, connect_mode: bool):
     if is_generating:
         st.warning("⏳ 이미지 생성 중입니다... 페이지를 이동하지 마세요!")
         submitted = False
+    elif draft_mode:
+        submitted = st.button(f"⚡ 초안 생성 ({num_images}개)", type="primary")
     else:
         submitted = st.button(f"🖼 이미지 생성 ({num_images}개)", type="primary")
 
+    if submitted and selected_caption and draft_mode:
+        st.session_state["is_generating_t2i"] = True
+        payload = {
+            "prompt": caption_to_prompt(selected_caption),
+            "width": align_to_64(width),
+            "height": align_to_64(height),
+            "steps": steps,
+            "guidance_scale": guidance_scale,
+            "num_drafts": num_images
+        }
+        try:
+            with st.spinner(f"초안 {num_images}개 생성 중..."):
+                st.session_state["t2i_drafts"] = api.call_t2i_drafts(payload)
+                st.session_state["t2i_refined"] = {}
+        except Exception as e:
+            st.error(str(e))
+        st.session_state["is_generating_t2i"] = False
+
+    if draft_mode:
+        render_t2i_drafts(api)
+        return
+
     if submitted and selected_caption:
         # 생성 시작 - 상태 설정
         st.session_state["is_generating_t2i"] = True
@@ -587,37 +770,57 @@ def render_t2i_page(config: ConfigLoader, api: APIClient, connect_mode: bool):
             st.info(f"해상도 정렬: {width}x{height} → {aligned_w}x{aligned_h}")
 
         st.session_state["generated_images"] = []
-        progress = st.progress(0)
+        prompt = caption_to_prompt(selected_caption)
 
-        for i in range(num_images):
-            # 1개만 생성할 때는 variation 표시 안함
-            if num_images == 1:
-                prompt = caption_to_prompt(selected_caption)
-            else:
-                prompt = caption_to_prompt(f"{selected_caption} (variation {i+1})")
-
-            payload = {
-                "prompt": prompt,
-                "width": aligned_w,
-                "height": aligned_h,
-                "steps": steps,
-                "guidance_scale": guidance_scale
-            }
+        # 여러 장은 한 번의 요청으로 배치 생성 (이미지마다 다른 seed 노이즈)
+        payload = {
+            "prompt": prompt,
+            "width": aligned_w,
+            "height": aligned_h,
+            "steps": steps,
+            "guidance_scale": guidance_scale,
+            "num_images": num_images
+        }
 
-            try:
-                with st.spinner(f"이미지 {i+1}/{num_images} 생성 중..."):
-                    img_bytes = api.call_t2i(payload)
-                    if img_bytes:
-                        st.session_state["generated_images"].append({
-                            "prompt": prompt,
-                            "bytes": img_bytes
-                        })
-                progress.progress((i+1)/num_images)
-            except Exception as e:
-                st.error(f"이미지 {i+1} 생성 실패: {e}")
-                break
-        
+        # 스트리밍: 완성된 이미지부터 바로 표시 (첫 이미지 대기 시간이 개수와 무관)
+        status = st.empty()
+        progress = st.progress(0.0)
+        max_cols = 3
+        slots = []
+        for row_start in range(0, num_images, max_cols):
+            cols = st.columns(min(max_cols, num_images - row_start))
+            slots += [col.empty() for col in cols]
+
+        finished = 0
+        try:
+            for event, data in api.stream_events("/api/generate_t2i/stream", payload):
+                text = describe_stream_event(event, data)
+                if text:
+                    status.info(text)
+                if event == "step" and data.get("max"):
+                    progress.progress(min(1.0, (finished + data["value"] / data["max"]) / num_images))
+                elif event == "image":
+                    img_bytes = data["image"].getvalue()
+                    st.session_state["generated_images"].append({
+                        "prompt": prompt,
+                        "bytes": img_bytes,
+                        "index": data["index"]
+                    })
+                    slots[data["index"]].image(
+                        img_bytes,
+                        caption=f"버전 {data['index'] + 1} (seed {data.get('seed')})",
+                        width=320
+                    )
+                    finished += 1
+                    progress.progress(finished / num_images)
+        except Exception as e:
+            st.error(f"이미지 생성 실패: {e}")
+
+        status.empty()
         progress.empty()
+        for slot in slots:
+            slot.empty()
+        st.session_state["generated_images"].sort(key=lambda item: item["index"])
 
         # 생성 완료 - 상태 해제
         st.session_state["is_generating_t2i"] = False
@@ -646,6 +849,58 @@ def render_t2i_page(config: ConfigLoader, api: APIClient, connect_mode: bool):
                             key=f"dl_{row_start + idx}"
                         )
 
+def render_t2i_drafts(api: APIClient):
+    """초안 목록 + 초안별 완성 버튼 (초안 세션은 백엔드에 보관)"""
+    drafts = st.session_state.get("t2i_drafts")
+    if not drafts:
+        return
+
+    refine_labels = {
+        "latent_upscale": "초안 구도 유지 (latent 업스케일)",
+        "full": "처음부터 다시 (같은 seed, 전체 steps)"
+    }
+    method = st.radio(
+        "완성 방식",
+        list(refine_labels.keys()),
+        format_func=lambda m: refine_labels[m],
+        horizontal=True
+    )
+
+    st.caption(
+        f"초안 {drafts['draft_width']}x{drafts['draft_height']}, {drafts['draft_steps']} steps "
+        f"({drafts.get('elapsed_time', 0):.1f}초) → 완성 {drafts['width']}x{drafts['height']}, {drafts['steps']} steps"
+    )
+
+    refined = st.session_state.setdefault("t2i_refined", {})
+    max_cols = 3
+    for row_start in range(0, len(drafts["images"]), max_cols):
+        cols = st.columns(min(max_cols, len(drafts["images"]) - row_start))
+        for offset, col in enumerate(cols):
+            index = row_start + offset
+            with col:
+                st.image(
+                    drafts["images"][index],
+                    caption=f"초안 {index + 1} (seed {drafts['seeds'][index]})",
+                    width=320
+                )
+                if st.button("✨ 이 초안 완성", key=f"refine_{drafts['draft_id']}_{index}"):
+                    try:
+                        with st.spinner(f"초안 {index + 1} 완성 중..."):
+                            image = api.call_refine_draft(drafts["draft_id"], index, method)
+                        if image:
+                            refined[index] = image.getvalue()
+                    except Exception as e:
+                        st.error(str(e))
+
+                if index in refined:
+                    st.image(refined[index], caption=f"완성 {index + 1}", width=320)
+                    st.download_button(
+                        "⬇️ 다운로드",
+                        refined[index],
+                        f"image_draft{index + 1}.png",
+                        key=f"dl_refined_{drafts['draft_id']}_{index}"
+                    )
+
 # ============================================================
 # 페이지 3: I2I 이미지 편집 (고도화 버전)
 # ============================================================
@@ -819,14 +1074,36 @@ def render_i2i_page(config: ConfigLoader, api: APIClient, connect_mode: bool):
     }
 
     # --------------------------------------------
-    # 10) 백엔드 호출 (GPU 부족 → 자동 1/2 해상도 재시도)
+    # 10) 백엔드 호출 (스트리밍: 대기 순서 / step 진행 표시)
     # --------------------------------------------
+    status = st.empty()
+    progress = st.progress(0.0)
+    edited_img = None
     try:
-        with st.spinner("이미지 편집 중... 1분 가량 소요됩니다."):
-            edited_img = api.call_i2i(payload)
+        for event, data in api.stream_events("/api/generate_i2i/stream", payload):
+            text = describe_stream_event(event, data)
+            if text:
+                status.info(text)
+            if event == "step" and data.get("max"):
+                progress.progress(min(1.0, data["value"] / data["max"]))
+            elif event == "image":
+                edited_img = data["image"].getvalue()
     except Exception as e:
         st.error(f"❌ 편집 실패: {e}")
         return
+    finally:
+        status.empty()
+        progress.empty()
+
+    if edited_img:
+        st.image(edited_img, caption="✨ 편집 결과", use_container_width=True)
+        st.download_button(
+            "⬇️ 편집 이미지 다운로드",
+            edited_img,
+            file_name="edited_i2i.png",
+            use_container_width=True,
+            key="download_i2i_stream_result"
+        )
 
     # ---------------------------------------------------------------------
     # 8) 편집 결과 표시 (세션 상태에서 가져오기)